@@ -1,7 +1,15 @@
-import asyncio
 import logging
+import time
+import threading
 import voluptuous as vol
+from homeassistant.components.climate import DOMAIN as CLIMATE_DOMAIN
+from homeassistant.components.climate.const import (
+    ATTR_FAN_MODE,
+    ATTR_HVAC_MODE,
+    HVACMode,
+)
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import ATTR_ENTITY_ID, ATTR_TEMPERATURE
 from homeassistant.core import HomeAssistant, ServiceCall, callback
 from homeassistant.exceptions import (
     ConfigEntryAuthFailed,
@@ -9,13 +17,42 @@ from homeassistant.exceptions import (
     HomeAssistantError,
     ServiceValidationError,
 )
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers import device_registry as dr
-
-from .api import MySairAPI, MySairAuthError, MySairConnectionError
-from .coordinator import MySairCoordinator
-from .mqtt_handler import MySairMQTTClient
-from .status_parser import parse_status_payload, parse_feedback_payload
-from .const import DOMAIN, SERVICE_STOP_INSTALLATION, ATTR_INSTALLATION_REF
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+
+from .api import MySairAsyncAPI, MySairAuthError, MySairConnectionError
+from .climate import MySairThermostat, async_set_zones
+from .coordinator import MySairCoordinator, signal_zones_added
+from .mqtt_handler import MySairAsyncMQTTClient, MySairMQTTClient
+from .mqtt_manager import MqttEntryLink, async_get_mqtt_manager
+from .status_handoff import StatusHandoff
+from .status_sync import StatusSyncScheduler
+from .status_parser import (
+    StatusDeduplicator,
+    parse_feedback_payload,
+    parse_status_payload,
+)
+from .const import (
+    CONF_BUS_EVENTS,
+    CONF_COMMAND_WINDOW,
+    CONF_MQTT_TRANSPORT,
+    CONF_SYNC_CONCURRENCY,
+    COMMAND_WINDOW_SECONDS,
+    DOMAIN,
+    MQTT_TRANSPORT_ASYNCIO,
+    MQTT_TRANSPORT_THREAD,
+    SERVICE_STOP_INSTALLATION,
+    SERVICE_SET_ZONES,
+    STATUS_SYNC_MAX_CONCURRENCY,
+    ATTR_INSTALLATION_REF,
+    TOPOLOGY_RETRY_SECONDS,
+    TOPOLOGY_STORAGE_KEY,
+    TOPOLOGY_STORAGE_VERSION,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,6 +60,21 @@ PLATFORMS = ["climate", "sensor", "switch"]
 
 STOP_INSTALLATION_SCHEMA = vol.Schema({vol.Required(ATTR_INSTALLATION_REF): str})
 
+SET_ZONES_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+            vol.Optional(ATTR_HVAC_MODE): vol.All(
+                vol.Coerce(HVACMode),
+                vol.In([HVACMode.OFF, HVACMode.HEAT, HVACMode.COOL]),
+            ),
+            vol.Optional(ATTR_TEMPERATURE): vol.Coerce(float),
+            vol.Optional(ATTR_FAN_MODE): cv.string,
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_HVAC_MODE, ATTR_TEMPERATURE, ATTR_FAN_MODE),
+)
+
 
 @callback
 def _persist_refresh_token(
@@ -36,6 +88,11 @@ def _persist_refresh_token(
     )
 
 
+def _device_id(dev):
+    """Id de zona de un dispositivo de ``/devices`` (``reference``, o ``rf``/``id``)."""
+    return dev.get("reference") or dev.get("rf") or dev.get("id")
+
+
 def _cleanup_stale_zone_devices(
     hass: HomeAssistant, entry: ConfigEntry, all_devices: dict
 ) -> None:
@@ -51,7 +108,7 @@ def _cleanup_stale_zone_devices(
     aquí, ya que no es una zona.
     """
     current_zone_ids = {
-        f"{inst_ref}_{dev.get('reference') or dev.get('rf') or dev.get('id')}"
+        f"{inst_ref}_{_device_id(dev)}"
         for inst_ref, devices in all_devices.items()
         for dev in devices
     }
@@ -75,8 +132,168 @@ def _cleanup_stale_zone_devices(
             )
 
 
+# ==========================================================
+# 🗺️ TOPOLOGÍA (descubrimiento + caché persistente)
+# ==========================================================
+def _topology_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    """Store (``.storage/``) con la última topología completa de la entrada."""
+    return Store(
+        hass, TOPOLOGY_STORAGE_VERSION, f"{TOPOLOGY_STORAGE_KEY}.{entry.entry_id}"
+    )
+
+
+def _topology_cache_data(topology: dict) -> dict:
+    """Parte de la topología que se persiste (lo necesario para crear entidades)."""
+    return {
+        "installations": topology["installations"],
+        "devices": topology["devices"],
+    }
+
+
+def _cached_topology(data):
+    """Convierte lo leído del Store en una topología; ``None`` si no es usable.
+
+    Devuelve la misma forma que ``MySairAsyncAPI.async_discover_topology``
+    (sin ubicaciones ni fallos), para que el resto del setup no distinga el
+    origen.
+    """
+    if not isinstance(data, dict):
+        return None
+    installations = data.get("installations")
+    devices = data.get("devices")
+    if (
+        not isinstance(installations, list)
+        or not installations
+        or not isinstance(devices, dict)
+        or set(installations) != set(devices)
+    ):
+        return None
+    return {
+        "locations": [],
+        "installations": list(installations),
+        "devices": {ref: list(devices[ref]) for ref in installations},
+        "failed_locations": {},
+        "failed_installations": {},
+    }
+
+
+def _topology_failures(topology: dict) -> dict:
+    return {**topology["failed_locations"], **topology["failed_installations"]}
+
+
+async def _async_start_session(api: MySairAsyncAPI) -> None:
+    """Renueva tokens a partir del refresh_token guardado (A6: no se persiste
+    ni se usa password tras la configuración inicial)."""
+    try:
+        await api.async_refresh_tokens()
+    except MySairAuthError as err:
+        raise ConfigEntryAuthFailed(
+            f"Sesión MySair inválida o expirada: {err}"
+        ) from err
+    except MySairConnectionError as err:
+        raise ConfigEntryNotReady(f"No se pudo conectar con MySair: {err}") from err
+
+
+async def _async_discover(api: MySairAsyncAPI):
+    """Descubrimiento completo Locations → Installations → Devices en el setup.
+
+    Todas las ubicaciones, con instalaciones y dispositivos pedidos de forma
+    concurrente (fan-out acotado, ver MySairAsyncAPI.async_discover_topology).
+    Devuelve ``(topology, segundos)``; sin ninguna instalación utilizable
+    lanza ``ConfigEntryNotReady``.
+    """
+    discovery_started = time.monotonic()
+    try:
+        topology = await api.async_discover_topology()
+    except MySairAuthError as err:
+        raise ConfigEntryAuthFailed(
+            f"Sesión MySair inválida o expirada: {err}"
+        ) from err
+    except MySairConnectionError as err:
+        raise ConfigEntryNotReady(f"No se pudo consultar MySair: {err}") from err
+    discovery_seconds = time.monotonic() - discovery_started
+
+    if not topology["locations"]:
+        raise ConfigEntryNotReady("No se encontraron ubicaciones en la cuenta MySair.")
+
+    if not topology["installations"]:
+        failures = _topology_failures(topology)
+        if failures:
+            raise ConfigEntryNotReady(
+                f"No se pudo consultar ninguna instalación MySair: {failures}"
+            )
+        raise ConfigEntryNotReady(
+            "No se encontraron instalaciones en la cuenta MySair."
+        )
+
+    _LOGGER.info(
+        f"[MySair] 🏠 Instalaciones detectadas: {topology['installations']} "
+        f"({len(topology['locations'])} ubicaciones, {discovery_seconds:.2f} s)"
+    )
+    for ref, devices in topology["devices"].items():
+        _LOGGER.info(
+            f"[MySair] 📟 Instalación {ref}: {len(devices)} termostatos encontrados"
+        )
+    return topology, discovery_seconds
+
+
+async def _async_apply_revalidated_topology(
+    hass: HomeAssistant, entry: ConfigEntry, store: Store, topology: dict
+) -> None:
+    """Aplica en caliente la topología revalidada tras un arranque desde caché.
+
+    Solo cambian las zonas añadidas o eliminadas: las nuevas se anuncian a
+    las plataformas (``signal_zones_added``) y las desaparecidas se limpian
+    con ``_cleanup_stale_zone_devices``, que al quitar el dispositivo del
+    registro retira también sus entidades. Un cambio en el conjunto de
+    instalaciones (suscripciones MQTT, coordinador) recarga la entrada.
+    """
+    data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if data is None:
+        return  # descargada mientras se revalidaba
+
+    data["topology_errors"] = {
+        "locations": topology["failed_locations"],
+        "installations": topology["failed_installations"],
+    }
+    failures = _topology_failures(topology)
+    if failures:
+        _LOGGER.warning(
+            f"[MySair] ⚠️ Revalidación parcial de la topología, se mantiene la caché: {failures}"
+        )
+        return
+
+    await store.async_save(_topology_cache_data(topology))
+
+    if set(topology["installations"]) != set(data["installations"]):
+        _LOGGER.info(
+            f"[MySair] 🔄 Instalaciones cambiadas ({data['installations']} → "
+            f"{topology['installations']}), recargando la integración"
+        )
+        hass.config_entries.async_schedule_reload(entry.entry_id)
+        return
+
+    current = data["devices"]
+    added = {}
+    for ref, devices in topology["devices"].items():
+        known = {_device_id(dev) for dev in current.get(ref, [])}
+        new_devices = [dev for dev in devices if _device_id(dev) not in known]
+        if new_devices:
+            added[ref] = new_devices
+
+    # Mismo dict (no uno nuevo): diagnostics y servicios lo leen por referencia.
+    current.clear()
+    current.update(topology["devices"])
+
+    _cleanup_stale_zone_devices(hass, entry, current)
+    if added:
+        _LOGGER.info(f"[MySair] ➕ Zonas nuevas tras revalidar: {added}")
+        async_dispatcher_send(hass, signal_zones_added(entry.entry_id), added)
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Configura la integración MySair."""
+    setup_started = time.monotonic()
     email = entry.data.get("email")
     refresh_token = entry.data.get("refresh_token")
     if not email or not refresh_token:
@@ -87,65 +304,80 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     _LOGGER.info(f"[MySair] 🔐 Autenticando usuario {email}")
 
     def _on_tokens_refreshed(access_token, refresh_token_value):
-        # Se invoca desde un hilo ejecutor: hay que volver al loop para tocar hass.
+        # Puede invocarse desde el loop (cliente asíncrono) o desde el hilo
+        # MQTT (refresco síncrono de credenciales): call_soon_threadsafe vale
+        # para ambos casos.
         hass.loop.call_soon_threadsafe(
             _persist_refresh_token, hass, entry, refresh_token_value
         )
 
-    api = MySairAPI(email, on_tokens_refreshed=_on_tokens_refreshed)
+    # Cliente HTTP asíncrono sobre la sesión aiohttp compartida de HA: las
+    # llamadas de setup, entidades y refresco periódico se hacen con `await`
+    # directo, sin pasar por el executor.
+    api = MySairAsyncAPI(
+        email,
+        async_get_clientsession(hass),
+        on_tokens_refreshed=_on_tokens_refreshed,
+    )
     api.refresh_token_value = refresh_token
-
-    # --- SESIÓN: renovar tokens a partir del refresh_token guardado (A6: no se
-    # persiste ni se usa password tras la configuración inicial). ---
-    try:
-        await hass.async_add_executor_job(api.refresh_tokens)
-    except MySairAuthError as err:
-        raise ConfigEntryAuthFailed(
-            f"Sesión MySair inválida o expirada: {err}"
-        ) from err
-    except MySairConnectionError as err:
-        raise ConfigEntryNotReady(f"No se pudo conectar con MySair: {err}") from err
+    # La renovación proactiva del access_token se activa con el runtime
+    # (_async_start_runtime); el timer se cancela al descargar la entrada.
+    entry.async_on_unload(api.stop_token_refresh_timer)
+
+    # Opciones (config_flow.py): al guardarlas se recarga la entrada. El
+    # listener salta con cualquier cambio de la entrada (p. ej. el
+    # refresh_token persistido), así que solo recarga si cambian las opciones.
+    options = dict(entry.options)
+
+    async def _async_entry_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+        if dict(entry.options) != options:
+            await hass.config_entries.async_reload(entry.entry_id)
+
+    entry.async_on_unload(entry.add_update_listener(_async_entry_updated))
+
+    # --- TOPOLOGÍA: caché local o descubrimiento completo ---
+    # Con caché (arranques posteriores al primero), las entidades se crean
+    # directamente desde la copia local; sesión, MQTT y revalidación de la
+    # topología van en segundo plano (_async_connect_and_revalidate, más
+    # abajo). El setup pasa de varias idas y vueltas HTTP a una lectura de
+    # fichero, y no depende de que el backend responda rápido.
+    store = _topology_store(hass, entry)
+    topology = _cached_topology(await store.async_load())
+    if topology is None:
+        await _async_start_session(api)
+        topology, discovery_seconds = await _async_discover(api)
+        failures = _topology_failures(topology)
+        if failures:
+            # Con un descubrimiento parcial no se sabe qué zonas existen en
+            # las instalaciones que fallaron: limpiar ahora borraría sus
+            # dispositivos, y cachearlo las haría desaparecer del próximo
+            # arranque.
+            _LOGGER.warning(
+                f"[MySair] ⚠️ Descubrimiento parcial, se omite la limpieza de zonas huérfanas: {failures}"
+            )
+        else:
+            _cleanup_stale_zone_devices(hass, entry, topology["devices"])
+            await store.async_save(_topology_cache_data(topology))
+        topology_source = "api"
+    else:
+        discovery_seconds = None
+        topology_source = "cache"
+        _LOGGER.info(
+            f"[MySair] 💾 Topología cargada de caché: {topology['installations']} "
+            "(revalidando en segundo plano)"
+        )
 
     # Migración: entradas creadas antes de A6 guardaban password/access_token
     # en claro; ya no se usan, se eliminan de la config entry en el primer
-    # arranque correcto tras la actualización.
+    # arranque tras la actualización.
     stale_keys = {"password", "access_token"} & entry.data.keys()
     if stale_keys:
         hass.config_entries.async_update_entry(
             entry, data={k: v for k, v in entry.data.items() if k not in stale_keys}
         )
 
-    # --- ESTRUCTURA: Locations → Installations → Devices ---
-    locations = await hass.async_add_executor_job(api.get_locations)
-    if not locations:
-        raise ConfigEntryNotReady("No se encontraron ubicaciones en la cuenta MySair.")
-
-    first_loc = locations[0]
-    location_id = first_loc["id"]
-    installations = await hass.async_add_executor_job(
-        api.get_installations, location_id
-    )
-    if not installations:
-        raise ConfigEntryNotReady(
-            "No se encontraron instalaciones en la ubicación MySair."
-        )
-
-    _LOGGER.info(
-        f"[MySair] 🏠 Instalaciones detectadas: {[i['reference'] for i in installations]}"
-    )
-
-    all_devices = {}
-    installation_refs = []
-    for inst in installations:
-        ref = inst["reference"]
-        installation_refs.append(ref)
-        devices = await hass.async_add_executor_job(api.get_devices, ref)
-        all_devices[ref] = devices
-        _LOGGER.info(
-            f"[MySair] 📟 Instalación {ref}: {len(devices)} termostatos encontrados"
-        )
-
-    _cleanup_stale_zone_devices(hass, entry, all_devices)
+    all_devices = topology["devices"]
+    installation_refs = topology["installations"]
 
     # Guardar datos en memoria global
     hass.data.setdefault(DOMAIN, {})
@@ -155,8 +387,77 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         "installations": installation_refs,
         "mqtt": None,
         "coordinator": None,
+        "status_sync": None,
+        "status_handoff": None,
+        "status_dedup": None,
+        "topology_errors": {
+            "locations": topology["failed_locations"],
+            "installations": topology["failed_installations"],
+        },
+        "startup": {
+            "topology_source": topology_source,
+            "discovery_seconds": (
+                None if discovery_seconds is None else round(discovery_seconds, 3)
+            ),
+        },
     }
 
+    # --- COORDINADOR (C1): redistribuye cada status por zona en vez de que
+    # cada entidad repita el mismo filtrado de topic/ctl/zone_id (ver
+    # coordinator.py). Recibe los status directamente del callback MQTT, sin
+    # pasar por el bus de eventos. Se arranca antes de las plataformas para
+    # que ya esté escuchando cuando las entidades se den de alta. ---
+    coordinator = MySairCoordinator(
+        hass,
+        installation_refs,
+        command_window=entry.options.get(CONF_COMMAND_WINDOW, COMMAND_WINDOW_SECONDS),
+    )
+    coordinator.start()
+    hass.data[DOMAIN][entry.entry_id]["coordinator"] = coordinator
+
+    # Evento mysair_update opcional (ver CONF_BUS_EVENTS en const.py).
+    fire_bus_events = entry.options.get(CONF_BUS_EVENTS, False)
+
+    @callback
+    def _async_handle_status(topic, parsed_data):
+        coordinator.async_handle_status(topic, parsed_data)
+        if fire_bus_events:
+            # Los datos del evento van al recorder: zonas como dict.
+            data = {
+                **parsed_data,
+                "zones": [zone.as_dict() for zone in parsed_data["zones"]],
+            }
+            hass.bus.async_fire(f"{DOMAIN}_update", {"topic": topic, "data": data})
+
+    # Status del hilo MQTT: fusionados por instalación y entregados al loop
+    # en lotes (status_handoff.py), no un call_soon_threadsafe por mensaje.
+    status_handoff = StatusHandoff(
+        hass, _async_handle_status, coordinator.async_refresh_installation
+    )
+    hass.data[DOMAIN][entry.entry_id]["status_handoff"] = status_handoff
+    # Status repetidos tal cual (p. ej. tras cada sync o relevo de
+    # credenciales): no se parsean, solo renuevan la frescura de sus zonas.
+    status_dedup = StatusDeduplicator()
+    hass.data[DOMAIN][entry.entry_id]["status_dedup"] = status_dedup
+
+    @callback
+    def _async_handle_feedback(feedback):
+        coordinator.feedback.async_handle_feedback(feedback)
+        hass.bus.async_fire(f"{DOMAIN}_feedback", feedback)
+
+    # --- TRANSPORTE MQTT (opción por entrada, ver config_flow.py) ---
+    # El cliente con hilo propio invoca el callback desde ese hilo y hay que
+    # saltar al loop; el cliente asyncio ya lo invoca dentro del loop. Se
+    # decide en cada llamada: con la conexión compartida (mqtt_manager.py)
+    # la entrada puede acabar atendida por un cliente del otro transporte.
+    mqtt_transport = entry.options.get(CONF_MQTT_TRANSPORT, MQTT_TRANSPORT_THREAD)
+
+    def _run_in_loop(func, *args):
+        if threading.get_ident() == hass.loop_thread_id:
+            func(*args)
+        else:
+            hass.loop.call_soon_threadsafe(func, *args)
+
     # --- CALLBACK PARA MQTT (con parseo de mensajes status) ---
     def mqtt_message_callback(data):
         """Procesa mensajes entrantes desde AWS IoT."""
@@ -167,6 +468,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
 
             # Si el mensaje es de tipo "status", lo parseamos
             if topic.endswith("/status"):
+                if status_dedup.is_repeat(payload):
+                    status_handoff.refresh(topic, payload["ctl"])
+                    return
                 parsed_data = parse_status_payload(payload)
                 # E4: un payload que no es ni siquiera un dict se rechaza
                 # (parse_status_payload devuelve None) — no se dispara el
@@ -176,15 +480,13 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
                         f"[MySair MQTT] ⛔ Payload de status rechazado (forma inesperada): {topic}"
                     )
                     return
-                hass.loop.call_soon_threadsafe(
-                    hass.bus.async_fire,
-                    f"{DOMAIN}_update",
-                    {"topic": topic, "data": parsed_data},
-                )
+                status_handoff.put(topic, parsed_data)
                 _LOGGER.debug(f"[MySair MQTT] 🧩 Estado parseado: {parsed_data}")
 
             # Confirmación (ACK) de una instrucción enviada por HTTP (E7,
-            # docs/protocol-findings.md §8). Evento propio, no mysair_update.
+            # docs/protocol-findings.md §8). Va directa a la entidad que envió
+            # el orderId (router del coordinador); el evento mysair_feedback
+            # se mantiene para automatizaciones (uno por comando, poco volumen).
             elif topic.endswith("/feedback"):
                 feedback = parse_feedback_payload(payload)
                 if feedback is None:
@@ -196,15 +498,11 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
                     f"[MySair MQTT] ✅ Confirmación recibida: orderId={feedback['order_id']} "
                     f"ctl={feedback['ctl']}"
                 )
-                hass.loop.call_soon_threadsafe(
-                    hass.bus.async_fire,
-                    f"{DOMAIN}_feedback",
-                    feedback,
-                )
+                _run_in_loop(_async_handle_feedback, feedback)
 
-            else:
-                # Otros mensajes (no status)
-                hass.loop.call_soon_threadsafe(
+            elif fire_bus_events:
+                # Otros mensajes (no status): solo interesan a automatizaciones
+                _run_in_loop(
                     hass.bus.async_fire,
                     f"{DOMAIN}_update",
                     {"topic": topic, "data": payload},
@@ -213,53 +511,156 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         except Exception as e:
             _LOGGER.error(f"[MySair MQTT] ❌ Error en callback: {e}")
 
+    # Conexión/desconexión MQTT: el sync de status adaptativo (más abajo)
+    # sincroniza todas las instalaciones en cuanto se completa una conexión.
+    @callback
+    def _async_handle_connection(connected):
+        status_sync.async_handle_connection(connected)
+
+    def mqtt_connection_callback(connected):
+        _run_in_loop(_async_handle_connection, connected)
+
     # --- CLIENTE MQTT ---
-    mqtt_client = MySairMQTTClient(api, installation_refs, mqtt_message_callback)
+    # Se crea ya (las entidades lo reciben en su constructor), pero no se
+    # conecta hasta tener sesión: ver _async_start_runtime más abajo. Si otra
+    # entrada ya tiene abierta una conexión con el mismo aws_mqtt_user, la
+    # entrada se une a ella y este cliente no llega a arrancar
+    # (mqtt_manager.py); el MqttEntryLink apunta siempre al que la atiende.
+    if mqtt_transport == MQTT_TRANSPORT_ASYNCIO:
+        mqtt_client = MySairAsyncMQTTClient(
+            api,
+            installation_refs,
+            mqtt_message_callback,
+            async_get_clientsession(hass),
+            connection_callback=mqtt_connection_callback,
+        )
+    else:
+        mqtt_client = MySairMQTTClient(
+            api,
+            installation_refs,
+            mqtt_message_callback,
+            connection_callback=mqtt_connection_callback,
+        )
+    mqtt_client = MqttEntryLink(mqtt_client)
     hass.data[DOMAIN][entry.entry_id]["mqtt"] = mqtt_client
 
-    # Lanzar el hilo MQTT sin bloquear el loop
-    await hass.async_add_executor_job(mqtt_client.start)
-
-    # --- COORDINADOR (C1): redistribuye mysair_update por zona en vez de que
-    # cada entidad repita el mismo filtrado de topic/ctl/zone_id (ver
-    # coordinator.py). Se arranca antes de las plataformas para que ya esté
-    # escuchando cuando las entidades se den de alta. ---
-    coordinator = MySairCoordinator(hass, installation_refs)
-    coordinator.start()
-    hass.data[DOMAIN][entry.entry_id]["coordinator"] = coordinator
+    # --- SYNC DE STATUS DE RESPALDO (adaptativo, ver status_sync.py): solo
+    # pide status/sync a las instalaciones sin datos recientes por MQTT. ---
+    status_sync = StatusSyncScheduler(
+        hass,
+        api,
+        coordinator,
+        installation_refs,
+        mqtt_client,
+        max_concurrency=entry.options.get(
+            CONF_SYNC_CONCURRENCY, STATUS_SYNC_MAX_CONCURRENCY
+        ),
+    )
+    hass.data[DOMAIN][entry.entry_id]["status_sync"] = status_sync
 
     # --- PLATAFORMAS ---
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
-    _LOGGER.info("[MySair] ✅ Plataformas cargadas correctamente")
+    setup_seconds = time.monotonic() - setup_started
+    hass.data[DOMAIN][entry.entry_id]["startup"]["setup_seconds"] = round(
+        setup_seconds, 3
+    )
+    _LOGGER.info(
+        f"[MySair] ✅ Plataformas cargadas correctamente ({setup_seconds:.2f} s)"
+    )
+
+    entry_data = hass.data[DOMAIN][entry.entry_id]
 
-    # --- REFRESCO AUTOMÁTICO DE STATUS ---
-    async def refresh_status_periodic():
-        """Cada 2 minutos solicita un 'status' de respaldo a todas las instalaciones.
+    def _entry_active():
+        # Tras descargar o recargar la entrada, hass.data ya no guarda este
+        # dict (una recarga pone otro con el mismo entry_id).
+        return hass.data.get(DOMAIN, {}).get(entry.entry_id) is entry_data
 
-        El estado en tiempo real llega por MQTT; este POST solo fuerza un sync
-        periódico por si se pierde algún mensaje.
+    async def _async_start_runtime():
+        """Lanza el cliente MQTT y el sync de status (requieren sesión válida)."""
+        api.start_token_refresh_timer()
+        manager = async_get_mqtt_manager(hass)
+        try:
+            await manager.async_acquire(
+                entry.entry_id,
+                mqtt_client,
+                api,
+                installation_refs,
+                mqtt_message_callback,
+                mqtt_connection_callback,
+                feedback_pending=coordinator.feedback.is_pending,
+            )
+        finally:
+            if not _entry_active():
+                # Descargada mientras conectaba (o cancelada con la descarga):
+                # async_unload_entry ya liberó lo suyo, esto no lo vio.
+                api.stop_token_refresh_timer()
+                await manager.async_release(entry.entry_id, mqtt_client)
+        if _entry_active():
+            status_sync.start()
+
+    async def _async_connect_and_revalidate():
+        """Arranque desde caché: sesión, runtime y revalidación de la topología.
+
+        Un refresh_token inválido lanza el flujo de reautenticación; un fallo
+        de red se reintenta pasado ``TOPOLOGY_RETRY_SECONDS``. Si la
+        revalidación falla, las entidades siguen con la topología cacheada.
+        Tras cada espera se comprueba que la entrada sigue cargada.
         """
-        while True:
-            try:
-                for ref in installation_refs:
-                    await hass.async_add_executor_job(
-                        api.send_installation_command, ref, "status"
-                    )
-                    _LOGGER.debug(
-                        f"[MySair] 🔁 Solicitud de estado enviada a instalación {ref}"
-                    )
-            except Exception as e:
-                _LOGGER.warning(
-                    f"[MySair] ⚠️ Error al enviar instrucción de estado: {e}"
-                )
-            await asyncio.sleep(120)  # 2 minutos
+        try:
+            await api.async_refresh_tokens()
+        except MySairAuthError as err:
+            if _entry_active():
+                _LOGGER.warning(f"[MySair] 🔐 Sesión MySair inválida o expirada: {err}")
+                entry.async_start_reauth(hass)
+            return
+        except MySairConnectionError as err:
+            if not _entry_active():
+                return
+            _LOGGER.warning(
+                f"[MySair] ⚠️ No se pudo conectar con MySair ({err}); "
+                f"reintentando en {TOPOLOGY_RETRY_SECONDS} s"
+            )
+            entry.async_on_unload(
+                async_call_later(hass, TOPOLOGY_RETRY_SECONDS, _schedule_revalidation)
+            )
+            return
+        if not _entry_active():
+            return
 
-    # Lanzar la tarea periódica ligada al ciclo de vida de la entrada:
-    # Home Assistant la cancela automáticamente durante el unload.
-    entry.async_create_background_task(
-        hass, refresh_status_periodic(), name="mysair_status_refresh"
-    )
+        await _async_start_runtime()
+        if not _entry_active():
+            return
+
+        revalidation_started = time.monotonic()
+        try:
+            revalidated = await api.async_discover_topology()
+        except (MySairAuthError, MySairConnectionError) as err:
+            _LOGGER.warning(
+                f"[MySair] ⚠️ No se pudo revalidar la topología, se mantiene la caché: {err}"
+            )
+            return
+        if not _entry_active():
+            return
+        entry_data["startup"]["revalidation_seconds"] = round(
+            time.monotonic() - revalidation_started, 3
+        )
+        await _async_apply_revalidated_topology(hass, entry, store, revalidated)
+
+    @callback
+    def _schedule_revalidation(_now=None):
+        if not _entry_active():
+            return
+        # Tarea de fondo: la descarga de la entrada la cancela en vez de
+        # esperarla (una sesión colgada no retrasa la descarga).
+        entry.async_create_background_task(
+            hass, _async_connect_and_revalidate(), name="mysair_topology_revalidate"
+        )
+
+    if topology_source == "cache":
+        _schedule_revalidation()
+    else:
+        await _async_start_runtime()
 
     # --- SERVICIO mysair.stop_installation (F5) ---
     # Compartido por todas las config entries del dominio: se registra una
@@ -271,10 +672,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
             for entry_data in hass.data.get(DOMAIN, {}).values():
                 if installation_ref in entry_data.get("installations", []):
                     try:
-                        await hass.async_add_executor_job(
-                            entry_data["api"].send_installation_command,
-                            installation_ref,
-                            "stop",
+                        await entry_data["api"].async_send_installation_command(
+                            installation_ref, "stop"
                         )
                     except Exception as e:
                         raise HomeAssistantError(
@@ -292,6 +691,54 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
             schema=STOP_INSTALLATION_SCHEMA,
         )
 
+    # --- SERVICIO mysair.set_zones: mismos ajustes en varias zonas con un
+    # único envío por lotes (ver climate.async_set_zones). Compartido por
+    # todas las entradas, igual que stop_installation. ---
+    if not hass.services.has_service(DOMAIN, SERVICE_SET_ZONES):
+
+        async def _async_handle_set_zones(call: ServiceCall) -> None:
+            component = hass.data.get(CLIMATE_DOMAIN)
+            settings = {
+                "hvac_mode": call.data.get(ATTR_HVAC_MODE),
+                "temperature": call.data.get(ATTR_TEMPERATURE),
+                "fan_mode": call.data.get(ATTR_FAN_MODE),
+            }
+
+            # Un lote por cuenta (cada config entry tiene su propio cliente).
+            entities_by_api = {}
+            for entity_id in call.data[ATTR_ENTITY_ID]:
+                entity = component.get_entity(entity_id) if component else None
+                if not isinstance(entity, MySairThermostat):
+                    raise ServiceValidationError(
+                        f"'{entity_id}' no es un termostato MySair cargado."
+                    )
+                entities_by_api.setdefault(id(entity.api), (entity.api, []))[1].append(
+                    entity
+                )
+
+            # Se valida todo antes de enviar nada a ninguna cuenta.
+            try:
+                for _, entities in entities_by_api.values():
+                    for entity in entities:
+                        entity._plan_zone_settings(**settings)
+            except ValueError as err:
+                raise ServiceValidationError(str(err)) from err
+
+            errors = []
+            for api, entities in entities_by_api.values():
+                errors.extend(await async_set_zones(api, entities, **settings))
+            if errors:
+                raise HomeAssistantError(
+                    f"Error al aplicar ajustes a {len(errors)} zonas: {'; '.join(errors)}"
+                )
+
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_SET_ZONES,
+            _async_handle_set_zones,
+            schema=SET_ZONES_SCHEMA,
+        )
+
     return True
 
 
@@ -299,10 +746,9 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Descarga la integración MySair y libera recursos (MQTT, tareas, estado).
 
     Orden de cierre: primero se descargan las plataformas (las entidades se
-    desconectan del coordinador), después se detiene el coordinador y el
-    cliente MQTT, y por último se limpia el estado en memoria. La tarea
-    periódica se cancela sola por estar creada con
-    entry.async_create_background_task.
+    desconectan del coordinador), después se detienen el sync de status, el
+    coordinador y el cliente MQTT, y por último se limpia el estado en
+    memoria.
     """
     _LOGGER.info("[MySair] 🔌 Deteniendo integración y cerrando sesiones...")
 
@@ -310,15 +756,27 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if unload_ok:
         data = hass.data[DOMAIN].pop(entry.entry_id, None)
         if data:
+            status_sync = data.get("status_sync")
+            if status_sync:
+                status_sync.stop()
             coordinator = data.get("coordinator")
             if coordinator:
                 coordinator.stop()
             mqtt_client = data.get("mqtt")
             if mqtt_client:
-                await hass.async_add_executor_job(mqtt_client.stop)
-        # Servicio compartido por todas las entradas: se retira solo cuando
-        # se descarga la última (F5).
+                # Cierra la conexión solo si ninguna otra entrada la comparte.
+                await async_get_mqtt_manager(hass).async_release(
+                    entry.entry_id, mqtt_client
+                )
+        # Servicios compartidos por todas las entradas: se retiran solo
+        # cuando se descarga la última (F5).
         if not hass.data[DOMAIN]:
             hass.services.async_remove(DOMAIN, SERVICE_STOP_INSTALLATION)
+            hass.services.async_remove(DOMAIN, SERVICE_SET_ZONES)
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Borra la caché de topología al eliminar la integración."""
+    await _topology_store(hass, entry).async_remove()
@@ -1,4 +1,8 @@
+import asyncio
+import base64
+import json
 import requests
+import aiohttp
 import datetime
 import time
 import hmac
@@ -20,6 +24,107 @@ def _truncate(text, limit=200):
     return text if len(text) <= limit else text[:limit] + "…(truncado)"
 
 
+# Máximo de peticiones HTTP simultáneas durante el descubrimiento de topología
+# (``MySairAsyncAPI.async_discover_topology``): suficiente para que N
+# instalaciones no cuesten N × RTT, sin disparar ráfagas contra el backend.
+DISCOVERY_MAX_CONCURRENCY = 4
+
+
+# Antelación con la que se renueva el access_token antes de su ``exp`` (JWT),
+# y espera antes de reintentar una renovación proactiva fallida por red.
+ACCESS_TOKEN_REFRESH_MARGIN_SECONDS = 120
+ACCESS_TOKEN_REFRESH_RETRY_SECONDS = 30
+
+# Máximo de instrucciones por ``POST /send/instruction`` en los envíos por
+# lotes (``send_zone_commands``). El backend acepta un array, pero no se
+# conoce su límite: 20 cubre una vivienda entera en una sola petición sin
+# arriesgar cuerpos desmesurados.
+MAX_INSTRUCTIONS_PER_REQUEST = 20
+
+
+class AwsUrlSigner:
+    """Firma SigV4 por query string de la URL WebSocket de AWS IoT.
+
+    De una firma a la siguiente solo cambian la fecha y, al renovarse, las
+    credenciales. La clave de firma derivada (cadena HMAC ``k_date`` →
+    ``k_region`` → ``k_service`` → ``k_signing``) depende solo del secreto,
+    el día, la región y el servicio, así que se cachea por esa tupla; el
+    hash del payload vacío y las partes fijas de la petición canónica se
+    calculan una vez. Por firma quedan dos SHA-256 y un HMAC.
+
+    La caché guarda pocas claves (``max_keys``): basta con las del día en
+    curso de las credenciales vigentes y las recién renovadas.
+    """
+
+    ALGORITHM = "AWS4-HMAC-SHA256"
+    SERVICE = "iotdevicegateway"
+    _EMPTY_PAYLOAD_HASH = hashlib.sha256(b"").hexdigest()
+
+    def __init__(self, max_keys=4):
+        self.max_keys = max_keys
+        self._signing_keys = {}  # (secreto, día, región, servicio) -> clave
+        # Instancia compartida por varios hilos (MQTT, executor): los fallos
+        # insertan y expulsan bajo el lock; los aciertos no lo necesitan.
+        self._signing_keys_lock = Lock()
+        self.key_cache_hits = 0
+        self.key_cache_misses = 0
+
+    def signing_key(self, secret_key, date_stamp, region):
+        """Clave de firma derivada del día ``date_stamp`` (``AAAAMMDD``), cacheada."""
+        cache_key = (secret_key, date_stamp, region, self.SERVICE)
+        key = self._signing_keys.get(cache_key)
+        if key is not None:
+            self.key_cache_hits += 1
+            return key
+        key = ("AWS4" + secret_key).encode("utf-8")
+        for part in (date_stamp, region, self.SERVICE, "aws4_request"):
+            key = hmac.new(key, part.encode("utf-8"), hashlib.sha256).digest()
+        with self._signing_keys_lock:
+            self.key_cache_misses += 1
+            if cache_key not in self._signing_keys:
+                while len(self._signing_keys) >= self.max_keys:
+                    del self._signing_keys[next(iter(self._signing_keys))]
+                self._signing_keys[cache_key] = key
+        return key
+
+    def sign_url(self, host, region, access_key, secret_key, token, now=None):
+        """URL ``wss://{host}/mqtt?...`` firmada en ``now`` (UTC; por defecto, ahora)."""
+        t = now or datetime.datetime.now(datetime.timezone.utc)
+        amz_date = t.strftime("%Y%m%dT%H%M%SZ")
+        date_stamp = amz_date[:8]
+        credential_scope = f"{date_stamp}/{region}/{self.SERVICE}/aws4_request"
+
+        canonical_querystring = (
+            f"X-Amz-Algorithm={self.ALGORITHM}&"
+            f"X-Amz-Credential={urllib.parse.quote_plus(access_key + '/' + credential_scope)}&"
+            f"X-Amz-Date={amz_date}&"
+            f"X-Amz-SignedHeaders=host"
+        )
+        canonical_request = (
+            f"GET\n/mqtt\n{canonical_querystring}\nhost:{host}\n\nhost\n"
+            f"{self._EMPTY_PAYLOAD_HASH}"
+        )
+        string_to_sign = (
+            f"{self.ALGORITHM}\n{amz_date}\n{credential_scope}\n"
+            f"{hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()}"
+        )
+        signature = hmac.new(
+            self.signing_key(secret_key, date_stamp, region),
+            string_to_sign.encode("utf-8"),
+            hashlib.sha256,
+        ).hexdigest()
+
+        token_param = urllib.parse.urlencode({"X-Amz-Security-Token": token})
+        return (
+            f"wss://{host}/mqtt?{canonical_querystring}"
+            f"&X-Amz-Signature={signature}&{token_param}"
+        )
+
+
+# Firmante compartido por todas las cuentas (``MySairAPI.aws_sign_url``).
+_AWS_URL_SIGNER = AwsUrlSigner()
+
+
 class MySairAuthError(Exception):
     """Credenciales o refresh_token inválidos/expirados: requiere reautenticación."""
 
@@ -28,6 +133,21 @@ class MySairConnectionError(Exception):
     """Fallo de red o del backend, no relacionado con las credenciales."""
 
 
+def jwt_expires_at(token):
+    """Devuelve el claim ``exp`` (unix s) de un JWT, o ``None`` si no se puede leer.
+
+    Solo decodifica el payload (sin verificar la firma: no es un control de
+    seguridad, solo sirve para saber cuándo renovar). Cualquier token que no
+    sea un JWT con ``exp`` numérico devuelve ``None``.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
 def extract_order_id(response):
     """Extrae el ``orderId`` de la respuesta de ``POST /send/instruction``.
 
@@ -45,6 +165,64 @@ def extract_order_id(response):
         return None
 
 
+def extract_order_ids(response, count):
+    """Extrae los ``orderId`` de una respuesta a un envío de ``count`` instrucciones.
+
+    **Inferido** (mismo formato que ``extract_order_id``): ``entity.value`` trae
+    un elemento por instrucción, en el mismo orden del array enviado. Devuelve
+    siempre una lista de longitud ``count``, con ``None`` donde no haya
+    ``orderId`` (forma inesperada o respuesta más corta).
+    """
+    order_ids = [None] * count
+    if not isinstance(response, dict):
+        return order_ids
+    try:
+        values = response["entity"]["value"]
+    except (KeyError, TypeError):
+        return order_ids
+    if not isinstance(values, list):
+        return order_ids
+    for index, value in enumerate(values[:count]):
+        if isinstance(value, dict):
+            order_ids[index] = value.get("orderId")
+    return order_ids
+
+
+def _batch_results(instructions, response=None, error=None):
+    """Resultado por instrucción de un envío por lotes (ver ``send_zone_commands``)."""
+    order_ids = extract_order_ids(response, len(instructions))
+    return [
+        {
+            "ctl": instruction["ctl"],
+            "device": instruction["device"],
+            "command": instruction["command"],
+            "order_id": None if error else order_id,
+            "error": None if error is None else str(error),
+        }
+        for instruction, order_id in zip(instructions, order_ids)
+    ]
+
+
+def _chunked(items, size):
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def _validate_instruction_response(data):
+    """Comprueba el cuerpo (ya decodificado) de un ``201`` de ``/send/instruction``.
+
+    El backend puede responder 201 y aun así rechazar la instrucción
+    (``msg`` distinto de ``"Creado"`` o ``error`` no vacío). Compartido por el
+    cliente síncrono y el asíncrono.
+    """
+    msg = data.get("msg", "")
+    error = data.get("error", [])
+    if msg != "Creado" or error:
+        raise Exception(f"Instruction rejected: {_truncate(data)}")
+
+    _LOGGER.debug("[MySairAPI] ✅ Instrucción enviada correctamente")
+    return data
+
+
 class MySairAPI:
     """Cliente API para Mysair."""
 
@@ -135,7 +313,23 @@ class MySairAPI:
         la contraseña en claro. Lanza ``MySairAuthError`` si no hay
         refresh_token o es inválido/ha expirado (requiere reautenticación), o
         ``MySairConnectionError`` ante fallos de red o del backend.
+
+        Una sola renovación a la vez entre hilos (``self.lock``): el
+        refresh_token rota en cada renovación, así que dos en paralelo se
+        invalidarían mutuamente. Quien esperaba al lock y encuentra un
+        access_token nuevo y vigente lo reutiliza en vez de renovar otra vez.
         """
+        token_seen = self.access_token
+        with self.lock:
+            if (
+                self.access_token
+                and self.access_token != token_seen
+                and not self.access_token_expired()
+            ):
+                return True
+            return self._refresh_tokens_locked()
+
+    def _refresh_tokens_locked(self):
         if not self.refresh_token_value:
             raise MySairAuthError("No hay refresh_token disponible.")
 
@@ -165,8 +359,15 @@ class MySairAPI:
                 f"Refresh tokens error: {resp.status_code} {_truncate(resp.text)}"
             )
 
-        data = resp.json()
-        entity = data.get("entity", {})
+        self._store_refreshed_tokens(resp.json())
+        return True
+
+    def _store_refreshed_tokens(self, data):
+        """Guarda los tokens de una respuesta de ``/user/refreshtokens``.
+
+        Compartido por ``refresh_tokens`` y ``MySairAsyncAPI.async_refresh_tokens``.
+        """
+        entity = (data or {}).get("entity", {})
         self.access_token = entity.get("access_token")
         self.refresh_token_value = entity.get("refresh_token")
 
@@ -175,7 +376,32 @@ class MySairAPI:
 
         _LOGGER.info("[MySairAPI] ✅ Tokens renovados correctamente.")
         self._notify_tokens()
-        return True
+
+    def seconds_until_access_token_refresh(
+        self, margin_seconds=ACCESS_TOKEN_REFRESH_MARGIN_SECONDS
+    ):
+        """Segundos hasta que conviene renovar el access_token (``exp`` del JWT).
+
+        Análogo a ``seconds_until_aws_credentials_expire``: ``None`` si no hay
+        token o no es un JWT con ``exp`` (no se puede programar la renovación
+        por tiempo); ``0`` si ya está dentro del margen.
+        """
+        expires_at = jwt_expires_at(self.access_token)
+        if expires_at is None:
+            return None
+        return max(expires_at - time.time() - margin_seconds, 0)
+
+    def access_token_expired(self, margin_seconds=0):
+        """True si el access_token ha expirado (según su ``exp``) o falta.
+
+        Sin ``exp`` legible no se asume expirado: el backend lo dirá con un 401.
+        """
+        if not self.access_token:
+            return True
+        expires_at = jwt_expires_at(self.access_token)
+        if expires_at is None:
+            return False
+        return time.time() >= expires_at - margin_seconds
 
     # ==========================================================
     # ☁️ AWS CREDENTIALS
@@ -196,45 +422,52 @@ class MySairAPI:
                     f"AWS credentials error: {resp.status_code} {_truncate(resp.text)}"
                 )
 
-            data = resp.json()
-            entity = data.get("entity", {})
-
-            required_keys = [
-                "aws_mqtt_host",
-                "aws_default_region",
-                "aws_access_key_id",
-                "aws_secret_access_key",
-                "aws_security_token",
-                "aws_mqtt_user",
-            ]
-
-            # Validar presencia de claves
-            if not all(k in entity for k in required_keys):
-                raise Exception("Credenciales AWS incompletas o inválidas")
-
-            # Normalizar nombres para mqtt_handler.
-            # aws_base_topic y aws_expires_at son opcionales (pueden no venir en
-            # APIs antiguas); se usan para el topic dinámico y el refresco proactivo.
-            self.aws_credentials = {
-                "aws_mqtt_host": entity["aws_mqtt_host"],
-                "aws_default_region": entity["aws_default_region"],
-                "aws_access_key_id": entity["aws_access_key_id"],
-                "aws_secret_access_key": entity["aws_secret_access_key"],
-                "aws_security_token": entity["aws_security_token"],
-                "aws_mqtt_user": entity["aws_mqtt_user"],
-                "aws_base_topic": entity.get("aws_base_topic"),
-                "aws_expires_at": entity.get("aws_expires_at"),
-            }
-
-            _LOGGER.debug(
-                f"[MySairAPI] ✅ Credenciales AWS obtenidas para usuario {entity['aws_mqtt_user']}"
-            )
-            return self.aws_credentials
+            return self._store_aws_credentials(resp.json())
 
         except Exception as e:
             _LOGGER.error(f"[MySairAPI] ❌ Error al obtener credenciales AWS: {e}")
             raise
 
+    def _store_aws_credentials(self, data):
+        """Valida y normaliza una respuesta de ``/user/refreshawscredentials``.
+
+        Compartido por ``refresh_aws_credentials`` y
+        ``MySairAsyncAPI.async_refresh_aws_credentials``.
+        """
+        entity = (data or {}).get("entity", {})
+
+        required_keys = [
+            "aws_mqtt_host",
+            "aws_default_region",
+            "aws_access_key_id",
+            "aws_secret_access_key",
+            "aws_security_token",
+            "aws_mqtt_user",
+        ]
+
+        # Validar presencia de claves
+        if not all(k in entity for k in required_keys):
+            raise Exception("Credenciales AWS incompletas o inválidas")
+
+        # Normalizar nombres para mqtt_handler.
+        # aws_base_topic y aws_expires_at son opcionales (pueden no venir en
+        # APIs antiguas); se usan para el topic dinámico y el refresco proactivo.
+        self.aws_credentials = {
+            "aws_mqtt_host": entity["aws_mqtt_host"],
+            "aws_default_region": entity["aws_default_region"],
+            "aws_access_key_id": entity["aws_access_key_id"],
+            "aws_secret_access_key": entity["aws_secret_access_key"],
+            "aws_security_token": entity["aws_security_token"],
+            "aws_mqtt_user": entity["aws_mqtt_user"],
+            "aws_base_topic": entity.get("aws_base_topic"),
+            "aws_expires_at": entity.get("aws_expires_at"),
+        }
+
+        _LOGGER.debug(
+            f"[MySairAPI] ✅ Credenciales AWS obtenidas para usuario {entity['aws_mqtt_user']}"
+        )
+        return self.aws_credentials
+
     def aws_credentials_expired(self, margin_seconds=60):
         """Indica si conviene refrescar las credenciales AWS antes de (re)conectar.
 
@@ -376,14 +609,7 @@ class MySairAPI:
                     f"Instruction error: {resp.status_code} {_truncate(resp.text)}"
                 )
 
-            data = resp.json()
-            msg = data.get("msg", "")
-            error = data.get("error", [])
-            if msg != "Creado" or error:
-                raise Exception(f"Instruction rejected: {_truncate(data)}")
-
-            _LOGGER.debug("[MySairAPI] ✅ Instrucción enviada correctamente")
-            return data
+            return _validate_instruction_response(resp.json())
 
         except Exception as e:
             _LOGGER.error(f"[MySairAPI] ❌ Error al enviar instrucción: {e}")
@@ -392,6 +618,76 @@ class MySairAPI:
     # ==========================================================
     # ⚙️ ZONE COMMAND HELPERS (para Climate, Switch, etc.)
     # ==========================================================
+    def _app_name(self):
+        """``app`` de las instrucciones: el ``aws_mqtt_user`` de la sesión, o el histórico."""
+        return (
+            self.aws_credentials.get("aws_mqtt_user", "web0077")
+            if self.aws_credentials
+            else "web0077"
+        )
+
+    def build_zone_instruction(
+        self, ctl, device, command_type, value=None, temperature=None
+    ):
+        """Construye (y valida) el elemento de ``/send/instruction`` de un comando de zona.
+
+        Lanza ``ValueError`` si faltan parámetros o el comando/valor no es
+        válido. Compartido por ``send_zone_command`` y su variante asíncrona.
+        """
+        if not ctl or not device:
+            raise ValueError("Faltan parámetros obligatorios (ctl o device).")
+
+        if command_type == "mode":
+            if value not in ["0", "1"]:
+                raise ValueError("Modo inválido: usa '0' para calor o '1' para frío.")
+            payload_value = {"mode": value, "temperature": str(temperature or 22.0)}
+
+        elif command_type == "temp":
+            payload_value = str(value)
+
+        elif command_type == "power":
+            payload_value = "0"
+
+        elif command_type == "fanspeed":
+            if value not in ("0", "1", "2", "3", "4"):
+                raise ValueError("Velocidad de ventilador inválida: usa '0'..'4'.")
+            payload_value = str(value)
+
+        else:
+            raise ValueError(f"Tipo de comando no soportado: {command_type}")
+
+        return {
+            "sender": "WEB",
+            "ctl": ctl,
+            "app": self._app_name(),
+            "device": device,
+            "command": command_type,
+            "value": payload_value,
+        }
+
+    def build_installation_instruction(self, ctl, command_type):
+        """Construye (y valida) el elemento de ``/send/instruction`` de un comando de instalación."""
+        if not ctl:
+            raise ValueError("Falta el parámetro obligatorio 'ctl'.")
+
+        if command_type == "stop":
+            payload_value = "1"
+        elif command_type == "status":
+            payload_value = "sync"
+        else:
+            raise ValueError(
+                f"Tipo de comando de instalación no soportado: {command_type}"
+            )
+
+        return {
+            "sender": "WEB",
+            "ctl": ctl,
+            "app": self._app_name(),
+            "device": "",
+            "command": command_type,
+            "value": payload_value,
+        }
+
     def send_zone_command(
         self, ctl, device, command_type, value=None, temperature=None
     ):
@@ -405,45 +701,10 @@ class MySairAPI:
             - "fanspeed" → velocidad de ventilador (value = "0".."4"; ver docs/protocol-findings.md §9)
         """
         try:
-            if not ctl or not device:
-                raise ValueError("Faltan parámetros obligatorios (ctl o device).")
-
-            app_name = (
-                self.aws_credentials.get("aws_mqtt_user", "web0077")
-                if self.aws_credentials
-                else "web0077"
-            )
-
-            if command_type == "mode":
-                if value not in ["0", "1"]:
-                    raise ValueError(
-                        "Modo inválido: usa '0' para calor o '1' para frío."
-                    )
-                payload_value = {"mode": value, "temperature": str(temperature or 22.0)}
-
-            elif command_type == "temp":
-                payload_value = str(value)
-
-            elif command_type == "power":
-                payload_value = "0"
-
-            elif command_type == "fanspeed":
-                if value not in ("0", "1", "2", "3", "4"):
-                    raise ValueError("Velocidad de ventilador inválida: usa '0'..'4'.")
-                payload_value = str(value)
-
-            else:
-                raise ValueError(f"Tipo de comando no soportado: {command_type}")
-
             instruction = [
-                {
-                    "sender": "WEB",
-                    "ctl": ctl,
-                    "app": app_name,
-                    "device": device,
-                    "command": command_type,
-                    "value": payload_value,
-                }
+                self.build_zone_instruction(
+                    ctl, device, command_type, value, temperature
+                )
             ]
 
             _LOGGER.debug(
@@ -457,6 +718,41 @@ class MySairAPI:
             )
             raise
 
+    def build_zone_instructions(self, commands):
+        """Construye (y valida) las instrucciones de varios comandos de zona.
+
+        ``commands`` es un iterable de tuplas ``(ctl, device, command_type,
+        value=None, temperature=None)`` — los mismos argumentos que
+        ``send_zone_command``. Lanza ``ValueError`` ante el primer comando
+        inválido, antes de enviar nada.
+        """
+        return [self.build_zone_instruction(*command) for command in commands]
+
+    def send_zone_commands(self, commands):
+        """Envía varios comandos de zona en el mínimo de peticiones posible.
+
+        Agrupa las instrucciones en arrays de hasta
+        ``MAX_INSTRUCTIONS_PER_REQUEST`` (una sola petición para el caso
+        habitual, p. ej. "apagar toda la planta"). Devuelve un dict por
+        comando, en el mismo orden que ``commands``, con ``ctl``, ``device``,
+        ``command``, ``order_id`` (para correlacionar el ACK por MQTT) y
+        ``error`` (``None`` si su petición fue aceptada). Un lote fallido no
+        impide enviar los demás.
+        """
+        instructions = self.build_zone_instructions(commands)
+        _LOGGER.debug(
+            f"[MySairAPI] ⚙️ Enviando {len(instructions)} comandos de zona por lotes"
+        )
+        results = []
+        for chunk in _chunked(instructions, MAX_INSTRUCTIONS_PER_REQUEST):
+            try:
+                response = self.send_instruction(chunk)
+            except Exception as e:
+                results.extend(_batch_results(chunk, error=e))
+            else:
+                results.extend(_batch_results(chunk, response))
+        return results
+
     def send_installation_command(self, ctl, command_type, value=None):
         """Envía una instrucción a nivel de instalación completa (``device`` vacío).
 
@@ -465,34 +761,7 @@ class MySairAPI:
             - "status" → solicita sincronización de estado (value = "sync")
         """
         try:
-            if not ctl:
-                raise ValueError("Falta el parámetro obligatorio 'ctl'.")
-
-            app_name = (
-                self.aws_credentials.get("aws_mqtt_user", "web0077")
-                if self.aws_credentials
-                else "web0077"
-            )
-
-            if command_type == "stop":
-                payload_value = "1"
-            elif command_type == "status":
-                payload_value = "sync"
-            else:
-                raise ValueError(
-                    f"Tipo de comando de instalación no soportado: {command_type}"
-                )
-
-            instruction = [
-                {
-                    "sender": "WEB",
-                    "ctl": ctl,
-                    "app": app_name,
-                    "device": "",
-                    "command": command_type,
-                    "value": payload_value,
-                }
-            ]
+            instruction = [self.build_installation_instruction(ctl, command_type)]
 
             _LOGGER.debug(
                 f"[MySairAPI] 🏠 Enviando comando de instalación '{command_type}' a {ctl} → {instruction}"
@@ -510,46 +779,426 @@ class MySairAPI:
     # ==========================================================
     @staticmethod
     def aws_sign_url(host, region, access_key, secret_key, token):
-        """Genera una URL firmada para conexión MQTT AWS."""
-        service = "iotdevicegateway"
-        algorithm = "AWS4-HMAC-SHA256"
-        t = datetime.datetime.now(datetime.timezone.utc)
-        amz_date = t.strftime("%Y%m%dT%H%M%SZ")
-        date_stamp = t.strftime("%Y%m%d")
-        credential_scope = f"{date_stamp}/{region}/{service}/aws4_request"
+        """Genera una URL firmada para conexión MQTT AWS (ver ``AwsUrlSigner``)."""
+        url = _AWS_URL_SIGNER.sign_url(host, region, access_key, secret_key, token)
+        _LOGGER.info(f"[MySairAPI] 🔗 URL MQTT firmada generada para {host}")
+        return url
 
-        canonical_querystring = (
-            f"X-Amz-Algorithm={algorithm}&"
-            f"X-Amz-Credential={urllib.parse.quote_plus(access_key + '/' + credential_scope)}&"
-            f"X-Amz-Date={amz_date}&"
-            f"X-Amz-SignedHeaders=host"
+
+class MySairAsyncAPI(MySairAPI):
+    """Cliente API asíncrono (aiohttp) con la misma superficie que ``MySairAPI``.
+
+    Pensado para Home Assistant: recibe la ``aiohttp.ClientSession`` compartida
+    de HA (``async_get_clientsession``), así que cada comando se ``await``-ea
+    directamente en el event loop, sin salto a un hilo ejecutor ni competir
+    por el executor compartido de HA. Los métodos asíncronos llevan el
+    prefijo ``async_`` (convención de HA) para poder convivir con los
+    síncronos heredados: el hilo MQTT (``mqtt_handler.py``) sigue usando
+    ``refresh_aws_credentials``/``aws_sign_url`` sobre esta misma instancia,
+    compartiendo tokens y credenciales AWS.
+
+    A diferencia de ``get_locations``/``get_installations``/``get_devices``
+    (que devuelven ``[]`` ante cualquier error), sus variantes asíncronas
+    lanzan ``MySairConnectionError``: así el llamador puede distinguir "no hay
+    nada" de "no se pudo consultar".
+    """
+
+    def __init__(
+        self,
+        email: str,
+        websession: aiohttp.ClientSession,
+        password: "str | None" = None,
+        session: "requests.Session | None" = None,
+        on_tokens_refreshed=None,
+    ):
+        super().__init__(
+            email,
+            password,
+            session=session,
+            on_tokens_refreshed=on_tokens_refreshed,
         )
+        self.websession = websession
+        # Gestión de tokens (ver async_refresh_tokens): renovación en vuelo
+        # compartida por todos los llamadores y timer de renovación proactiva.
+        self._refresh_task = None
+        self._refresh_timer = None
+        self._proactive_refresh = False
+        self._proactive_task = None  # renovación proactiva en curso
+
+    async def _async_request(self, method, path, *, json_body=None, timeout=10):
+        """Petición HTTP autenticada; devuelve ``(status, data, text)``.
+
+        ``data`` es el cuerpo decodificado como JSON, o ``None`` si no lo es.
+        Cualquier fallo de red o timeout se traduce a ``MySairConnectionError``.
+        """
+        headers = (
+            {"Authorization": f"Bearer {self.access_token}"}
+            if self.access_token
+            else None
+        )
+        try:
+            async with self.websession.request(
+                method,
+                f"{self.base_url}{path}",
+                headers=headers,
+                json=json_body,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as resp:
+                text = await resp.text()
+                status = resp.status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise MySairConnectionError(f"Error de red en {method} {path}: {e}") from e
+        try:
+            data = json.loads(text) if text else None
+        except ValueError:
+            data = None
+        return status, data, text
 
-        canonical_headers = f"host:{host}\n"
-        payload_hash = hashlib.sha256(b"").hexdigest()
-        canonical_request = f"GET\n/mqtt\n{canonical_querystring}\n{canonical_headers}\nhost\n{payload_hash}"
+    # ==========================================================
+    # 🔄 REFRESH TOKEN / ☁️ AWS CREDENTIALS
+    # ==========================================================
+    async def async_refresh_tokens(self):
+        """Versión asíncrona de ``refresh_tokens`` (mismos errores), single-flight.
+
+        Todos los llamadores concurrentes (p. ej. varias entidades que reciben
+        un 401 a la vez, o la renovación proactiva) comparten la misma
+        renovación en vuelo: el refresh_token rota en cada renovación, así que
+        dos en paralelo se lo quitarían la una a la otra. Cancelar a un
+        llamador no cancela la renovación compartida.
+        """
+        task = self._refresh_task
+        if task is None:
+            task = asyncio.ensure_future(self._async_refresh_tokens_once())
+            self._refresh_task = task
+            task.add_done_callback(self._on_refresh_done)
+        return await asyncio.shield(task)
+
+    def _on_refresh_done(self, task):
+        if self._refresh_task is task:
+            self._refresh_task = None
+        if task.cancelled():
+            return
+        if task.exception() is None:
+            self._schedule_token_refresh()
+
+    def start_token_refresh_timer(self):
+        """Activa la renovación proactiva del access_token (desde el event loop).
+
+        Cada renovación correcta programa la siguiente a
+        ``ACCESS_TOKEN_REFRESH_MARGIN_SECONDS`` del ``exp`` del JWT, en segundo
+        plano: los comandos del usuario no esperan nunca a una renovación
+        salvo que el token ya haya caducado de verdad.
+        """
+        self._proactive_refresh = True
+        self._schedule_token_refresh()
 
-        string_to_sign = (
-            f"{algorithm}\n{amz_date}\n{credential_scope}\n"
-            f"{hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()}"
+    def stop_token_refresh_timer(self):
+        """Desactiva la renovación proactiva (descarga de la integración).
+
+        Cancela también la renovación proactiva en curso; la renovación
+        compartida a la que espera (``_refresh_task``) termina igualmente: el
+        refresh_token rota en el servidor y hay que guardar el nuevo.
+        """
+        self._proactive_refresh = False
+        self._cancel_token_refresh_timer()
+        if self._proactive_task is not None:
+            self._proactive_task.cancel()
+            self._proactive_task = None
+
+    def _cancel_token_refresh_timer(self):
+        if self._refresh_timer:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+
+    def _schedule_token_refresh(self, delay=None):
+        self._cancel_token_refresh_timer()
+        if not self._proactive_refresh:
+            return
+        if delay is None:
+            delay = self.seconds_until_access_token_refresh()
+        if delay is None:
+            return
+        _LOGGER.debug(
+            f"[MySairAPI] ⏰ Renovación proactiva de tokens programada en {delay:.0f}s"
+        )
+        self._refresh_timer = asyncio.get_running_loop().call_later(
+            delay, self._on_token_refresh_due
         )
 
-        def sign(key, msg):
-            return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+    def _on_token_refresh_due(self):
+        self._refresh_timer = None
+        if self._refresh_task is None and self._proactive_refresh:
+            # Referencia propia: el loop solo guarda una débil a sus tareas.
+            task = asyncio.ensure_future(self._async_proactive_refresh())
+            self._proactive_task = task
+            task.add_done_callback(self._on_proactive_refresh_done)
 
-        k_date = sign(("AWS4" + secret_key).encode("utf-8"), date_stamp)
-        k_region = sign(k_date, region)
-        k_service = sign(k_region, service)
-        k_signing = sign(k_service, "aws4_request")
-        signature = hmac.new(
-            k_signing, string_to_sign.encode("utf-8"), hashlib.sha256
-        ).hexdigest()
+    def _on_proactive_refresh_done(self, task):
+        if self._proactive_task is task:
+            self._proactive_task = None
 
-        canonical_querystring += f"&X-Amz-Signature={signature}"
-        canonical_querystring += "&" + urllib.parse.urlencode(
-            {"X-Amz-Security-Token": token}
+    async def _async_proactive_refresh(self):
+        try:
+            await self.async_refresh_tokens()
+        except MySairAuthError as e:
+            # Sin reintento: el siguiente comando recibirá el error de
+            # autenticación y Home Assistant pedirá reautenticar.
+            _LOGGER.error(
+                f"[MySairAPI] ❌ Renovación proactiva de tokens rechazada: {e}"
+            )
+        except MySairConnectionError as e:
+            if not self._proactive_refresh:
+                return  # desactivada mientras tanto: nada que reintentar
+            _LOGGER.warning(
+                f"[MySairAPI] ⚠️ Renovación proactiva de tokens fallida ({e}); "
+                f"reintentando en {ACCESS_TOKEN_REFRESH_RETRY_SECONDS}s"
+            )
+            self._schedule_token_refresh(ACCESS_TOKEN_REFRESH_RETRY_SECONDS)
+
+    async def _async_refresh_tokens_once(self):
+        if not self.refresh_token_value:
+            raise MySairAuthError("No hay refresh_token disponible.")
+
+        _LOGGER.debug("[MySairAPI] 🔄 Renovando tokens de sesión...")
+        status, data, text = await self._async_request(
+            "PUT",
+            "/user/refreshtokens",
+            json_body={"refresh_token": self.refresh_token_value},
         )
+        if status in (401, 403):
+            _LOGGER.error(f"[MySairAPI] ❌ Refresh token inválido o expirado: {status}")
+            raise MySairAuthError(f"Refresh tokens error: {status} {_truncate(text)}")
+        if status != 200:
+            _LOGGER.error(
+                f"[MySairAPI] ❌ Error al refrescar tokens: {status} {_truncate(text)}"
+            )
+            raise MySairConnectionError(
+                f"Refresh tokens error: {status} {_truncate(text)}"
+            )
 
-        url = f"wss://{host}/mqtt?{canonical_querystring}"
-        _LOGGER.info(f"[MySairAPI] 🔗 URL MQTT firmada generada para {host}")
-        return url
+        self._store_refreshed_tokens(data)
+        return True
+
+    async def async_refresh_aws_credentials(self):
+        """Versión asíncrona de ``refresh_aws_credentials``."""
+        _LOGGER.debug("[MySairAPI] ☁️ Solicitando credenciales AWS MQTT...")
+        status, data, text = await self._async_request(
+            "PUT", "/user/refreshawscredentials", timeout=15
+        )
+        if status != 200:
+            _LOGGER.error(
+                f"[MySairAPI] ❌ Error al obtener credenciales AWS: {status} {_truncate(text)}"
+            )
+            raise MySairConnectionError(
+                f"AWS credentials error: {status} {_truncate(text)}"
+            )
+        return self._store_aws_credentials(data)
+
+    # ==========================================================
+    # 📍 LOCATIONS / INSTALLATIONS / DEVICES
+    # ==========================================================
+    async def _async_get_entity_list(self, path, what):
+        status, data, text = await self._async_request("GET", path)
+        if status in (401, 403):
+            raise MySairAuthError(f"{what} error: {status} {_truncate(text)}")
+        if status != 200 or not isinstance(data, dict):
+            _LOGGER.error(
+                f"[MySairAPI] ❌ Error obteniendo {what}: {status} {_truncate(text)}"
+            )
+            raise MySairConnectionError(f"{what} error: {status} {_truncate(text)}")
+        return data.get("entity", [])
+
+    async def async_get_locations(self):
+        """Versión asíncrona de ``get_locations`` (lanza en vez de devolver ``[]``)."""
+        _LOGGER.info("[MySairAPI] 📍 Locations...")
+        return await self._async_get_entity_list("/locations", "Locations")
+
+    async def async_get_installations(self, location_id):
+        """Versión asíncrona de ``get_installations`` (lanza en vez de devolver ``[]``)."""
+        _LOGGER.info(f"[MySairAPI] 🔧 Installations loc={location_id}")
+        return await self._async_get_entity_list(
+            f"/installations?location_id={location_id}&validated=1", "Installations"
+        )
+
+    async def async_get_devices(self, installation_ref):
+        """Versión asíncrona de ``get_devices`` (lanza en vez de devolver ``[]``)."""
+        _LOGGER.info(f"[MySairAPI] 📟 Devices ref={installation_ref}")
+        return await self._async_get_entity_list(
+            f"/devices?installation_ref={installation_ref}", "Devices"
+        )
+
+    async def async_discover_topology(self, max_concurrency=DISCOVERY_MAX_CONCURRENCY):
+        """Descubre Locations → Installations → Devices de toda la cuenta.
+
+        Recorre todas las ubicaciones (no solo la primera) y pide
+        instalaciones y dispositivos de forma concurrente, con como mucho
+        ``max_concurrency`` peticiones HTTP en vuelo a la vez. Un fallo al
+        listar las instalaciones de una ubicación o los dispositivos de una
+        instalación no aborta el resto: queda anotado en
+        ``failed_locations``/``failed_installations`` (mensaje por id/ref).
+        Solo el fallo de ``/locations`` se propaga (sin él no hay nada que
+        descubrir).
+
+        Devuelve un dict con el orden estable de la API (ubicaciones y, dentro
+        de cada una, instalaciones en el orden recibido; una instalación que
+        aparece en varias ubicaciones se cuenta una sola vez):
+          - ``locations``: ids de ubicación;
+          - ``installations``: refs con dispositivos obtenidos correctamente;
+          - ``devices``: ``{ref: [dispositivos]}`` de esas instalaciones;
+          - ``failed_locations`` / ``failed_installations``: ``{id|ref: error}``.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def _bounded(coro_fn, *args):
+            async with semaphore:
+                return await coro_fn(*args)
+
+        locations = await self.async_get_locations()
+        location_ids = [loc["id"] for loc in locations if "id" in loc]
+
+        installations_per_location = await asyncio.gather(
+            *(
+                _bounded(self.async_get_installations, loc_id)
+                for loc_id in location_ids
+            ),
+            return_exceptions=True,
+        )
+
+        failed_locations = {}
+        refs = []
+        for loc_id, result in zip(location_ids, installations_per_location):
+            if isinstance(result, BaseException):
+                if not isinstance(result, (MySairAuthError, MySairConnectionError)):
+                    raise result
+                _LOGGER.warning(
+                    f"[MySairAPI] ⚠️ No se pudieron obtener las instalaciones de la ubicación {loc_id}: {result}"
+                )
+                failed_locations[loc_id] = str(result)
+                continue
+            for inst in result:
+                ref = inst.get("reference")
+                if ref and ref not in refs:
+                    refs.append(ref)
+
+        devices_per_installation = await asyncio.gather(
+            *(_bounded(self.async_get_devices, ref) for ref in refs),
+            return_exceptions=True,
+        )
+
+        devices = {}
+        failed_installations = {}
+        for ref, result in zip(refs, devices_per_installation):
+            if isinstance(result, BaseException):
+                if not isinstance(result, (MySairAuthError, MySairConnectionError)):
+                    raise result
+                _LOGGER.warning(
+                    f"[MySairAPI] ⚠️ No se pudieron obtener los dispositivos de {ref}: {result}"
+                )
+                failed_installations[ref] = str(result)
+                continue
+            devices[ref] = result
+
+        return {
+            "locations": location_ids,
+            "installations": list(devices),
+            "devices": devices,
+            "failed_locations": failed_locations,
+            "failed_installations": failed_installations,
+        }
+
+    # ==========================================================
+    # 📡 SEND INSTRUCTION
+    # ==========================================================
+    async def async_send_instruction(self, instruction):
+        """Versión asíncrona de ``send_instruction``.
+
+        Con la renovación proactiva activa, el token nunca debería llegar
+        caducado; si aun así el backend responde 401, se reintenta una vez
+        tras unirse a la renovación en vuelo (o iniciar una), sin renovar
+        también las credenciales AWS: esas son del MQTT, que las renueva por
+        su cuenta cuando las necesita (ver mqtt_handler.py).
+        """
+        try:
+            _LOGGER.debug(f"[MySairAPI] 📤 Enviando instrucción: {instruction}")
+            if self.access_token_expired():
+                # Caducado con certeza (exp del JWT): un 401 seguro, no se
+                # gasta la ida y vuelta.
+                await self.async_refresh_tokens()
+            token_used = self.access_token
+            status, data, text = await self._async_request(
+                "POST", "/send/instruction", json_body=instruction
+            )
+
+            if status == 401:
+                if self.access_token == token_used:
+                    _LOGGER.debug(
+                        "[MySairAPI] ⚠️ Token HTTP expirado, renovando sesión..."
+                    )
+                    await self.async_refresh_tokens()
+                status, data, text = await self._async_request(
+                    "POST", "/send/instruction", json_body=instruction
+                )
+
+            if status != 201 or not isinstance(data, dict):
+                raise Exception(f"Instruction error: {status} {_truncate(text)}")
+
+            return _validate_instruction_response(data)
+
+        except Exception as e:
+            _LOGGER.error(f"[MySairAPI] ❌ Error al enviar instrucción: {e}")
+            raise
+
+    async def async_send_zone_command(
+        self, ctl, device, command_type, value=None, temperature=None
+    ):
+        """Versión asíncrona de ``send_zone_command``."""
+        try:
+            instruction = [
+                self.build_zone_instruction(
+                    ctl, device, command_type, value, temperature
+                )
+            ]
+            _LOGGER.debug(
+                f"[MySairAPI] ⚙️ Enviando comando '{command_type}' a {device} ({ctl}) → {instruction}"
+            )
+            return await self.async_send_instruction(instruction)
+        except Exception as e:
+            _LOGGER.error(
+                f"[MySairAPI] ❌ Error al enviar comando {command_type} para {device}: {e}"
+            )
+            raise
+
+    async def async_send_zone_commands(self, commands):
+        """Versión asíncrona de ``send_zone_commands`` (lotes en paralelo)."""
+        instructions = self.build_zone_instructions(commands)
+        _LOGGER.debug(
+            f"[MySairAPI] ⚙️ Enviando {len(instructions)} comandos de zona por lotes"
+        )
+        chunks = _chunked(instructions, MAX_INSTRUCTIONS_PER_REQUEST)
+        responses = await asyncio.gather(
+            *(self.async_send_instruction(chunk) for chunk in chunks),
+            return_exceptions=True,
+        )
+        results = []
+        for chunk, response in zip(chunks, responses):
+            if isinstance(response, Exception):
+                results.extend(_batch_results(chunk, error=response))
+            elif isinstance(response, BaseException):
+                raise response
+            else:
+                results.extend(_batch_results(chunk, response))
+        return results
+
+    async def async_send_installation_command(self, ctl, command_type, value=None):
+        """Versión asíncrona de ``send_installation_command``."""
+        try:
+            instruction = [self.build_installation_instruction(ctl, command_type)]
+            _LOGGER.debug(
+                f"[MySairAPI] 🏠 Enviando comando de instalación '{command_type}' a {ctl} → {instruction}"
+            )
+            return await self.async_send_instruction(instruction)
+        except Exception as e:
+            _LOGGER.error(
+                f"[MySairAPI] ❌ Error al enviar comando de instalación {command_type} para {ctl}: {e}"
+            )
+            raise
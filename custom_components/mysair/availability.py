@@ -3,59 +3,82 @@
 Mixin compartido por las entidades climate/sensor/switch. Sin heartbeat de
 aplicación (ver docs/known-unknowns.md #11) no hay forma directa de saber si
 el dispositivo sigue "vivo"; en vez de mostrar datos potencialmente obsoletos
-como si fueran en tiempo real, la entidad se marca no disponible si no ha
-recibido un ``status`` en más de ``MQTT_STALE_AFTER_SECONDS``. Empieza no
-disponible hasta el primer status tras el arranque/recarga.
-
-Con ``should_poll=False`` nada vuelve a evaluar ``available`` por su cuenta:
-si el MQTT se cae y no llega más ningún status, el último estado publicado
-se quedaría "disponible" para siempre. Por eso cada status recibido arma
-además un timer (``async_call_later``) que fuerza un `async_write_ha_state`
-al cabo de ``MQTT_STALE_AFTER_SECONDS` si no ha llegado nada más nuevo.
-"""
+como si fueran en tiempo real, la entidad se marca no disponible si su zona
+no ha recibido un ``status`` en más de ``MQTT_STALE_AFTER_SECONDS``. Empieza
+no disponible hasta el primer status tras el arranque/recarga.
+
+La frescura la lleva el coordinador por zona, con un único timer por config
+entry (ver `coordinator.py`): con ``should_poll=False`` nada vuelve a evaluar
+``available`` por su cuenta, así que cuando una zona caduca el coordinador
+avisa a sus entidades (``signal_zone_stale``) y estas reescriben su estado.
 
-from datetime import timedelta
+Escrituras solo con cambios: cada entidad declara en ``_zone_fields`` los
+campos de zona que determinan su estado publicado, y en vez de llamar a
+``async_write_ha_state`` tras cada status llama a ``_async_write_zone_state``
+con los campos cambiados que le pasa el coordinador. Si no cambió ninguno de
+los suyos no escribe. Cualquier otra escritura (estado optimista de un
+comando, revert, caducidad) deja el estado "sucio": puede diferir del último
+status, así que el siguiente status se escribe siempre.
+"""
 
-import homeassistant.util.dt as dt_util
 from homeassistant.core import callback
-from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
-from .const import MQTT_STALE_AFTER_SECONDS
+from .coordinator import signal_zone_stale
 
 
 class AvailabilityMixin:
-    """Requiere que la clase que lo use llame a ``self._init_availability()``
-    y a ``self._stop_availability()`` en ``async_will_remove_from_hass``."""
+    """Requiere que la clase que lo use defina ``self.inst_ref`` y
+    ``self.device_id``, llame a ``self._init_availability(coordinator)``, a
+    ``self._start_availability()`` en ``async_added_to_hass`` y a
+    ``self._stop_availability()`` en ``async_will_remove_from_hass``."""
 
     _attr_should_poll = False
+    # Campos de zona que determinan el estado publicado de la entidad.
+    _zone_fields = frozenset()
 
-    def _init_availability(self):
-        self._last_status_at = None
-        self._cancel_stale_check = None
+    def _init_availability(self, coordinator):
+        self._coordinator = coordinator
+        self._unsub_stale = None
+        self._zone_state_dirty = True
 
-    def _stop_availability(self):
-        if self._cancel_stale_check:
-            self._cancel_stale_check()
-            self._cancel_stale_check = None
-
-    def _mark_status_received(self):
-        self._last_status_at = dt_util.utcnow()
-        if self._cancel_stale_check:
-            self._cancel_stale_check()
-        self._cancel_stale_check = async_call_later(
-            self.hass, MQTT_STALE_AFTER_SECONDS, self._on_stale_check
+    def _start_availability(self):
+        self._unsub_stale = async_dispatcher_connect(
+            self.hass,
+            signal_zone_stale(self.inst_ref, self.device_id),
+            self._on_zone_stale,
         )
 
+    def _stop_availability(self):
+        if self._unsub_stale:
+            self._unsub_stale()
+            self._unsub_stale = None
+
     @callback
-    def _on_stale_check(self, now):
-        """Fuerza una reevaluación de `available` cuando los datos podrían haber caducado."""
-        self._cancel_stale_check = None
+    def async_write_ha_state(self):
+        self._zone_state_dirty = True
+        super().async_write_ha_state()
+
+    @callback
+    def _async_write_zone_state(self, changed):
+        """Escribe el estado tras un status solo si cambió algún campo propio.
+
+        ``changed`` son los campos cambiados según el coordinador. Se escribe
+        igualmente si el estado publicado no viene del último status (ver
+        docstring del módulo).
+        """
+        if not self._zone_state_dirty and changed.isdisjoint(self._zone_fields):
+            self._coordinator.state_writes_skipped += 1
+            return
+        self._coordinator.state_writes += 1
+        self.async_write_ha_state()
+        self._zone_state_dirty = False
+
+    @callback
+    def _on_zone_stale(self):
+        """La zona ha caducado: publica de nuevo el estado (ya no disponible)."""
         self.async_write_ha_state()
 
     @property
     def available(self):
-        if self._last_status_at is None:
-            return False
-        return dt_util.utcnow() - self._last_status_at < timedelta(
-            seconds=MQTT_STALE_AFTER_SECONDS
-        )
+        return self._coordinator.zone_available(self.inst_ref, self.device_id)
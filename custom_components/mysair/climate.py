@@ -1,4 +1,6 @@
 import logging
+from functools import partial
+
 from homeassistant.components.climate import ClimateEntity
 from homeassistant.components.climate.const import (
     ClimateEntityFeature,
@@ -12,7 +14,7 @@ from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from .availability import AvailabilityMixin
 from .command_feedback import CommandFeedbackMixin
 from .const import DOMAIN
-from .coordinator import signal_zone_update
+from .coordinator import signal_zone_update, signal_zones_added
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -24,25 +26,97 @@ _FAN_MODE_HA_TO_WIRE = {v: k for k, v in _FAN_MODE_WIRE_TO_HA.items()}
 _FAN_MODES = ["1", "2", "3", FAN_MODE_AUTO]
 
 
-async def async_setup_entry(hass, entry, async_add_entities):
-    """Configura los termostatos MySair."""
-    data = hass.data[DOMAIN][entry.entry_id]
-    api = data["api"]
-    mqtt_client = data["mqtt"]
-    devices = data["devices"]
-
+def _zone_entities(hass, data, devices):
+    """Termostatos de las zonas de ``devices`` (``{inst_ref: [dispositivos]}``)."""
     entities = []
     for inst_ref, device_list in devices.items():
         for dev in device_list:
             dev_id = dev.get("reference") or dev.get("rf") or dev.get("id")
             name = dev.get("name", f"Termostato {dev_id}")
             entities.append(
-                MySairThermostat(hass, api, mqtt_client, inst_ref, dev_id, name)
+                MySairThermostat(
+                    hass,
+                    data["api"],
+                    data["mqtt"],
+                    data["coordinator"],
+                    inst_ref,
+                    dev_id,
+                    name,
+                )
             )
+    return entities
+
+
+async def async_setup_entry(hass, entry, async_add_entities):
+    """Configura los termostatos MySair."""
+    data = hass.data[DOMAIN][entry.entry_id]
 
+    entities = _zone_entities(hass, data, data["devices"])
     async_add_entities(entities)
     _LOGGER.info(f"[MySair Climate] ✅ {len(entities)} termostatos creados.")
 
+    @callback
+    def _async_add_zones(devices):
+        """Zonas nuevas tras revalidar la topología cacheada (ver __init__.py)."""
+        new_entities = _zone_entities(hass, data, devices)
+        async_add_entities(new_entities)
+        _LOGGER.info(f"[MySair Climate] ➕ {len(new_entities)} termostatos añadidos.")
+
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, signal_zones_added(entry.entry_id), _async_add_zones
+        )
+    )
+
+
+async def async_set_zones(
+    api, entities, hvac_mode=None, temperature=None, fan_mode=None
+):
+    """Aplica los mismos ajustes a varios termostatos de una cuenta (``mysair.set_zones``).
+
+    Todos los comandos salen en un único envío por lotes
+    (``api.async_send_zone_commands``) en vez de una petición por zona; cada
+    zona correlaciona después su ACK con el ``orderId`` que le corresponde.
+    Una zona cuyo lote falla conserva su estado; devuelve la lista de errores
+    (``"entity_id: motivo"``), vacía si todo fue aceptado. Lanza
+    ``ValueError`` antes de enviar nada si algún ajuste no es válido.
+    """
+    plans = [
+        (entity, *entity._plan_zone_settings(hvac_mode, temperature, fan_mode))
+        for entity in entities
+    ]
+    commands = [command for _, zone_commands, _ in plans for command in zone_commands]
+    results = await api.async_send_zone_commands(commands) if commands else []
+
+    results_by_zone = {}
+    for result in results:
+        results_by_zone.setdefault((result["ctl"], result["device"]), []).append(result)
+
+    errors = []
+    for entity, _, state in plans:
+        zone_results = results_by_zone.get((entity.inst_ref, entity.device_id), [])
+        failed = [result["error"] for result in zone_results if result["error"]]
+        if failed:
+            _LOGGER.error(
+                f"[MySair Climate] ❌ Error al aplicar ajustes a {entity.name}: {failed[0]}"
+            )
+            errors.append(f"{entity.entity_id}: {failed[0]}")
+            continue
+        revert_fn = entity._apply_zone_settings(state)
+        order_ids = [
+            result["order_id"] for result in zone_results if result["order_id"]
+        ]
+        if order_ids:
+            # Una sola confirmación pendiente por zona: la del último comando.
+            entity._track_order_id(order_ids[-1], revert_fn=revert_fn)
+        entity.async_write_ha_state()
+
+    _LOGGER.debug(
+        f"[MySair Climate] 📦 Ajustes aplicados a {len(entities)} zonas "
+        f"con {len(commands)} comandos ({len(errors)} errores)"
+    )
+    return errors
+
 
 class MySairThermostat(CommandFeedbackMixin, AvailabilityMixin, ClimateEntity):
     """Entidad Climate de un termostato MySair."""
@@ -54,8 +128,24 @@ class MySairThermostat(CommandFeedbackMixin, AvailabilityMixin, ClimateEntity):
         | ClimateEntityFeature.FAN_MODE
     )
     _attr_temperature_unit = UnitOfTemperature.CELSIUS
+    _zone_fields = frozenset(
+        {
+            "temp_actual",
+            "temp_target",
+            "temp_min",
+            "temp_max",
+            "allow_heat",
+            "allow_cool",
+            "allow_fan",
+            "fan_mode",
+            "is_on",
+            "is_standby",
+            "is_heat",
+            "is_cool",
+        }
+    )
 
-    def __init__(self, hass, api, mqtt_client, inst_ref, device_id, name):
+    def __init__(self, hass, api, mqtt_client, coordinator, inst_ref, device_id, name):
         self.hass = hass
         self.api = api
         self.mqtt_client = mqtt_client
@@ -75,8 +165,8 @@ class MySairThermostat(CommandFeedbackMixin, AvailabilityMixin, ClimateEntity):
         self._fan_mode = None
         self._attr_fan_modes = []
         self._unsub = None
-        self._init_command_feedback()
-        self._init_availability()
+        self._init_command_feedback(coordinator.feedback, coordinator.commands)
+        self._init_availability(coordinator)
 
     @property
     def device_info(self):
@@ -97,13 +187,13 @@ class MySairThermostat(CommandFeedbackMixin, AvailabilityMixin, ClimateEntity):
             signal_zone_update(self.inst_ref, self.device_id),
             self._handle_zone_update,
         )
-        self._start_feedback_listener()
+        self._start_availability()
 
     async def async_will_remove_from_hass(self):
         if self._unsub:
             self._unsub()
             self._unsub = None
-        self._stop_feedback_listener()
+        self._stop_command_feedback()
         self._stop_availability()
 
     @property
@@ -146,24 +236,30 @@ class MySairThermostat(CommandFeedbackMixin, AvailabilityMixin, ClimateEntity):
         _LOGGER.debug(
             f"[MySair Climate] 🌡️ Cambiando temperatura a {new_temp}°C en {self.name}"
         )
+        # La consigna optimista se publica ya: al arrastrar el control, los
+        # valores intermedios se agrupan en la cola y solo sale el último.
+        self.async_write_ha_state()
+
+        def _revert(previous=previous_temp):
+            self._target_temperature = previous
+
         try:
-            response = await self.hass.async_add_executor_job(
-                self.api.send_zone_command,
-                self.inst_ref,
-                self.device_id,
+            await self._async_send_command(
                 "temp",
-                new_temp,
+                partial(
+                    self.api.async_send_zone_command,
+                    self.inst_ref,
+                    self.device_id,
+                    "temp",
+                    new_temp,
+                ),
+                revert_fn=_revert,
             )
-
-            def _revert(previous=previous_temp):
-                self._target_temperature = previous
-
-            self._track_command_confirmation(response, revert_fn=_revert)
-            self.async_write_ha_state()
         except Exception as e:
             _LOGGER.error(
                 f"[MySair Climate] ❌ Error al enviar cambio de temperatura: {e}"
             )
+            self.async_write_ha_state()
 
     async def async_set_hvac_mode(self, hvac_mode):
         if hvac_mode not in self._attr_hvac_modes:
@@ -171,44 +267,44 @@ class MySairThermostat(CommandFeedbackMixin, AvailabilityMixin, ClimateEntity):
             return
 
         previous_mode = self._hvac_mode
-        try:
-            response = None
-            if hvac_mode == HVACMode.HEAT:
-                _LOGGER.debug(
-                    f"[MySair Climate] 🔥 Encendiendo {self.name} en CALOR a {self._target_temperature}°C"
-                )
-                response = await self.hass.async_add_executor_job(
-                    self.api.send_zone_command,
-                    self.inst_ref,
-                    self.device_id,
-                    "mode",
-                    "0",
-                    self._target_temperature,
-                )
-
-            elif hvac_mode == HVACMode.COOL:
-                _LOGGER.debug(
-                    f"[MySair Climate] ❄️ Encendiendo {self.name} en FRÍO a {self._target_temperature}°C"
-                )
-                response = await self.hass.async_add_executor_job(
-                    self.api.send_zone_command,
-                    self.inst_ref,
-                    self.device_id,
-                    "mode",
-                    "1",
-                    self._target_temperature,
-                )
-
-            elif hvac_mode == HVACMode.OFF:
-                _LOGGER.debug(f"[MySair Climate] ⛔ Apagando {self.name}")
-                response = await self.hass.async_add_executor_job(
-                    self.api.send_zone_command, self.inst_ref, self.device_id, "power"
-                )
+        if hvac_mode == HVACMode.HEAT:
+            _LOGGER.debug(
+                f"[MySair Climate] 🔥 Encendiendo {self.name} en CALOR a {self._target_temperature}°C"
+            )
+            send = partial(
+                self.api.async_send_zone_command,
+                self.inst_ref,
+                self.device_id,
+                "mode",
+                "0",
+                self._target_temperature,
+            )
+        elif hvac_mode == HVACMode.COOL:
+            _LOGGER.debug(
+                f"[MySair Climate] ❄️ Encendiendo {self.name} en FRÍO a {self._target_temperature}°C"
+            )
+            send = partial(
+                self.api.async_send_zone_command,
+                self.inst_ref,
+                self.device_id,
+                "mode",
+                "1",
+                self._target_temperature,
+            )
+        else:
+            _LOGGER.debug(f"[MySair Climate] ⛔ Apagando {self.name}")
+            send = partial(
+                self.api.async_send_zone_command, self.inst_ref, self.device_id, "power"
+            )
 
-            def _revert(previous=previous_mode):
-                self._hvac_mode = previous
+        def _revert(previous=previous_mode):
+            self._hvac_mode = previous
 
-            self._track_command_confirmation(response, revert_fn=_revert)
+        try:
+            # Encendido, apagado y calor/frío comparten ranura "mode": el
+            # último gana (ver command_queue.py).
+            if not await self._async_send_command("mode", send, revert_fn=_revert):
+                return
             self._hvac_mode = hvac_mode
             self.async_write_ha_state()
 
@@ -227,19 +323,24 @@ class MySairThermostat(CommandFeedbackMixin, AvailabilityMixin, ClimateEntity):
         _LOGGER.debug(
             f"[MySair Climate] 🌀 Cambiando velocidad de ventilador a {fan_mode} en {self.name}"
         )
+
+        def _revert(previous=previous_fan_mode):
+            self._fan_mode = previous
+
         try:
-            response = await self.hass.async_add_executor_job(
-                self.api.send_zone_command,
-                self.inst_ref,
-                self.device_id,
+            sent = await self._async_send_command(
                 "fanspeed",
-                wire_value,
+                partial(
+                    self.api.async_send_zone_command,
+                    self.inst_ref,
+                    self.device_id,
+                    "fanspeed",
+                    wire_value,
+                ),
+                revert_fn=_revert,
             )
-
-            def _revert(previous=previous_fan_mode):
-                self._fan_mode = previous
-
-            self._track_command_confirmation(response, revert_fn=_revert)
+            if not sent:
+                return
             self._fan_mode = fan_mode
             self.async_write_ha_state()
         except Exception as e:
@@ -247,6 +348,61 @@ class MySairThermostat(CommandFeedbackMixin, AvailabilityMixin, ClimateEntity):
                 f"[MySair Climate] ❌ Error al cambiar velocidad de ventilador: {e}"
             )
 
+    def _plan_zone_settings(self, hvac_mode=None, temperature=None, fan_mode=None):
+        """Comandos y nuevo estado optimista de esta zona para ``mysair.set_zones``.
+
+        Misma semántica que ``async_set_hvac_mode``/``async_set_temperature``/
+        ``async_set_fan_mode`` (p. ej. cambiar la consigna de una zona apagada
+        no envía nada), pero sin enviar: devuelve ``(comandos, estado)`` para
+        ``async_set_zones``. Lanza ``ValueError`` si el modo o la velocidad no
+        están disponibles en esta zona.
+        """
+        if hvac_mode is not None and hvac_mode not in self._attr_hvac_modes:
+            raise ValueError(
+                f"Modo HVAC no disponible en {self.entity_id}: {hvac_mode}"
+            )
+        if fan_mode is not None and fan_mode not in self._attr_fan_modes:
+            raise ValueError(
+                f"Velocidad de ventilador no disponible en {self.entity_id}: {fan_mode}"
+            )
+
+        target = self._target_temperature if temperature is None else temperature
+        commands = []
+        if hvac_mode == HVACMode.HEAT:
+            commands.append((self.inst_ref, self.device_id, "mode", "0", target))
+        elif hvac_mode == HVACMode.COOL:
+            commands.append((self.inst_ref, self.device_id, "mode", "1", target))
+        elif hvac_mode == HVACMode.OFF:
+            commands.append((self.inst_ref, self.device_id, "power"))
+        elif temperature is not None and self._hvac_mode != HVACMode.OFF:
+            commands.append((self.inst_ref, self.device_id, "temp", temperature))
+        if fan_mode is not None:
+            commands.append(
+                (
+                    self.inst_ref,
+                    self.device_id,
+                    "fanspeed",
+                    _FAN_MODE_HA_TO_WIRE.get(fan_mode, fan_mode),
+                )
+            )
+
+        state = (
+            target,
+            self._hvac_mode if hvac_mode is None else hvac_mode,
+            self._fan_mode if fan_mode is None else fan_mode,
+        )
+        return commands, state
+
+    def _apply_zone_settings(self, state):
+        """Aplica el estado optimista de ``_plan_zone_settings``; devuelve su revert."""
+        previous = (self._target_temperature, self._hvac_mode, self._fan_mode)
+        self._target_temperature, self._hvac_mode, self._fan_mode = state
+
+        def _revert(previous=previous):
+            self._target_temperature, self._hvac_mode, self._fan_mode = previous
+
+        return _revert
+
     async def async_turn_off(self):
         await self.async_set_hvac_mode(HVACMode.OFF)
 
@@ -260,54 +416,53 @@ class MySairThermostat(CommandFeedbackMixin, AvailabilityMixin, ClimateEntity):
     # EVENTOS MQTT → ACTUALIZACIÓN DE ESTADO
     # ------------------------------------------------------------------
     @callback
-    def _handle_zone_update(self, zone):
+    def _handle_zone_update(self, zone, changed):
         _LOGGER.debug(f"[MySair Climate] 📨 Evento recibido para {self._attr_name}")
-        self._mark_status_received()
         # Un status real es la verdad más fresca: descarta cualquier
         # comando pendiente de confirmar (y su revert), ya no hace falta.
         self._clear_pending_command()
-        if zone.get("temp_actual") is not None:
-            self._current_temperature = zone.get("temp_actual")
-        if zone.get("temp_target") is not None:
-            self._target_temperature = zone.get("temp_target")
-        if zone.get("temp_min") is not None:
-            self._attr_min_temp = zone.get("temp_min")
-        if zone.get("temp_max") is not None:
-            self._attr_max_temp = zone.get("temp_max")
+        if zone.temp_actual is not None:
+            self._current_temperature = zone.temp_actual
+        if zone.temp_target is not None:
+            self._target_temperature = zone.temp_target
+        if zone.temp_min is not None:
+            self._attr_min_temp = zone.temp_min
+        if zone.temp_max is not None:
+            self._attr_max_temp = zone.temp_max
 
         # Disponibilidad real de calor/frío según capacidades de la zona
         # (c/f, ver docs/protocol-findings.md). Siempre se permite OFF.
         modes = [HVACMode.OFF]
-        if zone.get("allow_heat"):
+        if zone.allow_heat:
             modes.append(HVACMode.HEAT)
-        if zone.get("allow_cool"):
+        if zone.allow_cool:
             modes.append(HVACMode.COOL)
         self._attr_hvac_modes = modes
 
         # Velocidad de ventilador (vv/fanspeed, ver docs/protocol-findings.md §9).
-        self._attr_fan_modes = list(_FAN_MODES) if zone.get("allow_fan") else []
-        self._fan_mode = _FAN_MODE_WIRE_TO_HA.get(zone.get("fan_mode"))
+        self._attr_fan_modes = list(_FAN_MODES) if zone.allow_fan else []
+        self._fan_mode = _FAN_MODE_WIRE_TO_HA.get(zone.fan_mode)
 
         # 'e' = encendido (on/off/standby); calor/frío = paridad de 'm'.
         # Ver docs/protocol-findings.md.
-        if not zone.get("is_on"):
+        if not zone.is_on:
             self._hvac_mode = HVACMode.OFF
             self._hvac_action = HVACAction.OFF
         else:
-            if zone.get("is_cool"):
+            if zone.is_cool:
                 self._hvac_mode = HVACMode.COOL
-            elif zone.get("is_heat"):
+            elif zone.is_heat:
                 self._hvac_mode = HVACMode.HEAT
 
-            if zone.get("is_standby"):
+            if zone.is_standby:
                 self._hvac_action = HVACAction.IDLE
-            elif zone.get("is_cool"):
+            elif zone.is_cool:
                 self._hvac_action = HVACAction.COOLING
-            elif zone.get("is_heat"):
+            elif zone.is_heat:
                 self._hvac_action = HVACAction.HEATING
 
         _LOGGER.debug(
             f"[MySair Climate] 🔄 {self._attr_name}: {self._current_temperature}°C / "
             f"{self._target_temperature}°C / {self._hvac_mode}"
         )
-        self.async_write_ha_state()
+        self._async_write_zone_state(changed)
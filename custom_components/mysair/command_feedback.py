@@ -1,68 +1,175 @@
 """Seguimiento de confirmación (ACK) de comandos vía el topic MQTT feedback.
 
-Mixin compartido por MySairThermostat (climate.py) y MySairSwitch (switch.py):
-ambas envían comandos por HTTP y necesitan la misma lógica para correlacionar
-la respuesta (``orderId``) con el ACK que llega después por MQTT (ver
-docs/protocol-findings.md §8, docs/known-unknowns.md #23 — payload confirmado
-con captura real de producción el 2026-07-20).
+MySairThermostat (climate.py) y los switches (switch.py) envían comandos por
+HTTP y necesitan correlacionar la respuesta (``orderId``) con el ACK que llega
+después por MQTT (ver docs/protocol-findings.md §8, docs/known-unknowns.md
+#23 — payload confirmado con captura real de producción el 2026-07-20).
 
 Si no llega confirmación a tiempo, se revierte el estado optimista al último
 valor conocido (``revert_fn``, opcional en ``_track_command_confirmation``).
 Si llega un status MQTT real antes (nueva verdad confirmada), se descarta
 cualquier revert pendiente: ya no hace falta, el dato fresco manda.
+
+Enrutado por ``orderId``: antes cada entidad con comandos se suscribía por su
+cuenta al evento de bus ``mysair_feedback`` y comparaba ``ctl`` y su
+``orderId`` pendiente, así que cada ACK recorría todas las entidades de todas
+las cuentas. Ahora un único `CommandFeedbackRouter` por config entry (lo crea
+el coordinador) guarda un dict ``orderId`` → comando pendiente, con su
+timeout y su revert, y entrega cada ACK solo a la entidad que lo envió. Las
+entidades usan `CommandFeedbackMixin`, una fachada fina sobre el router.
 """
 
 import logging
+from functools import partial
 
 from homeassistant.core import callback
 from homeassistant.helpers.event import async_call_later
 
 from .api import extract_order_id
-from .const import DOMAIN, FEEDBACK_TIMEOUT_SECONDS
+from .const import FEEDBACK_TIMEOUT_SECONDS
 
 _LOGGER = logging.getLogger(__name__)
 
 
+class CommandFeedbackRouter:
+    """Comandos pendientes de confirmar de una config entry, indexados por ``orderId``.
+
+    Como mucho un comando pendiente por entidad: registrar uno nuevo descarta
+    el anterior (y su revert), igual que cuando cada entidad lo guardaba.
+    """
+
+    def __init__(self, hass):
+        self.hass = hass
+        # orderId -> (entidad, revert_fn, cancelar timeout)
+        self._pending = {}
+        # entidad -> orderId pendiente
+        self._order_by_entity = {}
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def is_pending(self, order_id) -> bool:
+        """``True`` si se espera el ACK de ``order_id`` (seguro desde el hilo MQTT)."""
+        return order_id in self._pending
+
+    def track(self, entity, order_id, revert_fn=None):
+        """Registra el comando ``order_id`` de ``entity`` y arma su timeout."""
+        self.discard(entity)
+        if order_id in self._pending:
+            self._pop(order_id)
+        cancel_timeout = async_call_later(
+            self.hass,
+            FEEDBACK_TIMEOUT_SECONDS,
+            partial(self._on_feedback_timeout, order_id),
+        )
+        self._pending[order_id] = (entity, revert_fn, cancel_timeout)
+        self._order_by_entity[entity] = order_id
+
+    def discard(self, entity):
+        """Descarta el comando pendiente de ``entity`` (si lo hay) sin revertir."""
+        order_id = self._order_by_entity.get(entity)
+        if order_id is not None:
+            self._pop(order_id)
+
+    def stop(self):
+        """Cancela todos los timeouts pendientes (descarga de la entrada)."""
+        for _, _, cancel_timeout in self._pending.values():
+            cancel_timeout()
+        self._pending.clear()
+        self._order_by_entity.clear()
+
+    def _pop(self, order_id):
+        entity, revert_fn, cancel_timeout = self._pending.pop(order_id)
+        del self._order_by_entity[entity]
+        cancel_timeout()
+        return entity, revert_fn
+
+    @callback
+    def async_handle_feedback(self, feedback):
+        """Entrega un ACK ya parseado (``parse_feedback_payload``) a su entidad."""
+        order_id = feedback.get("order_id")
+        pending = self._pending.get(order_id)
+        if pending is None or pending[0].inst_ref != feedback.get("ctl"):
+            return
+        entity, _ = self._pop(order_id)
+        _LOGGER.debug(
+            f"[MySair] ✅ Comando confirmado para {entity.name} (orderId={order_id})"
+        )
+
+    @callback
+    def _on_feedback_timeout(self, order_id, now):
+        if order_id not in self._pending:
+            return
+        entity, revert_fn, _ = self._pending[order_id]
+        # El timer ya ha vencido: _pop lo "cancela" sin efecto.
+        self._pop(order_id)
+
+        mqtt_client = getattr(entity, "mqtt_client", None)
+        if mqtt_client is not None and not mqtt_client.connected:
+            reason = "MQTT desconectado en ese momento"
+        else:
+            reason = (
+                "con MQTT activo — puede ser un ACK perdido o un problema del backend"
+            )
+        revert_note = " — revirtiendo al último estado confirmado" if revert_fn else ""
+        _LOGGER.warning(
+            f"[MySair] ⚠️ Sin confirmación MQTT para {entity.name} tras "
+            f"{FEEDBACK_TIMEOUT_SECONDS}s ({reason}, orderId={order_id})"
+            f"{revert_note}"
+        )
+        if revert_fn:
+            revert_fn()
+            entity.async_write_ha_state()
+
+
 class CommandFeedbackMixin:
-    """Requiere que la clase que lo use defina ``self.hass``, ``self.inst_ref``, ``self.name``."""
+    """Requiere que la clase que lo use defina ``self.inst_ref``, ``self.name``
+    y llame a ``self._init_command_feedback(router, commands)`` y a
+    ``self._stop_command_feedback()`` en ``async_will_remove_from_hass``."""
+
+    def _init_command_feedback(self, router, commands):
+        self._feedback_router = router
+        self._command_queue = commands
 
-    def _init_command_feedback(self):
-        self._pending_order_id = None
-        self._pending_revert_fn = None
-        self._cancel_feedback_timeout = None
-        self._unsub_feedback = None
+    async def _async_send_command(self, command_type, send, revert_fn=None):
+        """Envía ``send()`` por la cola de comandos y registra su ``orderId``.
 
-    def _start_feedback_listener(self):
-        self._unsub_feedback = self.hass.bus.async_listen(
-            f"{DOMAIN}_feedback", self._handle_feedback_event
+        Devuelve ``False`` si un cambio posterior del mismo tipo lo sustituyó
+        antes de salir (ver command_queue.py): el llamador no debe tocar el
+        estado. Si el envío falla, la cola ya ha aplicado ``revert_fn`` y la
+        excepción se propaga.
+        """
+        result = await self._command_queue.async_send(
+            self, command_type, send, revert_fn
         )
+        if result is None:
+            return False
+        response, revert_fn = result
+        self._track_command_confirmation(response, revert_fn=revert_fn)
+        return True
 
-    def _stop_feedback_listener(self):
-        if self._unsub_feedback:
-            self._unsub_feedback()
-            self._unsub_feedback = None
-        if self._cancel_feedback_timeout:
-            self._cancel_feedback_timeout()
-            self._cancel_feedback_timeout = None
+    def _stop_command_feedback(self):
+        self._feedback_router.discard(self)
 
     def _track_command_confirmation(self, response, revert_fn=None):
         """Registra el ``orderId`` de un comando recién enviado y arma el timeout.
 
         ``revert_fn``, si se pasa, es una función sin argumentos que restaura
         el estado local al valor previo al cambio optimista; se llama solo si
-        no llega confirmación a tiempo (no escribe el estado, eso lo hace el
-        llamador tras invocarla).
+        no llega confirmación a tiempo (el router escribe el estado después).
+        """
+        self._track_order_id(extract_order_id(response), revert_fn)
+
+    def _track_order_id(self, order_id, revert_fn=None):
+        """Como ``_track_command_confirmation``, con el ``orderId`` ya extraído.
+
+        Lo usan los envíos por lotes (``mysair.set_zones``), donde una sola
+        respuesta trae el ``orderId`` de varias zonas a la vez.
         """
-        order_id = extract_order_id(response)
         if not order_id:
             return
-        if self._cancel_feedback_timeout:
-            self._cancel_feedback_timeout()
-        self._pending_order_id = order_id
-        self._pending_revert_fn = revert_fn
-        self._cancel_feedback_timeout = async_call_later(
-            self.hass, FEEDBACK_TIMEOUT_SECONDS, self._on_feedback_timeout
-        )
+        self._feedback_router.track(self, order_id, revert_fn)
 
     def _clear_pending_command(self):
         """Descarta cualquier comando pendiente de confirmar (y su revert).
@@ -70,51 +177,4 @@ class CommandFeedbackMixin:
         Se llama al recibir un status MQTT real para esta zona: ese dato
         fresco ya es la verdad, no hace falta seguir esperando/revirtiendo.
         """
-        self._pending_order_id = None
-        self._pending_revert_fn = None
-        if self._cancel_feedback_timeout:
-            self._cancel_feedback_timeout()
-            self._cancel_feedback_timeout = None
-
-    @callback
-    def _handle_feedback_event(self, event):
-        if event.data.get("ctl") != self.inst_ref:
-            return
-        if (
-            not self._pending_order_id
-            or event.data.get("order_id") != self._pending_order_id
-        ):
-            return
-        _LOGGER.debug(
-            f"[MySair] ✅ Comando confirmado para {self.name} (orderId={self._pending_order_id})"
-        )
-        self._pending_order_id = None
-        self._pending_revert_fn = None
-        if self._cancel_feedback_timeout:
-            self._cancel_feedback_timeout()
-            self._cancel_feedback_timeout = None
-
-    @callback
-    def _on_feedback_timeout(self, now):
-        if self._pending_order_id:
-            mqtt_client = getattr(self, "mqtt_client", None)
-            if mqtt_client is not None and not mqtt_client.connected:
-                reason = "MQTT desconectado en ese momento"
-            else:
-                reason = "con MQTT activo — puede ser un ACK perdido o un problema del backend"
-
-            revert_fn = self._pending_revert_fn
-            revert_note = (
-                " — revirtiendo al último estado confirmado" if revert_fn else ""
-            )
-            _LOGGER.warning(
-                f"[MySair] ⚠️ Sin confirmación MQTT para {self.name} tras "
-                f"{FEEDBACK_TIMEOUT_SECONDS}s ({reason}, orderId={self._pending_order_id})"
-                f"{revert_note}"
-            )
-            self._pending_order_id = None
-            self._pending_revert_fn = None
-            if revert_fn:
-                revert_fn()
-                self.async_write_ha_state()
-        self._cancel_feedback_timeout = None
+        self._feedback_router.discard(self)
@@ -0,0 +1,156 @@
+"""Cola de comandos por zona con agrupación "el último gana" (debounce).
+
+Arrastrar el control de consigna en la UI llama a ``async_set_temperature``
+muchas veces seguidas. Antes cada llamada era un ``POST /send/instruction``
+propio y sustituía el ``orderId`` pendiente de la anterior, así que los ACK
+de las primeras ya no se podían correlacionar.
+
+Ahora cada entidad envía sus comandos a través de la `CommandQueue` de su
+config entry (la crea el coordinador), con una ranura por entidad y tipo de
+comando (``temp``, ``fanspeed``, ``mode`` — encender/apagar cuenta como
+``mode``):
+
+- Si la ranura está libre, el comando sale en el acto (sin retardo para un
+  clic aislado).
+- Si llega otro cambio con una petición en vuelo o antes de que pase
+  ``CONF_COMMAND_WINDOW`` desde el último envío, se queda esperando; uno más
+  nuevo lo sustituye (el sustituido nunca se envía y su llamada vuelve sin
+  hacer nada). Al acabar la petición y la ventana sale solo el último.
+- Una petición ya en vuelo no se aborta: el backend puede haberla aplicado y
+  su ``orderId`` se seguiría esperando; el siguiente valor sale detrás.
+
+El revert de un cambio agrupado es el del primero de la tanda (el estado
+anterior a todos los valores que no llegaron a enviarse). Si falla un envío
+con otro valor ya esperando en la ranura, no se revierte: su revert pasa al
+que espera y solo se aplica si ese también falla.
+"""
+
+import logging
+from functools import partial
+
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _Slot:
+    """Estado de una ranura (entidad, tipo de comando)."""
+
+    __slots__ = ("pending", "in_flight", "timer", "last_sent_at")
+
+    def __init__(self):
+        self.pending = None  # (send, future, revert_fn) aún sin enviar
+        self.in_flight = None  # tarea del envío en curso
+        self.timer = None  # cancelación del timer de la ventana
+        self.last_sent_at = None  # loop.time() del último envío
+
+
+class CommandQueue:
+    """Comandos de las entidades de una config entry, agrupados por ranura."""
+
+    def __init__(self, hass, window):
+        self.hass = hass
+        self.window = window
+        self._slots = {}
+        # Contadores para diagnostics.
+        self.commands_sent = 0
+        self.commands_coalesced = 0
+
+    async def async_send(self, entity, command_type, send, revert_fn=None):
+        """Envía ``send()`` (corrutina del API) por la ranura ``(entity, command_type)``.
+
+        Devuelve ``(respuesta, revert_fn)`` cuando se ha enviado (con el revert
+        de toda la tanda agrupada) o ``None`` si un cambio posterior lo
+        sustituyó antes de salir. Si el envío falla, aplica el revert (salvo
+        que ya espere un valor más nuevo) y relanza la excepción (el llamador
+        escribe el estado).
+        """
+        slot = self._slots.get((entity, command_type))
+        if slot is None:
+            slot = self._slots[(entity, command_type)] = _Slot()
+        if slot.pending is not None:
+            _, superseded, first_revert = slot.pending
+            if not superseded.done():
+                superseded.set_result(None)
+            self.commands_coalesced += 1
+            revert_fn = first_revert or revert_fn
+        future = self.hass.loop.create_future()
+        slot.pending = (send, future, revert_fn)
+        self._maybe_send(entity, command_type, slot)
+        return await future
+
+    def stop(self):
+        """Cancela ventanas y envíos pendientes (descarga de la entrada)."""
+        for slot in self._slots.values():
+            if slot.timer:
+                slot.timer()
+                slot.timer = None
+            if slot.pending is not None:
+                slot.pending[1].cancel()
+                slot.pending = None
+            if slot.in_flight is not None:
+                slot.in_flight.cancel()
+        self._slots.clear()
+
+    def _maybe_send(self, entity, command_type, slot):
+        if slot.pending is None or slot.in_flight is not None or slot.timer:
+            return
+        if slot.last_sent_at is not None:
+            wait = slot.last_sent_at + self.window - self.hass.loop.time()
+            if wait > 0:
+                slot.timer = async_call_later(
+                    self.hass, wait, partial(self._on_window, entity, command_type)
+                )
+                return
+        send, future, revert_fn = slot.pending
+        slot.pending = None
+        slot.last_sent_at = self.hass.loop.time()
+        self.commands_sent += 1
+        task = self.hass.async_create_task(
+            self._async_send(entity, command_type, slot, send, future, revert_fn),
+            eager_start=True,
+        )
+        # Con eager_start el envío puede haber terminado ya (sin ceder el loop).
+        if not task.done():
+            slot.in_flight = task
+
+    @callback
+    def _on_window(self, entity, command_type, _now):
+        slot = self._slots.get((entity, command_type))
+        if slot is None:
+            return
+        slot.timer = None
+        self._maybe_send(entity, command_type, slot)
+
+    async def _async_send(self, entity, command_type, slot, send, future, revert_fn):
+        try:
+            response = await send()
+        except Exception as err:
+            if slot.pending is not None:
+                # Ya hay un valor más nuevo esperando: revertir aquí pisaría su
+                # estado optimista. El revert pasa a él (estado anterior a
+                # ambos) y solo se aplica si ese envío también falla.
+                pending_send, pending_future, pending_revert = slot.pending
+                slot.pending = (
+                    pending_send,
+                    pending_future,
+                    revert_fn or pending_revert,
+                )
+            elif revert_fn:
+                revert_fn()
+            if not future.done():
+                future.set_exception(err)
+        else:
+            if not future.done():
+                future.set_result((response, revert_fn))
+        finally:
+            if not future.done():  # cancelado (descarga de la entrada)
+                future.cancel()
+            slot.in_flight = None
+            if slot.pending is not None:
+                _LOGGER.debug(
+                    f"[MySair] 🧮 {entity.name}: enviando el último '{command_type}' "
+                    "agrupado"
+                )
+            self._maybe_send(entity, command_type, slot)
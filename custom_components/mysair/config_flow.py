@@ -3,8 +3,19 @@ import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.config_entries import ConfigFlowResult
-
-from .const import DOMAIN
+from homeassistant.core import callback
+
+from .const import (
+    CONF_BUS_EVENTS,
+    CONF_COMMAND_WINDOW,
+    CONF_MQTT_TRANSPORT,
+    CONF_SYNC_CONCURRENCY,
+    COMMAND_WINDOW_SECONDS,
+    DOMAIN,
+    MQTT_TRANSPORT_ASYNCIO,
+    MQTT_TRANSPORT_THREAD,
+    STATUS_SYNC_MAX_CONCURRENCY,
+)
 from .api import MySairAPI, MySairAuthError, MySairConnectionError
 
 _LOGGER = logging.getLogger(__name__)
@@ -18,12 +29,33 @@ DATA_SCHEMA = vol.Schema(
 
 REAUTH_SCHEMA = vol.Schema({vol.Required("password"): str})
 
+OPTIONS_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_MQTT_TRANSPORT, default=MQTT_TRANSPORT_THREAD): vol.In(
+            [MQTT_TRANSPORT_THREAD, MQTT_TRANSPORT_ASYNCIO]
+        ),
+        vol.Required(CONF_BUS_EVENTS, default=False): bool,
+        vol.Required(CONF_COMMAND_WINDOW, default=COMMAND_WINDOW_SECONDS): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=5)
+        ),
+        vol.Required(
+            CONF_SYNC_CONCURRENCY, default=STATUS_SYNC_MAX_CONCURRENCY
+        ): vol.All(vol.Coerce(int), vol.Range(min=1, max=16)),
+    }
+)
+
 
 class MySairConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Flujo de configuración para la integración MySair."""
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Opciones por entrada (transporte MQTT, evento de bus)."""
+        return MySairOptionsFlow()
+
     async def async_step_user(self, user_input=None) -> ConfigFlowResult:
         """Primer paso del flujo de configuración (inicio de sesión)."""
         errors = {}
@@ -118,3 +150,20 @@ class MySairConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             errors=errors,
             description_placeholders={"email": reauth_entry.data.get("email", "")},
         )
+
+
+class MySairOptionsFlow(config_entries.OptionsFlow):
+    """Opciones de una entrada MySair; al guardarlas se recarga la entrada
+    (listener de actualización registrado en ``async_setup_entry``)."""
+
+    async def async_step_init(self, user_input=None) -> ConfigFlowResult:
+        """Único paso: transporte MQTT, evento de bus, ventana de comandos y syncs en paralelo."""
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=self.add_suggested_values_to_schema(
+                OPTIONS_SCHEMA, self.config_entry.options
+            ),
+        )
@@ -6,10 +6,56 @@ DOMAIN = "mysair"
 FEEDBACK_TIMEOUT_SECONDS = 5
 
 # Antigüedad máxima de un status MQTT antes de marcar la entidad como no
-# disponible (C5). 3x el intervalo del refresco periódico de respaldo (120 s,
-# __init__.py) para no dar falsos "no disponible" por jitter normal.
+# disponible (C5). 3x el intervalo del sync de status de respaldo (120 s,
+# STATUS_SYNC_INTERVAL_SECONDS) para no dar falsos "no disponible" por jitter
+# normal.
 MQTT_STALE_AFTER_SECONDS = 360
 
+# Sync de status de respaldo (status_sync.py). Cada STATUS_SYNC_INTERVAL_SECONDS
+# se revisa cada instalación y solo se le pide un `status`/`sync` si MQTT está
+# conectado y su zona más antigua lleva STATUS_SYNC_MAX_AGE_SECONDS sin status.
+# Con MQTT sano, una instalación sin cambios se sincroniza cada dos
+# intervalos (240 s), aún por debajo de MQTT_STALE_AFTER_SECONDS.
+STATUS_SYNC_INTERVAL_SECONDS = 120
+STATUS_SYNC_MAX_AGE_SECONDS = 180
+# Los syncs de varias instalaciones salen en paralelo, con como mucho
+# CONF_SYNC_CONCURRENCY peticiones en vuelo (opción de la entrada) y un
+# timeout propio por instalación: una lenta no retrasa a las demás.
+CONF_SYNC_CONCURRENCY = "sync_concurrency"
+STATUS_SYNC_MAX_CONCURRENCY = 4
+STATUS_SYNC_TIMEOUT_SECONDS = 10
+
+# Status del hilo MQTT pendientes de entregar al loop (status_handoff.py): uno
+# por instalación, así que en la práctica la cola no pasa del número de
+# instalaciones; el límite solo protege ante ``ctl`` inesperados.
+STATUS_HANDOFF_MAX_PENDING = 256
+
+# Caché persistente de la topología (ubicaciones → instalaciones → zonas) en
+# `.storage/`, para crear las entidades al arrancar sin esperar al backend.
+TOPOLOGY_STORAGE_VERSION = 1
+TOPOLOGY_STORAGE_KEY = f"{DOMAIN}.topology"
+# Reintento de sesión/revalidación en segundo plano tras un arranque desde
+# caché si el backend no responde.
+TOPOLOGY_RETRY_SECONDS = 60
+
+# Transporte MQTT, seleccionable por entrada desde las opciones: el cliente
+# con hilo propio (websocket-client, por defecto) o el nativo asyncio
+# (aiohttp, en el event loop de Home Assistant, sin hilos).
+CONF_MQTT_TRANSPORT = "mqtt_transport"
+MQTT_TRANSPORT_THREAD = "thread"
+MQTT_TRANSPORT_ASYNCIO = "asyncio"
+
+# Evento de bus `mysair_update` por cada mensaje MQTT: opcional (desactivado
+# por defecto) porque el recorder guarda cada evento en la base de datos; el
+# estado llega a las entidades por el coordinador sin pasar por el bus.
+CONF_BUS_EVENTS = "bus_events"
+
+# Ventana de agrupación de comandos por zona y tipo (command_queue.py): los
+# cambios que llegan antes de que pase desde el último envío (p. ej. al
+# arrastrar el control de consigna) se agrupan y solo sale el último valor.
+CONF_COMMAND_WINDOW = "command_window"
+COMMAND_WINDOW_SECONDS = 0.5
+
 # Atributos comunes
 ATTR_TARGET_TEMP = "target_temperature"
 ATTR_CURRENT_TEMP = "current_temperature"
@@ -22,3 +68,6 @@ SCAN_INTERVAL = 60  # segundos
 # Servicio mysair.stop_installation (F5)
 SERVICE_STOP_INSTALLATION = "stop_installation"
 ATTR_INSTALLATION_REF = "installation_ref"
+
+# Servicio mysair.set_zones: mismos ajustes en varios termostatos, por lotes
+SERVICE_SET_ZONES = "set_zones"
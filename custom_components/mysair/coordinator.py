@@ -6,25 +6,53 @@ topic/ctl/zone_id sobre la lista completa de zonas del mensaje. Con N zonas
 y 6 entidades por zona, un solo mensaje MQTT disparaba 6×N listeners que
 recorrían la misma lista de arriba a abajo.
 
-Ahora: una única instancia de `MySairCoordinator` por config entry escucha
-`f"{DOMAIN}_update"` una sola vez, filtra por sufijo de topic e instalaciones
+Ahora: una única instancia de `MySairCoordinator` por config entry recibe
+cada mensaje una sola vez, filtra por sufijo de topic e instalaciones
 propias, y redistribuye cada zona por separado vía
 `homeassistant.helpers.dispatcher` con una señal específica por (ctl,
 zone_id). Cada entidad se suscribe solo a su propia señal: ya no repite el
 filtrado, recibe directamente su zona ya aislada.
 
-El evento `f"{DOMAIN}_update"` (disparado desde `mqtt_message_callback` en
-`__init__.py`, sin cambios) sigue siendo el único punto de entrada: tanto el
-MQTT real como los tests (`_fire_status` en test_entities.py) funcionan igual
-que antes.
+Entrada directa, sin bus: `mqtt_message_callback` (`__init__.py`) entrega
+cada `status` ya parseado a `MySairCoordinator.async_handle_status`. Antes
+pasaba por el evento de bus `f"{DOMAIN}_update"`, que el recorder guarda en
+la tabla `events` con la lista completa de zonas: una escritura en la base de
+datos por cada mensaje MQTT. Ese evento es ahora opcional (opción
+`bus_events` de la entrada) y solo sirve a automatizaciones que lo usen; el
+coordinador ya no lo escucha.
+
+Detección de cambios por campo: el sync periódico (``status`` cada 2 minutos)
+repite casi siempre los mismos valores, y cada entidad escribía su estado en
+la máquina de estados (y el recorder) igualmente: 6×N escrituras idénticas
+por sync. Ahora el coordinador compara cada zona con la última recibida y
+envía, junto a la zona completa, el conjunto de campos que han cambiado; cada
+entidad solo escribe si cambió alguno de los suyos (``_zone_fields``, ver
+`availability.py`). Los contadores ``state_writes``/``state_writes_skipped``
+(en diagnostics) miden la reducción.
+
+Caducidad centralizada: antes cada entidad reprogramaba su propio timer de
+caducidad (``async_call_later``) con cada status, así que un sync de 20 zonas
+cancelaba y creaba 140 timers en el loop. Ahora el coordinador guarda la hora
+del último status de cada zona en un ``OrderedDict`` ordenado de más antigua
+a más reciente (todas caducan tras el mismo ``MQTT_STALE_AFTER_SECONDS``, así
+que ese orden es también el de caducidad) y mantiene un único timer armado
+para la primera zona que caducará. Un status solo mueve su zona al final;
+el timer se reprograma únicamente cuando vence. Al caducar una zona se avisa
+solo a sus entidades (``signal_zone_stale``).
 """
 
 import logging
+from collections import OrderedDict
+from datetime import timedelta
 
+import homeassistant.util.dt as dt_util
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_call_later
 
-from .const import DOMAIN
+from .command_feedback import CommandFeedbackRouter
+from .command_queue import CommandQueue
+from .const import COMMAND_WINDOW_SECONDS, DOMAIN, MQTT_STALE_AFTER_SECONDS
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -32,6 +60,9 @@ _LOGGER = logging.getLogger(__name__)
 # usan este módulo y las entidades), no una constante de protocolo/dominio,
 # así que vive aquí y no en const.py.
 _SIGNAL_ZONE_UPDATE = f"{DOMAIN}_zone_update"
+_SIGNAL_ZONE_STALE = f"{DOMAIN}_zone_stale"
+
+_STALE_AFTER = timedelta(seconds=MQTT_STALE_AFTER_SECONDS)
 
 
 def signal_zone_update(inst_ref: str, device_id: str) -> str:
@@ -39,53 +70,220 @@ def signal_zone_update(inst_ref: str, device_id: str) -> str:
 
     Cada entidad de una zona (climate/sensor/switch) se suscribe a esta
     misma señal para recibir solo los datos de su propia zona, ya
-    filtrados y aislados por el coordinador.
+    filtrados y aislados por el coordinador. La señal lleva dos argumentos:
+    la zona completa y el ``frozenset`` de campos que cambiaron respecto al
+    status anterior (vacío si no cambió nada; todos en el primero).
     """
     return f"{_SIGNAL_ZONE_UPDATE}_{inst_ref}_{device_id}"
 
 
+def signal_zone_stale(inst_ref: str, device_id: str) -> str:
+    """Señal (sin argumentos) que avisa a las entidades de una zona de que sus
+    datos han caducado: deben reescribir su estado (``available`` pasa a
+    ``False``)."""
+    return f"{_SIGNAL_ZONE_STALE}_{inst_ref}_{device_id}"
+
+
+def diff_zone(previous, zone) -> frozenset:
+    """Campos de ``zone`` con un valor distinto al de ``previous`` (`ZoneState`).
+
+    Sin zona previa, todos los campos cuentan como cambiados.
+    """
+    return zone.changed_fields(previous)
+
+
+def signal_zones_added(entry_id: str) -> str:
+    """Señal con zonas nuevas (``{inst_ref: [dispositivos]}``) de una entrada.
+
+    La envía la revalidación en segundo plano de la topología cacheada
+    (``__init__.py``) cuando aparecen zonas que no existían en la caché; cada
+    plataforma crea sus entidades para ellas sin recargar la integración.
+    """
+    return f"{DOMAIN}_zones_added_{entry_id}"
+
+
 class MySairCoordinator:
     """Redistribuye los mensajes `status` de una config entry por zona.
 
     Sustituye las N×6 suscripciones directas al bus (una por entidad) por
-    una única suscripción por config entry; ver docstring del módulo.
+    un único punto de entrada por config entry; ver docstring del módulo.
     """
 
-    def __init__(self, hass: HomeAssistant, installation_refs: list) -> None:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        installation_refs: list,
+        command_window: float = COMMAND_WINDOW_SECONDS,
+    ) -> None:
         self.hass = hass
         self._installation_refs = set(installation_refs)
-        self._zones = {}  # (ctl, zone_id) -> último dict de zona recibido
-        self._unsub = None
+        self._zones = {}  # (ctl, zone_id) -> último ZoneState recibido
+        self._last_status_zones = {}  # ctl -> zone_ids de su último status
+        self._running = False
+        # (ctl, zone_id) -> hora (UTC) del último status, de más antigua a más
+        # reciente: la primera es siempre la próxima en caducar.
+        self._fresh_zones = OrderedDict()
+        self._cancel_stale_timer = None
+        # ACK de comandos (topic feedback) por orderId, ver command_feedback.py.
+        self.feedback = CommandFeedbackRouter(hass)
+        # Envío de comandos agrupados por entidad/tipo, ver command_queue.py.
+        self.commands = CommandQueue(hass, command_window)
+        # Contadores para diagnostics: zonas recibidas, cuántas llegaron sin
+        # ningún cambio, y escrituras de estado hechas/evitadas por las
+        # entidades (las cuentan ellas, ver AvailabilityMixin).
+        self.zone_updates = 0
+        self.zone_updates_unchanged = 0
+        self.state_writes = 0
+        self.state_writes_skipped = 0
 
     def start(self) -> None:
-        """Se suscribe al evento `mysair_update` (una sola vez por entry)."""
-        self._unsub = self.hass.bus.async_listen(
-            f"{DOMAIN}_update", self._handle_update
-        )
+        """Empieza a aceptar mensajes (`async_handle_status`)."""
+        self._running = True
 
     def stop(self) -> None:
-        """Cancela la suscripción al bus."""
-        if self._unsub:
-            self._unsub()
-            self._unsub = None
+        """Deja de redistribuir: los mensajes que aún lleguen se ignoran."""
+        self._running = False
+        self.feedback.stop()
+        self.commands.stop()
+        if self._cancel_stale_timer:
+            self._cancel_stale_timer()
+            self._cancel_stale_timer = None
+
+    def zone_available(self, ctl: str, zone_id: str) -> bool:
+        """Si la zona ha recibido un status hace menos de ``MQTT_STALE_AFTER_SECONDS``."""
+        received_at = self._fresh_zones.get((ctl, zone_id))
+        return received_at is not None and dt_util.utcnow() - received_at < _STALE_AFTER
+
+    def installation_status_age(self, ctl: str) -> "float | None":
+        """Segundos desde el status de la zona de ``ctl`` que lleva más sin recibirlo.
+
+        ``None`` si aún no ha llegado ninguno o si alguna zona ya ha caducado:
+        en ambos casos hace falta pedir un sync (ver status_sync.py).
+        """
+        oldest = next(
+            (
+                received_at
+                for (zone_ctl, _), received_at in self._fresh_zones.items()
+                if zone_ctl == ctl
+            ),
+            None,
+        )
+        if oldest is None or any(
+            key[0] == ctl and key not in self._fresh_zones for key in self._zones
+        ):
+            return None
+        return (dt_util.utcnow() - oldest).total_seconds()
+
+    def _mark_zone_fresh(self, key) -> None:
+        self._fresh_zones[key] = dt_util.utcnow()
+        self._fresh_zones.move_to_end(key)
+        # Si ya hay timer, vence antes (o a la vez) que esta zona: nada que hacer.
+        if self._cancel_stale_timer is None:
+            self._schedule_stale_check()
+
+    def _schedule_stale_check(self) -> None:
+        oldest = next(iter(self._fresh_zones.values()))
+        delay = (oldest + _STALE_AFTER - dt_util.utcnow()).total_seconds()
+        self._cancel_stale_timer = async_call_later(
+            self.hass, max(delay, 0), self._on_stale_timer
+        )
+
+    @callback
+    def _on_stale_timer(self, _now) -> None:
+        """Retira las zonas caducadas, avisa a sus entidades y rearma el timer."""
+        self._cancel_stale_timer = None
+        now = dt_util.utcnow()
+        stale = []
+        while self._fresh_zones:
+            key, received_at = next(iter(self._fresh_zones.items()))
+            if now - received_at < _STALE_AFTER:
+                break
+            del self._fresh_zones[key]
+            stale.append(key)
+        if self._fresh_zones:
+            self._schedule_stale_check()
+        for ctl, zone_id in stale:
+            _LOGGER.debug(
+                f"[MySair Coordinator] ⏳ Zona {ctl}/{zone_id} sin status en "
+                f"{MQTT_STALE_AFTER_SECONDS}s, pasa a no disponible"
+            )
+            async_dispatcher_send(self.hass, signal_zone_stale(ctl, zone_id))
 
     @callback
-    def _handle_update(self, event) -> None:
-        topic = event.data.get("topic", "")
-        if not topic.endswith("/status"):
+    def async_handle_status(self, topic: str, data: dict) -> None:
+        """Redistribuye un `status` ya parseado (``{"ctl", "zones"}``) por zona.
+
+        Se llama desde el event loop (``mqtt_message_callback``).
+        """
+        if not self._running or not topic.endswith("/status"):
             return
 
-        data = event.data.get("data", {})
         ctl = data.get("ctl")
         if ctl not in self._installation_refs:
             return
 
+        zone_ids = []
         for zone in data.get("zones", []):
-            zone_id = zone.get("zone_id")
+            zone_id = zone.zone_id
             if zone_id is None:
                 continue
-            self._zones[(ctl, zone_id)] = zone
+            zone_ids.append(zone_id)
+            key = (ctl, zone_id)
+            changed = diff_zone(self._zones.get(key), zone)
+            self._zones[key] = zone
+            self._mark_zone_fresh(key)
+            self.zone_updates += 1
+            if not changed:
+                self.zone_updates_unchanged += 1
             _LOGGER.debug(
-                f"[MySair Coordinator] 📨 Zona {ctl}/{zone_id} actualizada, redistribuyendo"
+                f"[MySair Coordinator] 📨 Zona {ctl}/{zone_id}: "
+                f"{len(changed)} campos cambiados, redistribuyendo"
+            )
+            # Se envía aunque no cambie nada: el status sigue contando como
+            # dato fresco para la disponibilidad de las entidades.
+            async_dispatcher_send(
+                self.hass, signal_zone_update(ctl, zone_id), zone, changed
             )
-            async_dispatcher_send(self.hass, signal_zone_update(ctl, zone_id), zone)
+        self._last_status_zones[ctl] = zone_ids
+
+    @callback
+    def async_refresh_installation(self, ctl: str) -> None:
+        """Renueva la frescura de las zonas del último status de ``ctl``.
+
+        Para un status repetido tal cual (``StatusDeduplicator``), que no se
+        parsea: sus zonas son las del último. Solo se avisa a las entidades
+        de las zonas que habían caducado, para que vuelvan a estar
+        disponibles; las demás no tienen nada que escribir.
+        """
+        if not self._running or ctl not in self._installation_refs:
+            return
+        for zone_id in self._last_status_zones.get(ctl, ()):
+            key = (ctl, zone_id)
+            was_stale = key not in self._fresh_zones
+            self._mark_zone_fresh(key)
+            if was_stale:
+                async_dispatcher_send(
+                    self.hass,
+                    signal_zone_update(ctl, zone_id),
+                    self._zones[key],
+                    frozenset(),
+                )
+
+    def zone_snapshot(self) -> dict:
+        """Último estado de cada zona, como dict (diagnostics)."""
+        return {
+            f"{ctl}/{zone_id}": zone.as_dict()
+            for (ctl, zone_id), zone in self._zones.items()
+        }
+
+    def stats(self) -> dict:
+        """Contadores de zonas, escrituras de estado y comandos (diagnostics)."""
+        return {
+            "zone_updates": self.zone_updates,
+            "zone_updates_unchanged": self.zone_updates_unchanged,
+            "state_writes": self.state_writes,
+            "state_writes_skipped": self.state_writes_skipped,
+            "pending_commands": self.feedback.pending_count,
+            "commands_sent": self.commands.commands_sent,
+            "commands_coalesced": self.commands.commands_coalesced,
+        }
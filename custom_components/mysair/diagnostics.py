@@ -13,7 +13,9 @@ from homeassistant.components.diagnostics import async_redact_data
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 
-from .const import DOMAIN
+from .const import CONF_BUS_EVENTS, CONF_MQTT_TRANSPORT, DOMAIN, MQTT_TRANSPORT_THREAD
+from .mqtt_manager import async_get_mqtt_manager
+from .status_parser import STATUS_VALUE_CACHE
 
 TO_REDACT_ENTRY = {"email", "password", "access_token", "refresh_token"}
 TO_REDACT_API = {
@@ -44,21 +46,46 @@ async def async_get_config_entry_diagnostics(
     if mqtt_client is not None:
         last_message_at = mqtt_client.last_message_at
         mqtt_state = {
+            "transport": entry.options.get(CONF_MQTT_TRANSPORT, MQTT_TRANSPORT_THREAD),
+            "bus_events": entry.options.get(CONF_BUS_EVENTS, False),
             "connected": mqtt_client.connected,
             "reconnect_attempt": mqtt_client.reconnect_attempt,
             "last_message_at": last_message_at.isoformat() if last_message_at else None,
             "total_reconnects": mqtt_client.total_reconnects,
+            "total_rotations": mqtt_client.total_rotations,
+            "rotation_fallbacks": mqtt_client.rotation_fallbacks,
+            "rotation_duplicates": mqtt_client.rotation_duplicates,
+            "last_connack_seconds": mqtt_client.last_connack_seconds,
+            "subscribe_failures": mqtt_client.subscribe_failures,
+            "connection_entries": async_get_mqtt_manager(hass).entry_count(
+                entry.entry_id
+            ),
             "parse_strict_count": mqtt_client.parse_strict_count,
             "parse_fallback_count": mqtt_client.parse_fallback_count,
             "parse_error_count": mqtt_client.parse_error_count,
+            "status_duplicates": (
+                data["status_dedup"].duplicates if data.get("status_dedup") else 0
+            ),
             "last_close_code": mqtt_client.last_close_code,
             "last_close_msg": mqtt_client.last_close_msg,
         }
 
+    coordinator = data.get("coordinator")
+    status_sync = data.get("status_sync")
+    status_handoff = data.get("status_handoff")
+
     return {
         "entry_data": async_redact_data(dict(entry.data), TO_REDACT_ENTRY),
         "installations": data["installations"],
         "devices": data["devices"],
+        "topology_errors": data.get("topology_errors"),
+        "startup": data.get("startup"),
         "api": async_redact_data(api_state, TO_REDACT_API),
         "mqtt": mqtt_state,
+        "coordinator": coordinator.stats() if coordinator else None,
+        "zones": coordinator.zone_snapshot() if coordinator else None,
+        "status_sync": status_sync.stats() if status_sync else None,
+        "status_handoff": status_handoff.stats() if status_handoff else None,
+        # Compartida por todo el proceso, no solo por esta entrada.
+        "status_value_cache": STATUS_VALUE_CACHE.stats(),
     }
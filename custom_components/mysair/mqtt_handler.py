@@ -1,13 +1,20 @@
 import time
 import json
+import asyncio
 import random
 import struct
 import secrets
 import datetime
 import logging
 import threading
+import aiohttp
 import websocket
 
+try:  # backend JSON opcional más rápido (Home Assistant ya lo incluye)
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -17,6 +24,17 @@ def log(msg, level="info"):
     getattr(_LOGGER, level.lower())(f"{now} {msg}")
 
 
+def _aws_signing_params(aws):
+    """``(host, region, access_key, secret_key, token)`` de unas credenciales AWS."""
+    return (
+        aws.get("endpoint") or aws.get("aws_mqtt_host"),
+        aws.get("region") or aws.get("aws_default_region"),
+        aws.get("accessKeyId") or aws.get("aws_access_key_id"),
+        aws.get("secretAccessKey") or aws.get("aws_secret_access_key"),
+        aws.get("sessionToken") or aws.get("aws_security_token"),
+    )
+
+
 def _redact_client_id(client_id):
     """Enmascara el ``access_key`` embebido en el clientId antes de loguearlo (D2).
 
@@ -83,10 +101,10 @@ class FrameState:
     MALFORMED = "malformed"  # el varint de longitud MQTT nunca podrá completarse
 
 
-def _next_packet_length(buffer):
+def _next_packet_length(buffer, offset=0):
     """Longitud total (cabecera fija + varint + remaining_length) del primer
-    paquete MQTT al inicio de ``buffer``, o un ``FrameState`` si aún no se
-    puede determinar (E2, manejo de frames parciales/multi-paquete).
+    paquete MQTT que empieza en ``buffer[offset]``, o un ``FrameState`` si aún
+    no se puede determinar (E2, manejo de frames parciales/multi-paquete).
 
     Distingue "incompleto" (esperar más bytes) de "malformado" (el varint
     de longitud nunca terminará, más datos no ayudan): ``decode_varint``
@@ -95,12 +113,13 @@ def _next_packet_length(buffer):
     disponibles tras la cabecera fija — con menos, siempre es por falta de
     datos.
     """
-    if len(buffer) < 1:
+    available = len(buffer) - offset
+    if available < 1:
         return FrameState.INCOMPLETE
-    remaining_length, pos = decode_varint(buffer, 1)
+    remaining_length, pos = decode_varint(buffer, offset + 1)
     if remaining_length is None:
-        return FrameState.MALFORMED if (len(buffer) - 1) >= 4 else FrameState.INCOMPLETE
-    return pos + remaining_length
+        return FrameState.MALFORMED if (available - 1) >= 4 else FrameState.INCOMPLETE
+    return pos - offset + remaining_length
 
 
 def parse_mqtt_publish(message):
@@ -116,6 +135,10 @@ def parse_mqtt_publish(message):
     imprimible. Nuestras suscripciones piden QoS 0 (``build_mqtt_subscribe``),
     así que el PUBLISH no lleva Packet Identifier.
 
+    Acepta ``bytes`` o un ``memoryview`` (el buffer de recepción pasa
+    rebanadas sin copiar, ver ``_drain_recv_buffer``): el payload devuelto es
+    una rebanada del mismo tipo que ``message``.
+
     Devuelve ``(topic, payload_bytes)``, o ``(None, None)`` si el mensaje no
     tiene la forma esperada — el llamador debe caer entonces a la heurística
     de texto (``_on_message``), ya que no hay certeza total sobre casos límite
@@ -130,13 +153,13 @@ def parse_mqtt_publish(message):
 
     if len(message) < pos + 2:
         return None, None
-    topic_len = struct.unpack("!H", message[pos : pos + 2])[0]
+    topic_len = struct.unpack_from("!H", message, pos)[0]
     pos += 2
 
     if len(message) < pos + topic_len:
         return None, None
     try:
-        topic = message[pos : pos + topic_len].decode("utf-8")
+        topic = str(message[pos : pos + topic_len], "utf-8")
     except UnicodeDecodeError:
         return None, None
     pos += topic_len
@@ -168,6 +191,45 @@ def _extract_json(text):
     return json.loads(text[start:end]), start
 
 
+def _json_loads(data):
+    """``json.loads`` sobre ``bytes``/``memoryview``, con ``orjson`` si está.
+
+    Si ``orjson`` rechaza algo que la librería estándar sí acepta (NaN,
+    enteros de más de 64 bits), se reintenta con ``json`` para no cambiar
+    qué mensajes se consideran válidos.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    if not isinstance(data, str):
+        # str() directo desde el buffer: sin copia intermedia a bytes ni la
+        # detección de codificación que json.loads hace con bytes.
+        data = str(data, "utf-8")
+    return json.loads(data)
+
+
+def _decode_publish_json(payload):
+    """Decodifica el objeto JSON del payload de un PUBLISH (bytes o memoryview).
+
+    Camino rápido: un único decode del objeto exterior directamente desde los
+    bytes, sin pasar por ``str``. Solo si el payload no es un objeto JSON
+    limpio (bytes no UTF-8, basura antes o después del ``{...}``) se cae al
+    camino lento de siempre: texto con ``errors="ignore"`` + ``_extract_json``.
+    El ``value`` anidado de ``status`` no se toca aquí: lo decodifica
+    ``parse_status_payload`` solo para los topics ``/status``.
+    """
+    try:
+        data = _json_loads(payload)
+    except ValueError:  # incluye JSONDecodeError y UnicodeDecodeError
+        data = None
+    if isinstance(data, dict):
+        return data
+    data, _ = _extract_json(str(payload, "utf-8", errors="ignore").strip())
+    return data
+
+
 def build_mqtt_connect(client_id, username, password):
     """Construye el paquete CONNECT MQTT."""
     protocol_name = b"\x00\x04MQTT"
@@ -190,16 +252,58 @@ def build_mqtt_connect(client_id, username, password):
     return fixed_header + variable_header + payload
 
 
-def build_mqtt_subscribe(packet_id, topic):
-    """Construye el paquete SUBSCRIBE MQTT."""
+def build_mqtt_subscribe(packet_id, topics):
+    """Construye el paquete SUBSCRIBE MQTT para uno o varios topic filters.
+
+    ``topics`` es un topic (``str``) o una secuencia de ellos, todos con QoS
+    0. El llamador respeta el límite del broker por petición
+    (``MAX_TOPICS_PER_SUBSCRIBE``): aquí no se trocea.
+    """
+    if isinstance(topics, str):
+        topics = (topics,)
     variable_header = struct.pack("!H", packet_id)
-    topic_bytes = topic.encode("utf-8")
-    payload = struct.pack("!H", len(topic_bytes)) + topic_bytes + b"\x00"
+    payload = b""
+    for topic in topics:
+        topic_bytes = topic.encode("utf-8")
+        payload += struct.pack("!H", len(topic_bytes)) + topic_bytes + b"\x00"
     remaining_length = len(variable_header) + len(payload)
     fixed_header = b"\x82" + encode_varint(remaining_length)
     return fixed_header + variable_header + payload
 
 
+def build_mqtt_unsubscribe(packet_id, topics):
+    """Construye el paquete UNSUBSCRIBE MQTT para uno o varios topic filters."""
+    if isinstance(topics, str):
+        topics = (topics,)
+    variable_header = struct.pack("!H", packet_id)
+    payload = b""
+    for topic in topics:
+        topic_bytes = topic.encode("utf-8")
+        payload += struct.pack("!H", len(topic_bytes)) + topic_bytes
+    remaining_length = len(variable_header) + len(payload)
+    fixed_header = b"\xa2" + encode_varint(remaining_length)
+    return fixed_header + variable_header + payload
+
+
+def parse_mqtt_suback(packet):
+    """Decodifica un SUBACK: ``(packet_id, return_codes)``.
+
+    ``return_codes`` trae un byte por topic filter del SUBSCRIBE, en el mismo
+    orden: el QoS concedido (0x00-0x02) o 0x80 si el broker rechazó esa
+    suscripción. Devuelve ``(None, b"")`` si el paquete no tiene esa forma.
+    """
+    if not packet or packet[0] != 0x90:
+        return None, b""
+    remaining_length, pos = decode_varint(packet, 1)
+    if remaining_length is None or remaining_length < 2:
+        return None, b""
+    end = pos + remaining_length
+    if len(packet) < end:
+        return None, b""
+    (packet_id,) = struct.unpack_from("!H", packet, pos)
+    return packet_id, bytes(packet[pos + 2 : end])
+
+
 def build_client_id(access_key):
     """clientId MQTT único por conexión, siguiendo el patrón de la app oficial.
 
@@ -258,18 +362,90 @@ def compute_backoff_delay(
     return max(delay + rng.uniform(-jitter, jitter), 0)
 
 
+# Prefetch de credenciales AWS: se renuevan en segundo plano este tiempo antes
+# de aws_expires_at. El relevo de la conexión salta a los 60 s del vencimiento
+# (margen de ``aws_credentials_expired``), así que para entonces ya las tiene
+# y no espera a la petición HTTP.
+AWS_CREDENTIALS_PREFETCH_SECONDS = 300
+
+# Edad máxima para reutilizar una URL prefirmada: AWS rechaza las firmas cuyo
+# X-Amz-Date se aleja demasiado de su reloj (5 min), así que se deja margen.
+PRESIGNED_URL_MAX_AGE_SECONDS = 240
+
+# Relevo "make-before-break" de credenciales: tiempo máximo para que la
+# conexión nueva complete CONNACK + SUBACK antes de renunciar y volver a la
+# reconexión clásica (cerrar y reabrir).
+ROTATION_TIMEOUT_SECONDS = 30
+
+# Topic filters por SUBSCRIBE: AWS IoT Core admite como mucho 8 suscripciones
+# por petición; con más instalaciones se trocea en varios SUBSCRIBE.
+MAX_TOPICS_PER_SUBSCRIBE = 8
+
+# Reintentos de un topic rechazado en el SUBACK (0x80) antes de darlo por
+# perdido en esta conexión (se vuelve a intentar en la siguiente).
+MAX_SUBSCRIBE_RETRIES = 3
+
+# PUBLISH recordados durante el solape de las dos conexiones del relevo, para
+# descartar el duplicado que llega por la otra. Basta con unos pocos: los dos
+# ejemplares de un mensaje llegan casi a la vez.
+MAX_OVERLAP_DEDUPE = 256
+
+
+class _MQTTConnection:
+    """Estado de una conexión WebSocket concreta.
+
+    Normalmente hay una sola, pero durante el relevo de credenciales conviven
+    dos (la saliente y la entrante) y cada una necesita su propio buffer de
+    recepción: sus flujos de bytes no se pueden mezclar.
+    """
+
+    __slots__ = (
+        "ws",
+        "recv_buffer",
+        "recv_offset",
+        "connack",
+        "next_packet_id",
+        "pending_subscribes",
+        "subscribe_attempts",
+        "subscribed",
+    )
+
+    def __init__(self, ws=None):
+        self.ws = ws
+        # E2: bytes WS acumulados aún no procesados (frames parciales/
+        # multi-paquete). Se consumen avanzando recv_offset, sin copiar, y
+        # solo se compactan al terminar cada _on_message.
+        self.recv_buffer = bytearray()
+        self.recv_offset = 0
+        self.connack = False  # CONNACK recibido: ya admite SUBSCRIBE
+        self.next_packet_id = 1
+        self.pending_subscribes = {}  # packet_id -> topics aún sin SUBACK
+        self.subscribe_attempts = {}  # topic -> SUBSCRIBE enviados
+        self.subscribed = False  # CONNACK y todos los SUBACK recibidos
+
+
 # ==========================================================
 # 🌐 Cliente principal MySair MQTT
 # ==========================================================
-class MySairMQTTClient:
-    """Gestor MQTT para MySair mediante WebSocket directo."""
+class _MySairMQTTSession:
+    """Lógica MQTT común a los dos transportes: framing y despacho de
+    paquetes, suscripciones tras el CONNACK, backoff y métricas (D3/D4).
+
+    Las subclases aportan el transporte: cómo se abre el WebSocket y se
+    envía un paquete (``_send_packet``), cómo se programa el refresco
+    proactivo de credenciales y cómo se espera entre reintentos.
+    ``MySairMQTTClient`` usa un hilo propio con websocket-client;
+    ``MySairAsyncMQTTClient`` corre en el event loop con aiohttp.
+    """
 
-    def __init__(self, api, installation_refs, message_callback):
+    def __init__(self, api, installation_refs, message_callback, connection_callback):
         self.api = api
         self.installation_refs = installation_refs
         self.message_callback = message_callback
-        self.stop_event = threading.Event()
-        self._thread = None
+        # Opcional: se invoca con ``True`` al recibir el CONNACK y con
+        # ``False`` al perder la conexión (mismo hilo/loop que
+        # ``message_callback``). Lo usa el sync de status adaptativo.
+        self.connection_callback = connection_callback
         self._reconnect_delay = 10  # base del backoff exponencial (E3)
         self._max_reconnect_delay = 120
         self._reconnect_attempt = 0
@@ -294,13 +470,560 @@ class MySairMQTTClient:
         )
         self.last_close_code = None  # D4: código de cierre del último _on_close
         self.last_close_msg = None  # D4: mensaje de cierre del último _on_close
-        self._recv_buffer = b""  # E2: bytes WS acumulados aún no procesados (frames parciales/multi-paquete)
+        # Relevo de credenciales sin corte: se cuentan aparte de
+        # total_reconnects, que solo recoge las caídas (con pérdida de datos).
+        self.total_rotations = 0  # relevos completados sin desconectar
+        self.rotation_fallbacks = 0  # relevos que acabaron en cierre + reconexión
+        self.rotation_duplicates = 0  # PUBLISH descartados por llegar por las dos
+        self.subscribe_failures = 0  # topics rechazados en un SUBACK (0x80)
+        # Conexión actual y, durante un relevo, la otra (entrante hasta que se
+        # suscribe, saliente desde entonces hasta que se cierra).
+        self._conn = _MQTTConnection()
+        self._standby = None
+        # Durante el solape: PUBLISH ya entregados -> conexión que lo trajo.
+        self._overlap_seen = None
+        self._overlap_lock = threading.Lock()
+        # installation_refs puede cambiar con la conexión abierta (conexión
+        # compartida entre config entries): CONNACK, SUBACK y los cambios de
+        # suscripción se serializan con este lock.
+        self._subscription_lock = threading.RLock()
+        # Reconexión rápida: URL firmada por adelantado (url, access_key,
+        # monotonic de la firma) y tiempo hasta el CONNACK de cada conexión.
+        self._presigned_url = None
+        self._credential_prefetch_timer = None
+        self._connect_started_at = None  # monotonic del inicio del intento
+        self.last_connack_seconds = None  # inicio del intento -> CONNACK
+
+    def _set_connected(self, connected):
+        """Actualiza ``connected`` y avisa a ``connection_callback`` si cambia."""
+        if connected == self.connected:
+            return
+        self.connected = connected
+        if self.connection_callback:
+            self.connection_callback(connected)
 
     @property
     def reconnect_attempt(self):
         """Intentos de reconexión desde el último CONNACK logrado (se resetea al conectar)."""
         return self._reconnect_attempt
 
+    def _connection_params(self, aws):
+        """Extrae de las credenciales AWS los datos de una conexión nueva.
+
+        Devuelve ``(signed_url, host, client_id, username, password)`` y fija
+        el topic base y el usuario MQTT usados al suscribirse tras el CONNACK.
+        """
+        host, region, access_key, secret_key, token = _aws_signing_params(aws)
+        # clientId único por conexión (no aws_mqtt_user) para evitar
+        # expulsiones mutuas con la app oficial. Ver docs/protocol-findings.md.
+        client_id = build_client_id(access_key)
+        username = aws.get("aws_mqtt_user")
+        password = aws.get("aws_security_token")
+        self._base_topic = aws.get("aws_base_topic")
+        self._mqtt_user = username
+
+        # URL firmada (no se loguea: contiene la firma AWS). Si hay una
+        # prefirmada reciente con estas mismas credenciales, se usa esa.
+        signed_url = self._take_presigned_url(access_key)
+        if signed_url is None:
+            signed_url = self.api.aws_sign_url(
+                host, region, access_key, secret_key, token
+            )
+        return signed_url, host, client_id, username, password
+
+    def _presign_url(self):
+        """Deja firmada la URL de la próxima conexión con las credenciales actuales.
+
+        Se llama tras cada CONNACK y tras el prefetch de credenciales: una
+        reconexión usa la URL ya hecha (``_connection_params``) y pasa directa
+        al handshake TLS. Nunca lanza: sin URL prefirmada se firma al conectar.
+        """
+        try:
+            aws = self.api.aws_credentials
+            if not aws:
+                return
+            host, region, access_key, secret_key, token = _aws_signing_params(aws)
+            url = self.api.aws_sign_url(host, region, access_key, secret_key, token)
+        except Exception as e:
+            log(f"⚠️ [MySair MQTT] No se pudo prefirmar la URL: {e}", "debug")
+            return
+        self._presigned_url = (url, access_key, time.monotonic())
+
+    def _take_presigned_url(self, access_key):
+        """URL prefirmada para ``access_key`` si sigue siendo válida, o ``None``."""
+        presigned = self._presigned_url
+        if presigned is None:
+            return None
+        url, signed_key, signed_at = presigned
+        if (
+            signed_key != access_key
+            or time.monotonic() - signed_at > PRESIGNED_URL_MAX_AGE_SECONDS
+        ):
+            return None
+        return url
+
+    def _backoff_delay(self):
+        """Siguiente espera de reconexión no planificada (E3); cuenta el intento."""
+        delay = compute_backoff_delay(
+            self._reconnect_attempt,
+            base=self._reconnect_delay,
+            max_delay=self._max_reconnect_delay,
+        )
+        self._reconnect_attempt += 1
+        self.total_reconnects += 1
+        return delay
+
+    # ----------------------------------------------------------
+    # 🔀 Relevo de credenciales sin corte (make-before-break)
+    # ----------------------------------------------------------
+    def _connection_for(self, ws):
+        """Conexión a la que pertenece ``ws`` (la actual salvo que sea la otra del relevo)."""
+        standby = self._standby
+        if standby is not None and ws is standby.ws:
+            return standby
+        return self._conn
+
+    def _begin_overlap(self, standby):
+        """Registra la conexión entrante y empieza a deduplicar PUBLISH."""
+        with self._overlap_lock:
+            self._overlap_seen = {}
+            self._standby = standby
+
+    def _swap_connections(self):
+        """La entrante (ya suscrita) pasa a ser la actual; la saliente, la otra."""
+        self._conn, self._standby = self._standby, self._conn
+        self.ws = self._conn.ws
+        self.total_rotations += 1
+        # Por si la saliente cayó mientras la entrante se suscribía.
+        self._set_connected(True)
+
+    def _end_overlap(self):
+        """Fin del solape: la conexión saliente ya está cerrada."""
+        with self._overlap_lock:
+            self._overlap_seen = None
+            self._standby = None
+
+    def _is_overlap_duplicate(self, conn, packet):
+        """``True`` si ``packet`` ya se entregó llegando por la otra conexión.
+
+        Durante el solape los dos ejemplares de un PUBLISH llegan casi a la
+        vez por conexiones distintas: se entrega el primero y se descarta el
+        segundo. Un mensaje repetido por la misma conexión (dos status
+        idénticos seguidos) no es un duplicado del solape y se entrega.
+        """
+        if self._overlap_seen is None:
+            return False
+        key = bytes(packet)
+        with self._overlap_lock:
+            seen = self._overlap_seen
+            if seen is None:
+                return False
+            other = seen.pop(key, None)
+            if other is not None and other is not conn:
+                self.rotation_duplicates += 1
+                return True
+            seen[key] = conn
+            if len(seen) > MAX_OVERLAP_DEDUPE:
+                del seen[next(iter(seen))]
+        return False
+
+    def _on_standby_subscribed(self, conn):
+        """La conexión entrante del relevo ya tiene CONNACK y todos sus SUBACK.
+
+        Cada transporte decide cómo toma el relevo (ver subclases).
+        """
+
+    def _send_packet(self, conn, packet):
+        """Envía un paquete MQTT ya construido por el transporte concreto."""
+        raise NotImplementedError
+
+    # ----------------------------------------------------------
+    # 📡 Recepción y despacho de paquetes
+    # ----------------------------------------------------------
+    def _on_message(self, ws, message):
+        """Evento: bytes recibidos desde el broker.
+
+        E2: no se asume que ``message`` sea exactamente un paquete MQTT
+        completo — se acumula en el buffer de su conexión (``recv_buffer``)
+        y se drena en bucle,
+        para soportar tanto varios paquetes coalescidos en un mismo mensaje
+        WS como un paquete partido entre dos llamadas.
+        """
+        try:
+            conn = self._connection_for(ws)
+            conn.recv_buffer += message
+            try:
+                self._drain_recv_buffer(conn)
+            finally:
+                self._compact_recv_buffer(conn)
+        except Exception as e:
+            log(f"⚠️ [MySair MQTT] Error general en _on_message: {e}", "warning")
+
+    def _compact_recv_buffer(self, conn):
+        """Descarta del buffer los bytes ya consumidos (hasta ``recv_offset``).
+
+        Una sola vez por mensaje WS, no por paquete: con k paquetes
+        coalescidos cada byte se mueve como mucho una vez (el resto
+        incompleto), en vez de O(k) copias al rebanar ``bytes`` por paquete.
+        """
+        if conn.recv_offset:
+            del conn.recv_buffer[: conn.recv_offset]
+            conn.recv_offset = 0
+
+    def _drain_recv_buffer(self, conn):
+        """Extrae y despacha del buffer todos los paquetes MQTT completos
+        que pueda, dejando en el buffer solo el resto incompleto (E2).
+
+        Trabaja sobre un ``memoryview`` del ``bytearray``: cada paquete se
+        pasa a ``_dispatch_packet`` como rebanada sin copia y el consumo solo
+        avanza ``recv_offset``. Mientras la vista existe el ``bytearray`` no
+        puede redimensionarse, así que nada aquí lo vacía directamente: los
+        descartes también avanzan el offset hasta el final y la compactación
+        real la hace ``_compact_recv_buffer`` al volver.
+
+        No hace falta un cap aparte para el caso "incompleto, esperando más
+        bytes": la comprobación ``result > MAX_RECV_BUFFER_SIZE`` de abajo ya
+        garantiza que el buffer nunca puede crecer más allá del cap mientras
+        espera un paquete legítimo (una longitud declarada por encima del
+        cap se rechaza de inmediato, antes de esperar a que lleguen tantos
+        bytes).
+        """
+        buffer = conn.recv_buffer
+        with memoryview(buffer) as view:
+            while True:
+                offset = conn.recv_offset
+                result = _next_packet_length(buffer, offset)
+
+                if result is FrameState.INCOMPLETE:
+                    return  # esperar más bytes en la próxima llamada
+
+                if result is FrameState.MALFORMED or result > MAX_RECV_BUFFER_SIZE:
+                    self._recover_from_malformed_stream(conn)
+                    return
+
+                if len(buffer) - offset < result:
+                    return  # partición real: falta el resto de este paquete
+
+                if not self._dispatch_packet(conn, view[offset : offset + result]):
+                    # El "paquete" delimitado por la longitud no supera la
+                    # validación de contenido (p. ej. bytes que no son una
+                    # trama MQTT real pero coinciden por casualidad con un
+                    # varint válido). Igual que antes de E2, se aplica el
+                    # heurístico de texto de respaldo al buffer completo
+                    # restante y se renuncia a seguir troceándolo.
+                    self._dispatch_legacy_fallback(conn, bytes(view[offset:]))
+                    conn.recv_offset = len(buffer)
+                    return
+
+                conn.recv_offset = offset + result  # sigue con más coalescidos
+
+    def _recover_from_malformed_stream(self, conn):
+        log(
+            "⚠️ [MySair MQTT] Varint de longitud MQTT inválido o longitud de paquete "
+            "absurda; se descarta el buffer de recepción.",
+            "warning",
+        )
+        conn.recv_offset = len(conn.recv_buffer)
+
+    def _dispatch_packet(self, conn, packet):
+        """Procesa un paquete MQTT ya delimitado a su longitud exacta.
+
+        ``packet`` puede ser ``bytes`` o una rebanada ``memoryview`` del
+        buffer de recepción: no debe guardarse más allá de esta llamada.
+
+        Devuelve ``True`` si se despachó (o se ignoró un tipo desconocido de
+        forma segura), o ``False`` solo si es un PUBLISH cuyo parseo
+        estricto de contenido falló (``parse_mqtt_publish`` no concluyente)
+        — en ese caso el llamador decide aplicar el heurístico de texto de
+        respaldo sobre el buffer completo, no sobre este `packet` aislado.
+        """
+        # CONNACK
+        if packet[0] == 0x20:
+            log("✅ [MySair MQTT] CONNACK recibido, suscribiendo a topics...")
+            if conn is self._conn and self._connect_started_at is not None:
+                self.last_connack_seconds = round(
+                    time.monotonic() - self._connect_started_at, 3
+                )
+                self._connect_started_at = None
+            self._set_connected(True)
+            self._reconnect_attempt = 0  # conexión lograda: reinicia el backoff (E3)
+            with self._subscription_lock:
+                conn.connack = True
+                self._subscribe(conn, self._topics())
+            self._presign_url()  # para una posible reconexión
+            return True
+
+        # SUBACK
+        if packet[0] == 0x90:
+            self._handle_suback(conn, packet)
+            return True
+
+        # PUBLISH (nibble alto 0x3; los bits bajos son flags DUP/QoS/RETAIN)
+        if (packet[0] & 0xF0) == 0x30:
+            try:
+                # Método primario: decodificación conforme al estándar MQTT
+                # (ver parse_mqtt_publish, known-unknowns #6). Si no es
+                # concluyente, el llamador cae al heurístico de texto.
+                strict_topic, strict_payload = parse_mqtt_publish(packet)
+                if strict_topic is None:
+                    return False
+                if self._is_overlap_duplicate(conn, packet):
+                    return True
+
+                data = _decode_publish_json(strict_payload)
+                self.parse_strict_count += 1  # D4
+                self.last_message_at = datetime.datetime.now(
+                    datetime.timezone.utc
+                )  # D3
+                if _LOGGER.isEnabledFor(logging.DEBUG):
+                    preview = str(strict_payload[:200], "utf-8", errors="ignore")
+                    log(
+                        f"📥 [MySair MQTT] Mensaje MQTT recibido ({strict_topic}): {preview}...",
+                        "debug",
+                    )
+
+                if self.message_callback:
+                    self.message_callback({"topic": strict_topic, "payload": data})
+                return True
+            except Exception as e:
+                self.parse_error_count += 1  # D4
+                log(f"⚠️ [MySair MQTT] Error procesando mensaje: {e}", "warning")
+                return (
+                    True  # ya contabilizado como error; no reintentar como heurístico
+                )
+
+        # Tipo de paquete desconocido/no manejado: se ignora en silencio,
+        # igual que antes de E2.
+        return True
+
+    def _topics(self, refs=None):
+        """Topics a los que suscribirse: status de ``refs`` (por defecto, de
+        todas las instalaciones) y, con todas, el de feedback."""
+        topics = [
+            build_status_topic(self._base_topic, ref)
+            for ref in (self.installation_refs if refs is None else refs)
+        ]
+        # Confirmación (ACK) de instrucciones enviadas por HTTP, ver
+        # docs/protocol-findings.md §8.
+        if refs is None and self._mqtt_user:
+            topics.append(build_feedback_topic(self._base_topic, self._mqtt_user))
+        return topics
+
+    def _open_connections(self):
+        """Conexiones que ya recibieron su CONNACK (la actual y la del relevo)."""
+        return [
+            conn
+            for conn in (self._conn, self._standby)
+            if conn is not None and conn.connack and conn.ws is not None
+        ]
+
+    def add_installations(self, refs):
+        """Añade instalaciones y se suscribe a ellas sin reconectar.
+
+        Lo usa la conexión compartida entre config entries (mqtt_manager.py)
+        cuando otra entrada de la misma cuenta MQTT se une. Se puede llamar
+        desde cualquier hilo.
+        """
+        with self._subscription_lock:
+            refs = [ref for ref in refs if ref not in self.installation_refs]
+            if not refs:
+                return
+            # Lista nueva, no append: la original es la del llamador.
+            self.installation_refs = [*self.installation_refs, *refs]
+            for conn in self._open_connections():
+                try:
+                    self._subscribe(conn, self._topics(refs))
+                    self._flush_packets(conn)
+                except Exception as e:
+                    log(
+                        f"⚠️ [MySair MQTT] No se pudo suscribir a {refs}: {e}", "warning"
+                    )
+
+    def remove_installations(self, refs):
+        """Quita instalaciones y cancela su suscripción (UNSUBSCRIBE).
+
+        El UNSUBACK no se espera: si llega algún status más de esas
+        instalaciones, quien enruta los mensajes ya no tiene a quién dárselo.
+        """
+        with self._subscription_lock:
+            refs = [ref for ref in refs if ref in self.installation_refs]
+            if not refs:
+                return
+            self.installation_refs = [
+                ref for ref in self.installation_refs if ref not in refs
+            ]
+            topics = self._topics(refs)
+            for conn in self._open_connections():
+                try:
+                    for start in range(0, len(topics), MAX_TOPICS_PER_SUBSCRIBE):
+                        chunk = topics[start : start + MAX_TOPICS_PER_SUBSCRIBE]
+                        packet_id = conn.next_packet_id
+                        conn.next_packet_id = packet_id % 0xFFFF + 1
+                        self._send_packet(
+                            conn, build_mqtt_unsubscribe(packet_id, chunk)
+                        )
+                    self._flush_packets(conn)
+                except Exception as e:
+                    log(
+                        f"⚠️ [MySair MQTT] No se pudo cancelar la suscripción a {refs}: {e}",
+                        "warning",
+                    )
+            log(f"📴 [MySair MQTT] Suscripción cancelada: {', '.join(topics)}", "debug")
+
+    def _flush_packets(self, conn):
+        """Envía lo que ``_send_packet`` dejó pendiente fuera del despacho.
+
+        El transporte con hilo envía en el acto; el de asyncio lo sobrescribe.
+        """
+
+    def _subscribe(self, conn, topics):
+        """Suscribe ``topics`` con el mínimo de SUBSCRIBE (y de SUBACK).
+
+        Antes se enviaba un SUBSCRIBE por topic; ahora van agrupados de
+        ``MAX_TOPICS_PER_SUBSCRIBE`` en ``MAX_TOPICS_PER_SUBSCRIBE``, así que
+        resuscribirse tras cada reconexión cuesta un frame para la mayoría
+        de cuentas.
+        """
+        for start in range(0, len(topics), MAX_TOPICS_PER_SUBSCRIBE):
+            chunk = topics[start : start + MAX_TOPICS_PER_SUBSCRIBE]
+            packet_id = conn.next_packet_id
+            conn.next_packet_id = packet_id % 0xFFFF + 1
+            conn.pending_subscribes[packet_id] = chunk
+            for topic in chunk:
+                conn.subscribe_attempts[topic] = (
+                    conn.subscribe_attempts.get(topic, 0) + 1
+                )
+            self._send_packet(conn, build_mqtt_subscribe(packet_id, chunk))
+            log(
+                f"📡 [MySair MQTT] SUBSCRIBE enviado a: {', '.join(chunk)}",
+                "debug",
+            )
+
+    def _handle_suback(self, conn, packet):
+        """Comprueba los return codes del SUBACK y reintenta los rechazados.
+
+        Un topic rechazado (0x80) se vuelve a pedir hasta
+        ``MAX_SUBSCRIBE_RETRIES`` veces; si sigue fallando se deja de
+        esperar por él para que la conexión cuente como suscrita (el resto
+        de zonas sí llegan) y se avisa en el log.
+        """
+        with self._subscription_lock:
+            if not self._process_suback(conn, packet):
+                return
+            if conn.subscribed or conn.pending_subscribes:
+                return
+            conn.subscribed = True
+        if conn is self._standby:
+            self._on_standby_subscribed(conn)
+
+    def _process_suback(self, conn, packet):
+        """Return codes de un SUBACK de ``conn`` (con el lock tomado).
+
+        Devuelve ``False`` si no corresponde a ningún SUBSCRIBE pendiente.
+        """
+        packet_id, return_codes = parse_mqtt_suback(packet)
+        topics = conn.pending_subscribes.pop(packet_id, None)
+        if topics is None:
+            log(
+                f"⚠️ [MySair MQTT] SUBACK inesperado (packet_id={packet_id}), se ignora.",
+                "debug",
+            )
+            return False
+        log("✅ [MySair MQTT] SUBACK recibido.", "debug")
+        wanted = set(self._topics())
+
+        retry = []
+        for index, topic in enumerate(topics):
+            # Un SUBACK con menos códigos que topics se trata como rechazo.
+            code = return_codes[index] if index < len(return_codes) else 0x80
+            if not code & 0x80:
+                continue
+            self.subscribe_failures += 1
+            if topic not in wanted:
+                continue  # instalación retirada mientras tanto
+            if conn.subscribe_attempts.get(topic, 0) <= MAX_SUBSCRIBE_RETRIES:
+                retry.append(topic)
+            else:
+                log(
+                    f"❌ [MySair MQTT] Suscripción a {topic} rechazada tras "
+                    f"{MAX_SUBSCRIBE_RETRIES} reintentos; sin datos de ese topic "
+                    f"hasta la próxima conexión",
+                    "error",
+                )
+        if retry:
+            log(
+                f"⚠️ [MySair MQTT] Suscripción rechazada por el broker, "
+                f"reintentando: {', '.join(retry)}",
+                "warning",
+            )
+            self._subscribe(conn, retry)
+        return True
+
+    def _dispatch_legacy_fallback(self, conn, buffer):
+        """Heurística de texto de respaldo (sin cambios respecto a antes de
+        E2), aplicada ahora al buffer completo en vez de a un `message`
+        crudo — equivalente cuando no hay reensamblado en curso."""
+        try:
+            if self._is_overlap_duplicate(conn, buffer):
+                return
+            payload = buffer.split(b"\x00", 2)[-1]
+            decoded = payload.decode("utf-8", errors="ignore").strip()
+            data, start = _extract_json(decoded)
+            # Confirmado en producción (2026-07-20) que el broker no siempre
+            # envuelve el topic entre paréntesis: a veces es "(topic){json}",
+            # a veces "topic{json}" sin paréntesis (p. ej. el topic de feedback).
+            topic = decoded[:start].strip(" ()") if start > 0 else "unknown"
+            self.parse_fallback_count += 1  # D4
+            self.last_message_at = datetime.datetime.now(datetime.timezone.utc)  # D3
+            log(
+                f"📥 [MySair MQTT] Mensaje MQTT recibido ({topic}): {decoded[:200]}...",
+                "debug",
+            )
+
+            if self.message_callback:
+                self.message_callback({"topic": topic, "payload": data})
+        except Exception as e:
+            self.parse_error_count += 1  # D4
+            log(f"⚠️ [MySair MQTT] Error procesando mensaje: {e}", "warning")
+
+    def _on_error(self, ws, error):
+        log(f"❌ [MySair MQTT] Error WebSocket: {error}", "error")
+
+    def _on_close(self, ws, close_status_code, close_msg):
+        if ws is not self.ws:
+            # Conexión saliente de un relevo: la actual sigue conectada.
+            log(
+                f"🔌 [MySair MQTT] Conexión anterior al relevo cerrada (code={close_status_code})",
+                "debug",
+            )
+            return
+        log(
+            f"🔌 [MySair MQTT] Conexión cerrada (code={close_status_code}, msg={close_msg})"
+        )
+        self._set_connected(False)
+        self.last_close_code = close_status_code  # D4
+        self.last_close_msg = close_msg  # D4
+
+
+class MySairMQTTClient(_MySairMQTTSession):
+    """Gestor MQTT para MySair mediante WebSocket directo, en un hilo propio.
+
+    Transporte por defecto. ``message_callback`` se invoca desde el hilo
+    MQTT: el llamador debe saltar al event loop (``call_soon_threadsafe``).
+    Durante un relevo de credenciales hay dos hilos de lectura a la vez (el
+    de la conexión saliente y el de la entrante).
+    """
+
+    def __init__(
+        self, api, installation_refs, message_callback, connection_callback=None
+    ):
+        super().__init__(api, installation_refs, message_callback, connection_callback)
+        self.stop_event = threading.Event()
+        self._thread = None
+        # Hilo del relevo en curso o de la conexión que tomó el relevo: lo
+        # atiende hasta que se cierra, y _run lo espera antes de reconectar.
+        self._rotation = None
+
     # ----------------------------------------------------------
     # 🔗 Conexión principal
     # ----------------------------------------------------------
@@ -315,11 +1038,14 @@ class MySairMQTTClient:
         log("🛑 [MySair MQTT] Deteniendo cliente WebSocket MQTT...")
         self.stop_event.set()
         self._cancel_credential_refresh_timer()
-        if self.ws:
-            try:
-                self.ws.close()
-            except Exception:
-                pass
+        self._cancel_credential_prefetch_timer()
+        standby = self._standby
+        for ws in (self.ws, standby.ws if standby is not None else None):
+            if ws:
+                try:
+                    ws.close()
+                except Exception:
+                    pass
         self.connected = False
         log("✅ [MySair MQTT] Cliente detenido.")
 
@@ -331,6 +1057,45 @@ class MySairMQTTClient:
             self._credential_refresh_timer.cancel()
             self._credential_refresh_timer = None
 
+    def _cancel_credential_prefetch_timer(self):
+        if self._credential_prefetch_timer:
+            self._credential_prefetch_timer.cancel()
+            self._credential_prefetch_timer = None
+
+    def _schedule_credential_prefetch_timer(self):
+        """Programa la renovación en segundo plano de las credenciales AWS
+        ``AWS_CREDENTIALS_PREFETCH_SECONDS`` antes de que caduquen.
+
+        Si ya quedan menos de eso (credenciales de vida corta), no se arma:
+        se renuevan al reconectar, como antes.
+        """
+        self._cancel_credential_prefetch_timer()
+        delay = self.api.seconds_until_aws_credentials_expire(
+            margin_seconds=AWS_CREDENTIALS_PREFETCH_SECONDS
+        )
+        if not delay:
+            return
+        self._credential_prefetch_timer = threading.Timer(
+            delay, self._on_credential_prefetch_due
+        )
+        self._credential_prefetch_timer.daemon = True
+        self._credential_prefetch_timer.start()
+
+    def _on_credential_prefetch_due(self):
+        """Hilo del timer: credenciales nuevas y URL firmada, listas para el relevo."""
+        self._credential_prefetch_timer = None
+        try:
+            self.api.refresh_aws_credentials()
+        except Exception as e:
+            log(
+                f"⚠️ [MySair MQTT] No se pudieron renovar por adelantado las "
+                f"credenciales AWS ({e}); se renovarán al reconectar.",
+                "warning",
+            )
+            return
+        self._presign_url()
+        log("☁️ [MySair MQTT] Credenciales AWS renovadas por adelantado.", "debug")
+
     def _schedule_credential_refresh_timer(self):
         """Programa un refresco de conexión antes de que caduquen las
         credenciales AWS actuales, en vez de esperar a que AWS IoT corte la
@@ -353,11 +1118,24 @@ class MySairMQTTClient:
         )
 
     def _on_credential_refresh_due(self):
-        """Fuerza una reconexión con credenciales frescas antes de que caduquen."""
+        """Renueva la conexión con credenciales frescas antes de que caduquen.
+
+        Con la conexión actual ya suscrita, la nueva se abre en otro hilo
+        (``_rotate``) y la actual solo se cierra cuando la nueva tiene todos
+        sus SUBACK: no hay hueco sin suscripción. Si no, se fuerza una
+        reconexión inmediata como antes.
+        """
         log(
             "🔄 [MySair MQTT] Refrescando conexión antes de que caduquen las credenciales AWS...",
             "debug",
         )
+        if self.connected and self._conn.subscribed and not self.stop_event.is_set():
+            rotation = threading.Thread(
+                target=self._rotate, daemon=True, name="mysair_mqtt_rotation"
+            )
+            self._rotation = rotation
+            rotation.start()
+            return
         self._planned_reconnect = True
         if self.ws:
             try:
@@ -365,80 +1143,152 @@ class MySairMQTTClient:
             except Exception:
                 pass
 
+    def _rotate(self):
+        """Hilo del relevo: abre la conexión nueva y, si toma el relevo, la
+        atiende hasta que se cierre (igual que ``_run`` con la suya)."""
+        old_ws = self.ws
+        standby = None
+        try:
+            if self.api.aws_credentials_expired():
+                self.api.refresh_aws_credentials()
+            aws = self.api.aws_credentials
+            if not aws:
+                raise ConnectionError("no se pudieron obtener credenciales AWS")
+            standby = self._build_connection(aws)
+            if not self.stop_event.is_set():
+                self._begin_overlap(standby)
+            # stop() marca stop_event antes de leer _standby: o ya ve la
+            # entrante y la cierra, o el stop se ve aquí y no se abre.
+            if self.stop_event.is_set():
+                standby.ws.close()
+            else:
+                timeout = threading.Timer(
+                    ROTATION_TIMEOUT_SECONDS, self._on_rotation_timeout, (standby,)
+                )
+                timeout.daemon = True
+                timeout.start()
+                try:
+                    standby.ws.run_forever(ping_interval=30, ping_timeout=10)
+                finally:
+                    timeout.cancel()
+        except Exception as e:
+            log(f"❌ [MySair MQTT] Error en la conexión del relevo: {e}", "error")
+        finally:
+            if self._rotation is threading.current_thread():
+                self._rotation = None
+
+        if standby is not None and self._standby is standby:
+            self._end_overlap()
+        if (standby is not None and standby.subscribed) or self.stop_event.is_set():
+            return  # tomó el relevo y ya se ha cerrado (o se está parando)
+        # La conexión nueva no llegó a suscribirse: como antes del relevo sin
+        # corte, se cierra la actual y _run reconecta sin esperar.
+        log(
+            "⚠️ [MySair MQTT] El relevo de credenciales no se completó; "
+            "reconectando de inmediato.",
+            "warning",
+        )
+        self.rotation_fallbacks += 1
+        self._planned_reconnect = True
+        if old_ws:
+            try:
+                old_ws.close()
+            except Exception:
+                pass
+
+    def _on_rotation_timeout(self, standby):
+        if not standby.subscribed:
+            log(
+                f"⚠️ [MySair MQTT] La conexión del relevo no se suscribió en "
+                f"{ROTATION_TIMEOUT_SECONDS}s; se descarta.",
+                "warning",
+            )
+            standby.ws.close()
+
+    def _on_standby_subscribed(self, conn):
+        """Hilo del relevo: la nueva ya recibe todo, se cierra la anterior."""
+        if self.stop_event.is_set():
+            conn.ws.close()  # parado durante el relevo: no toma el relevo
+            return
+        old_ws = self.ws
+        self._swap_connections()
+        log(
+            "🔀 [MySair MQTT] Relevo de credenciales: conexión nueva suscrita, "
+            "cerrando la anterior."
+        )
+        self._schedule_credential_refresh_timer()
+        self._schedule_credential_prefetch_timer()
+        if old_ws:
+            try:
+                old_ws.close()
+            except Exception:
+                pass
+
     # ----------------------------------------------------------
     # 🧠 Lógica de conexión
     # ----------------------------------------------------------
+    def _build_connection(self, aws):
+        """WebSocketApp de una conexión nueva con las credenciales ``aws``."""
+        signed_url, host, client_id, username, password = self._connection_params(aws)
+        log(
+            f"🔗 [MySair MQTT] Conectando a {host} como {_redact_client_id(client_id)}",
+            "debug",
+        )
+        headers = {"Sec-WebSocket-Protocol": "mqtt"}
+        return _MQTTConnection(
+            websocket.WebSocketApp(
+                signed_url,
+                header=headers,
+                on_open=lambda ws: self._on_open(ws, client_id, username, password),
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close,
+            )
+        )
+
     def _run(self):
         while not self.stop_event.is_set():
+            self._connect_started_at = time.monotonic()
             try:
                 # Refrescar credenciales AWS si faltan o están por expirar
                 # (aws_expires_at). Se hace en CADA intento de conexión para no
-                # reutilizar una firma caducada tras una desconexión larga.
+                # reutilizar una firma caducada tras una desconexión larga;
+                # normalmente el prefetch ya las ha renovado.
                 if self.api.aws_credentials_expired():
                     self.api.refresh_aws_credentials()
 
                 aws = self.api.aws_credentials
                 if not aws:
-                    delay = compute_backoff_delay(
-                        self._reconnect_attempt,
-                        base=self._reconnect_delay,
-                        max_delay=self._max_reconnect_delay,
-                    )
+                    delay = self._backoff_delay()
                     log(
                         f"❌ [MySair MQTT] No se pudieron obtener credenciales AWS. Reintentando en {delay:.1f}s.",
                         "error",
                     )
-                    self._reconnect_attempt += 1
-                    self.total_reconnects += 1
                     time.sleep(delay)
                     continue
 
-                # Datos AWS / MQTT
-                host = aws.get("endpoint") or aws.get("aws_mqtt_host")
-                region = aws.get("region") or aws.get("aws_default_region")
-                access_key = aws.get("accessKeyId") or aws.get("aws_access_key_id")
-                secret_key = aws.get("secretAccessKey") or aws.get(
-                    "aws_secret_access_key"
-                )
-                token = aws.get("sessionToken") or aws.get("aws_security_token")
-                # clientId único por conexión (no aws_mqtt_user) para evitar
-                # expulsiones mutuas con la app oficial. Ver docs/protocol-findings.md.
-                client_id = build_client_id(access_key)
-                username = aws.get("aws_mqtt_user")
-                password = aws.get("aws_security_token")
-                self._base_topic = aws.get("aws_base_topic")
-                self._mqtt_user = username
-
-                # Generar URL firmada (no se loguea: contiene la firma AWS)
-                signed_url = self.api.aws_sign_url(
-                    host, region, access_key, secret_key, token
-                )
-                log(
-                    f"🔗 [MySair MQTT] Conectando a {host} como {_redact_client_id(client_id)}",
-                    "debug",
-                )
-
-                # Configurar cliente WebSocket
-                headers = {"Sec-WebSocket-Protocol": "mqtt"}
-                self.ws = websocket.WebSocketApp(
-                    signed_url,
-                    header=headers,
-                    on_open=lambda ws: self._on_open(ws, client_id, username, password),
-                    on_message=self._on_message,
-                    on_error=self._on_error,
-                    on_close=self._on_close,
-                )
+                conn = self._build_connection(aws)
+                self._conn = conn
+                self.ws = conn.ws
 
                 # Refrescar la conexión antes de que caduquen estas credenciales,
                 # en vez de esperar a que AWS IoT la corte (ver
                 # docs/known-unknowns.md — causa de desconexiones periódicas).
                 self._schedule_credential_refresh_timer()
+                self._schedule_credential_prefetch_timer()
 
                 self.ws.run_forever(ping_interval=30, ping_timeout=10)
+                if self._standby is conn:
+                    self._end_overlap()  # cerrada tras ceder el relevo
 
             except Exception as e:
                 log(f"❌ [MySair MQTT] Error en conexión WebSocket: {e}", "error")
 
+            # Tras un relevo la conexión nueva corre en el hilo del relevo
+            # (que puede a su vez ceder a otro): se espera a que termine.
+            while (rotation := self._rotation) is not None:
+                rotation.join()
+
             # Esperar antes de reintentar, salvo que sea un refresco
             # proactivo planificado (credenciales ya frescas: reconectar ya).
             # Las desconexiones no planificadas usan backoff exponencial con
@@ -450,16 +1300,10 @@ class MySairMQTTClient:
                     )
                     self._planned_reconnect = False
                 else:
-                    delay = compute_backoff_delay(
-                        self._reconnect_attempt,
-                        base=self._reconnect_delay,
-                        max_delay=self._max_reconnect_delay,
-                    )
+                    delay = self._backoff_delay()
                     log(
-                        f"🔁 [MySair MQTT] Reintentando conexión en {delay:.1f}s (intento {self._reconnect_attempt + 1})..."
+                        f"🔁 [MySair MQTT] Reintentando conexión en {delay:.1f}s (intento {self._reconnect_attempt})..."
                     )
-                    self._reconnect_attempt += 1
-                    self.total_reconnects += 1
                     time.sleep(delay)
 
     # ----------------------------------------------------------
@@ -467,180 +1311,392 @@ class MySairMQTTClient:
     # ----------------------------------------------------------
     def _on_open(self, ws, client_id, username, password):
         """Evento: WebSocket abierto."""
+        if self.stop_event.is_set():
+            # stop() entre la comprobación y run_forever: run_forever anula
+            # un close() previo, así que se cierra aquí.
+            ws.close()
+            return
         try:
             log(
                 "✅ [MySair MQTT] WebSocket abierto, enviando paquete CONNECT...",
                 "debug",
             )
             pkt = build_mqtt_connect(client_id, username, password)
-            ws.send(pkt, opcode=websocket.ABNF.OPCODE_BINARY)
+            self._send_packet(self._connection_for(ws), pkt)
             log("📤 [MySair MQTT] CONNECT enviado.", "debug")
         except Exception as e:
             log(f"❌ [MySair MQTT] Error enviando CONNECT: {e}", "error")
 
-    def _on_message(self, ws, message):
-        """Evento: bytes recibidos desde el broker.
+    def _send_packet(self, conn, packet):
+        conn.ws.send(packet, opcode=websocket.ABNF.OPCODE_BINARY)
 
-        E2: no se asume que ``message`` sea exactamente un paquete MQTT
-        completo — se acumula en ``self._recv_buffer`` y se drena en bucle,
-        para soportar tanto varios paquetes coalescidos en un mismo mensaje
-        WS como un paquete partido entre dos llamadas.
-        """
-        try:
-            self._recv_buffer += message
-            self._drain_recv_buffer(ws)
-        except Exception as e:
-            log(f"⚠️ [MySair MQTT] Error general en _on_message: {e}", "warning")
 
-    def _drain_recv_buffer(self, ws):
-        """Extrae y despacha del buffer todos los paquetes MQTT completos
-        que pueda, dejando en el buffer solo el resto incompleto (E2).
+class MySairAsyncMQTTClient(_MySairMQTTSession):
+    """El mismo cliente MQTT sobre asyncio (aiohttp), en el event loop de HA.
 
-        No hace falta un cap aparte para el caso "incompleto, esperando más
-        bytes": la comprobación ``result > MAX_RECV_BUFFER_SIZE`` de abajo ya
-        garantiza que el buffer nunca puede crecer más allá del cap mientras
-        espera un paquete legítimo (una longitud declarada por encima del
-        cap se rechaza de inmediato, antes de esperar a que lleguen tantos
-        bytes).
-        """
-        while True:
-            result = _next_packet_length(self._recv_buffer)
+    Sin hilos propios: el WebSocket va sobre la sesión aiohttp compartida
+    (su ``heartbeat`` sustituye al hilo de ping de websocket-client), el
+    refresco proactivo de credenciales es un ``loop.call_later`` y el
+    backoff un ``asyncio.sleep``. ``message_callback`` se invoca en el propio
+    loop, así que el llamador no necesita ``call_soon_threadsafe``.
 
-            if result is FrameState.INCOMPLETE:
-                return  # esperar más bytes en la próxima llamada
+    ``api`` debe ser un ``MySairAsyncAPI`` (credenciales y tokens se renuevan
+    con sus métodos ``async_*``). ``start``/``async_stop`` se llaman desde el
+    event loop.
+    """
 
-            if result is FrameState.MALFORMED or result > MAX_RECV_BUFFER_SIZE:
-                self._recover_from_malformed_stream()
-                return
+    def __init__(
+        self,
+        api,
+        installation_refs,
+        message_callback,
+        websession,
+        connection_callback=None,
+    ):
+        super().__init__(api, installation_refs, message_callback, connection_callback)
+        self.websession = websession
+        self._task = None
+        self._stopping = False
+        # Paquetes pendientes de enviar por cada WebSocket, generados al
+        # despachar (SUBSCRIBE tras el CONNACK): el despacho es síncrono y el
+        # envío no.
+        self._outbox = {}
+        self._rotation = None  # tarea del relevo de credenciales en curso
+        self._successor = None  # conexión ya suscrita que sigue en _run
+        self._prefetch_task = None  # renovación de credenciales por adelantado
+        # Tareas cortas sueltas (cierres, envíos del outbox): el loop solo
+        # guarda referencias débiles y async_stop las cancela.
+        self._background_tasks = set()
 
-            if len(self._recv_buffer) < result:
-                return  # partición real: falta el resto de este paquete
-
-            packet, rest = self._recv_buffer[:result], self._recv_buffer[result:]
-            if not self._dispatch_packet(ws, packet):
-                # El "paquete" delimitado por la longitud no supera la
-                # validación de contenido (p. ej. bytes que no son una trama
-                # MQTT real pero coinciden por casualidad con un varint
-                # válido). Igual que antes de E2, se aplica el heurístico de
-                # texto de respaldo al buffer completo restante y se
-                # renuncia a seguir troceándolo.
-                self._dispatch_legacy_fallback(self._recv_buffer)
-                self._recv_buffer = b""
-                return
+    # ----------------------------------------------------------
+    # 🔗 Conexión principal
+    # ----------------------------------------------------------
+    def start(self):
+        """Lanza la tarea de conexión en el event loop actual."""
+        log("🚀 [MySair MQTT] Iniciando cliente MQTT asyncio...")
+        self._stopping = False
+        self._task = asyncio.get_running_loop().create_task(
+            self._run(), name="mysair_mqtt"
+        )
+
+    async def async_stop(self):
+        """Cancela la conexión y espera a que la tarea termine."""
+        log("🛑 [MySair MQTT] Deteniendo cliente MQTT asyncio...")
+        self._stopping = True
+        self._cancel_credential_refresh_timer()
+        self._cancel_credential_prefetch_timer()
+        for attr in ("_prefetch_task", "_rotation", "_task"):
+            task = getattr(self, attr)
+            setattr(self, attr, None)
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        background_tasks = list(self._background_tasks)
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        self.connected = False
+        log("✅ [MySair MQTT] Cliente detenido.")
+
+    def _create_background_task(self, coro, name):
+        """Tarea suelta del cliente, con referencia propia hasta que termina."""
+        task = asyncio.get_running_loop().create_task(coro, name=name)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._on_background_task_done)
+        return task
+
+    def _on_background_task_done(self, task):
+        self._background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log(
+                f"⚠️ [MySair MQTT] Error en tarea {task.get_name()}: {task.exception()}",
+                "debug",
+            )
+
+    # ----------------------------------------------------------
+    # 🔄 Refresco proactivo de credenciales (evita que AWS corte primero)
+    # ----------------------------------------------------------
+    def _cancel_credential_refresh_timer(self):
+        if self._credential_refresh_timer:
+            self._credential_refresh_timer.cancel()
+            self._credential_refresh_timer = None
+
+    def _cancel_credential_prefetch_timer(self):
+        if self._credential_prefetch_timer:
+            self._credential_prefetch_timer.cancel()
+            self._credential_prefetch_timer = None
+
+    def _schedule_credential_prefetch_timer(self):
+        """Como en ``MySairMQTTClient``, pero con ``loop.call_later``."""
+        self._cancel_credential_prefetch_timer()
+        delay = self.api.seconds_until_aws_credentials_expire(
+            margin_seconds=AWS_CREDENTIALS_PREFETCH_SECONDS
+        )
+        if not delay:
+            return
+        self._credential_prefetch_timer = asyncio.get_running_loop().call_later(
+            delay, self._on_credential_prefetch_due
+        )
 
-            self._recv_buffer = rest  # sigue buscando más paquetes coalescidos
+    def _on_credential_prefetch_due(self):
+        self._credential_prefetch_timer = None
+        if self._prefetch_task is None:
+            self._prefetch_task = asyncio.get_running_loop().create_task(
+                self._async_prefetch_credentials(), name="mysair_mqtt_prefetch"
+            )
+
+    async def _async_prefetch_credentials(self):
+        """Credenciales nuevas y URL firmada, listas para el relevo."""
+        try:
+            await self._async_ensure_credentials(
+                margin_seconds=AWS_CREDENTIALS_PREFETCH_SECONDS
+            )
+        except Exception as e:
+            log(
+                f"⚠️ [MySair MQTT] No se pudieron renovar por adelantado las "
+                f"credenciales AWS ({e}); se renovarán al reconectar.",
+                "warning",
+            )
+            return
+        finally:
+            self._prefetch_task = None
+        self._presign_url()
+        log("☁️ [MySair MQTT] Credenciales AWS renovadas por adelantado.", "debug")
 
-    def _recover_from_malformed_stream(self):
+    def _schedule_credential_refresh_timer(self):
+        """Como en ``MySairMQTTClient``, pero con ``loop.call_later``."""
+        self._cancel_credential_refresh_timer()
+        delay = self.api.seconds_until_aws_credentials_expire()
+        if delay is None:
+            return
+        self._credential_refresh_timer = asyncio.get_running_loop().call_later(
+            delay, self._on_credential_refresh_due
+        )
         log(
-            "⚠️ [MySair MQTT] Varint de longitud MQTT inválido o longitud de paquete "
-            "absurda; se descarta el buffer de recepción.",
-            "warning",
+            f"⏳ [MySair MQTT] Refresco proactivo de conexión programado en {delay:.0f}s",
+            "debug",
         )
-        self._recv_buffer = b""
 
-    def _dispatch_packet(self, ws, packet):
-        """Procesa un paquete MQTT ya delimitado a su longitud exacta.
+    def _on_credential_refresh_due(self):
+        """Como en ``MySairMQTTClient``: relevo sin corte si la conexión actual
+        está suscrita (``_async_rotate``), reconexión inmediata si no."""
+        log(
+            "🔄 [MySair MQTT] Refrescando conexión antes de que caduquen las credenciales AWS...",
+            "debug",
+        )
+        self._credential_refresh_timer = None
+        if self.connected and self._conn.subscribed and self._rotation is None:
+            self._rotation = asyncio.get_running_loop().create_task(
+                self._async_rotate(), name="mysair_mqtt_rotation"
+            )
+            return
+        self._planned_reconnect = True
+        if self.ws is not None and not self.ws.closed:
+            self._create_background_task(self.ws.close(), name="mysair_mqtt_close")
 
-        Devuelve ``True`` si se despachó (o se ignoró un tipo desconocido de
-        forma segura), o ``False`` solo si es un PUBLISH cuyo parseo
-        estricto de contenido falló (``parse_mqtt_publish`` no concluyente)
-        — en ese caso el llamador decide aplicar el heurístico de texto de
-        respaldo sobre el buffer completo, no sobre este `packet` aislado.
+    async def _async_rotate(self):
+        """Abre y suscribe la conexión nueva; solo entonces cierra la actual.
+
+        La nueva queda en ``_successor`` y ``_run`` sigue leyéndola sin pasar
+        por el backoff (lo que llegue mientras tanto espera en el WebSocket).
         """
-        # CONNACK
-        if packet[0] == 0x20:
-            log("✅ [MySair MQTT] CONNACK recibido, suscribiendo a topics...")
-            self.connected = True
-            self._reconnect_attempt = 0  # conexión lograda: reinicia el backoff (E3)
-            packet_id = 1
-            for ref in self.installation_refs:
-                topic = build_status_topic(self._base_topic, ref)
-                pkt = build_mqtt_subscribe(packet_id, topic)
-                ws.send(pkt, opcode=websocket.ABNF.OPCODE_BINARY)
-                log(f"📡 [MySair MQTT] SUBSCRIBE enviado a: {topic}", "debug")
-                packet_id += 1
-
-            # Confirmación (ACK) de instrucciones enviadas por HTTP, ver
-            # docs/protocol-findings.md §8.
-            if self._mqtt_user:
-                feedback_topic = build_feedback_topic(self._base_topic, self._mqtt_user)
-                pkt = build_mqtt_subscribe(packet_id, feedback_topic)
-                ws.send(pkt, opcode=websocket.ABNF.OPCODE_BINARY)
-                log(f"📡 [MySair MQTT] SUBSCRIBE enviado a: {feedback_topic}", "debug")
-            return True
+        old = self._conn
+        standby = None
+        try:
+            standby = await self._async_open()
+            if standby is None:
+                raise ConnectionError("no se pudieron obtener credenciales AWS")
+            self._begin_overlap(standby)
+            async with asyncio.timeout(ROTATION_TIMEOUT_SECONDS):
+                subscribed = await self._async_read(standby, until_subscribed=True)
+            if not subscribed:
+                raise ConnectionError(
+                    f"cerrada antes de suscribirse (code={standby.ws.close_code})"
+                )
+        except asyncio.CancelledError:
+            await self._async_discard_standby(standby)
+            raise
+        except Exception as e:
+            # Como antes del relevo sin corte: se cierra la actual y _run
+            # reconecta sin esperar.
+            log(
+                f"⚠️ [MySair MQTT] El relevo de credenciales no se completó ({e!r}); "
+                "reconectando de inmediato.",
+                "warning",
+            )
+            self.rotation_fallbacks += 1
+            await self._async_discard_standby(standby)
+            self._rotation = None
+            self._planned_reconnect = True
+            await old.ws.close()
+            return
 
-        # SUBACK
-        if packet[0] == 0x90:
-            log("✅ [MySair MQTT] SUBACK recibido.", "debug")
-            return True
+        self._rotation = None
+        self._swap_connections()
+        self._successor = standby
+        log(
+            "🔀 [MySair MQTT] Relevo de credenciales: conexión nueva suscrita, "
+            "cerrando la anterior."
+        )
+        await old.ws.close()
 
-        # PUBLISH (nibble alto 0x3; los bits bajos son flags DUP/QoS/RETAIN)
-        if (packet[0] & 0xF0) == 0x30:
+    async def _async_discard_standby(self, standby):
+        if standby is None:
+            return
+        if self._standby is standby:
+            self._end_overlap()
+        self._outbox.pop(standby.ws, None)
+        await standby.ws.close()
+
+    # ----------------------------------------------------------
+    # 🧠 Lógica de conexión
+    # ----------------------------------------------------------
+    async def _async_ensure_credentials(self, margin_seconds=60):
+        """Renueva las credenciales AWS si faltan o expiran en menos de
+        ``margin_seconds``.
+
+        Si además el access_token ya caducó, se renueva antes (compartiendo
+        la renovación en vuelo de ``MySairAsyncAPI.async_refresh_tokens``)
+        para no gastar un intento de conexión en un 401 seguro.
+        """
+        if not self.api.aws_credentials_expired(margin_seconds=margin_seconds):
+            return
+        if self.api.access_token_expired():
+            await self.api.async_refresh_tokens()
+        await self.api.async_refresh_aws_credentials()
+
+    async def _run(self):
+        conn = None  # conexión ya suscrita que dejó un relevo, si la hay
+        while not self._stopping:
             try:
-                # Método primario: decodificación conforme al estándar MQTT
-                # (ver parse_mqtt_publish, known-unknowns #6). Si no es
-                # concluyente, el llamador cae al heurístico de texto.
-                strict_topic, strict_payload = parse_mqtt_publish(packet)
-                if strict_topic is None:
-                    return False
+                if conn is None:
+                    self._connect_started_at = time.monotonic()
+                    conn = await self._async_open()
+                if conn is None:
+                    delay = self._backoff_delay()
+                    log(
+                        f"❌ [MySair MQTT] No se pudieron obtener credenciales AWS. Reintentando en {delay:.1f}s.",
+                        "error",
+                    )
+                    await asyncio.sleep(delay)
+                    continue
 
-                decoded = strict_payload.decode("utf-8", errors="ignore").strip()
-                data, _ = _extract_json(decoded)
-                self.parse_strict_count += 1  # D4
-                self.last_message_at = datetime.datetime.now(
-                    datetime.timezone.utc
-                )  # D3
-                log(
-                    f"📥 [MySair MQTT] Mensaje MQTT recibido ({strict_topic}): {decoded[:200]}...",
-                    "debug",
-                )
+                self._conn = conn
+                self.ws = conn.ws
+                self._schedule_credential_refresh_timer()
+                self._schedule_credential_prefetch_timer()
+                await self._async_read(conn)
+                self._on_close(conn.ws, conn.ws.close_code, None)
 
-                if self.message_callback:
-                    self.message_callback({"topic": strict_topic, "payload": data})
-                return True
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                self.parse_error_count += 1  # D4
-                log(f"⚠️ [MySair MQTT] Error procesando mensaje: {e}", "warning")
-                return (
-                    True  # ya contabilizado como error; no reintentar como heurístico
-                )
+                log(f"❌ [MySair MQTT] Error en conexión WebSocket: {e}", "error")
+            finally:
+                conn = await self._async_finish_connection(conn)
 
-        # Tipo de paquete desconocido/no manejado: se ignora en silencio,
-        # igual que antes de E2.
-        return True
+            if conn is not None:
+                continue  # relevo: la conexión nueva ya está suscrita
+            if not self._stopping:
+                if self._planned_reconnect:
+                    log(
+                        "🔁 [MySair MQTT] Reconectando de inmediato (refresco proactivo de credenciales)..."
+                    )
+                    self._planned_reconnect = False
+                else:
+                    delay = self._backoff_delay()
+                    log(
+                        f"🔁 [MySair MQTT] Reintentando conexión en {delay:.1f}s (intento {self._reconnect_attempt})..."
+                    )
+                    await asyncio.sleep(delay)
 
-    def _dispatch_legacy_fallback(self, buffer):
-        """Heurística de texto de respaldo (sin cambios respecto a antes de
-        E2), aplicada ahora al buffer completo en vez de a un `message`
-        crudo — equivalente cuando no hay reensamblado en curso."""
+    async def _async_open(self):
+        """Credenciales, URL firmada, WebSocket y CONNECT de una conexión nueva.
+
+        Devuelve la conexión, o ``None`` si no hay credenciales AWS.
+        """
+        await self._async_ensure_credentials()
+        aws = self.api.aws_credentials
+        if not aws:
+            return None
+
+        signed_url, host, client_id, username, password = self._connection_params(aws)
+        log(
+            f"🔗 [MySair MQTT] Conectando a {host} como {_redact_client_id(client_id)}",
+            "debug",
+        )
+        ws = await self.websession.ws_connect(
+            signed_url, protocols=("mqtt",), heartbeat=30
+        )
         try:
-            payload = buffer.split(b"\x00", 2)[-1]
-            decoded = payload.decode("utf-8", errors="ignore").strip()
-            data, start = _extract_json(decoded)
-            # Confirmado en producción (2026-07-20) que el broker no siempre
-            # envuelve el topic entre paréntesis: a veces es "(topic){json}",
-            # a veces "topic{json}" sin paréntesis (p. ej. el topic de feedback).
-            topic = decoded[:start].strip(" ()") if start > 0 else "unknown"
-            self.parse_fallback_count += 1  # D4
-            self.last_message_at = datetime.datetime.now(datetime.timezone.utc)  # D3
             log(
-                f"📥 [MySair MQTT] Mensaje MQTT recibido ({topic}): {decoded[:200]}...",
+                "✅ [MySair MQTT] WebSocket abierto, enviando paquete CONNECT...",
                 "debug",
             )
+            await ws.send_bytes(build_mqtt_connect(client_id, username, password))
+            log("📤 [MySair MQTT] CONNECT enviado.", "debug")
+        except BaseException:
+            await ws.close()
+            raise
+        return _MQTTConnection(ws)
 
-            if self.message_callback:
-                self.message_callback({"topic": topic, "payload": data})
-        except Exception as e:
-            self.parse_error_count += 1  # D4
-            log(f"⚠️ [MySair MQTT] Error procesando mensaje: {e}", "warning")
-
-    def _on_error(self, ws, error):
-        log(f"❌ [MySair MQTT] Error WebSocket: {error}", "error")
+    async def _async_read(self, conn, until_subscribed=False):
+        """Bucle de lectura de ``conn`` hasta que se cierra.
 
-    def _on_close(self, ws, close_status_code, close_msg):
-        log(
-            f"🔌 [MySair MQTT] Conexión cerrada (code={close_status_code}, msg={close_msg})"
+        Con ``until_subscribed`` (conexión entrante de un relevo) vuelve en
+        cuanto recibe el último SUBACK. Devuelve si quedó suscrita.
+        """
+        ws = conn.ws
+        async for msg in ws:
+            if msg.type is aiohttp.WSMsgType.BINARY:
+                self._on_message(ws, msg.data)
+                outbox = self._outbox.pop(ws, None)
+                while outbox:
+                    await ws.send_bytes(outbox.pop(0))
+                if until_subscribed and conn.subscribed:
+                    return True
+            elif msg.type is aiohttp.WSMsgType.ERROR:
+                self._on_error(ws, ws.exception())
+                break
+        return conn.subscribed
+
+    async def _async_finish_connection(self, conn):
+        """Cierra ``conn`` y devuelve la conexión que tomó su relevo, si la hay."""
+        if conn is not None:
+            self._outbox.pop(conn.ws, None)
+            await conn.ws.close()
+            if self._standby is conn:
+                self._end_overlap()  # cerrada tras ceder el relevo
+        successor, self._successor = self._successor, None
+        if successor is not None and self._stopping:
+            await successor.ws.close()
+            successor = None
+        if successor is None:
+            # Caída con un relevo a medias: ya no hay conexión que relevar.
+            rotation, self._rotation = self._rotation, None
+            if rotation is not None:
+                rotation.cancel()
+            self.ws = None
+            self._set_connected(False)
+        return successor
+
+    def _send_packet(self, conn, packet):
+        self._outbox.setdefault(conn.ws, []).append(packet)
+
+    def _flush_packets(self, conn):
+        # Fuera del bucle de lectura (que vacía el outbox tras cada mensaje):
+        # tarea aparte para no esperar al siguiente mensaje del broker.
+        self._create_background_task(
+            self._async_flush(conn.ws), name="mysair_mqtt_flush"
         )
-        self.connected = False
-        self.last_close_code = close_status_code  # D4
-        self.last_close_msg = close_msg  # D4
+
+    async def _async_flush(self, ws):
+        outbox = self._outbox.pop(ws, None)
+        try:
+            while outbox:
+                await ws.send_bytes(outbox.pop(0))
+        except Exception as e:
+            log(f"⚠️ [MySair MQTT] Error enviando paquetes pendientes: {e}", "debug")
@@ -0,0 +1,293 @@
+"""Conexión MQTT compartida entre config entries de la misma cuenta MQTT.
+
+Antes cada config entry arrancaba su propio cliente MQTT (hilo, WebSocket,
+credenciales AWS y suscripciones) aunque otra entrada ya estuviera conectada
+con el mismo ``aws_mqtt_user``: p. ej. un mismo usuario repartido en varias
+entradas por ubicación, o varios usuarios que el backend agrupa bajo la misma
+identidad MQTT. Cada una pagaba su conexión por separado.
+
+Ahora `MqttConnectionManager` (uno por proceso, en ``hass.data``) guarda una
+conexión por ``aws_mqtt_user``. La primera entrada que arranca aporta su
+cliente (y con él el transporte elegido en sus opciones); las siguientes se
+unen a ese cliente: se suscribe a sus instalaciones sin reconectar
+(``add_installations``) y cada PUBLISH se entrega solo a las entradas dueñas
+de la instalación del topic. Cada ACK del feedback llega a una sola entrada,
+la que espera su ``orderId`` (o, si ninguna, una dueña de la instalación):
+así el evento ``mysair_feedback`` sale una vez por conexión y no una por
+entrada. Los cambios de conexión llegan a todas. Las suscripciones van con
+contador de referencias: al descargar una entrada solo se cancelan las
+instalaciones que ya no usa ninguna otra, y la conexión se cierra cuando se
+va la última.
+
+Si no se pueden obtener las credenciales AWS al arrancar (y con ellas el
+``aws_mqtt_user``), la entrada usa su propio cliente sin compartir, como
+antes; el cliente las volverá a pedir al conectar.
+
+Las entidades, el sync de status y diagnostics reciben un `MqttEntryLink` al
+crearse, antes de saber a qué conexión se unirá la entrada: delega en el
+cliente que la atiende en cada momento.
+"""
+
+import logging
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .mqtt_handler import MySairAsyncMQTTClient
+from .status_parser import parse_feedback_payload
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_MQTT_MANAGER = f"{DOMAIN}_mqtt_manager"
+
+
+def async_get_mqtt_manager(hass: HomeAssistant) -> "MqttConnectionManager":
+    """El gestor de conexiones MQTT del proceso (se crea la primera vez)."""
+    manager = hass.data.get(DATA_MQTT_MANAGER)
+    if manager is None:
+        manager = hass.data[DATA_MQTT_MANAGER] = MqttConnectionManager(hass)
+    return manager
+
+
+def topic_installation_ref(topic):
+    """``ref`` de un topic ``.../get/ctl/{ref}/...``, o ``None`` si no es de una instalación."""
+    parts = topic.split("/")
+    try:
+        index = parts.index("ctl")
+    except ValueError:
+        return None
+    return parts[index + 1] if index + 1 < len(parts) else None
+
+
+class MqttEntryLink:
+    """El cliente MQTT tal como lo ve una config entry.
+
+    Delega todo en ``client``: al principio el cliente propio de la entrada
+    (sin arrancar) y, desde ``MqttConnectionManager.async_acquire``, el de la
+    conexión que la atiende, propia o compartida.
+    """
+
+    def __init__(self, client):
+        object.__setattr__(self, "client", client)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def __setattr__(self, name, value):
+        if name == "client":
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.client, name, value)
+
+
+class _SharedConnection:
+    """Un cliente MQTT y las config entries que lo usan."""
+
+    def __init__(self, client):
+        self.client = client
+        # entry_id -> (api, refs, message_callback, connection_callback,
+        # feedback_pending). Se sustituyen enteros en vez de modificarse: el
+        # hilo MQTT los lee sin lock.
+        self.entries = {}
+        self.routes = {}  # ref -> message_callbacks de las entradas dueñas
+        self.ref_counts = {}  # ref -> entradas que la usan
+        client.message_callback = self.route_message
+        client.connection_callback = self.route_connection
+
+    def add_entry(
+        self,
+        entry_id,
+        api,
+        refs,
+        message_callback,
+        connection_callback,
+        feedback_pending=None,
+    ):
+        """Registra la entrada; devuelve las instalaciones que no tenía nadie.
+
+        ``feedback_pending(order_id)`` dice si la entrada espera ese ACK.
+        """
+        self.entries = {
+            **self.entries,
+            entry_id: (
+                api,
+                list(refs),
+                message_callback,
+                connection_callback,
+                feedback_pending,
+            ),
+        }
+        added = []
+        for ref in refs:
+            self.ref_counts[ref] = self.ref_counts.get(ref, 0) + 1
+            if self.ref_counts[ref] == 1:
+                added.append(ref)
+        self._rebuild_routes()
+        return added
+
+    def remove_entry(self, entry_id):
+        """Da de baja la entrada; devuelve las instalaciones que ya no usa nadie."""
+        entries = dict(self.entries)
+        refs = entries.pop(entry_id)[1]
+        self.entries = entries
+        removed = []
+        for ref in refs:
+            self.ref_counts[ref] -= 1
+            if self.ref_counts[ref] == 0:
+                del self.ref_counts[ref]
+                removed.append(ref)
+        self._rebuild_routes()
+        return removed
+
+    def _rebuild_routes(self):
+        routes = {}
+        for _, refs, message_callback, *_ in self.entries.values():
+            for ref in refs:
+                routes[ref] = (*routes.get(ref, ()), message_callback)
+        self.routes = routes
+
+    def route_message(self, data):
+        """``message_callback`` del cliente: entrega el mensaje a sus entradas."""
+        topic = data.get("topic", "")
+        ref = topic_installation_ref(topic)
+        if ref is not None:
+            callbacks = self.routes.get(ref, ())
+        elif topic.endswith("/feedback"):
+            callbacks = self._feedback_callbacks(data.get("payload"))
+        else:
+            # Otros topics de usuario: cada entrada filtra lo suyo.
+            callbacks = [entry[2] for entry in self.entries.values()]
+        for message_callback in callbacks:
+            message_callback(data)
+
+    def _feedback_callbacks(self, payload):
+        """La entrada que recibe un ACK: la que espera su ``orderId`` o, si
+        ninguna, una dueña de su instalación (la primera entrada si no hay)."""
+        entries = list(self.entries.values())
+        if not entries:
+            return ()
+        feedback = parse_feedback_payload(payload)
+        if feedback is None:
+            return (entries[0][2],)  # su callback registra el rechazo
+        order_id, ctl = feedback["order_id"], feedback["ctl"]
+        if isinstance(order_id, (str, int)):
+            for _, _, message_callback, _, feedback_pending in entries:
+                if feedback_pending is not None and feedback_pending(order_id):
+                    return (message_callback,)
+        owners = self.routes.get(ctl) if isinstance(ctl, str) else None
+        return owners[:1] if owners else (entries[0][2],)
+
+    def route_connection(self, connected):
+        """``connection_callback`` del cliente: avisa a todas las entradas."""
+        for entry in self.entries.values():
+            entry[3](connected)
+
+
+class MqttConnectionManager:
+    """Conexiones MQTT del proceso, una por ``aws_mqtt_user``."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._connections = {}  # clave -> _SharedConnection
+        self._entry_keys = {}  # entry_id -> clave de su conexión
+
+    def entry_count(self, entry_id) -> int:
+        """Entradas que comparten la conexión de ``entry_id`` (diagnostics)."""
+        shared = self._connections.get(self._entry_keys.get(entry_id))
+        return len(shared.entries) if shared is not None else 0
+
+    async def async_acquire(
+        self,
+        entry_id,
+        link: MqttEntryLink,
+        api,
+        installation_refs,
+        message_callback,
+        connection_callback,
+        feedback_pending=None,
+    ) -> None:
+        """Conecta la entrada: arranca su cliente o la une a una conexión abierta."""
+        key = await self._async_connection_key(entry_id, api)
+        shared = self._connections.get(key)
+        self._entry_keys[entry_id] = key
+        if shared is None:
+            shared = self._connections[key] = _SharedConnection(link.client)
+            shared.add_entry(
+                entry_id,
+                api,
+                installation_refs,
+                message_callback,
+                connection_callback,
+                feedback_pending,
+            )
+            await self._async_call(shared.client, shared.client.start)
+            return
+
+        link.client = shared.client
+        added = shared.add_entry(
+            entry_id,
+            api,
+            installation_refs,
+            message_callback,
+            connection_callback,
+            feedback_pending,
+        )
+        _LOGGER.info(
+            f"[MySair MQTT] 🔗 Entrada unida a una conexión MQTT ya abierta "
+            f"({len(shared.entries)} entradas la comparten)"
+        )
+        if added:
+            await self._async_call(
+                shared.client, shared.client.add_installations, added
+            )
+
+    async def async_release(self, entry_id, link: MqttEntryLink) -> None:
+        """Desconecta la entrada; la conexión se cierra al irse la última."""
+        key = self._entry_keys.pop(entry_id, None)
+        shared = self._connections.get(key)
+        if shared is None or entry_id not in shared.entries:
+            # No llegó a conectarse: su cliente propio, sin arrancar.
+            await self._async_stop(link.client)
+            return
+
+        api = shared.entries[entry_id][0]
+        removed = shared.remove_entry(entry_id)
+        client = shared.client
+        if not shared.entries:
+            del self._connections[key]
+            await self._async_stop(client)
+            return
+
+        if client.api is api:
+            # La sesión de esta entrada se cierra con ella: las credenciales
+            # AWS se renuevan desde ahora con la de otra entrada.
+            client.api = next(iter(shared.entries.values()))[0]
+        if removed:
+            await self._async_call(client, client.remove_installations, removed)
+
+    async def _async_connection_key(self, entry_id, api):
+        """``aws_mqtt_user`` de la entrada, o una clave propia si no se conoce."""
+        if api.aws_credentials_expired():
+            try:
+                await api.async_refresh_aws_credentials()
+            except Exception as err:
+                _LOGGER.warning(
+                    f"[MySair MQTT] ⚠️ Sin credenciales AWS al arrancar ({err}); "
+                    "la entrada usa su propia conexión MQTT"
+                )
+        mqtt_user = (api.aws_credentials or {}).get("aws_mqtt_user")
+        return mqtt_user or ("entry", entry_id)
+
+    async def _async_call(self, client, func, *args):
+        # El cliente asyncio corre en el loop; el de hilo propio puede
+        # bloquear (arranque, envío por el WebSocket): al executor.
+        if isinstance(client, MySairAsyncMQTTClient):
+            func(*args)
+        else:
+            await self.hass.async_add_executor_job(func, *args)
+
+    async def _async_stop(self, client):
+        if isinstance(client, MySairAsyncMQTTClient):
+            await client.async_stop()
+        else:
+            await self.hass.async_add_executor_job(client.stop)
@@ -8,7 +8,7 @@ from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
 from .availability import AvailabilityMixin
 from .const import DOMAIN, SCAN_INTERVAL as _SCAN_INTERVAL_SECONDS
-from .coordinator import signal_zone_update
+from .coordinator import signal_zone_update, signal_zones_added
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -18,33 +18,57 @@ _LOGGER = logging.getLogger(__name__)
 SCAN_INTERVAL = timedelta(seconds=_SCAN_INTERVAL_SECONDS)
 
 
-async def async_setup_entry(hass, entry, async_add_entities):
-    """Configura los sensores MySair (temperaturas y modo por zona)."""
-    data = hass.data[DOMAIN][entry.entry_id]
-    devices = data["devices"]
-    mqtt_client = data["mqtt"]
-
-    entities = [MySairMqttStatusSensor(hass, entry.entry_id, mqtt_client)]
+def _zone_entities(hass, data, devices):
+    """Sensores de las zonas de ``devices`` (``{inst_ref: [dispositivos]}``)."""
+    coordinator = data["coordinator"]
+    entities = []
     for inst_ref, device_list in devices.items():
         for dev in device_list:
             dev_id = dev.get("reference") or dev.get("rf") or dev.get("id")
             name = dev.get("name", f"Zona {dev_id}")
             entities.append(
-                MySairTempSensor(hass, inst_ref, dev_id, f"{name} Temperatura Actual")
+                MySairTempSensor(
+                    hass, coordinator, inst_ref, dev_id, f"{name} Temperatura Actual"
+                )
             )
             entities.append(
                 MySairSetpointSensor(
-                    hass, inst_ref, dev_id, f"{name} Temperatura Consigna"
+                    hass, coordinator, inst_ref, dev_id, f"{name} Temperatura Consigna"
                 )
             )
-            entities.append(MySairModeSensor(hass, inst_ref, dev_id, f"{name} Modo"))
             entities.append(
-                MySairHumiditySensor(hass, inst_ref, dev_id, f"{name} Humedad")
+                MySairModeSensor(hass, coordinator, inst_ref, dev_id, f"{name} Modo")
             )
+            entities.append(
+                MySairHumiditySensor(
+                    hass, coordinator, inst_ref, dev_id, f"{name} Humedad"
+                )
+            )
+    return entities
+
 
+async def async_setup_entry(hass, entry, async_add_entities):
+    """Configura los sensores MySair (temperaturas y modo por zona)."""
+    data = hass.data[DOMAIN][entry.entry_id]
+
+    entities = [MySairMqttStatusSensor(hass, entry.entry_id, data["mqtt"])]
+    entities.extend(_zone_entities(hass, data, data["devices"]))
     async_add_entities(entities)
     _LOGGER.info(f"[MySair Sensor] ✅ {len(entities)} sensores creados.")
 
+    @callback
+    def _async_add_zones(devices):
+        """Zonas nuevas tras revalidar la topología cacheada (ver __init__.py)."""
+        new_entities = _zone_entities(hass, data, devices)
+        async_add_entities(new_entities)
+        _LOGGER.info(f"[MySair Sensor] ➕ {len(new_entities)} sensores añadidos.")
+
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, signal_zones_added(entry.entry_id), _async_add_zones
+        )
+    )
+
 
 # ==========================================================
 # 📶 SENSOR DE ESTADO DE CONEXIÓN MQTT (D3/D4)
@@ -57,6 +81,10 @@ class MySairMqttStatusSensor(SensorEntity):
     (su propia "no disponibilidad" no tiene sentido — incluso "offline" es
     información válida). Se actualiza por sondeo (should_poll=True) leyendo
     directamente el estado en vivo de MySairMQTTClient.
+
+    ``last_connack_seconds`` es lo que tardó el último intento de conexión en
+    recibir el CONNACK (credenciales, firma, TLS y CONNECT; sin contar la
+    espera del backoff).
     """
 
     _attr_icon = "mdi:wifi"
@@ -93,6 +121,7 @@ class MySairMqttStatusSensor(SensorEntity):
             "parse_fallback_count": self.mqtt_client.parse_fallback_count,
             "parse_error_count": self.mqtt_client.parse_error_count,
             "last_close_code": self.mqtt_client.last_close_code,
+            "last_connack_seconds": self.mqtt_client.last_connack_seconds,
         }
 
 
@@ -105,8 +134,9 @@ class MySairTempSensor(AvailabilityMixin, SensorEntity):
     _attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
     _attr_device_class = SensorDeviceClass.TEMPERATURE
     _attr_icon = "mdi:thermometer"
+    _zone_fields = frozenset({"temp_actual"})
 
-    def __init__(self, hass, inst_ref, device_id, name):
+    def __init__(self, hass, coordinator, inst_ref, device_id, name):
         self.hass = hass
         self.inst_ref = inst_ref
         self.device_id = device_id
@@ -114,7 +144,7 @@ class MySairTempSensor(AvailabilityMixin, SensorEntity):
         self._attr_unique_id = f"mysair_temp_{inst_ref}_{device_id}"
         self._state = None
         self._unsub = None
-        self._init_availability()
+        self._init_availability(coordinator)
 
     @property
     def device_info(self):
@@ -136,6 +166,7 @@ class MySairTempSensor(AvailabilityMixin, SensorEntity):
             signal_zone_update(self.inst_ref, self.device_id),
             self._handle_zone_update,
         )
+        self._start_availability()
 
     async def async_will_remove_from_hass(self):
         if self._unsub:
@@ -144,13 +175,12 @@ class MySairTempSensor(AvailabilityMixin, SensorEntity):
         self._stop_availability()
 
     @callback
-    def _handle_zone_update(self, zone):
-        self._mark_status_received()
-        new_val = zone.get("temp_actual")
+    def _handle_zone_update(self, zone, changed):
+        new_val = zone.temp_actual
         if new_val != self._state:
             self._state = new_val
             _LOGGER.debug(f"[MySair Sensor] 🌡️ {self._attr_name}: {new_val}°C")
-        self.async_write_ha_state()
+        self._async_write_zone_state(changed)
 
 
 # ==========================================================
@@ -162,8 +192,9 @@ class MySairSetpointSensor(AvailabilityMixin, SensorEntity):
     _attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
     _attr_device_class = SensorDeviceClass.TEMPERATURE
     _attr_icon = "mdi:thermostat"
+    _zone_fields = frozenset({"temp_target"})
 
-    def __init__(self, hass, inst_ref, device_id, name):
+    def __init__(self, hass, coordinator, inst_ref, device_id, name):
         self.hass = hass
         self.inst_ref = inst_ref
         self.device_id = device_id
@@ -171,7 +202,7 @@ class MySairSetpointSensor(AvailabilityMixin, SensorEntity):
         self._attr_unique_id = f"mysair_setpoint_{inst_ref}_{device_id}"
         self._state = None
         self._unsub = None
-        self._init_availability()
+        self._init_availability(coordinator)
 
     @property
     def device_info(self):
@@ -193,6 +224,7 @@ class MySairSetpointSensor(AvailabilityMixin, SensorEntity):
             signal_zone_update(self.inst_ref, self.device_id),
             self._handle_zone_update,
         )
+        self._start_availability()
 
     async def async_will_remove_from_hass(self):
         if self._unsub:
@@ -201,13 +233,12 @@ class MySairSetpointSensor(AvailabilityMixin, SensorEntity):
         self._stop_availability()
 
     @callback
-    def _handle_zone_update(self, zone):
-        self._mark_status_received()
-        new_val = zone.get("temp_target")
+    def _handle_zone_update(self, zone, changed):
+        new_val = zone.temp_target
         if new_val != self._state:
             self._state = new_val
             _LOGGER.debug(f"[MySair Sensor] 🎯 {self._attr_name}: {new_val}°C")
-        self.async_write_ha_state()
+        self._async_write_zone_state(changed)
 
 
 # ==========================================================
@@ -218,8 +249,9 @@ class MySairModeSensor(AvailabilityMixin, SensorEntity):
     activo (AC / suelo radiante / mixto — ver F4)."""
 
     _attr_icon = "mdi:repeat-variant"
+    _zone_fields = frozenset({"is_on", "is_heat", "is_cool", "is_ac", "is_floor"})
 
-    def __init__(self, hass, inst_ref, device_id, name):
+    def __init__(self, hass, coordinator, inst_ref, device_id, name):
         self.hass = hass
         self.inst_ref = inst_ref
         self.device_id = device_id
@@ -228,7 +260,7 @@ class MySairModeSensor(AvailabilityMixin, SensorEntity):
         self._state = "OFF"
         self._medium = None
         self._unsub = None
-        self._init_availability()
+        self._init_availability(coordinator)
 
     @property
     def device_info(self):
@@ -254,6 +286,7 @@ class MySairModeSensor(AvailabilityMixin, SensorEntity):
             signal_zone_update(self.inst_ref, self.device_id),
             self._handle_zone_update,
         )
+        self._start_availability()
 
     async def async_will_remove_from_hass(self):
         if self._unsub:
@@ -262,14 +295,13 @@ class MySairModeSensor(AvailabilityMixin, SensorEntity):
         self._stop_availability()
 
     @callback
-    def _handle_zone_update(self, zone):
-        self._mark_status_received()
+    def _handle_zone_update(self, zone, changed):
         # 'e' = encendido; calor/frío = paridad de 'm'. Ver docs/protocol-findings.md.
         new_state = "OFF"
-        if zone.get("is_on"):
-            if zone.get("is_cool"):
+        if zone.is_on:
+            if zone.is_cool:
                 new_state = "COOL"
-            elif zone.get("is_heat"):
+            elif zone.is_heat:
                 new_state = "HEAT"
             else:
                 new_state = "ON"
@@ -280,16 +312,16 @@ class MySairModeSensor(AvailabilityMixin, SensorEntity):
         # Medio activo (F4/AC-vs-suelo): 'm' distingue AC-solo/suelo-solo/mixto
         # con independencia de encendido/apagado (se conserva aunque la zona
         # esté apagada). Ver docs/protocol-findings.md §4.
-        if zone.get("is_ac") and zone.get("is_floor"):
+        if zone.is_ac and zone.is_floor:
             self._medium = "mixto"
-        elif zone.get("is_floor"):
+        elif zone.is_floor:
             self._medium = "suelo"
-        elif zone.get("is_ac"):
+        elif zone.is_ac:
             self._medium = "ac"
         else:
             self._medium = None
 
-        self.async_write_ha_state()
+        self._async_write_zone_state(changed)
 
 
 # ==========================================================
@@ -301,8 +333,9 @@ class MySairHumiditySensor(AvailabilityMixin, SensorEntity):
     _attr_native_unit_of_measurement = PERCENTAGE
     _attr_device_class = SensorDeviceClass.HUMIDITY
     _attr_icon = "mdi:water-percent"
+    _zone_fields = frozenset({"humidity"})
 
-    def __init__(self, hass, inst_ref, device_id, name):
+    def __init__(self, hass, coordinator, inst_ref, device_id, name):
         self.hass = hass
         self.inst_ref = inst_ref
         self.device_id = device_id
@@ -310,7 +343,7 @@ class MySairHumiditySensor(AvailabilityMixin, SensorEntity):
         self._attr_unique_id = f"mysair_humidity_{inst_ref}_{device_id}"
         self._state = None
         self._unsub = None
-        self._init_availability()
+        self._init_availability(coordinator)
 
     @property
     def device_info(self):
@@ -332,6 +365,7 @@ class MySairHumiditySensor(AvailabilityMixin, SensorEntity):
             signal_zone_update(self.inst_ref, self.device_id),
             self._handle_zone_update,
         )
+        self._start_availability()
 
     async def async_will_remove_from_hass(self):
         if self._unsub:
@@ -340,10 +374,9 @@ class MySairHumiditySensor(AvailabilityMixin, SensorEntity):
         self._stop_availability()
 
     @callback
-    def _handle_zone_update(self, zone):
-        self._mark_status_received()
-        new_val = zone.get("humidity")
+    def _handle_zone_update(self, zone, changed):
+        new_val = zone.humidity
         if new_val != self._state:
             self._state = new_val
             _LOGGER.debug(f"[MySair Sensor] 💧 {self._attr_name}: {new_val}%")
-        self.async_write_ha_state()
+        self._async_write_zone_state(changed)
@@ -0,0 +1,143 @@
+"""Entrega acotada de status del hilo MQTT al event loop, fusionando por instalación.
+
+Antes ``mqtt_message_callback`` (``__init__.py``) hacía un
+``hass.loop.call_soon_threadsafe`` por cada status recibido en el hilo MQTT,
+sin límite. Tras una reconexión o una ráfaga de syncs, si el loop iba por
+detrás, la cola de callbacks del loop crecía con status que el siguiente ya
+dejaba obsoletos.
+
+Ahora `StatusHandoff` guarda los status pendientes en un dict por ``ctl``:
+un status nuevo de una instalación que aún tiene otro pendiente se fusiona
+con él (la zona más reciente sustituye a la anterior con el mismo
+``zone_id``; las zonas que solo venían en el anterior se conservan, porque
+un status no tiene por qué traerlas todas). Solo hay un drenado programado
+en el loop a la vez, y procesa en un lote todo lo acumulado hasta entonces.
+La cola queda acotada por el número de instalaciones; como salvaguarda ante
+``ctl`` inesperados, por encima de ``STATUS_HANDOFF_MAX_PENDING`` se descarta
+el pendiente más antiguo.
+
+Un status repetido tal cual (``StatusDeduplicator``, ``status_parser.py``)
+no se parsea: solo se pide, con ``refresh``, renovar la frescura de las
+zonas de su instalación. Va por la misma cola, con el mismo límite; si ya
+hay un status pendiente de esa instalación, el aviso sobra.
+
+Desde el propio loop (transporte asyncio) no hay nada que acotar: el status
+se entrega en el acto. Los contadores (``stats()``, en diagnostics) dan el
+máximo de instalaciones pendientes a la vez y cuántos status se fusionaron.
+"""
+
+import logging
+import threading
+
+from homeassistant.core import HomeAssistant
+
+from .const import STATUS_HANDOFF_MAX_PENDING
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def merge_status(older: dict, newer: dict) -> dict:
+    """Status de la misma instalación fusionados: por ``zone_id``, manda el más nuevo."""
+    zones = {zone.zone_id: zone for zone in older.get("zones", [])}
+    for zone in newer.get("zones", []):
+        zones.pop(zone.zone_id, None)  # al final: orden de llegada
+        zones[zone.zone_id] = zone
+    return {**newer, "zones": list(zones.values())}
+
+
+class StatusHandoff:
+    """Status pendientes de entregar al loop, como mucho uno por ``ctl``.
+
+    ``handle_status(topic, parsed_data)`` y ``handle_refresh(ctl)`` se
+    invocan en el loop.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        handle_status,
+        handle_refresh=None,
+        max_pending: int = STATUS_HANDOFF_MAX_PENDING,
+    ) -> None:
+        self.hass = hass
+        self.handle_status = handle_status
+        self.handle_refresh = handle_refresh
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        # ctl -> (topic, status), del más antiguo al más nuevo; status None
+        # si solo hay que renovar la frescura (refresh).
+        self._pending = {}
+        self._scheduled = False
+        # Contadores para diagnostics.
+        self.high_water = 0  # máximo de instalaciones pendientes a la vez
+        self.merged = 0  # status fusionados con otro aún pendiente
+        self.dropped = 0  # pendientes descartados por superar max_pending
+        self.batches = 0  # drenados ejecutados en el loop
+
+    def put(self, topic: str, status: dict) -> None:
+        """Entrega ``status`` al loop; se puede llamar desde cualquier hilo."""
+        if threading.get_ident() == self.hass.loop_thread_id:
+            self.handle_status(topic, status)
+            return
+        ctl = status.get("ctl")
+        with self._lock:
+            pending = self._pending.pop(ctl, None)
+            if pending is not None and pending[1] is not None:
+                self.merged += 1
+                status = merge_status(pending[1], status)
+            elif pending is None:
+                self._make_room()
+            self._pending[ctl] = (topic, status)
+            if not self._claim_drain():
+                return
+        self.hass.loop.call_soon_threadsafe(self._drain)
+
+    def refresh(self, topic: str, ctl: str) -> None:
+        """Pide renovar la frescura de las zonas de ``ctl``; desde cualquier hilo."""
+        if threading.get_ident() == self.hass.loop_thread_id:
+            self.handle_refresh(ctl)
+            return
+        with self._lock:
+            if ctl in self._pending:
+                return  # lo pendiente ya renueva la frescura
+            self._make_room()
+            self._pending[ctl] = (topic, None)
+            if not self._claim_drain():
+                return
+        self.hass.loop.call_soon_threadsafe(self._drain)
+
+    def _make_room(self) -> None:
+        if len(self._pending) >= self.max_pending:
+            del self._pending[next(iter(self._pending))]
+            self.dropped += 1
+
+    def _claim_drain(self) -> bool:
+        """Con ``_lock`` tomado: ``True`` si hay que programar el drenado."""
+        self.high_water = max(self.high_water, len(self._pending))
+        if self._scheduled:
+            return False
+        self._scheduled = True
+        return True
+
+    def _drain(self) -> None:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._scheduled = False
+        self.batches += 1
+        for ctl, (topic, status) in batch.items():
+            try:
+                if status is None:
+                    self.handle_refresh(ctl)
+                else:
+                    self.handle_status(topic, status)
+            except Exception as e:
+                _LOGGER.error(f"[MySair MQTT] ❌ Error entregando status: {e}")
+
+    def stats(self) -> dict:
+        """Profundidad máxima y status fusionados/descartados (diagnostics)."""
+        return {
+            "high_water": self.high_water,
+            "merged": self.merged,
+            "dropped": self.dropped,
+            "batches": self.batches,
+        }
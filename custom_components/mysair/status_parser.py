@@ -4,12 +4,101 @@ Este módulo NO depende de Home Assistant a propósito: así la lógica de parse
 del estado se puede importar y testear de forma aislada (ver docs/testing-strategy.md).
 """
 
+import itertools
 import json
 import logging
+import threading
+from collections import OrderedDict
+
+try:  # opcional: mismo resultado que json, bastante más rápido
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def _json_loads(text):
+    """Decodifica con ``orjson`` si está instalado; si lo rechaza (NaN,
+    enteros enormes), con ``json``, que es la referencia de qué es válido."""
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
+
+# Entradas de STATUS_VALUE_CACHE: unos pocos value distintos vivos por
+# instalación bastan; cada entrada es el string crudo y su objeto (~1-6 KB).
+STATUS_VALUE_CACHE_SIZE = 64
+
+
+class StatusValueCache:
+    """LRU acotada: ``value`` crudo de un mensaje -> objeto ya decodificado.
+
+    ``parse_status_payload`` y el respaldo anidado de
+    ``parse_feedback_payload`` decodificaban el ``value`` con ``loads`` en
+    cada mensaje, aunque el mismo string ya se hubiera visto: varias config
+    entries con la misma instalación (cada una parsea el status), un status
+    que vuelve a un estado anterior no consecutivo (los repetidos seguidos
+    ya los descarta ``StatusDeduplicator``). Con la caché esos casos cuestan
+    una búsqueda.
+
+    Los objetos guardados se comparten entre llamadas, así que no salen de
+    este módulo: solo los leen los parsers de aquí, que extraen escalares
+    (``ZoneState``, ``order_id``/``ctl``). ``parse_status_value`` no usa la
+    caché y sigue devolviendo un objeto nuevo. Se usa desde los hilos MQTT
+    (uno por conexión): las operaciones van con lock.
+    """
+
+    def __init__(self, maxsize: int = STATUS_VALUE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # de menos a más recientemente usada
+        self._lock = threading.Lock()
+        # Contadores para diagnostics.
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0  # entradas expulsadas por superar maxsize
+
+    def get(self, raw_value):
+        """El objeto decodificado de ``raw_value``, o ``None`` si no está."""
+        with self._lock:
+            decoded = self._entries.get(raw_value)
+            if decoded is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(raw_value)
+            self.hits += 1
+            return decoded
+
+    def put(self, raw_value, decoded) -> None:
+        with self._lock:
+            self._entries[raw_value] = decoded
+            self._entries.move_to_end(raw_value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Tamaño y aciertos/fallos/expulsiones (diagnostics)."""
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# Compartida por todo el proceso (todas las config entries y conexiones).
+STATUS_VALUE_CACHE = StatusValueCache()
+
+
 def parse_status_value(raw_value):
     """Decodifica el campo ``value`` de un mensaje ``status``.
 
@@ -18,19 +107,39 @@ def parse_status_value(raw_value):
       - si ``raw_value`` es un string con JSON válido → el objeto decodificado;
       - si ya es un ``dict`` → se devuelve tal cual;
       - en cualquier otro caso (JSON inválido, tipo inesperado) → ``{}``.
+
+    Sin caché: el objeto es nuevo en cada llamada y se puede modificar.
     """
+    return _decode_status_value(raw_value, None)
+
+
+def _shared_status_value(raw_value):
+    """Como `parse_status_value`, memoizado en ``STATUS_VALUE_CACHE``.
+
+    El objeto puede ser el de la caché: solo lectura, y nada de él que no
+    sea un escalar debe salir del parser que lo pide.
+    """
+    return _decode_status_value(raw_value, STATUS_VALUE_CACHE)
+
+
+def _decode_status_value(raw_value, cache):
     if isinstance(raw_value, dict):
         return raw_value
 
     if not isinstance(raw_value, str):
         return {}
 
+    if cache is not None:
+        decoded = cache.get(raw_value)
+        if decoded is not None:
+            return decoded
+
     cleaned = raw_value.strip()
     if cleaned.endswith(";"):
         cleaned = cleaned[:-1]
 
     try:
-        parsed = json.loads(cleaned)
+        parsed = _json_loads(cleaned)
     except (ValueError, TypeError) as err:
         _LOGGER.warning(
             "[MySair MQTT] ⚠️ Error decodificando JSON anidado: %s -> %s...",
@@ -39,11 +148,17 @@ def parse_status_value(raw_value):
         )
         return {}
 
-    return parsed if isinstance(parsed, dict) else {}
+    if not isinstance(parsed, dict):
+        return {}
+    if cache is not None:
+        cache.put(raw_value, parsed)
+    return parsed
 
 
 def _to_float(value):
     """Convierte a float; devuelve None si no es convertible o falta."""
+    if value is None:  # campo ausente: sin pasar por la excepción
+        return None
     try:
         return float(value)
     except (TypeError, ValueError):
@@ -54,6 +169,23 @@ def _to_str(value):
     return None if value is None else str(value)
 
 
+def _mode_entry(n):
+    is_heat = n % 2 == 0
+    return str(n), is_heat, not is_heat, n in (0, 1, 4, 5), n in (2, 3, 4, 5)
+
+
+# Tablas precalculadas para los valores que envía el backend (strings): el
+# decodificador de zonas resuelve ``m``, ``e`` y las capacidades con una
+# búsqueda en vez de int()/str()/módulo por zona. Cualquier otro valor pasa
+# por el camino general, con el mismo resultado que antes.
+_MODE_TABLE = {str(n): _mode_entry(n) for n in range(6)}
+_POWER_TABLE = {e: (e, e != "0", e == "2") for e in ("0", "1", "2")}
+_CAPABILITY_TABLE = {
+    flags: tuple(flag == "1" for flag in flags)
+    for flags in itertools.product(("0", "1"), repeat=4)
+}
+
+
 def parse_mode(m):
     """Interpreta el campo ``m`` (modo, 0-5) del payload de estado.
 
@@ -64,6 +196,10 @@ def parse_mode(m):
     Devuelve la tupla (mode_raw, is_heat, is_cool, is_ac, is_floor); todos los
     booleanos son None si ``m`` falta o no es numérico.
     """
+    if m.__class__ is str:
+        entry = _MODE_TABLE.get(m)
+        if entry is not None:
+            return entry
     if m is None:
         return None, None, None, None, None
     mode_raw = str(m)
@@ -71,8 +207,28 @@ def parse_mode(m):
         n = int(mode_raw)
     except ValueError:
         return mode_raw, None, None, None, None
-    is_heat = n % 2 == 0
-    return mode_raw, is_heat, not is_heat, n in (0, 1, 4, 5), n in (2, 3, 4, 5)
+    return (mode_raw, *_mode_entry(n)[1:])
+
+
+def _parse_power(e):
+    """``(power, is_on, is_standby)`` del campo ``e``; standby también es encendido."""
+    if e.__class__ is str:
+        entry = _POWER_TABLE.get(e)
+        if entry is not None:
+            return entry
+    power = _to_str(e)
+    return power, power != "0", power == "2"
+
+
+def _parse_capabilities(c, f, v, s):
+    """``(allow_heat, allow_cool, allow_fan, allow_floor)``: ``"1"`` = permitido."""
+    try:
+        entry = _CAPABILITY_TABLE.get((c, f, v, s))
+    except TypeError:  # algún valor no hashable (lista, dict)
+        entry = None
+    if entry is None:
+        return tuple(_to_str(flag) == "1" for flag in (c, f, v, s))
+    return entry
 
 
 def compute_mode_value(is_heat, is_ac, is_floor):
@@ -95,6 +251,118 @@ def compute_mode_value(is_heat, is_ac, is_floor):
     return str(base if is_heat else base + 1)
 
 
+# Campos de ZoneState, en el orden en que los rellena parse_status_payload.
+ZONE_FIELDS = (
+    "ctl",
+    "zone_id",
+    "zone_name",
+    "temp_actual",
+    "temp_target",
+    "temp_min",
+    "temp_max",
+    "humidity",
+    "power",
+    "is_on",
+    "is_standby",
+    "mode_raw",
+    "is_heat",
+    "is_cool",
+    "is_ac",
+    "is_floor",
+    "fan_mode",
+    "allow_heat",
+    "allow_cool",
+    "allow_fan",
+    "allow_floor",
+)
+
+
+class ZoneState:
+    """Estado de una zona tal como llega en un ``status``.
+
+    Antes cada zona era un dict de 21 claves, creado de nuevo en cada mensaje
+    y guardado tal cual por el coordinador (``MySairCoordinator._zones``).
+    Con ``__slots__`` no hay dict por instancia: ocupa bastante menos memoria
+    y se crea más rápido (``tests/benchmarks/bench_zone_state.py``). Los
+    campos se leen como atributos; un campo que no se pasa vale ``None``.
+    ``as_dict()`` da la forma de dict para diagnostics y el evento
+    ``mysair_update``.
+    """
+
+    __slots__ = ZONE_FIELDS
+
+    def __init__(
+        self,
+        ctl=None,
+        zone_id=None,
+        zone_name=None,
+        temp_actual=None,
+        temp_target=None,
+        temp_min=None,
+        temp_max=None,
+        humidity=None,
+        power=None,
+        is_on=None,
+        is_standby=None,
+        mode_raw=None,
+        is_heat=None,
+        is_cool=None,
+        is_ac=None,
+        is_floor=None,
+        fan_mode=None,
+        allow_heat=None,
+        allow_cool=None,
+        allow_fan=None,
+        allow_floor=None,
+    ):
+        self.ctl = ctl
+        self.zone_id = zone_id
+        self.zone_name = zone_name
+        self.temp_actual = temp_actual
+        self.temp_target = temp_target
+        self.temp_min = temp_min
+        self.temp_max = temp_max
+        self.humidity = humidity
+        self.power = power
+        self.is_on = is_on
+        self.is_standby = is_standby
+        self.mode_raw = mode_raw
+        self.is_heat = is_heat
+        self.is_cool = is_cool
+        self.is_ac = is_ac
+        self.is_floor = is_floor
+        self.fan_mode = fan_mode
+        self.allow_heat = allow_heat
+        self.allow_cool = allow_cool
+        self.allow_fan = allow_fan
+        self.allow_floor = allow_floor
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in ZONE_FIELDS}
+
+    def changed_fields(self, previous):
+        """Campos con un valor distinto al de ``previous`` (todos si es ``None``)."""
+        if previous is None:
+            return frozenset(ZONE_FIELDS)
+        return frozenset(
+            field
+            for field in ZONE_FIELDS
+            if getattr(self, field) != getattr(previous, field)
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, ZoneState):
+            return NotImplemented
+        return all(
+            getattr(self, field) == getattr(other, field) for field in ZONE_FIELDS
+        )
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"ZoneState({self.ctl}/{self.zone_id}, {self.as_dict()})"
+
+
 def parse_status_payload(payload):
     """Normaliza el payload de un mensaje ``status`` a ``{"ctl", "zones"}``.
 
@@ -109,7 +377,7 @@ def parse_status_payload(payload):
         fallback por si alguna variante del backend lo envía así.)
       - capacidades: ``c``=permite calor, ``f``=permite frío, ``v``=fan, ``s``=suelo
 
-    Cada zona en ``zones`` incluye: ``ctl``, ``zone_id``, ``zone_name``,
+    Cada zona en ``zones`` es un `ZoneState` con: ``ctl``, ``zone_id``, ``zone_name``,
     ``temp_actual``, ``temp_target``, ``temp_min``, ``temp_max``, ``humidity``,
     ``power`` (e crudo), ``is_on``, ``is_standby``, ``mode_raw``, ``is_heat``,
     ``is_cool``, ``is_ac``, ``is_floor``, ``fan_mode`` y flags ``allow_*``.
@@ -135,7 +403,7 @@ def parse_status_payload(payload):
         _LOGGER.warning(
             "[MySair] status: payload sin 'ctl', el mensaje quedará sin destinatario"
         )
-    parsed_value = parse_status_value(payload.get("value", ""))
+    parsed_value = _shared_status_value(payload.get("value", ""))
 
     t_list = parsed_value.get("t", [])
     if not isinstance(t_list, list):
@@ -153,37 +421,77 @@ def parse_status_payload(payload):
             _LOGGER.warning(
                 "[MySair] status: zona sin 'rf' (zone_id), se generará sin identificador"
             )
-        power = _to_str(t.get("e", "0"))
+        power, is_on, is_standby = _parse_power(t.get("e", "0"))
         mode_raw, is_heat, is_cool, is_ac, is_floor = parse_mode(t.get("m"))
+        allow_heat, allow_cool, allow_fan, allow_floor = _parse_capabilities(
+            t.get("c"), t.get("f"), t.get("v"), t.get("s")
+        )
+        # Posicional, en el orden de ZONE_FIELDS: bastante más rápido que
+        # pasar 21 argumentos por nombre.
         zone_states.append(
-            {
-                "ctl": ctl_ref,
-                "zone_id": t.get("rf"),
-                "zone_name": t.get("n"),
-                "temp_actual": _to_float(t.get("tr")),
-                "temp_target": _to_float(t.get("tc")),
-                "temp_min": _to_float(t.get("tmm")),
-                "temp_max": _to_float(t.get("tmx")),
-                "humidity": _to_float(t.get("hum", t.get("hm"))),
-                "power": power,  # e crudo: "0"/"1"/"2"
-                "is_on": power != "0",  # standby ("2") también cuenta como encendido
-                "is_standby": power == "2",
-                "mode_raw": mode_raw,  # m crudo: "0".."5"
-                "is_heat": is_heat,
-                "is_cool": is_cool,
-                "is_ac": is_ac,
-                "is_floor": is_floor,
-                "fan_mode": _to_str(t.get("vv")),
-                "allow_heat": _to_str(t.get("c")) == "1",
-                "allow_cool": _to_str(t.get("f")) == "1",
-                "allow_fan": _to_str(t.get("v")) == "1",
-                "allow_floor": _to_str(t.get("s")) == "1",
-            }
+            ZoneState(
+                ctl_ref,
+                t.get("rf"),  # zone_id
+                t.get("n"),  # zone_name
+                _to_float(t.get("tr")),  # temp_actual
+                _to_float(t.get("tc")),  # temp_target
+                _to_float(t.get("tmm")),  # temp_min
+                _to_float(t.get("tmx")),  # temp_max
+                _to_float(t["hum"] if "hum" in t else t.get("hm")),  # humidity
+                power,  # e crudo: "0"/"1"/"2"
+                is_on,  # standby ("2") también cuenta como encendido
+                is_standby,
+                mode_raw,  # m crudo: "0".."5"
+                is_heat,
+                is_cool,
+                is_ac,
+                is_floor,
+                _to_str(t.get("vv")),  # fan_mode
+                allow_heat,
+                allow_cool,
+                allow_fan,
+                allow_floor,
+            )
         )
 
     return {"ctl": ctl_ref, "zones": zone_states}
 
 
+class StatusDeduplicator:
+    """Detecta ``status`` idénticos al anterior de la misma instalación.
+
+    Tras cada ``status``/``sync`` y tras las reconexiones del relevo de
+    credenciales el backend suele reenviar un status cuyo ``value`` crudo es
+    exactamente el último de ese ``ctl``. Se guarda ese ``value`` por ``ctl``
+    y se compara antes de parsear: un repetido no necesita
+    ``parse_status_payload`` ni redistribuirse por zona, solo renovar la
+    frescura de sus zonas. Se compara el string entero, no un digest: cuesta
+    lo mismo que calcular el hash y no hay colisiones posibles.
+    """
+
+    def __init__(self):
+        self._last_values = {}  # ctl -> último value crudo
+        self.duplicates = 0  # status descartados por repetidos
+
+    def is_repeat(self, payload) -> bool:
+        """``True`` si ``payload`` repite el último ``value`` de su ``ctl``.
+
+        Si no, lo recuerda como el último. Los payloads sin ``ctl`` o con un
+        ``value`` que no es un string nunca cuentan como repetidos.
+        """
+        if not isinstance(payload, dict):
+            return False
+        ctl = payload.get("ctl")
+        value = payload.get("value")
+        if ctl is None or value.__class__ is not str:
+            return False
+        if self._last_values.get(ctl) == value:
+            self.duplicates += 1
+            return True
+        self._last_values[ctl] = value
+        return False
+
+
 def parse_feedback_payload(payload):
     """Normaliza el payload del topic ``.../usr/{aws_mqtt_user}/feedback``.
 
@@ -215,7 +523,7 @@ def parse_feedback_payload(payload):
     ctl = payload.get("ctl")
 
     if order_id is None or ctl is None:
-        nested = parse_status_value(payload.get("value", ""))
+        nested = _shared_status_value(payload.get("value", ""))
         if order_id is None:
             order_id = nested.get("orderId")
         if ctl is None:
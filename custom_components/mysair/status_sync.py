@@ -0,0 +1,218 @@
+"""Sync de status de respaldo adaptativo, por instalación.
+
+Antes ``refresh_status_periodic`` (``__init__.py``) enviaba un
+``status``/``sync`` a todas las instalaciones cada 120 s, llegaran o no
+status por MQTT. Cada sync hace que el backend publique el status completo de
+todas las zonas, que recorre entero el pipeline (parseo, coordinador,
+entidades) aunque ya se tuviera ese mismo dato.
+
+Ahora `StatusSyncScheduler` revisa cada instalación cada
+``STATUS_SYNC_INTERVAL_SECONDS`` y solo pide el sync cuando hace falta:
+
+- Con MQTT desconectado no se pide: nadie recibiría la respuesta.
+- Si la zona de la instalación que lleva más tiempo sin status lo recibió
+  hace menos de ``STATUS_SYNC_MAX_AGE_SECONDS``
+  (``MySairCoordinator.installation_status_age``), el dato es reciente y se
+  omite. Con MQTT sano esto espacia los syncs de una instalación sin cambios
+  a uno cada dos intervalos, y los suprime mientras lleguen status
+  espontáneos.
+- Al completarse una (re)conexión (CONNACK, ``connection_callback`` del
+  cliente MQTT) se sincronizan todas en el acto: lo que cambió con la
+  conexión caída se recupera enseguida en vez de esperar al siguiente tick.
+
+Envío concurrente: antes las instalaciones se sincronizaban una tras otra y
+el siguiente ciclo se contaba desde el final del anterior, así que una
+instalación lenta (timeout HTTP de 10 s) retrasaba a las demás y el ritmo se
+desplazaba. Ahora cada instalación sale en su propia tarea, con como mucho
+``max_concurrency`` peticiones en vuelo (opción ``sync_concurrency``), su
+propio timeout (``STATUS_SYNC_TIMEOUT_SECONDS``) y sus propios contadores de
+errores. Los ticks van anclados al anterior (de inicio a inicio): la
+duración de una ronda no desplaza la siguiente.
+
+Los contadores (``stats()``, en diagnostics) dan el ritmo real de syncs y
+cuántos se han evitado respecto al sync fijo, en total y por instalación.
+"""
+
+import asyncio
+import logging
+import time
+
+import homeassistant.util.dt as dt_util
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_at
+
+from .const import (
+    STATUS_SYNC_INTERVAL_SECONDS,
+    STATUS_SYNC_MAX_AGE_SECONDS,
+    STATUS_SYNC_MAX_CONCURRENCY,
+    STATUS_SYNC_TIMEOUT_SECONDS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class StatusSyncScheduler:
+    """Decide, por instalación, cuándo pedir un ``status``/``sync`` de respaldo."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        api,
+        coordinator,
+        installation_refs: list,
+        mqtt_client,
+        max_concurrency: int = STATUS_SYNC_MAX_CONCURRENCY,
+    ) -> None:
+        self.hass = hass
+        self.api = api
+        self.coordinator = coordinator
+        self.installation_refs = list(installation_refs)
+        self.mqtt_client = mqtt_client
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._running = False
+        self._cancel_timer = None
+        self._next_run = None  # loop.time() del próximo tick
+        self._tasks = {}  # ref -> tarea de sync en vuelo
+        self._started_at = None
+        # Contadores para diagnostics: totales y por instalación.
+        self.syncs_sent = 0
+        self.syncs_avoided = 0
+        self.sync_errors = 0
+        self._installations = {
+            ref: {
+                "syncs_sent": 0,
+                "sync_errors": 0,
+                "sync_timeouts": 0,
+                "last_error": None,
+                "last_sync_seconds": None,
+            }
+            for ref in self.installation_refs
+        }
+
+    def start(self) -> None:
+        """Arma la revisión periódica (requiere sesión válida, como el MQTT)."""
+        self._running = True
+        self._started_at = dt_util.utcnow()
+        self._next_run = self.hass.loop.time() + STATUS_SYNC_INTERVAL_SECONDS
+        self._schedule_next()
+        if self.mqtt_client.connected:
+            self._request_sync(self.installation_refs)
+
+    def stop(self) -> None:
+        """Cancela la revisión periódica y los syncs en curso (descarga de la entrada)."""
+        self._running = False
+        if self._cancel_timer:
+            self._cancel_timer()
+            self._cancel_timer = None
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+
+    def _schedule_next(self) -> None:
+        self._cancel_timer = async_call_at(self.hass, self._on_interval, self._next_run)
+
+    @callback
+    def async_handle_connection(self, connected: bool) -> None:
+        """Cambio de estado de la conexión MQTT (``connection_callback``)."""
+        if not connected:
+            _LOGGER.debug(
+                "[MySair Sync] 🔌 MQTT desconectado: sin syncs hasta que vuelva"
+            )
+            return
+        _LOGGER.debug("[MySair Sync] 🔗 MQTT conectado: sync inmediato de todas")
+        self._request_sync(self.installation_refs)
+
+    @callback
+    def _on_interval(self, _now) -> None:
+        # El siguiente tick se ancla al anterior, no a este momento ni al
+        # final de los syncs: sin deriva. Si el loop se retrasó más de un
+        # intervalo, se salta al siguiente hueco en vez de encadenar ticks.
+        now = self.hass.loop.time()
+        self._next_run += STATUS_SYNC_INTERVAL_SECONDS
+        while self._next_run <= now:
+            self._next_run += STATUS_SYNC_INTERVAL_SECONDS
+        self._schedule_next()
+
+        if not self.mqtt_client.connected:
+            self.syncs_avoided += len(self.installation_refs)
+            return
+        due = []
+        for ref in self.installation_refs:
+            age = self.coordinator.installation_status_age(ref)
+            if age is not None and age < STATUS_SYNC_MAX_AGE_SECONDS:
+                self.syncs_avoided += 1
+                _LOGGER.debug(
+                    f"[MySair Sync] ⏭️ {ref}: status de hace {age:.0f}s, sync omitido"
+                )
+            else:
+                due.append(ref)
+        if due:
+            self._request_sync(due)
+
+    def _request_sync(self, refs) -> None:
+        if not self._running:
+            return
+        for ref in refs:
+            if ref in self._tasks:
+                continue  # ya hay un sync de esta instalación en vuelo
+            task = self.hass.async_create_background_task(
+                self._async_sync(ref), name=f"mysair_status_sync_{ref}"
+            )
+            # Con eager_start el sync puede haber terminado ya (sin ceder el loop).
+            if not task.done():
+                self._tasks[ref] = task
+
+    async def _async_sync(self, ref) -> None:
+        stats = self._installations[ref]
+        try:
+            async with self._semaphore:
+                started = time.monotonic()
+                try:
+                    async with asyncio.timeout(STATUS_SYNC_TIMEOUT_SECONDS):
+                        await self.api.async_send_installation_command(ref, "status")
+                except TimeoutError:
+                    self.sync_errors += 1
+                    stats["sync_errors"] += 1
+                    stats["sync_timeouts"] += 1
+                    stats["last_error"] = f"timeout ({STATUS_SYNC_TIMEOUT_SECONDS}s)"
+                    _LOGGER.warning(
+                        f"[MySair] ⚠️ Sin respuesta a la instrucción de estado de "
+                        f"{ref} en {STATUS_SYNC_TIMEOUT_SECONDS}s"
+                    )
+                    return
+                except Exception as e:
+                    self.sync_errors += 1
+                    stats["sync_errors"] += 1
+                    stats["last_error"] = str(e)
+                    _LOGGER.warning(
+                        f"[MySair] ⚠️ Error al enviar instrucción de estado a {ref}: {e}"
+                    )
+                    return
+                self.syncs_sent += 1
+                stats["syncs_sent"] += 1
+                stats["last_sync_seconds"] = round(time.monotonic() - started, 3)
+                _LOGGER.debug(
+                    f"[MySair] 🔁 Solicitud de estado enviada a instalación {ref}"
+                )
+        finally:
+            self._tasks.pop(ref, None)
+
+    def stats(self) -> dict:
+        """Ritmo de syncs, syncs evitados y errores, también por instalación (diagnostics).
+
+        ``sync_errors`` incluye los timeouts; ``sync_timeouts`` los cuenta aparte.
+        """
+        syncs_per_hour = None
+        if self._started_at is not None:
+            elapsed = (dt_util.utcnow() - self._started_at).total_seconds()
+            if elapsed > 0:
+                syncs_per_hour = round(self.syncs_sent * 3600 / elapsed, 1)
+        return {
+            "syncs_sent": self.syncs_sent,
+            "syncs_avoided": self.syncs_avoided,
+            "sync_errors": self.sync_errors,
+            "syncs_per_hour": syncs_per_hour,
+            "installations": {
+                ref: dict(stats) for ref, stats in self._installations.items()
+            },
+        }
@@ -1,4 +1,6 @@
 import logging
+from functools import partial
+
 from homeassistant.components.switch import SwitchEntity
 from homeassistant.core import callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
@@ -6,18 +8,17 @@ from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from .availability import AvailabilityMixin
 from .command_feedback import CommandFeedbackMixin
 from .const import DOMAIN
-from .coordinator import signal_zone_update
+from .coordinator import signal_zone_update, signal_zones_added
 from .status_parser import compute_mode_value
 
 _LOGGER = logging.getLogger(__name__)
 
 
-async def async_setup_entry(hass, entry, async_add_entities):
-    """Configura los switches de MySair (encendido/apagado por zona)."""
-    data = hass.data[DOMAIN][entry.entry_id]
+def _zone_entities(hass, data, devices):
+    """Switches de las zonas de ``devices`` (``{inst_ref: [dispositivos]}``)."""
     api = data["api"]
     mqtt_client = data["mqtt"]
-    devices = data["devices"]
+    coordinator = data["coordinator"]
 
     entities = []
     for inst_ref, device_list in devices.items():
@@ -26,24 +27,53 @@ async def async_setup_entry(hass, entry, async_add_entities):
             name = dev.get("name", f"Zona {dev_id} (Power)")
             zone_name = dev.get("name", f"Zona {dev_id}")
             entities.append(
-                MySairSwitch(hass, api, mqtt_client, inst_ref, dev_id, name)
+                MySairSwitch(
+                    hass, api, mqtt_client, coordinator, inst_ref, dev_id, name
+                )
             )
             entities.append(
                 MySairFloorSwitch(
-                    hass, api, mqtt_client, inst_ref, dev_id, f"{zone_name} Suelo"
+                    hass,
+                    api,
+                    mqtt_client,
+                    coordinator,
+                    inst_ref,
+                    dev_id,
+                    f"{zone_name} Suelo",
                 )
             )
+    return entities
+
 
+async def async_setup_entry(hass, entry, async_add_entities):
+    """Configura los switches de MySair (encendido/apagado por zona)."""
+    data = hass.data[DOMAIN][entry.entry_id]
+
+    entities = _zone_entities(hass, data, data["devices"])
     async_add_entities(entities)
     _LOGGER.info(f"[MySair Switch] ✅ {len(entities)} switches creados.")
 
+    @callback
+    def _async_add_zones(devices):
+        """Zonas nuevas tras revalidar la topología cacheada (ver __init__.py)."""
+        new_entities = _zone_entities(hass, data, devices)
+        async_add_entities(new_entities)
+        _LOGGER.info(f"[MySair Switch] ➕ {len(new_entities)} switches añadidos.")
+
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, signal_zones_added(entry.entry_id), _async_add_zones
+        )
+    )
+
 
 class MySairSwitch(CommandFeedbackMixin, AvailabilityMixin, SwitchEntity):
     """Entidad Switch para encender o apagar cada termostato MySair."""
 
     _attr_icon = "mdi:power"
+    _zone_fields = frozenset({"is_on"})
 
-    def __init__(self, hass, api, mqtt_client, inst_ref, device_id, name):
+    def __init__(self, hass, api, mqtt_client, coordinator, inst_ref, device_id, name):
         self.hass = hass
         self.api = api
         self.mqtt_client = mqtt_client
@@ -56,8 +86,8 @@ class MySairSwitch(CommandFeedbackMixin, AvailabilityMixin, SwitchEntity):
         # Por defecto calor (encender NUNCA debe forzar frío). Ver docs/protocol-findings.md.
         self._last_ac_mode = "0"
         self._unsub = None
-        self._init_command_feedback()
-        self._init_availability()
+        self._init_command_feedback(coordinator.feedback, coordinator.commands)
+        self._init_availability(coordinator)
 
     @property
     def device_info(self):
@@ -75,25 +105,30 @@ class MySairSwitch(CommandFeedbackMixin, AvailabilityMixin, SwitchEntity):
 
     async def async_turn_on(self, **kwargs):
         previous_is_on = self._is_on
+
+        def _revert(previous=previous_is_on):
+            self._is_on = previous
+
         try:
             # Encender = enviar comando 'mode' (no existe power "1"). Preservamos el
             # último modo calor/frío conocido; por defecto calor. Ver docs/protocol-findings.md.
             _LOGGER.debug(
                 f"[MySair Switch] 🔛 Encendiendo {self.name} (modo {self._last_ac_mode})"
             )
-            response = await self.hass.async_add_executor_job(
-                self.api.send_zone_command,
-                self.inst_ref,
-                self.device_id,
+            sent = await self._async_send_command(
                 "mode",
-                self._last_ac_mode,
-                22.0,
+                partial(
+                    self.api.async_send_zone_command,
+                    self.inst_ref,
+                    self.device_id,
+                    "mode",
+                    self._last_ac_mode,
+                    22.0,
+                ),
+                revert_fn=_revert,
             )
-
-            def _revert(previous=previous_is_on):
-                self._is_on = previous
-
-            self._track_command_confirmation(response, revert_fn=_revert)
+            if not sent:
+                return
             self._is_on = True
             self.async_write_ha_state()
         except Exception as e:
@@ -101,16 +136,24 @@ class MySairSwitch(CommandFeedbackMixin, AvailabilityMixin, SwitchEntity):
 
     async def async_turn_off(self, **kwargs):
         previous_is_on = self._is_on
+
+        def _revert(previous=previous_is_on):
+            self._is_on = previous
+
         try:
             _LOGGER.debug(f"[MySair Switch] ⛔ Apagando {self.name}")
-            response = await self.hass.async_add_executor_job(
-                self.api.send_zone_command, self.inst_ref, self.device_id, "power"
+            sent = await self._async_send_command(
+                "mode",
+                partial(
+                    self.api.async_send_zone_command,
+                    self.inst_ref,
+                    self.device_id,
+                    "power",
+                ),
+                revert_fn=_revert,
             )
-
-            def _revert(previous=previous_is_on):
-                self._is_on = previous
-
-            self._track_command_confirmation(response, revert_fn=_revert)
+            if not sent:
+                return
             self._is_on = False
             self.async_write_ha_state()
         except Exception as e:
@@ -122,27 +165,26 @@ class MySairSwitch(CommandFeedbackMixin, AvailabilityMixin, SwitchEntity):
             signal_zone_update(self.inst_ref, self.device_id),
             self._handle_zone_update,
         )
-        self._start_feedback_listener()
+        self._start_availability()
 
     async def async_will_remove_from_hass(self):
         if self._unsub:
             self._unsub()
             self._unsub = None
-        self._stop_feedback_listener()
+        self._stop_command_feedback()
         self._stop_availability()
 
     @callback
-    def _handle_zone_update(self, zone):
-        self._mark_status_received()
+    def _handle_zone_update(self, zone, changed):
         self._clear_pending_command()
-        self._is_on = bool(zone.get("is_on"))
+        self._is_on = bool(zone.is_on)
         # Recordar el modo AC (calor/frío) para preservarlo al reencender.
-        if zone.get("is_ac") and zone.get("mode_raw") in ("0", "1"):
-            self._last_ac_mode = zone.get("mode_raw")
+        if zone.is_ac and zone.mode_raw in ("0", "1"):
+            self._last_ac_mode = zone.mode_raw
         _LOGGER.debug(
             f"[MySair Switch] 🔄 Estado {self.name}: {'ON' if self._is_on else 'OFF'}"
         )
-        self.async_write_ha_state()
+        self._async_write_zone_state(changed)
 
 
 class MySairFloorSwitch(CommandFeedbackMixin, AvailabilityMixin, SwitchEntity):
@@ -155,8 +197,9 @@ class MySairFloorSwitch(CommandFeedbackMixin, AvailabilityMixin, SwitchEntity):
     """
 
     _attr_icon = "mdi:heat-wave"
+    _zone_fields = frozenset({"is_floor", "allow_floor"})
 
-    def __init__(self, hass, api, mqtt_client, inst_ref, device_id, name):
+    def __init__(self, hass, api, mqtt_client, coordinator, inst_ref, device_id, name):
         self.hass = hass
         self.api = api
         self.mqtt_client = mqtt_client
@@ -171,8 +214,8 @@ class MySairFloorSwitch(CommandFeedbackMixin, AvailabilityMixin, SwitchEntity):
         self._current_is_ac = True
         self._current_temp_target = 22.0
         self._unsub = None
-        self._init_command_feedback()
-        self._init_availability()
+        self._init_command_feedback(coordinator.feedback, coordinator.commands)
+        self._init_availability(coordinator)
 
     @property
     def device_info(self):
@@ -204,6 +247,10 @@ class MySairFloorSwitch(CommandFeedbackMixin, AvailabilityMixin, SwitchEntity):
 
     async def _async_set_floor(self, floor_on):
         previous_is_on = self._is_on
+
+        def _revert(previous=previous_is_on):
+            self._is_on = previous
+
         try:
             new_mode = compute_mode_value(
                 self._current_is_heat, self._current_is_ac, floor_on
@@ -211,19 +258,20 @@ class MySairFloorSwitch(CommandFeedbackMixin, AvailabilityMixin, SwitchEntity):
             _LOGGER.debug(
                 f"[MySair Switch] 🌡️ Cambiando suelo a {'ON' if floor_on else 'OFF'} en {self.name} (m={new_mode})"
             )
-            response = await self.hass.async_add_executor_job(
-                self.api.send_zone_command,
-                self.inst_ref,
-                self.device_id,
+            sent = await self._async_send_command(
                 "mode",
-                new_mode,
-                self._current_temp_target,
+                partial(
+                    self.api.async_send_zone_command,
+                    self.inst_ref,
+                    self.device_id,
+                    "mode",
+                    new_mode,
+                    self._current_temp_target,
+                ),
+                revert_fn=_revert,
             )
-
-            def _revert(previous=previous_is_on):
-                self._is_on = previous
-
-            self._track_command_confirmation(response, revert_fn=_revert)
+            if not sent:
+                return
             self._is_on = floor_on
             self.async_write_ha_state()
         except Exception as e:
@@ -237,28 +285,27 @@ class MySairFloorSwitch(CommandFeedbackMixin, AvailabilityMixin, SwitchEntity):
             signal_zone_update(self.inst_ref, self.device_id),
             self._handle_zone_update,
         )
-        self._start_feedback_listener()
+        self._start_availability()
 
     async def async_will_remove_from_hass(self):
         if self._unsub:
             self._unsub()
             self._unsub = None
-        self._stop_feedback_listener()
+        self._stop_command_feedback()
         self._stop_availability()
 
     @callback
-    def _handle_zone_update(self, zone):
-        self._mark_status_received()
+    def _handle_zone_update(self, zone, changed):
         self._clear_pending_command()
-        self._allow_floor = bool(zone.get("allow_floor"))
-        self._is_on = bool(zone.get("is_floor"))
-        if zone.get("is_heat") is not None:
-            self._current_is_heat = bool(zone.get("is_heat"))
-        if zone.get("is_ac") is not None:
-            self._current_is_ac = bool(zone.get("is_ac"))
-        if zone.get("temp_target") is not None:
-            self._current_temp_target = zone.get("temp_target")
+        self._allow_floor = bool(zone.allow_floor)
+        self._is_on = bool(zone.is_floor)
+        if zone.is_heat is not None:
+            self._current_is_heat = bool(zone.is_heat)
+        if zone.is_ac is not None:
+            self._current_is_ac = bool(zone.is_ac)
+        if zone.temp_target is not None:
+            self._current_temp_target = zone.temp_target
         _LOGGER.debug(
             f"[MySair Switch] 🔄 Suelo {self.name}: {'ON' if self._is_on else 'OFF'}"
         )
-        self.async_write_ha_state()
+        self._async_write_zone_state(changed)
@@ -0,0 +1,194 @@
+"""Benchmark: latencia de comandos y ocupación del executor, sync vs async.
+
+Lanza un servidor HTTP local (aiohttp) que imita ``/send/instruction`` con un
+retardo artificial y envía N comandos de zona concurrentes por dos caminos:
+
+- ``MySairAPI.send_zone_command`` (``requests``) vía ``loop.run_in_executor``,
+  como hacían las entidades con ``hass.async_add_executor_job``.
+- ``MySairAsyncAPI.async_send_zone_command`` (aiohttp) con ``await`` directo.
+
+No es un test de pytest (no se recoge: no empieza por ``test_``). Uso:
+
+    python tests/benchmarks/bench_async_api.py [--commands 50] [--delay-ms 50]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "..",
+        "custom_components",
+        "mysair",
+    ),
+)
+
+from api import MySairAPI, MySairAsyncAPI  # noqa: E402
+
+# Tamaño del executor por defecto de Home Assistant en instalaciones pequeñas
+# (Raspberry Pi): es el recurso compartido por el que compiten los comandos.
+EXECUTOR_WORKERS = 8
+
+
+class _Occupancy:
+    """Cuenta hilos del executor ocupados (pico) y tiempo total hilo·segundo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.busy = 0
+        self.peak = 0
+        self.thread_seconds = 0.0
+
+    def wrap(self, fn):
+        def _inner(*args):
+            start = time.perf_counter()
+            with self._lock:
+                self.busy += 1
+                self.peak = max(self.peak, self.busy)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.busy -= 1
+                    self.thread_seconds += time.perf_counter() - start
+
+        return _inner
+
+
+def _start_server(delay):
+    """Arranca el servidor falso en un hilo propio; devuelve (base_url, stop)."""
+
+    async def _instruction(request):
+        await request.read()
+        await asyncio.sleep(delay)
+        return web.json_response({"msg": "Creado", "error": []}, status=201)
+
+    loop = asyncio.new_event_loop()
+    app = web.Application()
+    app.router.add_post("/send/instruction", _instruction)
+    runner = web.AppRunner(app, access_log=None)
+    ready = threading.Event()
+    state = {}
+
+    def _run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        loop.run_until_complete(site.start())
+        state["port"] = site._server.sockets[0].getsockname()[1]
+        ready.set()
+        loop.run_forever()
+        loop.run_until_complete(runner.cleanup())
+
+    thread = threading.Thread(target=_run, daemon=True)
+    thread.start()
+    ready.wait()
+
+    def _stop():
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+
+    return f"http://127.0.0.1:{state['port']}", _stop
+
+
+async def _timed(coro_factory):
+    start = time.perf_counter()
+    await coro_factory()
+    return time.perf_counter() - start
+
+
+async def _bench_sync(base_url, commands):
+    api = MySairAPI("bench@example.com")
+    api.base_url = base_url
+    api.access_token = "ACCESS"
+    occupancy = _Occupancy()
+    send = occupancy.wrap(api.send_zone_command)
+    loop = asyncio.get_running_loop()
+
+    with ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS) as executor:
+        start = time.perf_counter()
+        latencies = await asyncio.gather(
+            *(
+                _timed(
+                    lambda i=i: loop.run_in_executor(
+                        executor, send, "CTL", f"DEV_{i}", "temp", "22.5"
+                    )
+                )
+                for i in range(commands)
+            )
+        )
+        wall = time.perf_counter() - start
+    return latencies, wall, occupancy
+
+
+async def _bench_async(base_url, commands):
+    async with aiohttp.ClientSession() as websession:
+        api = MySairAsyncAPI("bench@example.com", websession)
+        api.base_url = base_url
+        api.access_token = "ACCESS"
+        start = time.perf_counter()
+        latencies = await asyncio.gather(
+            *(
+                _timed(
+                    lambda i=i: api.async_send_zone_command(
+                        "CTL", f"DEV_{i}", "temp", "22.5"
+                    )
+                )
+                for i in range(commands)
+            )
+        )
+        wall = time.perf_counter() - start
+    return latencies, wall
+
+
+def _report(name, latencies, wall, occupancy=None):
+    ordered = sorted(latencies)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(
+        f"{name:<6} total={wall * 1000:7.1f} ms  "
+        f"p50={statistics.median(ordered) * 1000:7.1f} ms  "
+        f"p95={p95 * 1000:7.1f} ms  max={ordered[-1] * 1000:7.1f} ms"
+    )
+    if occupancy is None:
+        print("       executor: 0 hilos ocupados, 0.0 hilo·s")
+    else:
+        print(
+            f"       executor: pico {occupancy.peak}/{EXECUTOR_WORKERS} hilos, "
+            f"{occupancy.thread_seconds:.2f} hilo·s"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=50)
+    parser.add_argument("--delay-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    base_url, stop = _start_server(args.delay_ms / 1000)
+    try:
+        print(
+            f"{args.commands} comandos concurrentes, "
+            f"retardo servidor {args.delay_ms:.0f} ms"
+        )
+        latencies, wall, occupancy = asyncio.run(_bench_sync(base_url, args.commands))
+        _report("sync", latencies, wall, occupancy)
+        latencies, wall = asyncio.run(_bench_async(base_url, args.commands))
+        _report("async", latencies, wall)
+    finally:
+        stop()
+
+
+if __name__ == "__main__":
+    main()
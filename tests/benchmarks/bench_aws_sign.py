@@ -0,0 +1,130 @@
+"""Benchmark: firma SigV4 de la URL MQTT (firmas/s).
+
+Compara ``AwsUrlSigner`` (clave de firma derivada cacheada por secreto, día,
+región y servicio; hash del payload vacío y partes fijas precalculados) con
+la implementación anterior de ``MySairAPI.aws_sign_url``, reproducida aquí
+tal cual (cadena HMAC completa en cada llamada).
+
+Antes de medir comprueba que las dos producen la misma URL con el reloj fijo
+de ``tests/test_aws_sign.py``.
+
+No es un test de pytest (no se recoge: no empieza por ``test_``). Uso:
+
+    python tests/benchmarks/bench_aws_sign.py [--signs 20000]
+"""
+
+import argparse
+import datetime
+import hashlib
+import hmac
+import os
+import sys
+import time
+import urllib.parse
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "..",
+        "custom_components",
+        "mysair",
+    ),
+)
+
+from api import AwsUrlSigner  # noqa: E402
+
+FIXED = datetime.datetime(2026, 7, 19, 10, 0, 0, tzinfo=datetime.timezone.utc)
+PARAMS = (
+    "test.iot.eu-west-1.amazonaws.com",
+    "eu-west-1",
+    "TESTKEYID",
+    "TESTSECRET",
+    "TESTTOKEN",
+)
+
+
+def _legacy_sign_url(host, region, access_key, secret_key, token, t):
+    """``aws_sign_url`` anterior, con la hora como parámetro."""
+    service = "iotdevicegateway"
+    algorithm = "AWS4-HMAC-SHA256"
+    amz_date = t.strftime("%Y%m%dT%H%M%SZ")
+    date_stamp = t.strftime("%Y%m%d")
+    credential_scope = f"{date_stamp}/{region}/{service}/aws4_request"
+
+    canonical_querystring = (
+        f"X-Amz-Algorithm={algorithm}&"
+        f"X-Amz-Credential={urllib.parse.quote_plus(access_key + '/' + credential_scope)}&"
+        f"X-Amz-Date={amz_date}&"
+        f"X-Amz-SignedHeaders=host"
+    )
+
+    canonical_headers = f"host:{host}\n"
+    payload_hash = hashlib.sha256(b"").hexdigest()
+    canonical_request = f"GET\n/mqtt\n{canonical_querystring}\n{canonical_headers}\nhost\n{payload_hash}"
+
+    string_to_sign = (
+        f"{algorithm}\n{amz_date}\n{credential_scope}\n"
+        f"{hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()}"
+    )
+
+    def sign(key, msg):
+        return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+    k_date = sign(("AWS4" + secret_key).encode("utf-8"), date_stamp)
+    k_region = sign(k_date, region)
+    k_service = sign(k_region, service)
+    k_signing = sign(k_service, "aws4_request")
+    signature = hmac.new(
+        k_signing, string_to_sign.encode("utf-8"), hashlib.sha256
+    ).hexdigest()
+
+    canonical_querystring += f"&X-Amz-Signature={signature}"
+    canonical_querystring += "&" + urllib.parse.urlencode(
+        {"X-Amz-Security-Token": token}
+    )
+    return f"wss://{host}/mqtt?{canonical_querystring}"
+
+
+def _time(fn, signs, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(signs):
+            fn(FIXED + datetime.timedelta(seconds=i % 3600))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--signs", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    signer = AwsUrlSigner()
+    for offset in (0, 1, 86400):
+        t = FIXED + datetime.timedelta(seconds=offset)
+        if signer.sign_url(*PARAMS, now=t) != _legacy_sign_url(*PARAMS, t):
+            raise SystemExit(f"URLs distintas para {t.isoformat()}")
+
+    print(f"{args.signs} firmas (mismo día, hora variable), mejor de {args.repeat}")
+    variants = (
+        ("antes", lambda t: _legacy_sign_url(*PARAMS, t)),
+        ("después", lambda t: signer.sign_url(*PARAMS, now=t)),
+    )
+    results = {}
+    for name, fn in variants:
+        elapsed = _time(fn, args.signs, args.repeat)
+        results[name] = elapsed
+        print(
+            f"{name:<8} {elapsed * 1e3:8.1f} ms  "
+            f"{elapsed / args.signs * 1e6:6.2f} µs/firma  "
+            f"{args.signs / elapsed:10.0f} firmas/s"
+        )
+    print(f"mejora  x{results['antes'] / results['después']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
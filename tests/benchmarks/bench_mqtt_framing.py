@@ -0,0 +1,155 @@
+"""Benchmark: capa de framing MQTT con 1000 PUBLISH coalescidos.
+
+Compara el buffer de recepción actual de ``MySairMQTTClient`` (``bytearray``
++ offset de lectura + rebanadas ``memoryview``) con la implementación
+anterior (``bytes`` concatenados y rebanados ``[:n]``/``[n:]`` por paquete,
+reproducida aquí tal cual), en dos escenarios:
+
+- ``1 mensaje``: los 1000 paquetes llegan en un único mensaje WS, como tras
+  un ``status/sync`` con muchas zonas (caso cuadrático de la versión vieja).
+- ``trozos``: el mismo flujo partido en mensajes WS de ``--chunk`` bytes,
+  con paquetes cortados a mitad.
+
+Para cada uno mide solo el framing (despacho que solo cuenta paquetes) y el
+camino completo (parseo del PUBLISH + JSON + callback).
+
+No es un test de pytest (no se recoge: no empieza por ``test_``). Uso:
+
+    python tests/benchmarks/bench_mqtt_framing.py [--packets 1000] [--payload 1500]
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "..",
+        "custom_components",
+        "mysair",
+    ),
+)
+
+from mqtt_handler import (  # noqa: E402
+    MAX_RECV_BUFFER_SIZE,
+    FrameState,
+    MySairMQTTClient,
+    _next_packet_length,
+    encode_varint,
+)
+
+
+class _LegacyClient(MySairMQTTClient):
+    """Buffer de recepción anterior: ``bytes`` con copia por paquete."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._recv_buffer = b""
+
+    def _on_message(self, ws, message):
+        self._recv_buffer += message
+        self._drain_recv_buffer(ws)
+
+    def _drain_recv_buffer(self, ws):
+        while True:
+            result = _next_packet_length(self._recv_buffer)
+            if result is FrameState.INCOMPLETE:
+                return
+            if result is FrameState.MALFORMED or result > MAX_RECV_BUFFER_SIZE:
+                self._recv_buffer = b""
+                return
+            if len(self._recv_buffer) < result:
+                return
+            packet, rest = self._recv_buffer[:result], self._recv_buffer[result:]
+            if not self._dispatch_packet(ws, packet):
+                self._dispatch_legacy_fallback(None, self._recv_buffer)
+                self._recv_buffer = b""
+                return
+            self._recv_buffer = rest
+
+
+def _counting(cls):
+    """Variante de ``cls`` cuyo despacho solo cuenta paquetes (framing puro)."""
+
+    class _Counting(cls):
+        def _dispatch_packet(self, ws, packet):
+            self.parse_strict_count += 1
+            return True
+
+    return _Counting
+
+
+def _publish_frame(topic, payload):
+    topic_bytes = topic.encode("utf-8")
+    remaining = struct.pack("!H", len(topic_bytes)) + topic_bytes + payload
+    return b"\x30" + encode_varint(len(remaining)) + remaining
+
+
+def _stream(packets, payload_size):
+    frames = []
+    for i in range(packets):
+        body = {"ctl": f"MYS{i:013d}", "n": i, "value": ""}
+        body["value"] = "x" * max(payload_size - len(json.dumps(body)), 0)
+        frames.append(
+            _publish_frame(
+                f"pro/v1/get/ctl/MYS{i:013d}/status", json.dumps(body).encode()
+            )
+        )
+    return b"".join(frames)
+
+
+def _run(cls, messages, packets, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        received = []
+        client = cls(api=None, installation_refs=[], message_callback=received.append)
+        start = time.perf_counter()
+        for message in messages:
+            client._on_message(None, message)
+        best = min(best, time.perf_counter() - start)
+        count = client.parse_strict_count
+        if count != packets:
+            raise SystemExit(f"{cls.__name__}: {count}/{packets} paquetes despachados")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--packets", type=int, default=1000)
+    parser.add_argument("--payload", type=int, default=1500, help="bytes por PUBLISH")
+    parser.add_argument("--chunk", type=int, default=4096, help="bytes por mensaje WS")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    stream = _stream(args.packets, args.payload)
+    scenarios = {
+        "1 mensaje": [stream],
+        "trozos": [
+            stream[i : i + args.chunk] for i in range(0, len(stream), args.chunk)
+        ],
+    }
+    print(
+        f"{args.packets} PUBLISH de ~{args.payload} B ({len(stream) / 1024:.0f} KiB), "
+        f"mejor de {args.repeat}"
+    )
+    for name, messages in scenarios.items():
+        for label, legacy, current in (
+            ("framing", _counting(_LegacyClient), _counting(MySairMQTTClient)),
+            ("completo", _LegacyClient, MySairMQTTClient),
+        ):
+            old = _run(legacy, messages, args.packets, args.repeat)
+            new = _run(current, messages, args.packets, args.repeat)
+            print(
+                f"{name:<10} {label:<9} bytes={old * 1000:8.2f} ms  "
+                f"bytearray={new * 1000:8.2f} ms  x{old / new:5.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Benchmark: filas y bytes que los status MQTT añaden a la base del recorder.
+
+Simula una hora de tráfico de una cuenta con ``--zones`` zonas: el sync
+periódico (un ``status`` completo cada ``--sync-seconds``) más ``--pushes``
+mensajes ``status`` espontáneos por hora (cambios de consigna, temperatura…),
+con las temperaturas variando entre mensajes. Cada mensaje se normaliza con
+``parse_status_payload`` y se inserta como lo haría el recorder de Home
+Assistant con un evento ``mysair_update`` (esquema aproximado: ``events`` +
+``event_data`` deduplicado por hash de ``shared_data``, en SQLite).
+
+Compara:
+
+- ``antes``: un evento de bus por mensaje ``status`` (el comportamiento previo).
+- ``después``: el status va directo al coordinador; sin eventos salvo con la
+  opción ``bus_events`` activada (equivale a ``antes``).
+
+No es un test de pytest (no se recoge: no empieza por ``test_``). Uso:
+
+    python tests/benchmarks/bench_recorder_events.py [--zones 20] [--pushes 120]
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import zlib
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "..",
+        "custom_components",
+        "mysair",
+    ),
+)
+
+from status_parser import parse_status_payload  # noqa: E402
+
+_SCHEMA = """
+CREATE TABLE event_types (
+    event_type_id INTEGER PRIMARY KEY,
+    event_type VARCHAR(64) UNIQUE
+);
+CREATE TABLE event_data (
+    data_id INTEGER PRIMARY KEY,
+    hash BIGINT,
+    shared_data TEXT
+);
+CREATE INDEX ix_event_data_hash ON event_data (hash);
+CREATE TABLE events (
+    event_id INTEGER PRIMARY KEY,
+    event_type_id INTEGER REFERENCES event_types (event_type_id),
+    origin_idx SMALLINT,
+    time_fired_ts FLOAT,
+    context_id_bin BLOB(16),
+    context_user_id_bin BLOB(16),
+    context_parent_id_bin BLOB(16),
+    data_id INTEGER REFERENCES event_data (data_id)
+);
+CREATE INDEX ix_events_time_fired_ts ON events (time_fired_ts);
+CREATE INDEX ix_events_event_type_id_time_fired_ts ON events (event_type_id, time_fired_ts);
+CREATE INDEX ix_events_context_id_bin ON events (context_id_bin);
+CREATE INDEX ix_events_data_id ON events (data_id);
+"""
+
+
+def _raw_status(rng, zones):
+    zone_list = [
+        {
+            "rf": f"MYS{i:013d}",
+            "n": f"Zona {i}",
+            "e": "1",
+            "m": "0",
+            "tr": f"{21 + rng.random() * 2:.1f}",
+            "tc": "22",
+            "tmm": "16",
+            "tmx": "30",
+            "hum": str(rng.randint(40, 55)),
+            "vv": "2",
+            "c": "1",
+            "f": "1",
+            "v": "1",
+            "s": "0",
+        }
+        for i in range(zones)
+    ]
+    return {"ctl": "MYS94B97E0C9177FB6", "value": json.dumps({"t": zone_list}) + ";"}
+
+
+def _messages(zones, sync_seconds, pushes, seed):
+    """Marcas de tiempo (s) y payloads de una hora de ``status``."""
+    rng = random.Random(seed)
+    stamps = list(range(0, 3600, sync_seconds))
+    stamps += [rng.uniform(0, 3600) for _ in range(pushes)]
+    for stamp in sorted(stamps):
+        yield stamp, _raw_status(rng, zones)
+
+
+def _db_bytes(conn):
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    return pages * conn.execute("PRAGMA page_size").fetchone()[0]
+
+
+def _record(conn, events):
+    """Inserta ``events`` como el recorder: devuelve (filas, bytes añadidos)."""
+    conn.execute("INSERT INTO event_types (event_type) VALUES ('mysair_update')")
+    conn.commit()
+    before = _db_bytes(conn)
+    rows = 0
+    for stamp, event_data in events:
+        shared = json.dumps(event_data, separators=(",", ":"))
+        data_hash = zlib.crc32(shared.encode())
+        found = conn.execute(
+            "SELECT data_id FROM event_data WHERE hash = ? AND shared_data = ?",
+            (data_hash, shared),
+        ).fetchone()
+        if found is None:
+            data_id = conn.execute(
+                "INSERT INTO event_data (hash, shared_data) VALUES (?, ?)",
+                (data_hash, shared),
+            ).lastrowid
+            rows += 1
+        else:
+            data_id = found[0]
+        conn.execute(
+            "INSERT INTO events (event_type_id, origin_idx, time_fired_ts, "
+            "context_id_bin, data_id) VALUES (1, 0, ?, ?, ?)",
+            (stamp, os.urandom(16), data_id),
+        )
+        rows += 1
+    conn.commit()
+    return rows, _db_bytes(conn) - before
+
+
+def _run(events):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "home-assistant_v2.db"))
+        conn.executescript(_SCHEMA)
+        try:
+            return _record(conn, events)
+        finally:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--zones", type=int, default=20)
+    parser.add_argument("--sync-seconds", type=int, default=120)
+    parser.add_argument("--pushes", type=int, default=120, help="status extra por hora")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    topic = "pro/v1/get/ctl/MYS94B97E0C9177FB6/status"
+    start = time.time()
+    bus_events = [
+        (start + stamp, {"topic": topic, "data": parse_status_payload(payload)})
+        for stamp, payload in _messages(
+            args.zones, args.sync_seconds, args.pushes, args.seed
+        )
+    ]
+    print(
+        f"1 hora, {args.zones} zonas: {len(bus_events)} mensajes status "
+        f"(sync cada {args.sync_seconds} s + {args.pushes} espontáneos)"
+    )
+    for name, events in (
+        ("antes", bus_events),
+        ("después", []),
+        ("bus_events", bus_events),
+    ):
+        rows, size = _run(events)
+        print(
+            f"{name:<10} eventos={len(events):5d}  filas={rows:5d}  "
+            f"bytes={size / 1024:8.1f} KiB/h  ({size * 24 / 1024 / 1024:6.1f} MiB/día)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Benchmark: timers del event loop para la caducidad de zonas (200 zonas).
+
+Simula ``--syncs`` status completos de ``--zones`` zonas, como el sync
+periódico, y mide el trabajo del loop para vigilar la caducidad en dos
+variantes, reproducidas aquí sin Home Assistant:
+
+- ``antes``: cada entidad (``--entities`` por zona) cancela su timer y arma
+  otro (``loop.call_later``) con cada status, como hacía ``AvailabilityMixin``.
+- ``después``: un ``OrderedDict`` por config entry con la hora del último
+  status de cada zona y un único timer para la primera que caducará, como
+  ``MySairCoordinator``.
+
+Informa de timers creados y cancelados, tamaño final de la cola de timers del
+loop (los cancelados siguen ocupando sitio hasta que el loop los purga) y
+tiempo por sync.
+
+No es un test de pytest (no se recoge: no empieza por ``test_``). Uso:
+
+    python tests/benchmarks/bench_stale_timers.py [--zones 200] [--syncs 30]
+"""
+
+import argparse
+import asyncio
+import time
+from collections import OrderedDict
+
+STALE_AFTER_SECONDS = 360
+
+
+class _Counters:
+    def __init__(self):
+        self.created = 0
+        self.cancelled = 0
+
+
+class _PerEntityTimers:
+    """Un timer por entidad, reprogramado con cada status (variante anterior)."""
+
+    def __init__(self, loop, zones, entities, counters):
+        self._loop = loop
+        self._counters = counters
+        self._handles = {
+            (zone, entity): None for zone in range(zones) for entity in range(entities)
+        }
+
+    def _on_stale(self):
+        pass
+
+    def handle_status(self, zones):
+        for key, handle in self._handles.items():
+            if key[0] not in zones:
+                continue
+            if handle is not None:
+                handle.cancel()
+                self._counters.cancelled += 1
+            self._handles[key] = self._loop.call_later(
+                STALE_AFTER_SECONDS, self._on_stale
+            )
+            self._counters.created += 1
+
+
+class _SharedTimer:
+    """Frescura por zona en orden de llegada y un único timer (variante actual)."""
+
+    def __init__(self, loop, counters):
+        self._loop = loop
+        self._counters = counters
+        self._fresh = OrderedDict()
+        self._handle = None
+
+    def _schedule(self):
+        oldest = next(iter(self._fresh.values()))
+        delay = oldest + STALE_AFTER_SECONDS - self._loop.time()
+        self._handle = self._loop.call_later(max(delay, 0), self._on_stale)
+        self._counters.created += 1
+
+    def _on_stale(self):
+        self._handle = None
+        now = self._loop.time()
+        while self._fresh:
+            zone, received_at = next(iter(self._fresh.items()))
+            if now - received_at < STALE_AFTER_SECONDS:
+                break
+            del self._fresh[zone]
+        if self._fresh:
+            self._schedule()
+
+    def handle_status(self, zones):
+        now = self._loop.time()
+        for zone in zones:
+            self._fresh[zone] = now
+            self._fresh.move_to_end(zone)
+            if self._handle is None:
+                self._schedule()
+
+
+async def _run(factory, zones, syncs):
+    loop = asyncio.get_running_loop()
+    counters = _Counters()
+    tracker = factory(loop, counters)
+    all_zones = range(zones)
+    elapsed = 0.0
+    for _ in range(syncs):
+        start = time.perf_counter()
+        tracker.handle_status(all_zones)
+        elapsed += time.perf_counter() - start
+        await asyncio.sleep(0)
+    heap = len(loop._scheduled)
+    for handle in list(loop._scheduled):
+        handle.cancel()
+    return counters, heap, elapsed / syncs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--zones", type=int, default=200)
+    parser.add_argument("--entities", type=int, default=7, help="entidades por zona")
+    parser.add_argument("--syncs", type=int, default=30)
+    args = parser.parse_args()
+
+    print(
+        f"{args.zones} zonas × {args.entities} entidades, {args.syncs} syncs completos"
+    )
+    variants = (
+        (
+            "antes",
+            lambda loop, counters: _PerEntityTimers(
+                loop, args.zones, args.entities, counters
+            ),
+        ),
+        ("después", _SharedTimer),
+    )
+    for name, factory in variants:
+        counters, heap, per_sync = asyncio.run(_run(factory, args.zones, args.syncs))
+        print(
+            f"{name:<8} timers creados={counters.created:6d} "
+            f"({counters.created / args.syncs:6.1f}/sync)  "
+            f"cancelados={counters.cancelled:6d}  cola del loop={heap:5d}  "
+            f"{per_sync * 1e6:8.1f} µs/sync"
+        )
+
+
+if __name__ == "__main__":
+    main()
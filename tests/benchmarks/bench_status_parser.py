@@ -0,0 +1,139 @@
+"""Benchmark: throughput del parseo de PUBLISH ``status`` (mensajes/s).
+
+Mide un payload ``status`` ya delimitado por el framing, en dos columnas:
+``decode`` (del ``memoryview`` del payload al objeto exterior y al ``value``
+anidado, ``parse_status_value``) y ``completo`` (además la normalización por
+zona de ``parse_status_payload``). Compara:
+
+- ``antes``: el camino anterior, reproducido aquí — ``str`` con
+  ``errors="ignore"``, ``strip``, ``_extract_json`` (``find``/``rfind`` +
+  rebanada + ``json.loads``) y ``json`` estándar para el ``value``.
+- ``json``: camino rápido desde bytes con la librería estándar.
+- ``orjson``: camino rápido con ``orjson`` (si está instalado; Home
+  Assistant lo incluye).
+
+No es un test de pytest (no se recoge: no empieza por ``test_``). Uso:
+
+    python tests/benchmarks/bench_status_parser.py [--zones 8] [--messages 5000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "..",
+        "custom_components",
+        "mysair",
+    ),
+)
+
+import mqtt_handler  # noqa: E402
+import status_parser  # noqa: E402
+from mqtt_handler import _decode_publish_json, _extract_json  # noqa: E402
+from status_parser import parse_status_payload, parse_status_value  # noqa: E402
+
+
+def _status_payload(zones):
+    value = {
+        "t": [
+            {
+                "rf": f"Z{i}",
+                "n": f"Zona {i}",
+                "e": "1",
+                "m": "0",
+                "tr": "22.4",
+                "tc": "21.5",
+                "tmm": "16",
+                "tmx": "30",
+                "hum": "48",
+                "vv": "2",
+                "c": "1",
+                "f": "1",
+                "v": "1",
+                "s": "0",
+            }
+            for i in range(zones)
+        ]
+    }
+    outer = {"ctl": "MYS94B97E0C9177FB6", "value": json.dumps(value) + ";"}
+    return json.dumps(outer).encode()
+
+
+def _before_decode(payload):
+    decoded = str(payload, "utf-8", errors="ignore").strip()
+    data, _ = _extract_json(decoded)
+    return data
+
+
+def _after_decode(payload):
+    return _decode_publish_json(payload)
+
+
+def _nested(decode):
+    return lambda payload: parse_status_value(decode(payload)["value"])
+
+
+def _full(decode):
+    return lambda payload: parse_status_payload(decode(payload))
+
+
+def _measure(fn, view, messages, repeat, orjson_module):
+    """Mensajes/s del mejor de ``repeat`` pasadas (tras una de calentamiento)."""
+    mqtt_handler.orjson = status_parser.orjson = orjson_module
+    best = float("inf")
+    for _ in range(repeat + 1):
+        start = time.perf_counter()
+        for _ in range(messages):
+            fn(view)
+        best = min(best, time.perf_counter() - start)
+    return messages / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--zones", type=int, default=8)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # El mismo payload en cada mensaje: sin caché de value, que daría
+    # aciertos (la mide aparte bench_status_value_cache.py).
+    status_parser.STATUS_VALUE_CACHE.maxsize = 0
+    orjson_module = mqtt_handler.orjson
+    payload = bytearray(_status_payload(args.zones))
+    view = memoryview(payload)
+    assert _full(_before_decode)(view) == _full(_after_decode)(view)
+
+    print(
+        f"status de {args.zones} zonas ({len(payload)} B), "
+        f"{args.messages} mensajes, mejor de {args.repeat}"
+    )
+    variants = [("antes", _before_decode, None), ("json", _after_decode, None)]
+    if orjson_module is None:
+        print("(orjson no instalado)")
+    else:
+        variants.append(("orjson", _after_decode, orjson_module))
+
+    baseline = None
+    for name, decode, backend in variants:
+        rates = [
+            _measure(fn(decode), view, args.messages, args.repeat, backend)
+            for fn in (_nested, _full)
+        ]
+        baseline = baseline or rates
+        print(
+            f"{name:<7} decode={rates[0]:9.0f} msg/s (x{rates[0] / baseline[0]:4.2f})  "
+            f"completo={rates[1]:9.0f} msg/s (x{rates[1] / baseline[1]:4.2f})"
+        )
+    mqtt_handler.orjson = status_parser.orjson = orjson_module
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark: caché LRU del ``value`` anidado de ``status`` (µs/mensaje).
+
+Mide la decodificación del ``value`` sobre un flujo de mensajes que recorre
+``--distinct`` ``value`` distintos en ciclo (p. ej. varias instalaciones, o
+varias config entries que parsean el mismo status):
+
+- ``antes``: ``parse_status_value``, un ``loads`` por mensaje (lo que
+  llamaban los parsers).
+- ``después``: ``_shared_status_value``, con ``STATUS_VALUE_CACHE`` de
+  ``STATUS_VALUE_CACHE_SIZE`` entradas.
+
+Con ``--distinct`` por debajo del tamaño de la caché casi todo son aciertos;
+por encima, el ciclo expulsa cada entrada antes de volver a pedirla y todo
+son fallos: mide lo que cuesta la caché cuando no sirve.
+
+No es un test de pytest (no se recoge: no empieza por ``test_``). Uso:
+
+    python tests/benchmarks/bench_status_value_cache.py [--zones 8] [--distinct 4]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "..",
+        "custom_components",
+        "mysair",
+    ),
+)
+
+from status_parser import (  # noqa: E402
+    STATUS_VALUE_CACHE,
+    STATUS_VALUE_CACHE_SIZE,
+    _shared_status_value,
+    parse_status_value,
+)
+
+
+def _payload(index, zones):
+    value = {
+        "t": [
+            {
+                "rf": f"Z{i}",
+                "n": f"Zona {i}",
+                "e": "1",
+                "m": "0",
+                "tr": f"{20 + index / 100:.2f}",
+                "tc": "21.5",
+                "tmm": "16",
+                "tmx": "30",
+                "hum": "48",
+                "vv": "2",
+                "c": "1",
+                "f": "1",
+                "v": "1",
+                "s": "0",
+            }
+            for i in range(zones)
+        ]
+    }
+    return json.dumps(value) + ";"
+
+
+def _time(decode, stream, messages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        STATUS_VALUE_CACHE.clear()
+        start = time.perf_counter()
+        for i in range(messages):
+            decode(stream[i % len(stream)])
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--zones", type=int, default=8)
+    parser.add_argument("--distinct", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{args.zones} zonas/mensaje, {args.messages} mensajes, "
+        f"caché de {STATUS_VALUE_CACHE_SIZE}, mejor de {args.repeat}"
+    )
+    for distinct in sorted({args.distinct, STATUS_VALUE_CACHE_SIZE * 2}):
+        stream = [_payload(i, args.zones) for i in range(distinct)]
+        results = {}
+        for name, decode in (
+            ("antes", parse_status_value),
+            ("después", _shared_status_value),
+        ):
+            STATUS_VALUE_CACHE.hits = STATUS_VALUE_CACHE.misses = 0
+            elapsed = _time(decode, stream, args.messages, args.repeat)
+            results[name] = elapsed
+            lookups = STATUS_VALUE_CACHE.hits + STATUS_VALUE_CACHE.misses
+            hit_rate = STATUS_VALUE_CACHE.hits / lookups if lookups else 0
+            print(
+                f"{distinct:4d} distintos  {name:<8} "
+                f"{elapsed / args.messages * 1e6:6.2f} µs/mensaje  "
+                f"aciertos {hit_rate:6.1%}"
+            )
+        print(
+            f"{distinct:4d} distintos  mejora   x{results['antes'] / results['después']:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Benchmark: decodificación de zonas de ``status`` (zonas/s).
+
+Compara ``parse_status_payload`` (tablas precalculadas para ``m``, ``e`` y las
+capacidades; ``_to_float`` sin excepción cuando falta el campo) con el
+decodificador anterior, reproducido aquí tal cual: ``parse_mode`` con
+``int()``/``str()``/módulo, cuatro ``_to_str(...) == "1"`` y cinco
+``_to_float`` con ``try``/``except`` por zona.
+
+El ``value`` va ya decodificado, para medir solo la normalización de zonas
+(el decode JSON lo mide ``bench_status_parser.py``). Dos juegos de zonas:
+``completas`` (todos los campos, como en producción) y ``parciales`` (sin
+humedad ni límites, cada ``_to_float`` del camino anterior lanzaba).
+
+Antes de medir comprueba que los dos dan exactamente las mismas zonas, para
+esos juegos y para valores fuera de las tablas.
+
+No es un test de pytest (no se recoge: no empieza por ``test_``). Uso:
+
+    python tests/benchmarks/bench_zone_decode.py [--zones 8] [--messages 20000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "..",
+        "custom_components",
+        "mysair",
+    ),
+)
+
+from status_parser import (  # noqa: E402
+    ZoneState,
+    parse_status_payload,
+    parse_status_value,
+)
+
+
+def _legacy_to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _legacy_to_str(value):
+    return None if value is None else str(value)
+
+
+def _legacy_parse_mode(m):
+    if m is None:
+        return None, None, None, None, None
+    mode_raw = str(m)
+    try:
+        n = int(mode_raw)
+    except ValueError:
+        return mode_raw, None, None, None, None
+    is_heat = n % 2 == 0
+    return mode_raw, is_heat, not is_heat, n in (0, 1, 4, 5), n in (2, 3, 4, 5)
+
+
+def _legacy_parse(payload):
+    """``parse_status_payload`` anterior (mismas validaciones), sin los logs."""
+    if not isinstance(payload, dict):
+        return None
+    ctl_ref = payload.get("ctl")
+    t_list = parse_status_value(payload.get("value", "")).get("t", [])
+    if not isinstance(t_list, list):
+        t_list = []
+    zone_states = []
+    for t in t_list:
+        if not isinstance(t, dict):
+            continue
+        if t.get("rf") is None:
+            pass  # aquí va el warning de zona sin "rf"
+        power = _legacy_to_str(t.get("e", "0"))
+        mode_raw, is_heat, is_cool, is_ac, is_floor = _legacy_parse_mode(t.get("m"))
+        zone_states.append(
+            ZoneState(
+                ctl_ref,
+                t.get("rf"),
+                t.get("n"),
+                _legacy_to_float(t.get("tr")),
+                _legacy_to_float(t.get("tc")),
+                _legacy_to_float(t.get("tmm")),
+                _legacy_to_float(t.get("tmx")),
+                _legacy_to_float(t.get("hum", t.get("hm"))),
+                power,
+                power != "0",
+                power == "2",
+                mode_raw,
+                is_heat,
+                is_cool,
+                is_ac,
+                is_floor,
+                _legacy_to_str(t.get("vv")),
+                _legacy_to_str(t.get("c")) == "1",
+                _legacy_to_str(t.get("f")) == "1",
+                _legacy_to_str(t.get("v")) == "1",
+                _legacy_to_str(t.get("s")) == "1",
+            )
+        )
+    return {"ctl": ctl_ref, "zones": zone_states}
+
+
+def _zone(i, partial):
+    zone = {
+        "rf": f"Z{i}",
+        "n": f"Zona {i}",
+        "e": str(i % 3),
+        "m": str(i % 6),
+        "tr": "22.4",
+        "tc": "21.5",
+        "vv": "2",
+        "c": "1",
+        "f": str(i % 2),
+        "v": "1",
+        "s": "0",
+    }
+    if not partial:
+        zone.update({"tmm": "16", "tmx": "30", "hum": "48"})
+    return zone
+
+
+def _payload(zones):
+    return {"ctl": "MYS94B97E0C9177FB6", "value": {"t": zones}}
+
+
+# Valores fuera de las tablas: deben seguir el camino general.
+ODD_ZONES = [
+    {"rf": "A", "e": 1, "m": 3, "c": 1, "f": True, "v": None, "s": 1.0},
+    {"rf": "B", "e": None, "m": "03", "c": ["1"], "tr": "", "tc": "x"},
+    {"rf": "C", "e": "7", "m": " 4", "hum": None, "hm": "50", "tmx": True},
+    {"rf": "D", "m": "x", "hm": "45"},
+]
+
+
+def _time(parse, payload, messages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(messages):
+            parse(payload)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--zones", type=int, default=8)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sets = {
+        "completas": _payload([_zone(i, False) for i in range(args.zones)]),
+        "parciales": _payload([_zone(i, True) for i in range(args.zones)]),
+    }
+    for payload in (*sets.values(), _payload(ODD_ZONES)):
+        if parse_status_payload(payload) != _legacy_parse(payload):
+            raise SystemExit("El decodificador nuevo no coincide con el anterior")
+
+    print(
+        f"{args.zones} zonas/mensaje, {args.messages} mensajes, mejor de {args.repeat}"
+    )
+    for label, payload in sets.items():
+        results = {}
+        for name, parse in (
+            ("antes", _legacy_parse),
+            ("después", parse_status_payload),
+        ):
+            elapsed = _time(parse, payload, args.messages, args.repeat)
+            results[name] = elapsed
+            print(
+                f"{label:<10} {name:<8} "
+                f"{elapsed / (args.messages * args.zones) * 1e6:6.2f} µs/zona  "
+                f"{args.messages * args.zones / elapsed:10.0f} zonas/s"
+            )
+        print(f"{label:<10} mejora   x{results['antes'] / results['después']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
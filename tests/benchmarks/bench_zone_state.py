@@ -0,0 +1,170 @@
+"""Benchmark: memoria por zona y tiempo de parseo por mensaje ``status``.
+
+Compara ``ZoneState`` (``__slots__``, lo que devuelve ``parse_status_payload``)
+con la forma anterior de cada zona, un dict de 21 claves; el parser anterior
+se reproduce aquí tal cual (``_legacy_parse``), salvo que construye el dict.
+
+- memoria: ``tracemalloc`` sobre ``--keep`` zonas vivas a la vez (lo que
+  retiene el coordinador), en bytes por zona.
+- parseo: ``parse_status_payload`` completo sobre un payload con ``--zones``
+  zonas y el ``value`` ya decodificado, para aislar la construcción de zonas
+  del decode JSON (que mide ``bench_status_parser.py``).
+
+Antes de medir comprueba que las dos formas tienen los mismos campos y valores.
+
+No es un test de pytest (no se recoge: no empieza por ``test_``). Uso:
+
+    python tests/benchmarks/bench_zone_state.py [--zones 8] [--messages 20000]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "..",
+        "custom_components",
+        "mysair",
+    ),
+)
+
+from status_parser import (  # noqa: E402
+    _to_float,
+    _to_str,
+    parse_mode,
+    parse_status_payload,
+    parse_status_value,
+)
+
+
+def _payload(zones):
+    value = {
+        "t": [
+            {
+                "rf": f"Z{i}",
+                "n": f"Zona {i}",
+                "e": "1",
+                "m": "0",
+                "tr": "22.4",
+                "tc": "21.5",
+                "tmm": "16",
+                "tmx": "30",
+                "hum": "48",
+                "vv": "2",
+                "c": "1",
+                "f": "1",
+                "v": "1",
+                "s": "0",
+            }
+            for i in range(zones)
+        ]
+    }
+    return {"ctl": "MYS94B97E0C9177FB6", "value": value}
+
+
+def _legacy_parse(payload):
+    """``parse_status_payload`` anterior (zonas como dict), sin los logs."""
+    ctl_ref = payload.get("ctl")
+    parsed_value = parse_status_value(payload.get("value", ""))
+    t_list = parsed_value.get("t", [])
+    if not isinstance(t_list, list):
+        t_list = []
+
+    zone_states = []
+    for t in t_list:
+        if not isinstance(t, dict):
+            continue
+        power = _to_str(t.get("e", "0"))
+        mode_raw, is_heat, is_cool, is_ac, is_floor = parse_mode(t.get("m"))
+        zone_states.append(
+            {
+                "ctl": ctl_ref,
+                "zone_id": t.get("rf"),
+                "zone_name": t.get("n"),
+                "temp_actual": _to_float(t.get("tr")),
+                "temp_target": _to_float(t.get("tc")),
+                "temp_min": _to_float(t.get("tmm")),
+                "temp_max": _to_float(t.get("tmx")),
+                "humidity": _to_float(t.get("hum", t.get("hm"))),
+                "power": power,
+                "is_on": power != "0",
+                "is_standby": power == "2",
+                "mode_raw": mode_raw,
+                "is_heat": is_heat,
+                "is_cool": is_cool,
+                "is_ac": is_ac,
+                "is_floor": is_floor,
+                "fan_mode": _to_str(t.get("vv")),
+                "allow_heat": _to_str(t.get("c")) == "1",
+                "allow_cool": _to_str(t.get("f")) == "1",
+                "allow_fan": _to_str(t.get("v")) == "1",
+                "allow_floor": _to_str(t.get("s")) == "1",
+            }
+        )
+    return {"ctl": ctl_ref, "zones": zone_states}
+
+
+def _bytes_per_zone(parse, payload, keep):
+    messages = keep // len(payload["value"]["t"])
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    # Las zonas retenidas; los floats/strings de cada zona cuentan en ambas.
+    kept = [zone for _ in range(messages) for zone in parse(payload)["zones"]]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(kept)
+
+
+def _time(parse, payload, messages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(messages):
+            parse(payload)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--zones", type=int, default=8)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--keep", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payload = _payload(args.zones)
+    legacy = _legacy_parse(payload)["zones"]
+    current = parse_status_payload(payload)["zones"]
+    if [zone.as_dict() for zone in current] != legacy:
+        raise SystemExit("Las zonas de ZoneState no coinciden con los dicts")
+
+    print(
+        f"{args.zones} zonas/mensaje; memoria con {args.keep} zonas vivas, "
+        f"parseo de {args.messages} mensajes, mejor de {args.repeat}"
+    )
+    variants = (("antes", _legacy_parse), ("después", parse_status_payload))
+    results = {}
+    for name, parse in variants:
+        per_zone = _bytes_per_zone(parse, payload, args.keep)
+        elapsed = _time(parse, payload, args.messages, args.repeat)
+        results[name] = (per_zone, elapsed)
+        print(
+            f"{name:<8} {per_zone:7.0f} B/zona  "
+            f"{elapsed / args.messages * 1e6:7.2f} µs/mensaje  "
+            f"{args.messages * args.zones / elapsed:10.0f} zonas/s"
+        )
+    print(
+        f"memoria x{results['antes'][0] / results['después'][0]:.2f}  "
+        f"parseo x{results['antes'][1] / results['después'][1]:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ Esto funciona porque esos módulos no tienen imports relativos.
 Todos los datos de fixtures están SANITIZADOS (valores ficticios, sin secretos).
 """
 
+import json
 import os
 import sys
 
@@ -92,6 +93,51 @@ class FakeSession:
         return self._handle("put", url, **kwargs)
 
 
+class FakeAsyncResponse:
+    """Imitación mínima de aiohttp.ClientResponse (usada como context manager)."""
+
+    def __init__(self, status=200, json_data=None, text=None):
+        self.status = status
+        if text is None:
+            text = "" if json_data is None else json.dumps(json_data)
+        self._text = text
+
+    async def text(self):
+        return self._text
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeAsyncSession:
+    """Sesión aiohttp falsa, análoga a ``FakeSession``: respuestas encoladas por
+    método (en minúsculas) y registro de llamadas. Si la respuesta encolada es
+    una excepción, se lanza al hacer la petición (p. ej. ``aiohttp.ClientError``).
+    """
+
+    def __init__(self):
+        self.responses = {"get": [], "post": [], "put": []}
+        self.calls = []
+
+    def queue(self, method, *responses):
+        self.responses[method].extend(responses)
+        return self
+
+    def request(self, method, url, **kwargs):
+        method = method.lower()
+        self.calls.append({"method": method, "url": url, **kwargs})
+        queue = self.responses[method]
+        if not queue:
+            raise AssertionError(f"Sin respuesta encolada para {method.upper()} {url}")
+        response = queue.pop(0)
+        if isinstance(response, BaseException):
+            raise response
+        return response
+
+
 @pytest.fixture
 def make_response():
     def _make(status_code=200, json_data=None, text=""):
@@ -105,6 +151,19 @@ def fake_session():
     return FakeSession()
 
 
+@pytest.fixture
+def make_async_response():
+    def _make(status=200, json_data=None, text=None):
+        return FakeAsyncResponse(status, json_data, text)
+
+    return _make
+
+
+@pytest.fixture
+def fake_async_session():
+    return FakeAsyncSession()
+
+
 # --- Payloads sanitizados (solo campos que el código realmente consume) ---
 
 
@@ -1,10 +1,31 @@
 """Tests P1 del cliente HTTP MySairAPI con una sesión inyectada (sin red)."""
 
+import asyncio
+import base64
+import json
+import time
+
 import pytest
 
 pytest.importorskip("requests")
+aiohttp = pytest.importorskip("aiohttp")
+
+from api import (  # noqa: E402 (deliberado: necesita importorskip antes)
+    MySairAPI,
+    MySairAsyncAPI,
+    MySairAuthError,
+    MAX_INSTRUCTIONS_PER_REQUEST,
+    MySairConnectionError,
+    extract_order_id,
+    extract_order_ids,
+    jwt_expires_at,
+)
+
 
-from api import MySairAPI, MySairAuthError, MySairConnectionError, extract_order_id
+def _jwt(exp):
+    """JWT sin firma válida con el claim ``exp`` indicado (solo se lee el payload)."""
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode())
+    return f"h.{payload.decode().rstrip('=')}.s"
 
 
 def _api(session):
@@ -328,3 +349,513 @@ def test_extract_order_id_empty_value_list_returns_none():
 def test_extract_order_id_non_dict_returns_none():
     assert extract_order_id(None) is None
     assert extract_order_id("not-a-dict") is None
+
+
+def test_extract_order_ids_aligned_with_instructions():
+    response = {"entity": {"value": [{"orderId": "a"}, {}, {"orderId": "c"}]}}
+    assert extract_order_ids(response, 3) == ["a", None, "c"]
+    # Respuesta más corta o con forma inesperada: None en lo que falte.
+    assert extract_order_ids(response, 4) == ["a", None, "c", None]
+    assert extract_order_ids({"entity": {"value": "x"}}, 2) == [None, None]
+    assert extract_order_ids(None, 1) == [None]
+
+
+# --- send_zone_commands (envío por lotes, servicio mysair.set_zones) ---
+
+
+def _creado_con_order_ids(make_response, *order_ids):
+    return make_response(
+        201,
+        {
+            "msg": "Creado",
+            "error": [],
+            "entity": {"value": [{"orderId": order_id} for order_id in order_ids]},
+        },
+    )
+
+
+def test_send_zone_commands_single_request_maps_order_ids(fake_session, make_response):
+    fake_session.queue("post", _creado_con_order_ids(make_response, "o1", "o2", "o3"))
+    results = _api(fake_session).send_zone_commands(
+        [
+            ("INST", "DEV_1", "power"),
+            ("INST", "DEV_2", "mode", "0", 21.0),
+            ("INST", "DEV_3", "temp", 23),
+        ]
+    )
+
+    assert len(fake_session.calls) == 1
+    body = fake_session.calls[0]["json"]
+    assert [item["device"] for item in body] == ["DEV_1", "DEV_2", "DEV_3"]
+    assert body[1]["value"] == {"mode": "0", "temperature": "21.0"}
+    assert [(r["device"], r["command"], r["order_id"]) for r in results] == [
+        ("DEV_1", "power", "o1"),
+        ("DEV_2", "mode", "o2"),
+        ("DEV_3", "temp", "o3"),
+    ]
+    assert all(r["error"] is None for r in results)
+
+
+def test_send_zone_commands_chunks_and_reports_failed_chunk(
+    fake_session, make_response
+):
+    total = MAX_INSTRUCTIONS_PER_REQUEST + 1
+    fake_session.queue(
+        "post",
+        _creado_con_order_ids(
+            make_response, *[f"o{i}" for i in range(MAX_INSTRUCTIONS_PER_REQUEST)]
+        ),
+        make_response(500, text="boom"),
+    )
+    results = _api(fake_session).send_zone_commands(
+        [("INST", f"DEV_{i}", "power") for i in range(total)]
+    )
+
+    assert [len(call["json"]) for call in fake_session.calls] == [
+        MAX_INSTRUCTIONS_PER_REQUEST,
+        1,
+    ]
+    assert results[0]["order_id"] == "o0"
+    assert results[0]["error"] is None
+    assert results[-1]["order_id"] is None
+    assert "500" in results[-1]["error"]
+
+
+def test_send_zone_commands_invalid_command_sends_nothing(fake_session):
+    with pytest.raises(ValueError):
+        _api(fake_session).send_zone_commands(
+            [("INST", "DEV_1", "power"), ("INST", "DEV_2", "mode", "9")]
+        )
+    assert fake_session.calls == []
+
+
+# --- MySairAsyncAPI (cliente aiohttp, sin executor) ---
+
+
+def _async_api(websession):
+    api = MySairAsyncAPI("user@example.com", websession)
+    api.access_token = "ACCESS"
+    api.refresh_token_value = "TEST_REFRESH"
+    return api
+
+
+def test_async_send_zone_command_builds_same_body_as_sync(
+    fake_async_session, make_async_response
+):
+    fake_async_session.queue("post", make_async_response(201, {"msg": "Creado"}))
+    api = _async_api(fake_async_session)
+
+    asyncio.run(api.async_send_zone_command("INST", "DEV", "mode", "0", 21.0))
+
+    call = fake_async_session.calls[-1]
+    assert call["url"].endswith("/send/instruction")
+    assert call["headers"] == {"Authorization": "Bearer ACCESS"}
+    assert call["json"] == [
+        MySairAPI("e").build_zone_instruction("INST", "DEV", "mode", "0", 21.0)
+    ]
+
+
+def test_async_send_installation_command_status(
+    fake_async_session, make_async_response
+):
+    fake_async_session.queue("post", make_async_response(201, {"msg": "Creado"}))
+    asyncio.run(
+        _async_api(fake_async_session).async_send_installation_command("INST", "status")
+    )
+    body = fake_async_session.calls[-1]["json"][0]
+    assert body["command"] == "status"
+    assert body["value"] == "sync"
+
+
+def test_async_send_instruction_rejected_msg_raises(
+    fake_async_session, make_async_response
+):
+    fake_async_session.queue("post", make_async_response(201, {"msg": "Rechazado"}))
+    with pytest.raises(Exception):
+        asyncio.run(
+            _async_api(fake_async_session).async_send_instruction([{"command": "x"}])
+        )
+
+
+def test_async_send_instruction_401_refreshes_and_retries(
+    fake_async_session, make_async_response
+):
+    fake_async_session.queue(
+        "post",
+        make_async_response(401, {}),
+        make_async_response(201, {"msg": "Creado"}),
+    )
+    fake_async_session.queue(
+        "put",
+        make_async_response(
+            200, {"entity": {"access_token": "NEW", "refresh_token": "NEW_R"}}
+        ),
+    )
+    api = _async_api(fake_async_session)
+
+    data = asyncio.run(api.async_send_instruction([{"command": "x"}]))
+
+    assert data["msg"] == "Creado"
+    assert api.access_token == "NEW"
+    # Las credenciales AWS ya no se renuevan en el camino del comando.
+    assert [c["method"] for c in fake_async_session.calls] == ["post", "put", "post"]
+    assert fake_async_session.calls[-1]["headers"] == {"Authorization": "Bearer NEW"}
+
+
+# --- GESTIÓN DE TOKENS (single-flight + renovación proactiva) ---
+
+
+def test_jwt_expires_at():
+    assert jwt_expires_at(_jwt(1700000000)) == 1700000000.0
+    assert jwt_expires_at("ACCESS") is None
+    assert jwt_expires_at(None) is None
+    assert jwt_expires_at("a.bm90LWpzb24.c") is None
+
+
+def test_access_token_expiry_helpers():
+    api = MySairAPI("user@example.com")
+    api.access_token = _jwt(time.time() + 1000)
+    assert not api.access_token_expired()
+    assert 870 < api.seconds_until_access_token_refresh() <= 880
+    api.access_token = _jwt(time.time() - 1)
+    assert api.access_token_expired()
+    assert api.seconds_until_access_token_refresh() == 0
+    api.access_token = "OPACO"
+    assert not api.access_token_expired()
+    assert api.seconds_until_access_token_refresh() is None
+
+
+def test_async_refresh_tokens_single_flight(fake_async_session, make_async_response):
+    fake_async_session.queue(
+        "put",
+        make_async_response(
+            200, {"entity": {"access_token": "NEW", "refresh_token": "NEW_R"}}
+        ),
+    )
+    api = _async_api(fake_async_session)
+
+    async def _run():
+        return await asyncio.gather(*(api.async_refresh_tokens() for _ in range(5)))
+
+    results = asyncio.run(_run())
+
+    assert results == [True] * 5
+    assert [c["method"] for c in fake_async_session.calls] == ["put"]
+    assert api.refresh_token_value == "NEW_R"
+
+
+def test_async_refresh_tokens_error_shared_and_cleared(
+    fake_async_session, make_async_response
+):
+    fake_async_session.queue("put", make_async_response(401, {}))
+    api = _async_api(fake_async_session)
+
+    async def _run():
+        return await asyncio.gather(
+            api.async_refresh_tokens(),
+            api.async_refresh_tokens(),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(_run())
+
+    assert all(isinstance(r, MySairAuthError) for r in results)
+    assert len(fake_async_session.calls) == 1
+    assert api._refresh_task is None
+
+
+def test_async_proactive_refresh_runs_before_expiry(
+    fake_async_session, make_async_response
+):
+    fresh = _jwt(time.time() + 3600)
+    fake_async_session.queue(
+        "put",
+        make_async_response(
+            200, {"entity": {"access_token": fresh, "refresh_token": "NEW_R"}}
+        ),
+    )
+    api = _async_api(fake_async_session)
+    # Caduca dentro del margen: la renovación se programa para ya (0 s).
+    api.access_token = _jwt(time.time() + 60)
+
+    async def _run():
+        api.start_token_refresh_timer()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        timer = api._refresh_timer
+        api.stop_token_refresh_timer()
+        return timer
+
+    next_timer = asyncio.run(_run())
+
+    assert api.access_token == fresh
+    assert [c["method"] for c in fake_async_session.calls] == ["put"]
+    # Tras renovar se programó la siguiente renovación (luego cancelada).
+    assert next_timer is not None
+    assert api._refresh_timer is None
+
+
+def test_async_stop_token_refresh_timer_cancels_inflight_refresh(monkeypatch):
+    api = _async_api(None)
+    api.access_token = _jwt(time.time() + 60)
+    started = []
+
+    async def _slow_refresh():
+        started.append(True)
+        await asyncio.sleep(3600)
+        raise MySairConnectionError("boom")
+
+    monkeypatch.setattr(api, "async_refresh_tokens", _slow_refresh)
+
+    async def _run():
+        api.start_token_refresh_timer()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        task = api._proactive_task
+        api.stop_token_refresh_timer()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        return task
+
+    task = asyncio.run(_run())
+
+    assert started == [True]
+    assert task.cancelled()
+    # Ni tarea colgando ni reintento re-armado tras la descarga.
+    assert api._proactive_task is None
+    assert api._refresh_timer is None
+
+
+def test_async_send_instruction_refreshes_expired_token_first(
+    fake_async_session, make_async_response
+):
+    fake_async_session.queue(
+        "put",
+        make_async_response(
+            200, {"entity": {"access_token": "NEW", "refresh_token": "NEW_R"}}
+        ),
+    )
+    fake_async_session.queue("post", make_async_response(201, {"msg": "Creado"}))
+    api = _async_api(fake_async_session)
+    api.access_token = _jwt(time.time() - 10)
+
+    asyncio.run(api.async_send_instruction([{"command": "x"}]))
+
+    assert [c["method"] for c in fake_async_session.calls] == ["put", "post"]
+    assert fake_async_session.calls[-1]["headers"] == {"Authorization": "Bearer NEW"}
+
+
+def test_async_send_instruction_401_after_token_changed_skips_refresh(
+    fake_async_session, make_async_response
+):
+    api = _async_api(fake_async_session)
+
+    class _RotatingResponse:
+        """401 que llega después de que otra tarea ya renovó el token."""
+
+        status = 401
+
+        async def text(self):
+            api.access_token = "ROTATED"
+            return "{}"
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+    fake_async_session.queue(
+        "post", _RotatingResponse(), make_async_response(201, {"msg": "Creado"})
+    )
+
+    asyncio.run(api.async_send_instruction([{"command": "x"}]))
+
+    assert [c["method"] for c in fake_async_session.calls] == ["post", "post"]
+    assert fake_async_session.calls[-1]["headers"] == {
+        "Authorization": "Bearer ROTATED"
+    }
+
+
+def test_async_refresh_tokens_invalid_raises_auth_error(
+    fake_async_session, make_async_response
+):
+    fake_async_session.queue("put", make_async_response(401, text="unauthorized"))
+    with pytest.raises(MySairAuthError):
+        asyncio.run(_async_api(fake_async_session).async_refresh_tokens())
+
+
+def test_async_refresh_tokens_notifies_callback(
+    fake_async_session, make_async_response
+):
+    fake_async_session.queue(
+        "put",
+        make_async_response(
+            200, {"entity": {"access_token": "NEW", "refresh_token": "NEW_R"}}
+        ),
+    )
+    calls = []
+    api = MySairAsyncAPI(
+        "user@example.com",
+        fake_async_session,
+        on_tokens_refreshed=lambda access, refresh: calls.append((access, refresh)),
+    )
+    api.refresh_token_value = "OLD_REFRESH"
+
+    assert asyncio.run(api.async_refresh_tokens()) is True
+    assert calls == [("NEW", "NEW_R")]
+
+
+def test_async_network_error_raises_connection_error(fake_async_session):
+    fake_async_session.queue("get", aiohttp.ClientConnectionError("boom"))
+    with pytest.raises(MySairConnectionError):
+        asyncio.run(_async_api(fake_async_session).async_get_locations())
+
+
+def test_async_get_devices_ok(fake_async_session, make_async_response):
+    devices = [{"reference": "DEV_1", "name": "Salon"}]
+    fake_async_session.queue("get", make_async_response(200, {"entity": devices}))
+
+    result = asyncio.run(_async_api(fake_async_session).async_get_devices("INST_A"))
+
+    assert result == devices
+    assert "installation_ref=INST_A" in fake_async_session.calls[-1]["url"]
+
+
+def test_async_get_locations_error_raises_instead_of_empty_list(
+    fake_async_session, make_async_response
+):
+    # A diferencia de get_locations() (que devuelve []), la variante asíncrona
+    # distingue "sin ubicaciones" de "no se pudo consultar".
+    fake_async_session.queue("get", make_async_response(500, text="err"))
+    with pytest.raises(MySairConnectionError):
+        asyncio.run(_async_api(fake_async_session).async_get_locations())
+
+
+# --- async_discover_topology: todas las ubicaciones, fan-out acotado ---
+
+
+def _patch_topology(monkeypatch, locations, installations, devices, delay=0.0):
+    """Sustituye los getters asíncronos; ``devices[ref]`` puede ser una excepción.
+
+    Devuelve un dict con el máximo de peticiones simultáneas observado.
+    """
+    stats = {"in_flight": 0, "max_in_flight": 0}
+
+    async def _track(result):
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            stats["in_flight"] -= 1
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def _get_locations(self):
+        return locations
+
+    async def _get_installations(self, location_id):
+        return await _track(installations[location_id])
+
+    async def _get_devices(self, ref):
+        return await _track(devices[ref])
+
+    monkeypatch.setattr(MySairAsyncAPI, "async_get_locations", _get_locations)
+    monkeypatch.setattr(MySairAsyncAPI, "async_get_installations", _get_installations)
+    monkeypatch.setattr(MySairAsyncAPI, "async_get_devices", _get_devices)
+    return stats
+
+
+def test_discover_topology_covers_all_locations(monkeypatch, fake_async_session):
+    _patch_topology(
+        monkeypatch,
+        locations=[{"id": 1}, {"id": 2}],
+        installations={
+            1: [{"reference": "INST_A"}],
+            # INST_A compartida entre ubicaciones: se cuenta una sola vez.
+            2: [{"reference": "INST_B"}, {"reference": "INST_A"}],
+        },
+        devices={"INST_A": [{"reference": "DEV_1"}], "INST_B": []},
+    )
+    result = asyncio.run(_async_api(fake_async_session).async_discover_topology())
+
+    assert result["locations"] == [1, 2]
+    assert result["installations"] == ["INST_A", "INST_B"]
+    assert result["devices"] == {"INST_A": [{"reference": "DEV_1"}], "INST_B": []}
+    assert result["failed_locations"] == {}
+    assert result["failed_installations"] == {}
+
+
+def test_discover_topology_reports_partial_failures(monkeypatch, fake_async_session):
+    _patch_topology(
+        monkeypatch,
+        locations=[{"id": 1}, {"id": 2}],
+        installations={
+            1: [{"reference": "INST_A"}, {"reference": "INST_B"}],
+            2: MySairConnectionError("boom loc"),
+        },
+        devices={
+            "INST_A": [{"reference": "DEV_1"}],
+            "INST_B": MySairAuthError("forbidden"),
+        },
+    )
+    result = asyncio.run(_async_api(fake_async_session).async_discover_topology())
+
+    assert result["installations"] == ["INST_A"]
+    assert result["devices"] == {"INST_A": [{"reference": "DEV_1"}]}
+    assert result["failed_locations"] == {2: "boom loc"}
+    assert result["failed_installations"] == {"INST_B": "forbidden"}
+
+
+def test_discover_topology_bounds_concurrency(monkeypatch, fake_async_session):
+    refs = [f"INST_{i}" for i in range(10)]
+    stats = _patch_topology(
+        monkeypatch,
+        locations=[{"id": 1}],
+        installations={1: [{"reference": ref} for ref in refs]},
+        devices={ref: [] for ref in refs},
+        delay=0.01,
+    )
+    result = asyncio.run(
+        _async_api(fake_async_session).async_discover_topology(max_concurrency=3)
+    )
+
+    assert result["installations"] == refs
+    assert stats["max_in_flight"] == 3
+
+
+def test_discover_topology_locations_error_propagates(
+    fake_async_session, make_async_response
+):
+    fake_async_session.queue("get", make_async_response(500, text="err"))
+    with pytest.raises(MySairConnectionError):
+        asyncio.run(_async_api(fake_async_session).async_discover_topology())
+
+
+def test_async_send_zone_commands_maps_order_ids(
+    fake_async_session, make_async_response
+):
+    fake_async_session.queue(
+        "post",
+        make_async_response(
+            201,
+            {
+                "msg": "Creado",
+                "error": [],
+                "entity": {"value": [{"orderId": "o1"}, {"orderId": "o2"}]},
+            },
+        ),
+    )
+    results = asyncio.run(
+        _async_api(fake_async_session).async_send_zone_commands(
+            [("INST", "DEV_1", "power"), ("INST", "DEV_2", "fanspeed", "4")]
+        )
+    )
+
+    assert len(fake_async_session.calls) == 1
+    assert [(r["device"], r["order_id"], r["error"]) for r in results] == [
+        ("DEV_1", "o1", None),
+        ("DEV_2", "o2", None),
+    ]
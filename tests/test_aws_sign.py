@@ -1,18 +1,20 @@
 """Tests P0 de la firma de URL AWS SigV4 (sin Home Assistant).
 
-Requiere `requests` (api lo importa) y `freezegun` para fijar el reloj.
+Requiere `requests` y `aiohttp` (api los importa) y `freezegun` para fijar el reloj.
 No valida contra AWS: solo la estructura y el determinismo de la firma.
 """
 
 import re
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
 pytest.importorskip("requests")
+pytest.importorskip("aiohttp")
 freezegun = pytest.importorskip("freezegun")
 
-from api import MySairAPI  # noqa: E402 (deliberado: necesita importorskip antes)
+from api import AwsUrlSigner, MySairAPI  # noqa: E402 (deliberado: necesita importorskip antes)
 
 
 FIXED = "2026-07-19T10:00:00Z"
@@ -57,3 +59,66 @@ def test_amz_date_matches_frozen_time():
         url = _sign()
     qs = urllib.parse.parse_qs(url.split("?", 1)[1])
     assert qs["X-Amz-Date"] == ["20260719T100000Z"]
+
+
+# Firmas de referencia calculadas con la implementación anterior de
+# ``aws_sign_url`` (cadena HMAC completa en cada llamada): el firmante con
+# clave cacheada debe producir exactamente la misma URL.
+_EXPECTED_SIGNATURES = {
+    FIXED: "cca4807534b4d45faa46f23f57335bd8d152bce4a6aec545aa6960102b09cb3e",
+    "2026-07-20T00:00:01Z": (
+        "ba397adf1e14f348c51e9e0722e838ef5fcf1add910cf1b2126c92ded7318aeb"
+    ),
+}
+
+
+@pytest.mark.parametrize("when", sorted(_EXPECTED_SIGNATURES))
+def test_signature_matches_reference_vector(when):
+    with freezegun.freeze_time(when):
+        url = _sign()
+    qs = urllib.parse.parse_qs(url.split("?", 1)[1])
+    assert qs["X-Amz-Signature"] == [_EXPECTED_SIGNATURES[when]]
+
+
+def test_signer_caches_signing_key_per_day():
+    signer = AwsUrlSigner()
+    params = ("test.iot.eu-west-1.amazonaws.com", "eu-west-1", "K", "S", "T")
+
+    with freezegun.freeze_time(FIXED) as frozen:
+        first = signer.sign_url(*params)
+        frozen.tick(60)
+        second = signer.sign_url(*params)
+        assert (signer.key_cache_misses, signer.key_cache_hits) == (1, 1)
+        assert first != second  # otra X-Amz-Date, misma clave derivada
+
+        frozen.move_to("2026-07-20T00:00:01Z")  # cambio de día: clave nueva
+        signer.sign_url(*params)
+        assert signer.key_cache_misses == 2
+
+        signer.sign_url(params[0], params[1], "K2", "S2", "T2")  # otro secreto
+        assert signer.key_cache_misses == 3
+
+
+def test_signer_key_cache_is_bounded():
+    signer = AwsUrlSigner(max_keys=2)
+    for secret in ("S1", "S2", "S3"):
+        signer.signing_key(secret, "20260719", "eu-west-1")
+
+    assert len(signer._signing_keys) == 2
+    signer.signing_key("S1", "20260719", "eu-west-1")  # expulsada: se recalcula
+    assert signer.key_cache_misses == 4
+
+
+def test_signer_key_cache_is_thread_safe():
+    # Fallos concurrentes con la caché llena: antes dos hilos podían expulsar
+    # la misma clave y el segundo ``del`` lanzaba KeyError.
+    signer = AwsUrlSigner(max_keys=2)
+
+    def _sign(i):
+        return signer.signing_key(f"S{i % 16}", "20260719", "eu-west-1")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        keys = list(executor.map(_sign, range(4000)))
+
+    assert len(keys) == 4000
+    assert len(signer._signing_keys) <= 2
@@ -8,7 +8,16 @@ from homeassistant import config_entries
 from homeassistant.data_entry_flow import FlowResultType
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
-from custom_components.mysair.const import DOMAIN
+from custom_components.mysair.const import (
+    CONF_BUS_EVENTS,
+    CONF_COMMAND_WINDOW,
+    CONF_MQTT_TRANSPORT,
+    CONF_SYNC_CONCURRENCY,
+    COMMAND_WINDOW_SECONDS,
+    DOMAIN,
+    MQTT_TRANSPORT_ASYNCIO,
+    STATUS_SYNC_MAX_CONCURRENCY,
+)
 from custom_components.mysair.api import (
     MySairAPI,
     MySairAuthError,
@@ -32,8 +41,15 @@ def _mock_login_raises(exc):
     return _login
 
 
+async def _mock_setup_entry(hass, entry):
+    return True
+
+
 async def test_user_flow_success_creates_entry(hass, monkeypatch):
     monkeypatch.setattr(MySairAPI, "login", _mock_login_ok())
+    # La entrada creada se configura al momento: sin esto arrancaría la sesión
+    # real (MySairAsyncAPI, petición HTTP y DNS) dentro del test.
+    monkeypatch.setattr("custom_components.mysair.async_setup_entry", _mock_setup_entry)
 
     result = await hass.config_entries.flow.async_init(
         DOMAIN, context={"source": config_entries.SOURCE_USER}
@@ -115,6 +131,9 @@ async def test_reauth_flow_success_updates_refresh_token(hass, monkeypatch):
     monkeypatch.setattr(
         MySairAPI, "login", _mock_login_ok(refresh_token="REFRESH_AFTER_REAUTH")
     )
+    # Tras reautenticar se recarga la entrada: igual que en el flujo de
+    # usuario, sin esto arrancaría la sesión real dentro del test.
+    monkeypatch.setattr("custom_components.mysair.async_setup_entry", _mock_setup_entry)
 
     result = await entry.start_reauth_flow(hass)
     assert result["type"] == FlowResultType.FORM
@@ -126,6 +145,8 @@ async def test_reauth_flow_success_updates_refresh_token(hass, monkeypatch):
     assert result2["type"] == FlowResultType.ABORT
     assert result2["reason"] == "reauth_successful"
     assert entry.data["refresh_token"] == "REFRESH_AFTER_REAUTH"
+    await hass.async_block_till_done()
+    assert entry.state is config_entries.ConfigEntryState.LOADED
 
 
 async def test_reauth_flow_invalid_auth_shows_error(hass, monkeypatch):
@@ -148,3 +169,30 @@ async def test_reauth_flow_invalid_auth_shows_error(hass, monkeypatch):
     assert result2["errors"] == {"base": "invalid_auth"}
     # El refresh_token no cambia si la reautenticación falla.
     assert entry.data["refresh_token"] == "STALE"
+
+
+async def test_options_flow_selects_mqtt_transport(hass, monkeypatch):
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="user@example.com",
+        data={"email": "user@example.com", "refresh_token": "R"},
+    )
+    entry.add_to_hass(hass)
+    # La entrada no está cargada: sin listener de actualización, guardar las
+    # opciones no la recarga.
+
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    assert result["type"] == FlowResultType.FORM
+    assert result["step_id"] == "init"
+
+    result2 = await hass.config_entries.options.async_configure(
+        result["flow_id"], {CONF_MQTT_TRANSPORT: MQTT_TRANSPORT_ASYNCIO}
+    )
+    assert result2["type"] == FlowResultType.CREATE_ENTRY
+    # bus_events queda desactivado por defecto (no llena el recorder).
+    assert entry.options == {
+        CONF_MQTT_TRANSPORT: MQTT_TRANSPORT_ASYNCIO,
+        CONF_BUS_EVENTS: False,
+        CONF_COMMAND_WINDOW: COMMAND_WINDOW_SECONDS,
+        CONF_SYNC_CONCURRENCY: STATUS_SYNC_MAX_CONCURRENCY,
+    }
@@ -1,20 +1,42 @@
 """Tests P2 del coordinador de zona (C1, harness de Home Assistant).
 
 Cubre `MySairCoordinator` en aislamiento: filtrado por instalación propia,
-redistribución por zona vía dispatcher, y desuscripción en `stop()`. El
-comportamiento observable end-to-end (entidades reaccionando a `mysair_update`)
+redistribución por zona vía dispatcher, detección de campos cambiados,
+caducidad por zona con un único timer, enrutado de ACK por ``orderId``
+(`CommandFeedbackRouter`), agrupación de comandos (`CommandQueue`) y
+desuscripción en `stop()`. El
+comportamiento observable end-to-end (entidades reaccionando a cada status)
 ya está cubierto por test_entities.py y no cambia con este refactor.
 """
 
+import asyncio
+from datetime import timedelta
+
 import pytest
 
 pytest.importorskip("homeassistant")
 
+import homeassistant.util.dt as dt_util
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
-from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
 
-from custom_components.mysair.const import DOMAIN
-from custom_components.mysair.coordinator import signal_zone_update
+from custom_components.mysair import coordinator as coordinator_module
+from custom_components.mysair.command_feedback import CommandFeedbackRouter
+from custom_components.mysair.command_queue import CommandQueue
+from custom_components.mysair.const import (
+    DOMAIN,
+    FEEDBACK_TIMEOUT_SECONDS,
+    MQTT_STALE_AFTER_SECONDS,
+)
+from custom_components.mysair.coordinator import (
+    diff_zone,
+    signal_zone_stale,
+    signal_zone_update,
+)
+from custom_components.mysair.status_parser import ZONE_FIELDS, ZoneState
 
 from test_entities import _patch_happy_api, _fire_status, _zone
 
@@ -39,7 +61,7 @@ async def test_coordinator_ignores_ctl_not_in_installation_refs(hass, monkeypatc
     async_dispatcher_connect(
         hass,
         signal_zone_update("OTHER_INST", "DEV_1"),
-        lambda zone: received.append(zone),
+        lambda zone, changed: received.append(zone),
     )
 
     _fire_status(hass, "OTHER_INST", _zone())
@@ -51,67 +73,66 @@ async def test_coordinator_ignores_ctl_not_in_installation_refs(hass, monkeypatc
 async def test_coordinator_dispatches_each_zone_independently_for_multi_zone_message(
     hass, monkeypatch
 ):
-    await _setup_entry(hass, monkeypatch)
+    entry = await _setup_entry(hass, monkeypatch)
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
 
     received_dev1 = []
     received_dev2 = []
     async_dispatcher_connect(
         hass,
         signal_zone_update("INST_A", "DEV_1"),
-        lambda zone: received_dev1.append(zone),
+        lambda zone, changed: received_dev1.append(zone),
     )
     async_dispatcher_connect(
         hass,
         signal_zone_update("INST_A", "DEV_2"),
-        lambda zone: received_dev2.append(zone),
+        lambda zone, changed: received_dev2.append(zone),
     )
 
-    hass.bus.async_fire(
-        f"{DOMAIN}_update",
+    coordinator.async_handle_status(
+        "pro/v1/get/ctl/INST_A/status",
         {
-            "topic": "pro/v1/get/ctl/INST_A/status",
-            "data": {
-                "ctl": "INST_A",
-                "zones": [
-                    _zone(zone_id="DEV_1"),
-                    _zone(zone_id="DEV_2", temp_actual=19.0),
-                ],
-            },
+            "ctl": "INST_A",
+            "zones": [
+                _zone(zone_id="DEV_1"),
+                _zone(zone_id="DEV_2", temp_actual=19.0),
+            ],
         },
     )
     await hass.async_block_till_done()
 
-    assert len(received_dev1) == 1 and received_dev1[0]["zone_id"] == "DEV_1"
-    assert len(received_dev2) == 1 and received_dev2[0]["temp_actual"] == 19.0
+    assert len(received_dev1) == 1 and received_dev1[0].zone_id == "DEV_1"
+    assert len(received_dev2) == 1 and received_dev2[0].temp_actual == 19.0
 
 
 async def test_coordinator_ignores_non_status_topic(hass, monkeypatch):
-    await _setup_entry(hass, monkeypatch)
+    entry = await _setup_entry(hass, monkeypatch)
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
 
     received = []
     async_dispatcher_connect(
-        hass, signal_zone_update("INST_A", "DEV_1"), lambda zone: received.append(zone)
+        hass,
+        signal_zone_update("INST_A", "DEV_1"),
+        lambda zone, changed: received.append(zone),
     )
 
-    hass.bus.async_fire(
-        f"{DOMAIN}_update",
-        {
-            "topic": "pro/v1/get/usr/web0077/feedback",
-            "data": {"ctl": "INST_A", "zones": [_zone()]},
-        },
+    coordinator.async_handle_status(
+        "pro/v1/get/usr/web0077/feedback", {"ctl": "INST_A", "zones": [_zone()]}
     )
     await hass.async_block_till_done()
 
     assert received == []
 
 
-async def test_coordinator_stop_unsubscribes(hass, monkeypatch):
+async def test_coordinator_stop_ignores_further_messages(hass, monkeypatch):
     entry = await _setup_entry(hass, monkeypatch)
     coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
 
     received = []
     async_dispatcher_connect(
-        hass, signal_zone_update("INST_A", "DEV_1"), lambda zone: received.append(zone)
+        hass,
+        signal_zone_update("INST_A", "DEV_1"),
+        lambda zone, changed: received.append(zone),
     )
 
     coordinator.stop()
@@ -120,3 +141,290 @@ async def test_coordinator_stop_unsubscribes(hass, monkeypatch):
     await hass.async_block_till_done()
 
     assert received == []
+
+
+def test_diff_zone_reports_changed_fields():
+    previous = ZoneState(zone_id="DEV_1", temp_actual=21.5, humidity=45.0)
+
+    assert diff_zone(None, previous) == frozenset(ZONE_FIELDS)
+    assert diff_zone(previous, ZoneState(**previous.as_dict())) == frozenset()
+    assert diff_zone(
+        previous, ZoneState(zone_id="DEV_1", temp_actual=22.0, fan_mode="2")
+    ) == {"temp_actual", "fan_mode", "humidity"}
+
+
+async def test_coordinator_forwards_changed_fields_and_counts_unchanged(
+    hass, monkeypatch
+):
+    entry = await _setup_entry(hass, monkeypatch)
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+
+    received = []
+    async_dispatcher_connect(
+        hass,
+        signal_zone_update("INST_A", "DEV_1"),
+        lambda zone, changed: received.append(changed),
+    )
+
+    _fire_status(hass, "INST_A", _zone())
+    _fire_status(hass, "INST_A", _zone())
+    _fire_status(hass, "INST_A", _zone(temp_actual=23.0))
+    await hass.async_block_till_done()
+
+    assert received[0] == frozenset(ZONE_FIELDS)
+    assert received[1:] == [frozenset(), frozenset({"temp_actual"})]
+    assert coordinator.zone_updates == 3
+    assert coordinator.zone_updates_unchanged == 1
+
+
+async def test_coordinator_uses_one_stale_timer_for_all_zones(hass, monkeypatch):
+    entry = await _setup_entry(hass, monkeypatch)
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    scheduled = []
+    real_call_later = coordinator_module.async_call_later
+
+    def _counting_call_later(*args):
+        scheduled.append(args[1])
+        return real_call_later(*args)
+
+    monkeypatch.setattr(coordinator_module, "async_call_later", _counting_call_later)
+
+    zones = [_zone(zone_id=f"DEV_{i}") for i in range(20)]
+    for _ in range(3):
+        coordinator.async_handle_status(
+            "pro/v1/get/ctl/INST_A/status", {"ctl": "INST_A", "zones": zones}
+        )
+    await hass.async_block_till_done()
+
+    # 3 syncs de 20 zonas: un solo timer, no 60 (ni 60 × entidades).
+    # El retraso se calcula con un utcnow() posterior al del status: unos µs
+    # menos que MQTT_STALE_AFTER_SECONDS.
+    assert scheduled == [pytest.approx(MQTT_STALE_AFTER_SECONDS, abs=1)]
+    assert coordinator.zone_available("INST_A", "DEV_0")
+    assert not coordinator.zone_available("INST_A", "DEV_99")
+
+
+async def test_coordinator_marks_only_stale_zones_unavailable(hass, monkeypatch):
+    freezegun = pytest.importorskip("freezegun")
+
+    with freezegun.freeze_time(dt_util.utcnow()) as frozen:
+        entry = await _setup_entry(hass, monkeypatch)
+        coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+        stale = []
+        for zone_id in ("DEV_1", "DEV_2"):
+            async_dispatcher_connect(
+                hass,
+                signal_zone_stale("INST_A", zone_id),
+                lambda zone_id=zone_id: stale.append(zone_id),
+            )
+
+        coordinator.async_handle_status(
+            "pro/v1/get/ctl/INST_A/status",
+            {
+                "ctl": "INST_A",
+                "zones": [_zone(zone_id="DEV_1"), _zone(zone_id="DEV_2")],
+            },
+        )
+        frozen.tick(timedelta(seconds=200))
+        coordinator.async_handle_status(
+            "pro/v1/get/ctl/INST_A/status",
+            {"ctl": "INST_A", "zones": [_zone(zone_id="DEV_2")]},
+        )
+
+        frozen.tick(timedelta(seconds=MQTT_STALE_AFTER_SECONDS - 200 + 1))
+        async_fire_time_changed(hass, dt_util.utcnow())
+        await hass.async_block_till_done()
+        assert stale == ["DEV_1"]
+        assert not coordinator.zone_available("INST_A", "DEV_1")
+        assert coordinator.zone_available("INST_A", "DEV_2")
+
+        frozen.tick(timedelta(seconds=200))
+        async_fire_time_changed(hass, dt_util.utcnow())
+        await hass.async_block_till_done()
+        assert stale == ["DEV_1", "DEV_2"]
+        assert not coordinator.zone_available("INST_A", "DEV_2")
+
+
+async def test_coordinator_refresh_renews_freshness_of_last_status_zones(
+    hass, monkeypatch
+):
+    freezegun = pytest.importorskip("freezegun")
+
+    with freezegun.freeze_time(dt_util.utcnow()) as frozen:
+        entry = await _setup_entry(hass, monkeypatch)
+        coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+        updates = []
+        for zone_id in ("DEV_1", "DEV_2"):
+            async_dispatcher_connect(
+                hass,
+                signal_zone_update("INST_A", zone_id),
+                lambda zone, changed: updates.append((zone.zone_id, changed)),
+            )
+
+        coordinator.async_handle_status(
+            "pro/v1/get/ctl/INST_A/status",
+            {"ctl": "INST_A", "zones": [_zone(zone_id="DEV_1")]},
+        )
+        frozen.tick(timedelta(seconds=MQTT_STALE_AFTER_SECONDS + 1))
+        async_fire_time_changed(hass, dt_util.utcnow())
+        await hass.async_block_till_done()
+        assert not coordinator.zone_available("INST_A", "DEV_1")
+
+        # Status repetido: sin redistribuir el contenido, la zona vuelve a
+        # estar fresca y sus entidades reciben un aviso sin campos cambiados.
+        updates.clear()
+        coordinator.async_refresh_installation("INST_A")
+        assert coordinator.zone_available("INST_A", "DEV_1")
+        assert updates == [("DEV_1", frozenset())]
+
+        # Ya fresca: renovar no avisa a nadie.
+        coordinator.async_refresh_installation("INST_A")
+        coordinator.async_refresh_installation("OTHER_INST")
+        assert updates == [("DEV_1", frozenset())]
+        assert not coordinator.zone_available("INST_A", "DEV_2")
+        assert coordinator.zone_updates == 1
+
+
+class _FakeCommandEntity:
+    def __init__(self, inst_ref, name):
+        self.inst_ref = inst_ref
+        self.name = name
+        self.mqtt_client = None
+        self.state = "optimista"
+        self.writes = 0
+
+    def async_write_ha_state(self):
+        self.writes += 1
+
+
+async def test_feedback_router_delivers_ack_only_to_issuing_entity(hass):
+    router = CommandFeedbackRouter(hass)
+    salon = _FakeCommandEntity("INST_A", "Salon")
+    cocina = _FakeCommandEntity("INST_A", "Cocina")
+
+    def _revert(entity):
+        return lambda: setattr(entity, "state", "revertido")
+
+    router.track(salon, "order-1", _revert(salon))
+    router.track(cocina, "order-2", _revert(cocina))
+    # Un nuevo comando de la misma entidad sustituye al anterior.
+    router.track(cocina, "order-3", _revert(cocina))
+    assert router.pending_count == 2
+
+    router.async_handle_feedback({"order_id": "order-2", "ctl": "INST_A"})
+    router.async_handle_feedback({"order_id": "order-1", "ctl": "OTHER_INST"})
+    router.async_handle_feedback({"order_id": "order-1", "ctl": "INST_A"})
+    assert router.pending_count == 1
+
+    future = dt_util.utcnow() + timedelta(seconds=FEEDBACK_TIMEOUT_SECONDS + 1)
+    async_fire_time_changed(hass, future)
+    await hass.async_block_till_done()
+
+    assert (salon.state, salon.writes) == ("optimista", 0)
+    assert (cocina.state, cocina.writes) == ("revertido", 1)
+    assert router.pending_count == 0
+
+
+async def test_feedback_router_stop_cancels_pending_timeouts(hass):
+    router = CommandFeedbackRouter(hass)
+    salon = _FakeCommandEntity("INST_A", "Salon")
+    router.track(salon, "order-1", lambda: setattr(salon, "state", "revertido"))
+
+    router.stop()
+    future = dt_util.utcnow() + timedelta(seconds=FEEDBACK_TIMEOUT_SECONDS + 1)
+    async_fire_time_changed(hass, future)
+    await hass.async_block_till_done()
+
+    assert salon.state == "optimista"
+    assert router.pending_count == 0
+
+
+async def test_command_queue_sends_only_latest_while_in_flight(hass):
+    queue = CommandQueue(hass, 0)
+    salon = _FakeCommandEntity("INST_A", "Salon")
+    release = asyncio.Event()
+    sent = []
+
+    def _send(value):
+        async def _request():
+            sent.append(value)
+            await release.wait()
+            return {"value": value}
+
+        return _request
+
+    first = hass.async_create_task(
+        queue.async_send(salon, "temp", _send(23.0), lambda: "revert-23")
+    )
+    await asyncio.sleep(0)
+    # Con la primera petición en vuelo, 24 queda pendiente y 25 lo sustituye.
+    second = hass.async_create_task(queue.async_send(salon, "temp", _send(24.0)))
+    third = hass.async_create_task(queue.async_send(salon, "temp", _send(25.0)))
+    # Otro tipo de comando de la misma entidad tiene su propia ranura.
+    fan = hass.async_create_task(queue.async_send(salon, "fanspeed", _send("2")))
+    await asyncio.sleep(0)
+    assert sent == [23.0, "2"]
+
+    release.set()
+    await hass.async_block_till_done()
+
+    assert sent == [23.0, "2", 25.0]
+    assert first.result()[0] == {"value": 23.0}
+    assert second.result() is None
+    assert third.result()[0] == {"value": 25.0}
+    assert fan.result()[0] == {"value": "2"}
+    assert (queue.commands_sent, queue.commands_coalesced) == (3, 1)
+
+
+async def test_command_queue_reverts_and_raises_on_failure(hass):
+    queue = CommandQueue(hass, 0)
+    salon = _FakeCommandEntity("INST_A", "Salon")
+
+    async def _fail():
+        raise ConnectionError("sin red")
+
+    with pytest.raises(ConnectionError):
+        await queue.async_send(
+            salon, "temp", _fail, lambda: setattr(salon, "state", "revertido")
+        )
+    assert salon.state == "revertido"
+
+
+async def test_command_queue_failure_defers_revert_to_pending_command(hass):
+    queue = CommandQueue(hass, 0)
+    salon = _FakeCommandEntity("INST_A", "Salon")
+
+    def _revert(state):
+        return lambda: setattr(salon, "state", state)
+
+    def _fail_on(release):
+        async def _request():
+            await release.wait()
+            raise ConnectionError("sin red")
+
+        return _request
+
+    release_23, release_24 = asyncio.Event(), asyncio.Event()
+    first = hass.async_create_task(
+        queue.async_send(salon, "temp", _fail_on(release_23), _revert("antes-23"))
+    )
+    await asyncio.sleep(0)
+    # 24 espera detrás de 23 en vuelo; el fallo de 23 no pisa su estado.
+    second = hass.async_create_task(
+        queue.async_send(salon, "temp", _fail_on(release_24), _revert("antes-24"))
+    )
+    salon.state = "optimista-24"
+
+    release_23.set()
+    for _ in range(5):
+        await asyncio.sleep(0)
+    with pytest.raises(ConnectionError):
+        first.result()
+    assert salon.state == "optimista-24"
+
+    # También falla 24: vuelve al estado anterior a los dos.
+    release_24.set()
+    await hass.async_block_till_done()
+    with pytest.raises(ConnectionError):
+        second.result()
+    assert salon.state == "antes-23"
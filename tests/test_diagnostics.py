@@ -14,12 +14,21 @@ from pytest_homeassistant_custom_component.common import MockConfigEntry
 
 from custom_components.mysair.const import DOMAIN
 from custom_components.mysair.diagnostics import async_get_config_entry_diagnostics
-from custom_components.mysair.api import MySairAPI
+from custom_components.mysair.api import MySairAsyncAPI
 from custom_components.mysair.mqtt_handler import MySairMQTTClient
 
 
+def _coro(fn):
+    """Envuelve un doble síncrono como método ``async`` (cliente MySairAsyncAPI)."""
+
+    async def _method(self, *args, **kwargs):
+        return fn(self, *args, **kwargs)
+
+    return _method
+
+
 def _patch_happy_api(monkeypatch):
-    def _mock_refresh_tokens_ok(self):
+    async def _mock_refresh_tokens_ok(self):
         self.access_token = "ACCESS_SECRETO"
         self.refresh_token_value = "REFRESH_SECRETO"
         self.aws_credentials = {
@@ -34,17 +43,19 @@ def _patch_happy_api(monkeypatch):
         }
         return True
 
-    monkeypatch.setattr(MySairAPI, "refresh_tokens", _mock_refresh_tokens_ok)
-    monkeypatch.setattr(MySairAPI, "get_locations", lambda self: [{"id": 1001}])
+    monkeypatch.setattr(MySairAsyncAPI, "async_refresh_tokens", _mock_refresh_tokens_ok)
+    monkeypatch.setattr(
+        MySairAsyncAPI, "async_get_locations", _coro(lambda self: [{"id": 1001}])
+    )
     monkeypatch.setattr(
-        MySairAPI,
-        "get_installations",
-        lambda self, location_id: [{"reference": "INST_A"}],
+        MySairAsyncAPI,
+        "async_get_installations",
+        _coro(lambda self, location_id: [{"reference": "INST_A"}]),
     )
     monkeypatch.setattr(
-        MySairAPI,
-        "get_devices",
-        lambda self, ref: [{"reference": "DEV_1", "name": "Salon"}],
+        MySairAsyncAPI,
+        "async_get_devices",
+        _coro(lambda self, ref: [{"reference": "DEV_1", "name": "Salon"}]),
     )
     monkeypatch.setattr(MySairMQTTClient, "start", lambda self: None)
 
@@ -92,13 +103,51 @@ async def test_diagnostics_includes_installations_devices_and_mqtt_state(
 
     assert result["installations"] == ["INST_A"]
     assert result["devices"] == {"INST_A": [{"reference": "DEV_1", "name": "Salon"}]}
+    assert result["topology_errors"] == {"locations": {}, "installations": {}}
+    assert result["startup"]["topology_source"] == "api"
+    assert result["startup"]["discovery_seconds"] >= 0
+    assert result["startup"]["setup_seconds"] >= 0
     assert result["mqtt"]["connected"] is False
     assert result["mqtt"]["reconnect_attempt"] == 0
     # Observabilidad D3/D4: sin mensajes ni reconexiones aún tras el setup inicial.
     assert result["mqtt"]["last_message_at"] is None
     assert result["mqtt"]["total_reconnects"] == 0
+    assert result["mqtt"]["total_rotations"] == 0
+    assert result["mqtt"]["rotation_fallbacks"] == 0
+    assert result["mqtt"]["rotation_duplicates"] == 0
+    assert result["mqtt"]["last_connack_seconds"] is None
+    assert result["mqtt"]["subscribe_failures"] == 0
+    assert result["mqtt"]["connection_entries"] == 1
     assert result["mqtt"]["parse_strict_count"] == 0
     assert result["mqtt"]["parse_fallback_count"] == 0
     assert result["mqtt"]["parse_error_count"] == 0
+    assert result["mqtt"]["status_duplicates"] == 0
     assert result["mqtt"]["last_close_code"] is None
     assert result["mqtt"]["last_close_msg"] is None
+    assert result["coordinator"] == {
+        "zone_updates": 0,
+        "zone_updates_unchanged": 0,
+        "state_writes": 0,
+        "state_writes_skipped": 0,
+        "pending_commands": 0,
+        "commands_sent": 0,
+        "commands_coalesced": 0,
+    }
+    assert result["zones"] == {}  # aún sin ningún status
+    # Sync adaptativo: sin conexión MQTT aún, no se ha pedido ningún sync.
+    assert result["status_sync"]["syncs_sent"] == 0
+    assert result["status_sync"]["syncs_avoided"] == 0
+    assert result["status_sync"]["sync_errors"] == 0
+    assert result["status_handoff"] == {
+        "high_water": 0,
+        "merged": 0,
+        "dropped": 0,
+        "batches": 0,
+    }
+    assert set(result["status_value_cache"]) == {
+        "size",
+        "maxsize",
+        "hits",
+        "misses",
+        "evictions",
+    }
@@ -1,10 +1,11 @@
 """Tests P2 de entidades y eventos MQTT (harness de Home Assistant, ver Dockerfile.test).
 
 Cubre climate/sensor/switch reaccionando a `mysair_update` y enviando comandos
-vía `send_zone_command`. Sin red real: MySairAPI y MySairMQTTClient van
+vía `async_send_zone_command`. Sin red real: MySairAsyncAPI y MySairMQTTClient van
 parcheados (igual que en test_init_setup_unload.py).
 """
 
+import json
 import logging
 from datetime import timedelta
 
@@ -14,6 +15,7 @@ pytest.importorskip("homeassistant")
 
 import homeassistant.util.dt as dt_util
 from homeassistant.components.climate.const import HVACMode, HVACAction
+from homeassistant.exceptions import ServiceValidationError
 from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.entity_component import async_update_entity
 from pytest_homeassistant_custom_component.common import (
@@ -21,39 +23,64 @@ from pytest_homeassistant_custom_component.common import (
     async_fire_time_changed,
 )
 
-from custom_components.mysair.const import DOMAIN, FEEDBACK_TIMEOUT_SECONDS
-from custom_components.mysair.api import MySairAPI
+from custom_components.mysair.const import (
+    CONF_BUS_EVENTS,
+    DOMAIN,
+    FEEDBACK_TIMEOUT_SECONDS,
+)
+from custom_components.mysair.api import MySairAsyncAPI
 from custom_components.mysair.mqtt_handler import MySairMQTTClient
+from custom_components.mysair.status_parser import ZoneState
+
+
+def _coro(fn):
+    """Envuelve un doble síncrono como método ``async`` (cliente MySairAsyncAPI)."""
+
+    async def _method(self, *args, **kwargs):
+        return fn(self, *args, **kwargs)
+
+    return _method
+
+
+async def _mock_aws_credentials(self):
+    # Lo que necesita mqtt_manager.py para elegir conexión: aws_mqtt_user.
+    self.aws_credentials = {"aws_mqtt_user": "web0000", "aws_expires_at": 9999999999}
+    return self.aws_credentials
 
 
 def _patch_happy_api(monkeypatch, send_zone_command_calls=None):
-    def _refresh_tokens(self):
+    async def _refresh_tokens(self):
         self.access_token = "ACCESS"
         self.refresh_token_value = "REFRESH"
         return True
 
-    monkeypatch.setattr(MySairAPI, "refresh_tokens", _refresh_tokens)
-    monkeypatch.setattr(MySairAPI, "get_locations", lambda self: [{"id": 1001}])
+    monkeypatch.setattr(MySairAsyncAPI, "async_refresh_tokens", _refresh_tokens)
+    monkeypatch.setattr(
+        MySairAsyncAPI, "async_get_locations", _coro(lambda self: [{"id": 1001}])
+    )
     monkeypatch.setattr(
-        MySairAPI,
-        "get_installations",
-        lambda self, location_id: [{"reference": "INST_A"}],
+        MySairAsyncAPI,
+        "async_get_installations",
+        _coro(lambda self, location_id: [{"reference": "INST_A"}]),
     )
     monkeypatch.setattr(
-        MySairAPI,
-        "get_devices",
-        lambda self, ref: [{"reference": "DEV_1", "name": "Salon"}],
+        MySairAsyncAPI,
+        "async_get_devices",
+        _coro(lambda self, ref: [{"reference": "DEV_1", "name": "Salon"}]),
     )
     monkeypatch.setattr(
-        MySairAPI,
-        "send_instruction",
-        lambda self, instruction: {"msg": "Creado", "error": []},
+        MySairAsyncAPI,
+        "async_send_instruction",
+        _coro(lambda self, instruction: {"msg": "Creado", "error": []}),
+    )
+    monkeypatch.setattr(
+        MySairAsyncAPI, "async_refresh_aws_credentials", _mock_aws_credentials
     )
     monkeypatch.setattr(MySairMQTTClient, "start", lambda self: None)
 
     if send_zone_command_calls is not None:
 
-        def _send_zone_command(
+        async def _send_zone_command(
             self, ctl, device, command_type, value=None, temperature=None
         ):
             send_zone_command_calls.append(
@@ -72,7 +99,9 @@ def _patch_happy_api(monkeypatch, send_zone_command_calls=None):
                 "entity": {"value": [{"orderId": order_id}]},
             }
 
-        monkeypatch.setattr(MySairAPI, "send_zone_command", _send_zone_command)
+        monkeypatch.setattr(
+            MySairAsyncAPI, "async_send_zone_command", _send_zone_command
+        )
 
 
 async def _setup_entry(hass, monkeypatch, send_zone_command_calls=None):
@@ -89,13 +118,12 @@ async def _setup_entry(hass, monkeypatch, send_zone_command_calls=None):
 
 
 def _fire_status(hass, ctl, zone):
-    hass.bus.async_fire(
-        f"{DOMAIN}_update",
-        {
-            "topic": f"pro/v1/get/ctl/{ctl}/status",
-            "data": {"ctl": ctl, "zones": [zone]},
-        },
-    )
+    # Como mqtt_message_callback: el status va directo a los coordinadores,
+    # sin evento de bus (mysair_update es opcional, ver CONF_BUS_EVENTS).
+    for data in hass.data[DOMAIN].values():
+        data["coordinator"].async_handle_status(
+            f"pro/v1/get/ctl/{ctl}/status", {"ctl": ctl, "zones": [zone]}
+        )
 
 
 def _zone(**overrides):
@@ -118,7 +146,21 @@ def _zone(**overrides):
         "fan_mode": "4",
     }
     zone.update(overrides)
-    return zone
+    return ZoneState(**zone)
+
+
+def _fire_feedback(hass, order_id, ctl):
+    # Como mqtt_message_callback: el ACK va directo al router de cada entrada.
+    for data in hass.data[DOMAIN].values():
+        data["coordinator"].feedback.async_handle_feedback(
+            {"order_id": order_id, "ctl": ctl, "raw": {}}
+        )
+
+
+def _status_payload(tr="21.5"):
+    """Payload crudo de un PUBLISH ``status`` (una zona DEV_1 en calor)."""
+    zone = {"rf": "DEV_1", "e": "1", "m": "0", "tr": tr, "tc": "22", "hum": "45"}
+    return {"ctl": "INST_A", "value": json.dumps({"t": [zone]})}
 
 
 async def test_climate_updates_from_mqtt_event(hass, monkeypatch):
@@ -249,6 +291,69 @@ async def test_malformed_status_payload_does_not_fire_update_event(hass, monkeyp
     assert events == []
 
 
+async def test_status_reaches_entities_without_bus_event_by_default(hass, monkeypatch):
+    entry = await _setup_entry(hass, monkeypatch)
+    mqtt_client = hass.data[DOMAIN][entry.entry_id]["mqtt"]
+    events = []
+    hass.bus.async_listen(f"{DOMAIN}_update", events.append)
+
+    mqtt_client.message_callback(
+        {"topic": "pro/v1/get/ctl/INST_A/status", "payload": _status_payload()}
+    )
+    mqtt_client.message_callback({"topic": "pro/v1/other", "payload": {"x": 1}})
+    await hass.async_block_till_done()
+
+    assert hass.states.get("climate.salon").attributes["current_temperature"] == 21.5
+    assert events == []  # nada para el recorder
+
+
+async def test_repeated_status_payload_is_not_parsed_again(hass, monkeypatch):
+    entry = await _setup_entry(hass, monkeypatch)
+    data = hass.data[DOMAIN][entry.entry_id]
+    coordinator = data["coordinator"]
+
+    for _ in range(3):
+        data["mqtt"].message_callback(
+            {"topic": "pro/v1/get/ctl/INST_A/status", "payload": _status_payload()}
+        )
+    await hass.async_block_till_done()
+
+    # Solo el primero llega a parsearse y redistribuirse por zona; los
+    # repetidos solo renuevan la frescura (la zona sigue disponible).
+    assert coordinator.zone_updates == 1
+    assert data["status_dedup"].duplicates == 2
+    assert hass.states.get("climate.salon").attributes["current_temperature"] == 21.5
+
+
+async def test_bus_events_option_fires_mysair_update(hass, monkeypatch):
+    _patch_happy_api(monkeypatch)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="user@example.com",
+        data={"email": "user@example.com", "refresh_token": "OLD_REFRESH"},
+        options={CONF_BUS_EVENTS: True},
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    mqtt_client = hass.data[DOMAIN][entry.entry_id]["mqtt"]
+    events = []
+    hass.bus.async_listen(f"{DOMAIN}_update", events.append)
+
+    mqtt_client.message_callback(
+        {"topic": "pro/v1/get/ctl/INST_A/status", "payload": _status_payload()}
+    )
+    mqtt_client.message_callback({"topic": "pro/v1/other", "payload": {"x": 1}})
+    await hass.async_block_till_done()
+
+    assert [e.data["topic"] for e in events] == [
+        "pro/v1/get/ctl/INST_A/status",
+        "pro/v1/other",
+    ]
+    assert events[0].data["data"]["zones"][0]["zone_id"] == "DEV_1"
+    assert hass.states.get("climate.salon").attributes["current_temperature"] == 21.5
+
+
 async def test_climate_set_hvac_mode_sends_command(hass, monkeypatch):
     calls = []
     await _setup_entry(hass, monkeypatch, send_zone_command_calls=calls)
@@ -296,6 +401,82 @@ async def test_climate_set_temperature_while_off_does_not_send_command(
     assert hass.states.get("climate.salon").attributes["temperature"] == 25.0
 
 
+async def test_climate_set_temperature_coalesces_rapid_changes(hass, monkeypatch):
+    # Arrastrar la consigna: el primer valor sale en el acto, los siguientes
+    # dentro de la ventana se agrupan y solo se envía el último.
+    calls = []
+    entry = await _setup_entry(hass, monkeypatch, send_zone_command_calls=calls)
+    _fire_status(hass, "INST_A", _zone(temp_target=22.0))
+    await hass.async_block_till_done()
+
+    for temperature in (23.0, 24.0, 25.0):
+        await hass.services.async_call(
+            "climate",
+            "set_temperature",
+            {"entity_id": "climate.salon", "temperature": temperature},
+            blocking=False,
+        )
+    # Espera a que venza la ventana (COMMAND_WINDOW_SECONDS, tiempo real).
+    await hass.async_block_till_done()
+
+    assert [call["value"] for call in calls] == [23.0, 25.0]
+    assert hass.states.get("climate.salon").attributes["temperature"] == 25.0
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    assert coordinator.stats()["commands_sent"] == 2
+    assert coordinator.stats()["commands_coalesced"] == 1
+
+
+async def test_unchanged_status_skips_state_writes(hass, monkeypatch):
+    entry = await _setup_entry(hass, monkeypatch)
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    states = []
+    hass.bus.async_listen("state_changed", states.append)
+
+    # Primer status: las 7 entidades de la zona pasan a disponibles.
+    _fire_status(hass, "INST_A", _zone())
+    await hass.async_block_till_done()
+    assert coordinator.state_writes == 7
+    states.clear()
+
+    # Sync periódico sin cambios: ninguna escritura.
+    _fire_status(hass, "INST_A", _zone())
+    await hass.async_block_till_done()
+    assert coordinator.state_writes == 7
+    assert coordinator.state_writes_skipped == 7
+
+    # Solo cambia la temperatura actual: termostato + sensor de temperatura.
+    _fire_status(hass, "INST_A", _zone(temp_actual=23.0))
+    await hass.async_block_till_done()
+    assert coordinator.state_writes == 9
+    assert coordinator.state_writes_skipped == 12
+    assert sorted(event.data["entity_id"] for event in states) == [
+        "climate.salon",
+        "sensor.salon_temperatura_actual",
+    ]
+
+
+async def test_unchanged_status_still_overrides_optimistic_state(hass, monkeypatch):
+    await _setup_entry(hass, monkeypatch, send_zone_command_calls=[])
+    _fire_status(hass, "INST_A", _zone(temp_target=22.0))
+    await hass.async_block_till_done()
+
+    await hass.services.async_call(
+        "climate",
+        "set_temperature",
+        {"entity_id": "climate.salon", "temperature": 25.0},
+        blocking=True,
+    )
+    _fire_feedback(hass, "order-1", "INST_A")
+    await hass.async_block_till_done()
+    assert hass.states.get("climate.salon").attributes["temperature"] == 25.0
+
+    # El equipo no aplicó la consigna: el status llega igual que el anterior
+    # (ningún campo cambiado) pero el estado publicado era el optimista.
+    _fire_status(hass, "INST_A", _zone(temp_target=22.0))
+    await hass.async_block_till_done()
+    assert hass.states.get("climate.salon").attributes["temperature"] == 22.0
+
+
 async def test_switch_turn_on_off_sends_commands(hass, monkeypatch):
     calls = []
     await _setup_entry(hass, monkeypatch, send_zone_command_calls=calls)
@@ -521,14 +702,52 @@ async def test_climate_command_confirmed_via_feedback(hass, monkeypatch, caplog)
     )
     assert len(calls) == 1
 
-    hass.bus.async_fire(
-        f"{DOMAIN}_feedback", {"order_id": "order-1", "ctl": "INST_A", "raw": {}}
-    )
+    _fire_feedback(hass, "order-1", "INST_A")
     await hass.async_block_till_done()
 
     assert "Comando confirmado" in caplog.text
 
 
+async def test_feedback_topic_routes_ack_by_order_id_without_bus_listeners(
+    hass, monkeypatch, caplog
+):
+    caplog.set_level(logging.DEBUG)
+    calls = []
+    entry = await _setup_entry(hass, monkeypatch, send_zone_command_calls=calls)
+    _fire_status(hass, "INST_A", _zone())
+    await hass.async_block_till_done()
+    # Ninguna entidad escucha el bus: el ACK lo entrega el router por orderId.
+    assert hass.bus.async_listeners().get(f"{DOMAIN}_feedback", 0) == 0
+    events = []
+    hass.bus.async_listen(f"{DOMAIN}_feedback", events.append)
+
+    await hass.services.async_call(
+        "switch", "turn_off", {"entity_id": "switch.salon"}, blocking=True
+    )
+    router = hass.data[DOMAIN][entry.entry_id]["coordinator"].feedback
+    assert router.pending_count == 1
+
+    mqtt_client = hass.data[DOMAIN][entry.entry_id]["mqtt"]
+    mqtt_client.message_callback(
+        {
+            "topic": "pro/v1/get/usr/web0077/feedback",
+            "payload": {"orderId": "order-1", "ctl": "INST_A"},
+        }
+    )
+    await hass.async_block_till_done()
+
+    assert "Comando confirmado para Salon (orderId=order-1)" in caplog.text
+    assert router.pending_count == 0
+    # El evento sigue disponible para automatizaciones.
+    assert [event.data["order_id"] for event in events] == ["order-1"]
+
+    # Confirmado: el timeout ya no revierte el estado optimista.
+    future = dt_util.utcnow() + timedelta(seconds=FEEDBACK_TIMEOUT_SECONDS + 1)
+    async_fire_time_changed(hass, future)
+    await hass.async_block_till_done()
+    assert hass.states.get("switch.salon").state == "off"
+
+
 async def test_climate_command_feedback_from_other_installation_ignored(
     hass, monkeypatch, caplog
 ):
@@ -546,9 +765,7 @@ async def test_climate_command_feedback_from_other_installation_ignored(
     )
     assert len(calls) == 1
 
-    hass.bus.async_fire(
-        f"{DOMAIN}_feedback", {"order_id": "order-1", "ctl": "OTHER_INST", "raw": {}}
-    )
+    _fire_feedback(hass, "order-1", "OTHER_INST")
     await hass.async_block_till_done()
 
     assert "Comando confirmado" not in caplog.text
@@ -625,9 +842,7 @@ async def test_switch_command_confirmed_via_feedback(hass, monkeypatch, caplog):
     )
     assert len(calls) == 1
 
-    hass.bus.async_fire(
-        f"{DOMAIN}_feedback", {"order_id": "order-1", "ctl": "INST_A", "raw": {}}
-    )
+    _fire_feedback(hass, "order-1", "INST_A")
     await hass.async_block_till_done()
 
     assert "Comando confirmado" in caplog.text
@@ -910,6 +1125,7 @@ async def test_mqtt_status_sensor_reflects_connection_state(hass, monkeypatch):
     mqtt_client.parse_fallback_count = 1
     mqtt_client.parse_error_count = 2
     mqtt_client.total_reconnects = 4
+    mqtt_client.last_connack_seconds = 0.42
     await async_update_entity(hass, entity_id)
 
     state = hass.states.get(entity_id)
@@ -919,3 +1135,123 @@ async def test_mqtt_status_sensor_reflects_connection_state(hass, monkeypatch):
     assert state.attributes["parse_fallback_count"] == 1
     assert state.attributes["parse_error_count"] == 2
     assert state.attributes["total_reconnects"] == 4
+    assert state.attributes["last_connack_seconds"] == 0.42
+
+
+# --- Servicio mysair.set_zones (varias zonas en un solo envío por lotes) ---
+
+
+async def _setup_two_zones(hass, monkeypatch, instructions):
+    _patch_happy_api(monkeypatch)
+    monkeypatch.setattr(
+        MySairAsyncAPI,
+        "async_get_devices",
+        _coro(
+            lambda self, ref: [
+                {"reference": "DEV_1", "name": "Salon"},
+                {"reference": "DEV_2", "name": "Dormitorio"},
+            ]
+        ),
+    )
+
+    def _send_instruction(self, instruction):
+        instructions.append(instruction)
+        return {
+            "msg": "Creado",
+            "error": [],
+            "entity": {
+                "value": [
+                    {"orderId": f"batch-{item['device']}-{item['command']}"}
+                    for item in instruction
+                ]
+            },
+        }
+
+    monkeypatch.setattr(
+        MySairAsyncAPI, "async_send_instruction", _coro(_send_instruction)
+    )
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="user@example.com",
+        data={"email": "user@example.com", "refresh_token": "OLD_REFRESH"},
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    for zone_id in ("DEV_1", "DEV_2"):
+        _fire_status(hass, "INST_A", _zone(zone_id=zone_id))
+    await hass.async_block_till_done()
+    instructions.clear()  # descarta el "status" del refresco periódico
+
+
+async def test_set_zones_sends_single_batch_for_all_zones(hass, monkeypatch, caplog):
+    caplog.set_level(logging.DEBUG)
+    instructions = []
+    await _setup_two_zones(hass, monkeypatch, instructions)
+
+    await hass.services.async_call(
+        DOMAIN,
+        "set_zones",
+        {
+            "entity_id": ["climate.salon", "climate.dormitorio"],
+            "hvac_mode": "cool",
+            "temperature": 24,
+        },
+        blocking=True,
+    )
+
+    assert len(instructions) == 1
+    assert [(item["device"], item["command"]) for item in instructions[0]] == [
+        ("DEV_1", "mode"),
+        ("DEV_2", "mode"),
+    ]
+    assert instructions[0][0]["value"] == {"mode": "1", "temperature": "24.0"}
+    for entity_id in ("climate.salon", "climate.dormitorio"):
+        state = hass.states.get(entity_id)
+        assert state.state == HVACMode.COOL  # optimista
+        assert state.attributes["temperature"] == 24.0
+
+    # Cada zona correlaciona su propio orderId del lote.
+    _fire_feedback(hass, "batch-DEV_2-mode", "INST_A")
+    await hass.async_block_till_done()
+    assert "Comando confirmado para Dormitorio" in caplog.text
+
+    future = dt_util.utcnow() + timedelta(seconds=FEEDBACK_TIMEOUT_SECONDS + 1)
+    async_fire_time_changed(hass, future)
+    await hass.async_block_till_done()
+    # Sin ACK: solo la zona no confirmada vuelve a su estado anterior.
+    assert hass.states.get("climate.salon").state == HVACMode.HEAT
+    assert hass.states.get("climate.dormitorio").state == HVACMode.COOL
+
+
+async def test_set_zones_rejects_unavailable_mode_without_sending(hass, monkeypatch):
+    instructions = []
+    await _setup_two_zones(hass, monkeypatch, instructions)
+    _fire_status(hass, "INST_A", _zone(zone_id="DEV_2", allow_cool=False))
+    await hass.async_block_till_done()
+
+    with pytest.raises(ServiceValidationError):
+        await hass.services.async_call(
+            DOMAIN,
+            "set_zones",
+            {
+                "entity_id": ["climate.salon", "climate.dormitorio"],
+                "hvac_mode": "cool",
+            },
+            blocking=True,
+        )
+    assert instructions == []
+
+
+async def test_set_zones_rejects_non_mysair_entity(hass, monkeypatch):
+    instructions = []
+    await _setup_two_zones(hass, monkeypatch, instructions)
+
+    with pytest.raises(ServiceValidationError):
+        await hass.services.async_call(
+            DOMAIN,
+            "set_zones",
+            {"entity_id": ["climate.no_existe"], "hvac_mode": "off"},
+            blocking=True,
+        )
+    assert instructions == []
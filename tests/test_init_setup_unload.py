@@ -5,6 +5,8 @@ validar el ciclo de vida (setup/unload, ConfigEntryAuthFailed/NotReady), no
 el protocolo (ya cubierto en tests/test_api.py, tests/test_status_parser.py).
 """
 
+import asyncio
+
 import pytest
 
 pytest.importorskip("homeassistant")
@@ -14,16 +16,36 @@ from homeassistant.exceptions import ServiceValidationError
 from homeassistant.helpers import entity_registry as er
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
-from custom_components.mysair.const import DOMAIN, SERVICE_STOP_INSTALLATION
+from custom_components.mysair.const import (
+    CONF_BUS_EVENTS,
+    CONF_MQTT_TRANSPORT,
+    DOMAIN,
+    MQTT_TRANSPORT_ASYNCIO,
+    SERVICE_STOP_INSTALLATION,
+)
 from custom_components.mysair.api import (
-    MySairAPI,
+    MySairAsyncAPI,
     MySairAuthError,
     MySairConnectionError,
 )
-from custom_components.mysair.mqtt_handler import MySairMQTTClient
+from custom_components.mysair.mqtt_handler import (
+    MySairAsyncMQTTClient,
+    MySairMQTTClient,
+)
+from custom_components.mysair.mqtt_manager import async_get_mqtt_manager
+from custom_components.mysair.status_parser import ZoneState
+
+
+def _coro(fn):
+    """Envuelve un doble síncrono como método ``async`` (cliente MySairAsyncAPI)."""
 
+    async def _method(self, *args, **kwargs):
+        return fn(self, *args, **kwargs)
 
-def _mock_refresh_tokens_ok(self):
+    return _method
+
+
+async def _mock_refresh_tokens_ok(self):
     self.access_token = "ACCESS"
     self.refresh_token_value = "REFRESH_ROTATED"
     self._notify_tokens()  # el código real lo llama tras renovar; el mock reemplaza el método entero
@@ -31,29 +53,40 @@ def _mock_refresh_tokens_ok(self):
 
 
 def _mock_refresh_tokens_raises(exc):
-    def _refresh(self):
+    async def _refresh(self):
         raise exc
 
     return _refresh
 
 
+async def _mock_aws_credentials(self):
+    # Lo que necesita mqtt_manager.py para elegir conexión: aws_mqtt_user.
+    self.aws_credentials = {"aws_mqtt_user": "web0000", "aws_expires_at": 9999999999}
+    return self.aws_credentials
+
+
 def _patch_happy_api(monkeypatch):
-    monkeypatch.setattr(MySairAPI, "refresh_tokens", _mock_refresh_tokens_ok)
-    monkeypatch.setattr(MySairAPI, "get_locations", lambda self: [{"id": 1001}])
+    monkeypatch.setattr(MySairAsyncAPI, "async_refresh_tokens", _mock_refresh_tokens_ok)
     monkeypatch.setattr(
-        MySairAPI,
-        "get_installations",
-        lambda self, location_id: [{"reference": "INST_A"}],
+        MySairAsyncAPI, "async_get_locations", _coro(lambda self: [{"id": 1001}])
     )
     monkeypatch.setattr(
-        MySairAPI,
-        "get_devices",
-        lambda self, ref: [{"reference": "DEV_1", "name": "Salon"}],
+        MySairAsyncAPI,
+        "async_get_installations",
+        _coro(lambda self, location_id: [{"reference": "INST_A"}]),
     )
     monkeypatch.setattr(
-        MySairAPI,
-        "send_instruction",
-        lambda self, instruction: {"msg": "Creado", "error": []},
+        MySairAsyncAPI,
+        "async_get_devices",
+        _coro(lambda self, ref: [{"reference": "DEV_1", "name": "Salon"}]),
+    )
+    monkeypatch.setattr(
+        MySairAsyncAPI,
+        "async_send_instruction",
+        _coro(lambda self, instruction: {"msg": "Creado", "error": []}),
+    )
+    monkeypatch.setattr(
+        MySairAsyncAPI, "async_refresh_aws_credentials", _mock_aws_credentials
     )
     monkeypatch.setattr(MySairMQTTClient, "start", lambda self: None)
 
@@ -66,13 +99,14 @@ def _make_entry(refresh_token="OLD_REFRESH", extra_data=None):
 
 
 def _fire_status(hass, ctl, zone):
-    hass.bus.async_fire(
-        f"{DOMAIN}_update",
-        {
-            "topic": f"pro/v1/get/ctl/{ctl}/status",
-            "data": {"ctl": ctl, "zones": [zone]},
-        },
-    )
+    # Como mqtt_message_callback: el status va directo a los coordinadores,
+    # sin evento de bus (mysair_update es opcional, ver CONF_BUS_EVENTS).
+    # ``zone``: campos de la zona, como ya los deja parse_status_payload.
+    zone_state = ZoneState(ctl=ctl, **zone)
+    for data in hass.data[DOMAIN].values():
+        data["coordinator"].async_handle_status(
+            f"pro/v1/get/ctl/{ctl}/status", {"ctl": ctl, "zones": [zone_state]}
+        )
 
 
 async def test_setup_entry_success(hass, monkeypatch):
@@ -118,8 +152,8 @@ async def test_setup_entry_missing_refresh_token_triggers_reauth(hass, monkeypat
 
 async def test_setup_entry_invalid_session_triggers_reauth(hass, monkeypatch):
     monkeypatch.setattr(
-        MySairAPI,
-        "refresh_tokens",
+        MySairAsyncAPI,
+        "async_refresh_tokens",
         _mock_refresh_tokens_raises(MySairAuthError("expired")),
     )
     entry = _make_entry()
@@ -133,8 +167,8 @@ async def test_setup_entry_invalid_session_triggers_reauth(hass, monkeypatch):
 
 async def test_setup_entry_connection_error_retries(hass, monkeypatch):
     monkeypatch.setattr(
-        MySairAPI,
-        "refresh_tokens",
+        MySairAsyncAPI,
+        "async_refresh_tokens",
         _mock_refresh_tokens_raises(MySairConnectionError("boom")),
     )
     entry = _make_entry()
@@ -148,7 +182,7 @@ async def test_setup_entry_connection_error_retries(hass, monkeypatch):
 
 async def test_setup_entry_no_locations_retries(hass, monkeypatch):
     _patch_happy_api(monkeypatch)
-    monkeypatch.setattr(MySairAPI, "get_locations", lambda self: [])
+    monkeypatch.setattr(MySairAsyncAPI, "async_get_locations", _coro(lambda self: []))
     entry = _make_entry()
     entry.add_to_hass(hass)
 
@@ -160,7 +194,9 @@ async def test_setup_entry_no_locations_retries(hass, monkeypatch):
 
 async def test_setup_entry_no_installations_retries(hass, monkeypatch):
     _patch_happy_api(monkeypatch)
-    monkeypatch.setattr(MySairAPI, "get_installations", lambda self, location_id: [])
+    monkeypatch.setattr(
+        MySairAsyncAPI, "async_get_installations", _coro(lambda self, location_id: [])
+    )
     entry = _make_entry()
     entry.add_to_hass(hass)
 
@@ -188,6 +224,183 @@ async def test_unload_entry_cleans_up(hass, monkeypatch):
     assert stop_calls == [True]
 
 
+async def test_asyncio_transport_runs_in_loop_and_fires_update(hass, monkeypatch):
+    _patch_happy_api(monkeypatch)
+    calls = []
+    monkeypatch.setattr(
+        MySairAsyncMQTTClient, "start", lambda self: calls.append("start")
+    )
+    monkeypatch.setattr(
+        MySairAsyncMQTTClient, "async_stop", _coro(lambda self: calls.append("stop"))
+    )
+    monkeypatch.setattr(
+        MySairMQTTClient, "start", lambda self: calls.append("thread_start")
+    )
+    events = []
+    hass.bus.async_listen(f"{DOMAIN}_update", events.append)
+
+    entry = _make_entry()
+    entry.add_to_hass(hass)
+    hass.config_entries.async_update_entry(
+        entry,
+        options={CONF_MQTT_TRANSPORT: MQTT_TRANSPORT_ASYNCIO, CONF_BUS_EVENTS: True},
+    )
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    mqtt_client = hass.data[DOMAIN][entry.entry_id]["mqtt"]
+    assert isinstance(mqtt_client.client, MySairAsyncMQTTClient)
+    assert calls == ["start"]
+
+    # El callback se invoca en el loop: el evento se dispara sin saltos de hilo.
+    mqtt_client.message_callback(
+        {"topic": "pro/v1/get/ctl/INST_A/status", "payload": {"ctl": "INST_A"}}
+    )
+    await hass.async_block_till_done()
+    assert len(events) == 1
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert calls == ["start", "stop"]
+
+
+async def test_entries_with_same_mqtt_user_share_one_connection(hass, monkeypatch):
+    _patch_happy_api(monkeypatch)
+    monkeypatch.setattr(
+        MySairAsyncAPI,
+        "async_get_installations",
+        _coro(lambda self, location_id: [{"reference": f"INST_{self.email[0]}"}]),
+    )
+    calls = []
+    monkeypatch.setattr(MySairMQTTClient, "start", lambda self: calls.append("start"))
+    monkeypatch.setattr(MySairMQTTClient, "stop", lambda self: calls.append("stop"))
+    monkeypatch.setattr(
+        MySairMQTTClient,
+        "add_installations",
+        lambda self, refs: calls.append(("add", refs)),
+    )
+    monkeypatch.setattr(
+        MySairMQTTClient,
+        "remove_installations",
+        lambda self, refs: calls.append(("remove", refs)),
+    )
+
+    entries = []
+    for email in ("a@example.com", "b@example.com"):
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            unique_id=email,
+            data={"email": email, "refresh_token": "OLD_REFRESH"},
+        )
+        entry.add_to_hass(hass)
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        entries.append(entry)
+
+    link_a = hass.data[DOMAIN][entries[0].entry_id]["mqtt"]
+    link_b = hass.data[DOMAIN][entries[1].entry_id]["mqtt"]
+    assert link_a.client is link_b.client  # mismo aws_mqtt_user: un cliente
+    assert calls == ["start", ("add", ["INST_b"])]
+
+    # Cada status va solo a la entrada dueña de la instalación.
+    received = []
+    for entry in entries:
+        monkeypatch.setattr(
+            hass.data[DOMAIN][entry.entry_id]["coordinator"],
+            "async_handle_status",
+            lambda topic, data, entry=entry: received.append(entry.unique_id),
+        )
+    link_a.message_callback(
+        {"topic": "pro/v1/get/ctl/INST_b/status", "payload": {"ctl": "INST_b"}}
+    )
+    await hass.async_block_till_done()
+    assert received == ["b@example.com"]
+
+    # Descargar una entrada no corta la conexión de la otra.
+    assert await hass.config_entries.async_unload(entries[0].entry_id)
+    await hass.async_block_till_done()
+    assert calls[-1] == ("remove", ["INST_a"])
+    assert "stop" not in calls
+
+    assert await hass.config_entries.async_unload(entries[1].entry_id)
+    await hass.async_block_till_done()
+    assert calls[-1] == "stop"
+
+
+async def test_shared_connection_fires_each_feedback_once(hass, monkeypatch):
+    _patch_happy_api(monkeypatch)
+    monkeypatch.setattr(
+        MySairAsyncAPI,
+        "async_get_installations",
+        _coro(lambda self, location_id: [{"reference": f"INST_{self.email[0]}"}]),
+    )
+    monkeypatch.setattr(MySairMQTTClient, "stop", lambda self: None)
+    monkeypatch.setattr(MySairMQTTClient, "add_installations", lambda self, refs: None)
+    monkeypatch.setattr(
+        MySairMQTTClient, "remove_installations", lambda self, refs: None
+    )
+    entries = []
+    for email in ("a@example.com", "b@example.com"):
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            unique_id=email,
+            data={"email": email, "refresh_token": "OLD_REFRESH"},
+        )
+        entry.add_to_hass(hass)
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        entries.append(entry)
+
+    events = []
+    hass.bus.async_listen(f"{DOMAIN}_feedback", events.append)
+    router_b = hass.data[DOMAIN][entries[1].entry_id]["coordinator"].feedback
+    entity = type("_Entity", (), {"inst_ref": "INST_b", "name": "Salon"})()
+    router_b.track(entity, "ORDER_1")
+    link_a = hass.data[DOMAIN][entries[0].entry_id]["mqtt"]
+
+    # El ACK llega a la entrada que espera el orderId, una sola vez.
+    feedback_topic = "pro/v1/get/usr/web0000/feedback"
+    link_a.message_callback(
+        {"topic": feedback_topic, "payload": {"orderId": "ORDER_1", "ctl": "INST_b"}}
+    )
+    await hass.async_block_till_done()
+    assert len(events) == 1
+    assert router_b.pending_count == 0
+
+    # Un orderId que no espera nadie (p. ej. de la app) también sale una vez.
+    link_a.message_callback(
+        {"topic": feedback_topic, "payload": {"orderId": "APP_1", "ctl": "INST_a"}}
+    )
+    await hass.async_block_till_done()
+    assert [event.data["order_id"] for event in events] == ["ORDER_1", "APP_1"]
+
+    for entry in entries:
+        assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_options_change_reloads_entry_but_data_change_does_not(hass, monkeypatch):
+    _patch_happy_api(monkeypatch)
+    monkeypatch.setattr(MySairMQTTClient, "stop", lambda self: None)
+    entry = _make_entry()
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+
+    # Persistir el refresh_token (cambio de data) no recarga la entrada.
+    hass.config_entries.async_update_entry(
+        entry, data={**entry.data, "refresh_token": "NEW"}
+    )
+    await hass.async_block_till_done()
+    assert hass.data[DOMAIN][entry.entry_id]["coordinator"] is coordinator
+
+    hass.config_entries.async_update_entry(entry, options={CONF_BUS_EVENTS: True})
+    await hass.async_block_till_done()
+    assert entry.state is ConfigEntryState.LOADED
+    assert hass.data[DOMAIN][entry.entry_id]["coordinator"] is not coordinator
+
+
 async def test_reload_entry_does_not_duplicate_entities_or_service(hass, monkeypatch):
     # P3 (docs/testing-strategy.md): un reload no debe dejar entidades
     # duplicadas, listeners colgados del coordinador/servicio anterior, ni
@@ -201,7 +414,8 @@ async def test_reload_entry_does_not_duplicate_entities_or_service(hass, monkeyp
     await hass.async_block_till_done()
 
     assert await hass.config_entries.async_reload(entry.entry_id)
-    await hass.async_block_till_done()
+    # Desde caché: la revalidación es una tarea de fondo.
+    await hass.async_block_till_done(wait_background_tasks=True)
 
     assert entry.state is ConfigEntryState.LOADED
     assert hass.states.async_entity_ids("climate") == ["climate.salon"]
@@ -224,16 +438,16 @@ async def test_stop_installation_service_calls_api(hass, monkeypatch):
     _patch_happy_api(monkeypatch)
     calls = []
     monkeypatch.setattr(
-        MySairAPI,
-        "send_installation_command",
-        lambda self, ctl, command_type: calls.append((ctl, command_type)),
+        MySairAsyncAPI,
+        "async_send_installation_command",
+        _coro(lambda self, ctl, command_type: calls.append((ctl, command_type))),
     )
 
     entry = _make_entry()
     entry.add_to_hass(hass)
     assert await hass.config_entries.async_setup(entry.entry_id)
     await hass.async_block_till_done()
-    calls.clear()  # descarta la llamada "status" del refresco periódico (__init__.py)
+    calls.clear()  # descarta cualquier "status" del sync de respaldo (status_sync.py)
 
     assert hass.services.has_service(DOMAIN, SERVICE_STOP_INSTALLATION)
     await hass.services.async_call(
@@ -284,9 +498,11 @@ async def test_setup_entry_multiple_installations(hass, monkeypatch):
     # hasta ahora solo se probaba con una.
     _patch_happy_api(monkeypatch)
     monkeypatch.setattr(
-        MySairAPI,
-        "get_installations",
-        lambda self, location_id: [{"reference": "INST_A"}, {"reference": "INST_B"}],
+        MySairAsyncAPI,
+        "async_get_installations",
+        _coro(
+            lambda self, location_id: [{"reference": "INST_A"}, {"reference": "INST_B"}]
+        ),
     )
 
     def _get_devices(self, ref):
@@ -294,7 +510,7 @@ async def test_setup_entry_multiple_installations(hass, monkeypatch):
             return [{"reference": "DEV_1", "name": "Salon"}]
         return [{"reference": "DEV_2", "name": "Dormitorio"}]
 
-    monkeypatch.setattr(MySairAPI, "get_devices", _get_devices)
+    monkeypatch.setattr(MySairAsyncAPI, "async_get_devices", _coro(_get_devices))
 
     entry = _make_entry()
     entry.add_to_hass(hass)
@@ -355,12 +571,13 @@ async def test_topology_change_removes_orphaned_zone_device_and_entities(
 
     # Cambio de topología: DEV_1 desaparece, aparece DEV_2 nueva.
     monkeypatch.setattr(
-        MySairAPI,
-        "get_devices",
-        lambda self, ref: [{"reference": "DEV_2", "name": "Dormitorio"}],
+        MySairAsyncAPI,
+        "async_get_devices",
+        _coro(lambda self, ref: [{"reference": "DEV_2", "name": "Dormitorio"}]),
     )
     assert await hass.config_entries.async_reload(entry.entry_id)
-    await hass.async_block_till_done()
+    # Desde caché: la revalidación es una tarea de fondo.
+    await hass.async_block_till_done(wait_background_tasks=True)
 
     # La zona nueva se crea y funciona con normalidad.
     assert hass.states.get("climate.dormitorio") is not None
@@ -381,3 +598,289 @@ async def test_topology_change_removes_orphaned_zone_device_and_entities(
         is None
     )
     assert hass.states.get("climate.salon") is None
+
+
+async def test_setup_entry_discovers_every_location(hass, monkeypatch):
+    # Antes solo se miraba locations[0]; ahora se recorren todas.
+    _patch_happy_api(monkeypatch)
+    monkeypatch.setattr(
+        MySairAsyncAPI,
+        "async_get_locations",
+        _coro(lambda self: [{"id": 1001}, {"id": 1002}]),
+    )
+    monkeypatch.setattr(
+        MySairAsyncAPI,
+        "async_get_installations",
+        _coro(
+            lambda self, location_id: [
+                {"reference": "INST_A" if location_id == 1001 else "INST_B"}
+            ]
+        ),
+    )
+
+    entry = _make_entry()
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    stored = hass.data[DOMAIN][entry.entry_id]
+    assert stored["installations"] == ["INST_A", "INST_B"]
+    assert stored["startup"]["discovery_seconds"] >= 0
+    assert stored["startup"]["setup_seconds"] >= stored["startup"]["discovery_seconds"]
+
+
+async def test_partial_discovery_failure_keeps_other_installations(
+    hass, monkeypatch, hass_storage
+):
+    # Un fallo en los dispositivos de una instalación no tumba el setup de las
+    # demás y queda reportado por instalación. Tampoco se cachea una topología
+    # incompleta (haría desaparecer INST_B en el próximo arranque).
+    _patch_happy_api(monkeypatch)
+    monkeypatch.setattr(
+        MySairAsyncAPI,
+        "async_get_installations",
+        _coro(
+            lambda self, location_id: [{"reference": "INST_A"}, {"reference": "INST_B"}]
+        ),
+    )
+
+    def _get_devices(self, ref):
+        if ref == "INST_B":
+            raise MySairConnectionError("timeout")
+        return [{"reference": "DEV_1", "name": "Salon"}]
+
+    monkeypatch.setattr(MySairAsyncAPI, "async_get_devices", _coro(_get_devices))
+
+    entry = _make_entry()
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert entry.state is ConfigEntryState.LOADED
+    stored = hass.data[DOMAIN][entry.entry_id]
+    assert stored["installations"] == ["INST_A"]
+    assert stored["topology_errors"] == {
+        "locations": {},
+        "installations": {"INST_B": "timeout"},
+    }
+    assert _topology_cache_key(entry) not in hass_storage
+
+
+async def test_setup_entry_all_installations_failing_retries(hass, monkeypatch):
+    _patch_happy_api(monkeypatch)
+
+    def _get_devices(self, ref):
+        raise MySairConnectionError("timeout")
+
+    monkeypatch.setattr(MySairAsyncAPI, "async_get_devices", _coro(_get_devices))
+    entry = _make_entry()
+    entry.add_to_hass(hass)
+
+    assert not await hass.config_entries.async_setup(entry.entry_id)
+    assert entry.state is ConfigEntryState.SETUP_RETRY
+
+
+# --- Caché persistente de topología (arranque desde .storage/) ---
+
+
+def _topology_cache_key(entry):
+    return f"{DOMAIN}.topology.{entry.entry_id}"
+
+
+async def test_first_setup_saves_topology_cache(hass, monkeypatch, hass_storage):
+    _patch_happy_api(monkeypatch)
+    entry = _make_entry()
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert hass_storage[_topology_cache_key(entry)]["data"] == {
+        "installations": ["INST_A"],
+        "devices": {"INST_A": [{"reference": "DEV_1", "name": "Salon"}]},
+    }
+    assert hass.data[DOMAIN][entry.entry_id]["startup"]["topology_source"] == "api"
+
+
+async def test_setup_from_cache_does_not_wait_for_backend(hass, monkeypatch):
+    # Con caché, las entidades se crean sin ninguna llamada HTTP previa: aunque
+    # el backend no responda, la entrada queda cargada (la sesión se reintenta
+    # en segundo plano).
+    _patch_happy_api(monkeypatch)
+    monkeypatch.setattr(MySairMQTTClient, "stop", lambda self: None)
+    entry = _make_entry()
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    calls = []
+
+    def _unreachable(self, *args):
+        calls.append(args)
+        raise MySairConnectionError("backend caído")
+
+    monkeypatch.setattr(MySairAsyncAPI, "async_refresh_tokens", _coro(_unreachable))
+    monkeypatch.setattr(MySairAsyncAPI, "async_get_locations", _coro(_unreachable))
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    # Desde caché: la revalidación es una tarea de fondo.
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    assert entry.state is ConfigEntryState.LOADED
+    assert hass.data[DOMAIN][entry.entry_id]["startup"]["topology_source"] == "cache"
+    assert hass.states.get("climate.salon") is not None
+    # Solo el intento de sesión en segundo plano; nada de descubrimiento.
+    assert len(calls) == 1
+
+    # El reintento programado se cancela con la descarga.
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_setup_from_cache_invalid_session_starts_reauth(hass, monkeypatch):
+    _patch_happy_api(monkeypatch)
+    monkeypatch.setattr(MySairMQTTClient, "stop", lambda self: None)
+    entry = _make_entry()
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    monkeypatch.setattr(
+        MySairAsyncAPI,
+        "async_refresh_tokens",
+        _mock_refresh_tokens_raises(MySairAuthError("expired")),
+    )
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    # Desde caché: la revalidación es una tarea de fondo.
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    flows = hass.config_entries.flow.async_progress_by_handler(DOMAIN)
+    assert [flow["context"]["source"] for flow in flows] == ["reauth"]
+
+
+async def test_unload_during_cache_revalidation_starts_nothing(hass, monkeypatch):
+    # Descargada con la sesión aún renovándose: la revalidación se cancela y
+    # no arranca MQTT, ni el sync de status ni el timer de tokens.
+    _patch_happy_api(monkeypatch)
+    monkeypatch.setattr(MySairMQTTClient, "stop", lambda self: None)
+    entry = _make_entry()
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    refreshing = asyncio.Event()
+
+    async def _hanging_refresh(self):
+        refreshing.set()
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(MySairAsyncAPI, "async_refresh_tokens", _hanging_refresh)
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    await refreshing.wait()
+    data = hass.data[DOMAIN][entry.entry_id]
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    assert data["api"]._refresh_timer is None
+    assert data["status_sync"]._started_at is None
+    assert not async_get_mqtt_manager(hass)._connections
+
+
+async def test_revalidation_adds_new_zone_without_reload(hass, monkeypatch):
+    _patch_happy_api(monkeypatch)
+    monkeypatch.setattr(MySairMQTTClient, "stop", lambda self: None)
+    entry = _make_entry()
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    monkeypatch.setattr(
+        MySairAsyncAPI,
+        "async_get_devices",
+        _coro(
+            lambda self, ref: [
+                {"reference": "DEV_1", "name": "Salon"},
+                {"reference": "DEV_2", "name": "Dormitorio"},
+            ]
+        ),
+    )
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    # Desde caché: la revalidación es una tarea de fondo.
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    assert hass.states.get("climate.salon") is not None
+    assert hass.states.get("climate.dormitorio") is not None
+    assert hass.states.get("switch.dormitorio_suelo") is not None
+    stored = hass.data[DOMAIN][entry.entry_id]
+    assert [dev["reference"] for dev in stored["devices"]["INST_A"]] == [
+        "DEV_1",
+        "DEV_2",
+    ]
+    assert stored["startup"]["revalidation_seconds"] >= 0
+
+    # La zona nueva recibe status como cualquier otra.
+    _fire_status(
+        hass,
+        "INST_A",
+        {"zone_id": "DEV_2", "is_on": True, "is_heat": True, "is_cool": False},
+    )
+    await hass.async_block_till_done()
+    assert hass.states.get("climate.dormitorio").state != "unavailable"
+
+
+async def test_revalidation_partial_failure_keeps_cached_zones(hass, monkeypatch):
+    # Con la revalidación parcial no se sabe si las zonas de INST_B siguen
+    # existiendo: se mantienen las de la caché en vez de tratarlas como
+    # eliminadas.
+    _patch_happy_api(monkeypatch)
+    monkeypatch.setattr(MySairMQTTClient, "stop", lambda self: None)
+    monkeypatch.setattr(
+        MySairAsyncAPI,
+        "async_get_installations",
+        _coro(
+            lambda self, location_id: [{"reference": "INST_A"}, {"reference": "INST_B"}]
+        ),
+    )
+
+    def _get_devices(self, ref):
+        if ref == "INST_A":
+            return [{"reference": "DEV_1", "name": "Salon"}]
+        return [{"reference": "DEV_2", "name": "Dormitorio"}]
+
+    monkeypatch.setattr(MySairAsyncAPI, "async_get_devices", _coro(_get_devices))
+    entry = _make_entry()
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    def _get_devices_failing(self, ref):
+        if ref == "INST_B":
+            raise MySairConnectionError("timeout")
+        return _get_devices(self, ref)
+
+    monkeypatch.setattr(
+        MySairAsyncAPI, "async_get_devices", _coro(_get_devices_failing)
+    )
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    # Desde caché: la revalidación es una tarea de fondo.
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    stored = hass.data[DOMAIN][entry.entry_id]
+    assert stored["installations"] == ["INST_A", "INST_B"]
+    assert stored["topology_errors"]["installations"] == {"INST_B": "timeout"}
+    registry = er.async_get(hass)
+    assert registry.async_get_entity_id("climate", DOMAIN, "mysair_INST_B_DEV_2")
+    assert hass.states.get("climate.dormitorio") is not None
+
+
+async def test_remove_entry_deletes_topology_cache(hass, monkeypatch, hass_storage):
+    _patch_happy_api(monkeypatch)
+    monkeypatch.setattr(MySairMQTTClient, "stop", lambda self: None)
+    entry = _make_entry()
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    assert _topology_cache_key(entry) in hass_storage
+
+    await hass.config_entries.async_remove(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert _topology_cache_key(entry) not in hass_storage
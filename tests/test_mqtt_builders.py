@@ -10,7 +10,13 @@ import pytest
 
 pytest.importorskip("websocket")
 
-from mqtt_handler import build_mqtt_connect, build_mqtt_subscribe, encode_varint
+from mqtt_handler import (
+    build_mqtt_connect,
+    build_mqtt_subscribe,
+    build_mqtt_unsubscribe,
+    encode_varint,
+    parse_mqtt_suback,
+)
 
 
 @pytest.mark.parametrize(
@@ -64,3 +70,26 @@ def test_build_mqtt_subscribe_packet_id_varies():
     p2 = build_mqtt_subscribe(2, "t")
     assert p1 != p2
     assert struct.pack("!H", 2) in p2
+
+
+def test_build_mqtt_subscribe_packs_several_topics():
+    topics = ["pro/v1/get/ctl/INST_A/#", "pro/v1/get/usr/web0000/feedback"]
+    pkt = build_mqtt_subscribe(7, topics)
+    expected = struct.pack("!H", 7) + b"".join(
+        struct.pack("!H", len(t)) + t.encode() + b"\x00" for t in topics
+    )
+    assert pkt == b"\x82" + encode_varint(len(expected)) + expected
+    assert build_mqtt_subscribe(7, topics[:1]) == build_mqtt_subscribe(7, topics[0])
+
+
+def test_parse_mqtt_suback_return_codes():
+    assert parse_mqtt_suback(b"\x90\x04\x00\x05\x00\x80") == (5, b"\x00\x80")
+    assert parse_mqtt_suback(b"\x90\x01\x00") == (None, b"")  # sin packet_id
+    assert parse_mqtt_suback(b"\x90\x04\x00\x05") == (None, b"")  # truncado
+    assert parse_mqtt_suback(b"\x20\x02\x00\x00") == (None, b"")  # CONNACK
+
+
+def test_build_mqtt_unsubscribe_structure():
+    pkt = build_mqtt_unsubscribe(3, ["a/#", "b"])
+    expected = struct.pack("!H", 3) + b"\x00\x03a/#" + b"\x00\x01b"
+    assert pkt == b"\xa2" + encode_varint(len(expected)) + expected
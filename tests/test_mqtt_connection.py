@@ -1,6 +1,6 @@
 """Tests P0/P1 de la robustez de conexión MQTT (client_id, topic, expiración).
 
-Sin Home Assistant. Requiere websocket-client (mqtt_handler) y requests (api).
+Sin Home Assistant. Requiere websocket-client (mqtt_handler) y requests/aiohttp (api).
 """
 
 import time
@@ -9,8 +9,13 @@ import pytest
 
 pytest.importorskip("websocket")
 pytest.importorskip("requests")
+pytest.importorskip("aiohttp")
 
+import asyncio
 import struct
+import threading
+
+import aiohttp
 
 import mqtt_handler
 from mqtt_handler import (
@@ -23,10 +28,11 @@ from mqtt_handler import (
     parse_mqtt_publish,
     FrameState,
     MAX_RECV_BUFFER_SIZE,
+    MySairAsyncMQTTClient,
     MySairMQTTClient,
     _next_packet_length,
 )
-from api import MySairAPI
+from api import MySairAPI, MySairAsyncAPI
 
 
 # --- build_client_id (#20) ---
@@ -186,6 +192,24 @@ def _client():
     return client, received
 
 
+def test_connection_callback_reports_connack_and_close_once():
+    changes = []
+    client = MySairMQTTClient(
+        api=None,
+        installation_refs=[],
+        message_callback=lambda data: None,
+        connection_callback=changes.append,
+    )
+
+    client._on_message(None, b"\x20\x02\x00\x00")  # CONNACK
+    client._on_message(None, b"\x20\x02\x00\x00")  # repetido: sin cambio
+    client._on_close(None, 1006, "caída")
+    client._on_close(None, 1006, "caída")
+
+    assert changes == [True, False]
+    assert client.connected is False
+
+
 def test_on_message_extracts_topic_without_parens():
     client, received = _client()
     msg = _publish_message(
@@ -292,6 +316,20 @@ def test_parse_mqtt_publish_qos1_skips_packet_identifier():
     assert parsed_payload == payload
 
 
+def test_parse_mqtt_publish_accepts_memoryview_without_copy():
+    topic = "pro/v1/get/ctl/INST_A/status"
+    payload = b'{"ctl":"INST_A"}'
+    buffer = bytearray(b"\x00\x00" + _build_publish_frame(topic, payload))
+
+    with memoryview(buffer) as view:
+        parsed_topic, parsed_payload = parse_mqtt_publish(view[2:])
+        assert parsed_topic == topic
+        assert isinstance(parsed_payload, memoryview)
+        assert parsed_payload.obj is buffer
+        assert bytes(parsed_payload) == payload
+        parsed_payload.release()
+
+
 def test_parse_mqtt_publish_rejects_non_publish_frame():
     assert parse_mqtt_publish(b"\x20\x02\x00\x00") == (None, None)  # CONNACK
 
@@ -339,9 +377,10 @@ class _FakeTimer:
 
     instances = []
 
-    def __init__(self, delay, func):
+    def __init__(self, delay, func, args=None):
         self.delay = delay
         self.func = func
+        self.args = args
         self.started = False
         self.cancelled = False
         self.daemon = False
@@ -421,6 +460,291 @@ def test_on_credential_refresh_due_marks_planned_reconnect_and_closes_ws():
     assert closed == [True]
 
 
+class _FakeThreadWs:
+    """Doble de websocket.WebSocketApp: registra lo enviado y el cierre."""
+
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+
+    def send(self, data, opcode=None):
+        self.sent.append(data)
+
+    def close(self):
+        self.closed = True
+
+
+def _subscribed_thread_client():
+    api = MySairAPI("e", "p")
+    changes = []
+    received = []
+    client = MySairMQTTClient(
+        api=api,
+        installation_refs=["INST_A"],
+        message_callback=received.append,
+        connection_callback=changes.append,
+    )
+    client._mqtt_user = "web0000"  # lo fija _connection_params al conectar
+    client.ws = client._conn.ws = _FakeThreadWs()
+    client._on_message(client.ws, b"\x20\x02\x00\x00")  # CONNACK
+    client._on_message(client.ws, _build_suback(1, b"\x00\x00"))
+    return client, changes, received
+
+
+def test_standby_connection_takes_over_only_after_its_subacks():
+    client, changes, _ = _subscribed_thread_client()
+    old_ws = client.ws
+    standby = mqtt_handler._MQTTConnection(_FakeThreadWs())
+    client._begin_overlap(standby)
+
+    client._on_message(standby.ws, b"\x20\x02\x00\x00")  # CONNACK de la nueva
+    assert [pkt[0] for pkt in standby.ws.sent] == [0x82]  # status + feedback
+    # El broker rechaza el feedback (0x80): se vuelve a pedir solo ese.
+    client._on_message(standby.ws, _build_suback(1, b"\x00\x80"))
+    assert len(standby.ws.sent) == 2
+    assert b"pro/v1/get/usr/web0000/feedback" in standby.ws.sent[1]
+    assert b"INST_A" not in standby.ws.sent[1]
+    assert old_ws.closed is False  # falta ese SUBACK: la vieja sigue
+
+    client._on_message(standby.ws, _build_suback(2))
+    assert old_ws.closed is True
+    assert client.subscribe_failures == 1
+    assert client.ws is standby.ws
+
+    client._on_close(old_ws, 1000, None)  # cierre de la saliente: sin efecto
+    assert client.connected is True
+    assert changes == [True]
+    assert (client.total_rotations, client.total_reconnects) == (1, 0)
+
+
+def test_subscriptions_are_chunked_at_the_broker_limit():
+    refs = [f"INST_{i:02d}" for i in range(mqtt_handler.MAX_TOPICS_PER_SUBSCRIBE + 1)]
+    client = MySairMQTTClient(
+        api=MySairAPI("e", "p"),
+        installation_refs=refs,
+        message_callback=lambda data: None,
+    )
+    client._mqtt_user = "web0000"
+    client.ws = client._conn.ws = _FakeThreadWs()
+
+    client._on_message(client.ws, b"\x20\x02\x00\x00")  # CONNACK
+
+    # 9 status + feedback = 10 topics: un SUBSCRIBE de 8 y otro de 2.
+    first, second = client.ws.sent
+    assert first.count(b"pro/v1/get/ctl/") == mqtt_handler.MAX_TOPICS_PER_SUBSCRIBE
+    assert b"INST_08" in second and b"web0000/feedback" in second
+    client._on_message(client.ws, _build_suback(1, b"\x00" * 8))
+    assert client._conn.subscribed is False
+    client._on_message(client.ws, _build_suback(2, b"\x00\x00"))
+    assert client._conn.subscribed is True
+    assert client.subscribe_failures == 0
+
+
+def test_rejected_subscription_gives_up_after_max_retries():
+    client = MySairMQTTClient(
+        api=MySairAPI("e", "p"),
+        installation_refs=["INST_A"],
+        message_callback=lambda data: None,
+    )
+    client.ws = client._conn.ws = _FakeThreadWs()
+    client._on_message(client.ws, b"\x20\x02\x00\x00")  # CONNACK
+
+    for packet_id in range(1, mqtt_handler.MAX_SUBSCRIBE_RETRIES + 2):
+        client._on_message(client.ws, _build_suback(packet_id, b"\x80"))
+
+    # El SUBSCRIBE inicial y sus reintentos; después se deja de esperar.
+    assert len(client.ws.sent) == mqtt_handler.MAX_SUBSCRIBE_RETRIES + 1
+    assert client.subscribe_failures == mqtt_handler.MAX_SUBSCRIBE_RETRIES + 1
+    assert client._conn.subscribed is True
+
+
+def test_add_and_remove_installations_on_open_connection():
+    client, _, _ = _subscribed_thread_client()
+    refs = client.installation_refs
+
+    client.add_installations(["INST_A", "INST_B"])  # INST_A ya estaba
+    assert client.installation_refs == ["INST_A", "INST_B"]
+    assert refs == ["INST_A"]  # la lista del llamador no se toca
+    subscribe = client.ws.sent[-1]
+    assert subscribe[0] == 0x82
+    assert b"INST_B" in subscribe and b"INST_A" not in subscribe
+    assert b"feedback" not in subscribe
+    client._on_message(client.ws, _build_suback(2))
+    assert client._conn.pending_subscribes == {}
+
+    client.remove_installations(["INST_B", "INST_X"])
+    assert client.installation_refs == ["INST_A"]
+    unsubscribe = client.ws.sent[-1]
+    assert unsubscribe[0] == 0xA2
+    assert b"pro/v1/get/ctl/INST_B/#" in unsubscribe
+
+
+def test_add_installations_before_connack_waits_for_it():
+    client = MySairMQTTClient(
+        api=MySairAPI("e", "p"),
+        installation_refs=["INST_A"],
+        message_callback=lambda data: None,
+    )
+    client.ws = client._conn.ws = _FakeThreadWs()
+
+    client.add_installations(["INST_B"])
+    assert client.ws.sent == []
+    client._on_message(client.ws, b"\x20\x02\x00\x00")  # CONNACK
+    assert b"INST_A" in client.ws.sent[0] and b"INST_B" in client.ws.sent[0]
+
+
+def test_overlap_delivers_each_publish_once_across_both_connections():
+    client, _, received = _subscribed_thread_client()
+    standby = mqtt_handler._MQTTConnection(_FakeThreadWs())
+    client._begin_overlap(standby)
+    frame = _build_publish_frame("pro/v1/get/ctl/INST_A/status", b'{"n":1}')
+
+    client._on_message(client.ws, frame)
+    client._on_message(standby.ws, frame)  # el mismo PUBLISH por la otra
+    client._on_message(standby.ws, frame)  # repetido por la misma: se entrega
+
+    assert len(received) == 2
+    assert client.rotation_duplicates == 1
+
+    client._end_overlap()
+    client._on_message(client.ws, frame)
+    assert len(received) == 3
+
+
+def test_rotate_falls_back_to_reconnect_when_standby_closes_early(monkeypatch):
+    class _ClosingApp(_FakeThreadWs):
+        def __init__(self, url, **callbacks):
+            super().__init__()
+
+        def run_forever(self, **kwargs):
+            pass  # el broker cierra antes del CONNACK
+
+    monkeypatch.setattr(mqtt_handler.websocket, "WebSocketApp", _ClosingApp)
+    client, changes, _ = _subscribed_thread_client()
+    client.api.aws_credentials = _aws_credentials()
+    old_ws = client.ws
+
+    client._rotate()
+
+    assert old_ws.closed is True
+    assert client._planned_reconnect is True
+    assert client._standby is None
+    assert (client.rotation_fallbacks, client.total_rotations) == (1, 0)
+
+
+def test_rotate_does_not_open_standby_when_stopped_meanwhile(monkeypatch):
+    opened = []
+
+    class _App(_FakeThreadWs):
+        def __init__(self, url, **callbacks):
+            super().__init__()
+
+        def run_forever(self, **kwargs):
+            opened.append(self)
+
+    monkeypatch.setattr(mqtt_handler.websocket, "WebSocketApp", _App)
+    client, _, _ = _subscribed_thread_client()
+    client.api.aws_credentials = _aws_credentials()
+    # La descarga llega mientras el relevo renueva las credenciales.
+    monkeypatch.setattr(client.api, "aws_credentials_expired", lambda: True)
+    monkeypatch.setattr(client.api, "refresh_aws_credentials", client.stop)
+
+    client._rotate()
+
+    assert opened == []
+    assert client._standby is None
+    assert (client.rotation_fallbacks, client.total_rotations) == (0, 0)
+
+
+def test_standby_does_not_take_over_after_stop():
+    client, _, _ = _subscribed_thread_client()
+    old_ws = client.ws
+    standby = mqtt_handler._MQTTConnection(_FakeThreadWs())
+    client._begin_overlap(standby)
+    client.stop()
+
+    client._on_standby_subscribed(standby)
+
+    assert client.ws is old_ws
+    assert standby.ws.closed is True
+    assert client.total_rotations == 0
+
+
+def test_overlap_keeps_framing_separate_per_connection():
+    client, _, received = _subscribed_thread_client()
+    standby = mqtt_handler._MQTTConnection(_FakeThreadWs())
+    client._begin_overlap(standby)
+    frame_a = _build_publish_frame("pro/v1/get/ctl/INST_A/status", b'{"n":1}')
+    frame_b = _build_publish_frame("pro/v1/get/ctl/INST_A/status", b'{"n":2}')
+
+    # Cada conexión entrega medio paquete: no se mezclan los bytes.
+    client._on_message(client.ws, frame_a[:7])
+    client._on_message(standby.ws, frame_b[:5])
+    client._on_message(client.ws, frame_a[7:])
+    client._on_message(standby.ws, frame_b[5:])
+
+    assert [m["payload"]["n"] for m in received] == [1, 2]
+
+
+def test_prefetch_timer_fires_before_the_refresh_timer():
+    client = _client_with_creds(aws_expires_at=time.time() + 660)
+    client._schedule_credential_refresh_timer()
+    client._schedule_credential_prefetch_timer()
+
+    refresh, prefetch = _FakeTimer.instances
+    assert 590 <= refresh.delay <= 600
+    assert 350 <= prefetch.delay <= 360  # AWS_CREDENTIALS_PREFETCH_SECONDS antes
+
+
+def test_prefetch_timer_not_armed_when_credentials_are_short_lived():
+    client = _client_with_creds(aws_expires_at=time.time() + 200)
+    client._schedule_credential_prefetch_timer()
+
+    assert _FakeTimer.instances == []
+
+
+def test_prefetch_refreshes_credentials_and_presigns_next_url(monkeypatch):
+    client = _client_with_creds()
+    fresh = _aws_credentials(aws_access_key_id="NEWKEY")
+
+    def _refresh():
+        client.api.aws_credentials = fresh
+
+    monkeypatch.setattr(client.api, "refresh_aws_credentials", _refresh)
+    client._on_credential_prefetch_due()
+
+    url, access_key, _ = client._presigned_url
+    assert access_key == "NEWKEY"
+    # El relevo ya no pide credenciales ni firma: la URL está hecha.
+    signed = []
+    monkeypatch.setattr(client.api, "aws_sign_url", lambda *a: signed.append(a))
+    assert client.api.aws_credentials_expired() is False
+    assert client._connection_params(fresh)[0] == url
+    assert signed == []
+
+
+def test_presigned_url_not_reused_when_stale_or_for_other_credentials(monkeypatch):
+    client = _client_with_creds()
+    client.api.aws_credentials = _aws_credentials()
+    client._presigned_url = ("wss://vieja", "TESTKEYID", time.monotonic() - 241)
+    assert client._connection_params(client.api.aws_credentials)[0] != "wss://vieja"
+
+    client._presigned_url = ("wss://otra", "OTHERKEY", time.monotonic())
+    assert client._connection_params(client.api.aws_credentials)[0] != "wss://otra"
+
+
+def test_connack_records_time_to_connack_and_presigns():
+    client = _client_with_creds()
+    client.api.aws_credentials = _aws_credentials()
+    client._connect_started_at = time.monotonic() - 0.5
+
+    client._on_message(None, b"\x20\x02\x00\x00")
+
+    assert 0.5 <= client.last_connack_seconds < 1
+    assert client._connect_started_at is None
+    assert client._presigned_url[1] == "TESTKEYID"
+
+
 # --- compute_backoff_delay (E3) ---
 
 
@@ -560,6 +884,12 @@ def test_next_packet_length_distinguishes_incomplete_from_malformed():
     )  # remaining_length=0 -> paquete de 2 bytes
 
 
+def test_next_packet_length_with_offset():
+    buffer = b"\x20\x02\x00\x00" + b"\x30\x03\x00"
+    assert _next_packet_length(buffer, 4) == 5
+    assert _next_packet_length(buffer, 7) is FrameState.INCOMPLETE
+
+
 def test_on_message_dispatches_two_coalesced_publishes_in_one_call():
     client, received = _client()
     frame1 = _build_publish_frame("pro/v1/get/ctl/INST_A/status", b'{"ctl":"INST_A"}')
@@ -571,7 +901,7 @@ def test_on_message_dispatches_two_coalesced_publishes_in_one_call():
     assert received[0]["topic"] == "pro/v1/get/ctl/INST_A/status"
     assert received[1]["topic"] == "pro/v1/get/ctl/INST_B/status"
     assert client.parse_strict_count == 2
-    assert client._recv_buffer == b""
+    assert client._conn.recv_buffer == b""
 
 
 def test_on_message_dispatches_connack_and_suback_coalesced():
@@ -583,7 +913,7 @@ def test_on_message_dispatches_connack_and_suback_coalesced():
 
     assert client.connected is True
     assert client._reconnect_attempt == 0
-    assert client._recv_buffer == b""
+    assert client._conn.recv_buffer == b""
 
 
 @pytest.mark.parametrize(
@@ -611,7 +941,7 @@ def test_on_message_reassembles_publish_split_across_two_calls(split_at_fn):
     assert len(received) == 1
     assert received[0]["topic"] == topic
     assert received[0]["payload"] == {"ctl": "INST_A"}
-    assert client._recv_buffer == b""
+    assert client._conn.recv_buffer == b""
 
 
 def test_on_message_legacy_fallback_unchanged_for_existing_fixtures():
@@ -626,7 +956,7 @@ def test_on_message_legacy_fallback_unchanged_for_existing_fixtures():
 
     assert len(received) == 1
     assert received[0]["topic"] == "pro/v1/get/usr/web0077/feedback"
-    assert client._recv_buffer == b""
+    assert client._conn.recv_buffer == b""
 
 
 def test_on_message_split_legacy_fallback_message_across_two_calls():
@@ -660,7 +990,7 @@ def test_recv_buffer_resets_when_declared_length_exceeds_cap():
 
     client._on_message(None, header)
 
-    assert client._recv_buffer == b""
+    assert client._conn.recv_buffer == b""
     assert received == []
 
 
@@ -670,5 +1000,432 @@ def test_recv_buffer_resets_on_malformed_varint():
     # varint de longitud MQTT (máximo 4 bytes permitidos por el estándar).
     client._on_message(None, b"\x30\xff\xff\xff\xff")
 
-    assert client._recv_buffer == b""
+    assert client._conn.recv_buffer == b""
     assert received == []
+
+
+def test_on_message_many_coalesced_publishes_with_partial_tail():
+    client, received = _client()
+    frames = [
+        _build_publish_frame(f"pro/v1/get/ctl/INST_{i}/status", b'{"n":%d}' % i)
+        for i in range(1000)
+    ]
+    tail = _build_publish_frame("pro/v1/get/ctl/TAIL/status", b'{"n":-1}')
+    stream = b"".join(frames) + tail
+
+    client._on_message(None, stream[:-3])
+
+    assert [m["payload"]["n"] for m in received] == list(range(1000))
+    # Solo queda el paquete incompleto, ya compactado al inicio del buffer.
+    assert client._conn.recv_buffer == tail[:-3]
+    assert client._conn.recv_offset == 0
+
+    client._on_message(None, stream[-3:])
+
+    assert received[-1]["topic"] == "pro/v1/get/ctl/TAIL/status"
+    assert client._conn.recv_buffer == b""
+
+
+def test_recv_buffer_usable_after_malformed_reset():
+    client, received = _client()
+    client._on_message(None, b"\x30\xff\xff\xff\xff")
+
+    client._on_message(
+        None, _build_publish_frame("pro/v1/get/ctl/INST_A/status", b'{"ok":1}')
+    )
+
+    assert received == [{"topic": "pro/v1/get/ctl/INST_A/status", "payload": {"ok": 1}}]
+    assert client._conn.recv_buffer == b""
+
+
+# --- Decodificación JSON del payload directamente desde bytes ---
+
+
+@pytest.mark.parametrize("backend", ["auto", "json"])
+def test_decode_publish_json_fast_path_from_memoryview(monkeypatch, backend):
+    if backend == "json":
+        monkeypatch.setattr(mqtt_handler, "orjson", None)
+    payload = bytearray(b' {"ctl":"INST_A","value":"{\\"t\\":[]}"}\n')
+
+    with memoryview(payload) as view:
+        data = mqtt_handler._decode_publish_json(view)
+
+    # El value anidado sigue siendo un string: lo decodifica status_parser.
+    assert data == {"ctl": "INST_A", "value": '{"t":[]}'}
+
+
+def test_decode_publish_json_falls_back_to_text_heuristic():
+    # Basura alrededor del objeto y un byte no UTF-8: el camino rápido falla y
+    # el lento (errors="ignore" + _extract_json) se comporta como siempre.
+    payload = b'\xff\x00junk{"ctl":"INST_A"}trailer'
+
+    assert mqtt_handler._decode_publish_json(payload) == {"ctl": "INST_A"}
+
+
+def test_decode_publish_json_rejects_non_object():
+    with pytest.raises(ValueError):
+        mqtt_handler._decode_publish_json(b"[1, 2]")
+
+
+def test_on_message_fast_path_counts_strict_parse():
+    client, received = _client()
+    client._on_message(
+        None, _build_publish_frame("pro/v1/get/ctl/INST_A/status", b'{"ctl":"A"}')
+    )
+
+    assert received == [
+        {"topic": "pro/v1/get/ctl/INST_A/status", "payload": {"ctl": "A"}}
+    ]
+    assert client.parse_strict_count == 1
+    assert client.parse_error_count == 0
+
+
+# --- Transporte asyncio (MySairAsyncMQTTClient) ---
+
+
+class _FakeAsyncWs:
+    """Doble de aiohttp.ClientWebSocketResponse: mensajes entrantes encolados
+    (``None`` = el broker cierra) y registro de lo enviado."""
+
+    def __init__(self):
+        self.incoming = asyncio.Queue()
+        self.sent = []
+        self.closed = False
+        self.close_code = None
+
+    def feed(self, data):
+        self.incoming.put_nowait(
+            aiohttp.WSMessage(aiohttp.WSMsgType.BINARY, data, None)
+        )
+
+    def server_close(self, code=1000):
+        self.close_code = code
+        self.incoming.put_nowait(None)
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+    async def close(self):
+        self.server_close(1000)
+
+    def exception(self):
+        return None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        msg = await self.incoming.get()
+        if msg is None:
+            self.closed = True
+            raise StopAsyncIteration
+        return msg
+
+    def __await__(self):  # ``await websession.ws_connect(...)``, como aiohttp
+        return self._connected().__await__()
+
+    async def _connected(self):
+        return self
+
+
+class _FakeWebSession:
+    def __init__(self):
+        self.sockets = []
+        self.connect_calls = []
+
+    def ws_connect(self, url, **kwargs):
+        self.connect_calls.append((url, kwargs))
+        ws = _FakeAsyncWs()
+        self.sockets.append(ws)
+        return ws
+
+
+def _aws_credentials(**extra):
+    return {
+        "aws_mqtt_host": "test.iot.eu-west-1.amazonaws.com",
+        "aws_default_region": "eu-west-1",
+        "aws_access_key_id": "TESTKEYID",
+        "aws_secret_access_key": "TESTSECRET",
+        "aws_security_token": "TESTTOKEN",
+        "aws_mqtt_user": "web0000",
+        "aws_base_topic": "pro/v1/",
+        "aws_expires_at": time.time() + 3600,
+        **extra,
+    }
+
+
+def _async_client(websession, api=None, refs=("INST_A",)):
+    received = []
+    if api is None:
+        api = MySairAsyncAPI("e", websession=None)
+        api.access_token = "ACCESS"
+        api.aws_credentials = _aws_credentials()
+    client = MySairAsyncMQTTClient(
+        api,
+        list(refs),
+        lambda data: received.append((threading.get_ident(), data)),
+        websession,
+    )
+    client._reconnect_delay = 0  # backoff inmediato en los tests
+    return client, received
+
+
+async def _until(predicate):
+    for _ in range(200):
+        if predicate():
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("condición no alcanzada")
+
+
+def test_async_client_connects_subscribes_and_delivers_in_loop():
+    websession = _FakeWebSession()
+    client, received = _async_client(websession)
+    threads_before = threading.active_count()
+
+    async def _run():
+        client.start()
+        await _until(lambda: websession.sockets and websession.sockets[0].sent)
+        ws = websession.sockets[0]
+        assert ws.sent[0][0] == 0x10  # CONNECT
+
+        ws.feed(b"\x20\x02\x00\x00")  # CONNACK
+        await _until(lambda: len(ws.sent) == 2)
+        assert client.connected is True
+        ws.feed(
+            _build_publish_frame("pro/v1/get/ctl/INST_A/status", b'{"ctl":"INST_A"}')
+        )
+        await _until(lambda: received)
+        assert threading.active_count() == threads_before  # sin hilos propios
+        await client.async_stop()
+        return ws
+
+    ws = asyncio.run(_run())
+
+    url, kwargs = websession.connect_calls[0]
+    assert url.startswith("wss://test.iot.eu-west-1.amazonaws.com/mqtt?")
+    assert kwargs["protocols"] == ("mqtt",)
+    # Un solo SUBSCRIBE con los dos topics (status + feedback).
+    assert ws.sent[1][0] == 0x82
+    assert b"pro/v1/get/ctl/INST_A/#" in ws.sent[1]
+    assert b"pro/v1/get/usr/web0000/feedback" in ws.sent[1]
+    thread_id, data = received[0]
+    assert thread_id == threading.get_ident()  # callback en el hilo del loop
+    assert data == {
+        "topic": "pro/v1/get/ctl/INST_A/status",
+        "payload": {"ctl": "INST_A"},
+    }
+    assert client.connected is False
+    assert client._task is None
+
+
+def test_async_client_reconnects_with_backoff_after_close():
+    websession = _FakeWebSession()
+    client, _ = _async_client(websession)
+
+    async def _run():
+        client.start()
+        await _until(lambda: websession.sockets)
+        websession.sockets[0].server_close(1006)
+        await _until(lambda: len(websession.sockets) == 2)
+        await client.async_stop()
+
+    asyncio.run(_run())
+
+    assert client.last_close_code == 1006
+    assert client.total_reconnects == 1
+    assert client.reconnect_attempt == 1
+
+
+def test_async_client_planned_reconnect_skips_backoff():
+    websession = _FakeWebSession()
+    client, _ = _async_client(websession)
+
+    async def _run():
+        client.start()
+        await _until(lambda: websession.sockets)
+        client._on_credential_refresh_due()
+        await _until(lambda: len(websession.sockets) == 2)
+        await client.async_stop()
+
+    asyncio.run(_run())
+
+    assert client.total_reconnects == 0
+    assert client._planned_reconnect is False
+
+
+async def _handshake(ws):
+    """CONNACK y el SUBACK de la suscripción (status + feedback)."""
+    ws.feed(b"\x20\x02\x00\x00")
+    await _until(lambda: len(ws.sent) == 2)
+    ws.feed(_build_suback(1, b"\x00\x00"))
+    await asyncio.sleep(0)
+
+
+def test_async_client_rotation_is_make_before_break():
+    websession = _FakeWebSession()
+    client, received = _async_client(websession)
+    changes = []
+    client.connection_callback = changes.append
+    frame = _build_publish_frame("pro/v1/get/ctl/INST_A/status", b'{"n":1}')
+
+    async def _run():
+        client.start()
+        await _until(lambda: websession.sockets and websession.sockets[0].sent)
+        old = websession.sockets[0]
+        await _handshake(old)
+
+        client._on_credential_refresh_due()
+        await _until(
+            lambda: len(websession.sockets) == 2 and websession.sockets[1].sent
+        )
+        new = websession.sockets[1]
+        new.feed(b"\x20\x02\x00\x00")
+        await _until(lambda: len(new.sent) == 2)
+        # Solape: el mismo PUBLISH llega por las dos conexiones.
+        old.feed(frame)
+        new.feed(frame)
+        await _until(lambda: client.rotation_duplicates == 1)
+        assert old.close_code is None  # la vieja sigue abierta hasta los SUBACK
+
+        new.feed(_build_suback(1, b"\x00\x00"))
+        await _until(lambda: old.closed)
+        new.feed(_build_publish_frame("pro/v1/get/ctl/INST_A/status", b'{"n":2}'))
+        await _until(lambda: len(received) == 2)
+        assert client.ws is new
+        assert client.connected is True
+        await client.async_stop()
+
+    asyncio.run(_run())
+
+    assert [data["payload"]["n"] for _, data in received] == [1, 2]
+    assert len(websession.sockets) == 2  # sin reconexión tras el relevo
+    assert changes == [True, False]  # solo el CONNACK inicial y el stop
+    assert client.total_reconnects == 0
+    assert (client.total_rotations, client.rotation_fallbacks) == (1, 0)
+
+
+def test_async_client_rotation_falls_back_when_standby_never_subscribes(
+    monkeypatch,
+):
+    monkeypatch.setattr(mqtt_handler, "ROTATION_TIMEOUT_SECONDS", 0.01)
+    websession = _FakeWebSession()
+    client, _ = _async_client(websession)
+
+    async def _run():
+        client.start()
+        await _until(lambda: websession.sockets and websession.sockets[0].sent)
+        await _handshake(websession.sockets[0])
+
+        client._on_credential_refresh_due()
+        # La nueva no contesta: se descarta y se reconecta como antes.
+        for _ in range(100):
+            if len(websession.sockets) == 3:
+                break
+            await asyncio.sleep(0.005)
+        await client.async_stop()
+
+    asyncio.run(_run())
+
+    assert len(websession.sockets) == 3
+    assert websession.sockets[1].close_code == 1000  # la del relevo, cerrada
+    assert client.rotation_fallbacks == 1
+    assert client.total_rotations == 0
+    assert client.total_reconnects == 0  # reconexión planificada, sin backoff
+
+
+def test_async_client_prefetch_renews_credentials_in_background(monkeypatch):
+    websession = _FakeWebSession()
+    client, _ = _async_client(websession)
+    # Dentro de la ventana de prefetch, pero aún lejos del margen de 60 s.
+    client.api.aws_credentials = _aws_credentials(aws_expires_at=time.time() + 200)
+    calls = []
+
+    async def _refresh():
+        calls.append(True)
+        client.api.aws_credentials = _aws_credentials(aws_access_key_id="NEWKEY")
+
+    monkeypatch.setattr(client.api, "async_refresh_aws_credentials", _refresh)
+
+    async def _run():
+        client._on_credential_prefetch_due()
+        client._on_credential_prefetch_due()  # ya en vuelo: no se duplica
+        await _until(lambda: client._prefetch_task is None)
+
+    asyncio.run(_run())
+
+    assert calls == [True]
+    assert client._presigned_url[1] == "NEWKEY"
+
+
+def test_async_client_refreshes_expired_aws_credentials_before_connecting(
+    fake_async_session, make_async_response, aws_credentials_ok
+):
+    fake_async_session.queue("put", make_async_response(200, aws_credentials_ok))
+    api = MySairAsyncAPI("e", fake_async_session)
+    api.access_token = "ACCESS"
+    websession = _FakeWebSession()
+    client, _ = _async_client(websession, api=api)
+
+    async def _run():
+        client.start()
+        await _until(lambda: websession.sockets)
+        await client.async_stop()
+
+    asyncio.run(_run())
+
+    assert [c["url"].rsplit("/", 1)[-1] for c in fake_async_session.calls] == [
+        "refreshawscredentials"
+    ]
+    assert websession.connect_calls[0][0].startswith(
+        "wss://test.iot.eu-west-1.amazonaws.com/mqtt?"
+    )
+
+
+def test_async_client_stop_cancels_loose_tasks():
+    websession = _FakeWebSession()
+    client, _ = _async_client(websession)
+
+    class _HangingWs(_FakeAsyncWs):
+        async def send_bytes(self, data):
+            await asyncio.Event().wait()  # el broker no lee
+
+        async def close(self):
+            raise ConnectionResetError("reset")
+
+    async def _run():
+        ws = _HangingWs()
+        client._conn = mqtt_handler._MQTTConnection(ws)
+        client.ws = ws
+        client._send_packet(client._conn, b"\xc0\x00")  # PINGREQ
+        client._flush_packets(client._conn)
+        client._on_credential_refresh_due()  # sin suscripción: cierra la actual
+        await _until(lambda: len(client._background_tasks) == 1)
+        flush = next(iter(client._background_tasks))
+        await client.async_stop()
+        return flush
+
+    flush = asyncio.run(_run())
+
+    # El cierre fallido terminó con su error recogido; el envío, cancelado.
+    assert flush.get_name() == "mysair_mqtt_flush"
+    assert flush.cancelled()
+    assert client._background_tasks == set()
+
+
+def test_async_client_credential_timer_uses_loop_call_later():
+    websession = _FakeWebSession()
+    client, _ = _async_client(websession)
+    client.api.aws_credentials["aws_expires_at"] = time.time() + 660
+
+    async def _run():
+        client._schedule_credential_refresh_timer()
+        timer = client._credential_refresh_timer
+        client._cancel_credential_refresh_timer()
+        return timer
+
+    timer = asyncio.run(_run())
+
+    assert isinstance(timer, asyncio.TimerHandle)
+    assert timer.cancelled()
+    assert _FakeTimer.instances == []  # ningún threading.Timer
@@ -0,0 +1,137 @@
+"""Tests P2 de la entrega de status del hilo MQTT al loop (status_handoff.py).
+
+Cubre `StatusHandoff`: fusión por ``ctl`` (y por zona dentro de cada status),
+un único drenado por lote, el límite de pendientes, los avisos de frescura
+de status repetidos (``refresh``) y la entrega directa cuando ya se está en
+el loop (transporte asyncio).
+"""
+
+import threading
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.mysair.status_handoff import StatusHandoff, merge_status
+from custom_components.mysair.status_parser import ZoneState
+
+
+def _status(ctl, *zones):
+    return {
+        "ctl": ctl,
+        "zones": [
+            ZoneState(ctl=ctl, zone_id=zone_id, temp_actual=temp)
+            for zone_id, temp in zones
+        ],
+    }
+
+
+def _put_from_thread(handoff, items):
+    # Como el hilo MQTT: nada de esto corre en el loop.
+    thread = threading.Thread(
+        target=lambda: [handoff.put(topic, status) for topic, status in items]
+    )
+    thread.start()
+    thread.join()
+
+
+def test_merge_status_keeps_newest_zone_and_older_ones():
+    older = _status("INST_A", ("DEV_1", 20.0), ("DEV_2", 21.0))
+    newer = _status("INST_A", ("DEV_1", 22.5))
+
+    merged = merge_status(older, newer)
+
+    assert [(zone.zone_id, zone.temp_actual) for zone in merged["zones"]] == [
+        ("DEV_2", 21.0),
+        ("DEV_1", 22.5),
+    ]
+
+
+async def test_handoff_merges_per_installation_and_drains_in_one_batch(hass):
+    delivered = []
+    handoff = StatusHandoff(
+        hass, lambda topic, status: delivered.append((topic, status))
+    )
+
+    _put_from_thread(
+        handoff,
+        [
+            ("pro/v1/get/ctl/INST_A/status", _status("INST_A", ("DEV_1", 20.0))),
+            ("pro/v1/get/ctl/INST_B/status", _status("INST_B", ("DEV_9", 18.0))),
+            ("pro/v1/get/ctl/INST_A/status", _status("INST_A", ("DEV_1", 20.5))),
+            ("pro/v1/get/ctl/INST_A/status", _status("INST_A", ("DEV_2", 19.0))),
+        ],
+    )
+    await hass.async_block_till_done()
+
+    assert [status["ctl"] for _, status in delivered] == ["INST_B", "INST_A"]
+    assert [(zone.zone_id, zone.temp_actual) for zone in delivered[1][1]["zones"]] == [
+        ("DEV_1", 20.5),
+        ("DEV_2", 19.0),
+    ]
+    assert handoff.stats() == {
+        "high_water": 2,
+        "merged": 2,
+        "dropped": 0,
+        "batches": 1,
+    }
+
+
+async def test_handoff_drops_oldest_beyond_max_pending(hass):
+    delivered = []
+    handoff = StatusHandoff(
+        hass, lambda topic, status: delivered.append(status["ctl"]), max_pending=2
+    )
+
+    _put_from_thread(
+        handoff,
+        [(f"t/{ctl}", _status(ctl)) for ctl in ("INST_A", "INST_B", "INST_C")],
+    )
+    await hass.async_block_till_done()
+
+    assert delivered == ["INST_B", "INST_C"]
+    assert (handoff.high_water, handoff.dropped) == (2, 1)
+
+
+async def test_handoff_delivers_directly_from_the_loop(hass):
+    delivered = []
+    handoff = StatusHandoff(hass, lambda topic, status: delivered.append(topic))
+
+    handoff.put("pro/v1/get/ctl/INST_A/status", _status("INST_A"))
+
+    assert delivered == ["pro/v1/get/ctl/INST_A/status"]
+    assert handoff.batches == 0
+
+
+async def test_handoff_refresh_reaches_loop_unless_status_pending(hass):
+    delivered = []
+    handoff = StatusHandoff(
+        hass,
+        lambda topic, status: delivered.append(("status", status["ctl"])),
+        lambda ctl: delivered.append(("refresh", ctl)),
+    )
+
+    def _from_thread():
+        handoff.refresh("pro/v1/get/ctl/INST_A/status", "INST_A")
+        handoff.refresh("pro/v1/get/ctl/INST_A/status", "INST_A")
+        handoff.put("pro/v1/get/ctl/INST_B/status", _status("INST_B"))
+        # Con un status pendiente el aviso sobra; un status sustituye al aviso.
+        handoff.refresh("pro/v1/get/ctl/INST_B/status", "INST_B")
+        handoff.put("pro/v1/get/ctl/INST_A/status", _status("INST_A"))
+
+    thread = threading.Thread(target=_from_thread)
+    thread.start()
+    thread.join()
+    await hass.async_block_till_done()
+
+    assert delivered == [("status", "INST_B"), ("status", "INST_A")]
+    assert (handoff.merged, handoff.batches) == (0, 1)
+
+    thread = threading.Thread(
+        target=lambda: handoff.refresh("pro/v1/get/ctl/INST_C/status", "INST_C")
+    )
+    thread.start()
+    thread.join()
+    await hass.async_block_till_done()
+
+    assert delivered[-1] == ("refresh", "INST_C")
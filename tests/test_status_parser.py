@@ -7,7 +7,13 @@ Semántica confirmada desde la app oficial (docs/protocol-findings.md):
 
 import pytest
 
+import status_parser
 from status_parser import (
+    ZONE_FIELDS,
+    STATUS_VALUE_CACHE,
+    StatusDeduplicator,
+    StatusValueCache,
+    ZoneState,
     compute_mode_value,
     parse_mode,
     parse_status_payload,
@@ -41,10 +47,64 @@ def test_parse_status_value_non_str_non_dict_returns_empty():
     assert parse_status_value(["x"]) == {}
 
 
+@pytest.mark.parametrize("backend", ["auto", "json"])
+def test_parse_status_value_same_result_with_any_json_backend(monkeypatch, backend):
+    if backend == "json":
+        monkeypatch.setattr(status_parser, "orjson", None)
+    assert parse_status_value('{"t":[{"rf":"Z1","tc":"21.5"}]};') == {
+        "t": [{"rf": "Z1", "tc": "21.5"}]
+    }
+    # NaN lo acepta json (y orjson no): el resultado no depende del backend.
+    assert parse_status_value('{"x": NaN}')["x"] != 0
+
+
 def test_parse_status_value_json_non_object_returns_empty():
     assert parse_status_value("[1,2,3]") == {}
 
 
+def test_status_value_cache_evicts_least_recently_used():
+    cache = StatusValueCache(maxsize=2)
+    cache.put("a", {"a": 1})
+    cache.put("b", {"b": 1})
+    assert cache.get("a") == {"a": 1}  # "a" pasa a ser la más reciente
+    cache.put("c", {"c": 1})  # expulsa "b"
+
+    assert cache.get("b") is None
+    assert cache.get("c") == {"c": 1}
+    assert cache.stats() == {
+        "size": 2,
+        "maxsize": 2,
+        "hits": 2,
+        "misses": 1,
+        "evictions": 1,
+    }
+
+
+def test_parse_status_payload_reuses_cached_value_without_sharing_state():
+    STATUS_VALUE_CACHE.clear()
+    payload = {"ctl": "X", "value": '{"t":[{"rf":"D","tr":"21.5"}]};'}
+    hits = STATUS_VALUE_CACHE.hits
+
+    first = parse_status_payload(payload)
+    first["zones"].clear()
+    first_value = parse_status_value(payload["value"])
+    first_value["t"].clear()  # el público no usa la caché: objeto propio
+    second = parse_status_payload(dict(payload))
+
+    assert STATUS_VALUE_CACHE.hits == hits + 1
+    assert [zone.temp_actual for zone in second["zones"]] == [21.5]
+    assert parse_status_value(payload["value"]) == {"t": [{"rf": "D", "tr": "21.5"}]}
+
+
+def test_invalid_status_value_is_not_cached(caplog):
+    STATUS_VALUE_CACHE.clear()
+    for _ in range(2):
+        parse_status_payload({"ctl": "X", "value": "no-json"})
+
+    assert STATUS_VALUE_CACHE.stats()["size"] == 0
+    assert caplog.text.count("Error decodificando JSON anidado") == 2
+
+
 # --- parse_mode ---
 
 
@@ -72,6 +132,22 @@ def test_parse_mode_non_numeric():
     assert parse_mode("x") == ("x", None, None, None, None)
 
 
+@pytest.mark.parametrize(
+    "m,expected",
+    [
+        # Fuera de la tabla precalculada: camino general, mismo resultado.
+        ("03", ("03", False, True, False, True)),
+        (" 4", (" 4", True, False, True, True)),
+        ("7", ("7", False, True, False, False)),
+        (5, ("5", False, True, True, True)),
+        (True, ("True", None, None, None, None)),
+        ([1], ("[1]", None, None, None, None)),
+    ],
+)
+def test_parse_mode_values_outside_lookup_table(m, expected):
+    assert parse_mode(m) == expected
+
+
 # --- compute_mode_value (F4, inversa de parse_mode) ---
 
 
@@ -110,7 +186,7 @@ def test_parse_status_payload_full(status_payload):
     assert result["ctl"] == "INST_A"
     assert len(result["zones"]) == 1
     zone = result["zones"][0]
-    assert zone == {
+    assert zone.as_dict() == {
         "ctl": "INST_A",
         "zone_id": "DEV_1",
         "zone_name": "Salon",
@@ -135,6 +211,15 @@ def test_parse_status_payload_full(status_payload):
     }
 
 
+def test_zone_state_equality_and_changed_fields():
+    zone = ZoneState(ctl="X", zone_id="D", temp_actual=21.5)
+
+    assert zone == ZoneState(ctl="X", zone_id="D", temp_actual=21.5)
+    assert zone.changed_fields(None) == frozenset(ZONE_FIELDS)
+    assert zone.changed_fields(ZoneState(ctl="X", zone_id="D")) == {"temp_actual"}
+    assert not hasattr(zone, "__dict__")  # __slots__: sin dict por zona
+
+
 @pytest.mark.parametrize(
     "e,is_on,is_standby",
     [("0", False, False), ("1", True, False), ("2", True, True)],
@@ -142,64 +227,109 @@ def test_parse_status_payload_full(status_payload):
 def test_parse_status_payload_power_field(e, is_on, is_standby):
     payload = {"ctl": "X", "value": '{"t":[{"rf":"D","e":"%s","m":"0"}]}' % e}
     zone = parse_status_payload(payload)["zones"][0]
-    assert zone["is_on"] is is_on
-    assert zone["is_standby"] is is_standby
+    assert zone.is_on is is_on
+    assert zone.is_standby is is_standby
 
 
 def test_parse_status_payload_cool_mode():
     # m=1 (AC frío), encendido
     payload = {"ctl": "X", "value": '{"t":[{"rf":"D","e":"1","m":"1"}]}'}
     zone = parse_status_payload(payload)["zones"][0]
-    assert zone["is_on"] is True
-    assert zone["is_heat"] is False
-    assert zone["is_cool"] is True
+    assert zone.is_on is True
+    assert zone.is_heat is False
+    assert zone.is_cool is True
 
 
 def test_parse_status_payload_off_keeps_mode_field():
     # apagado (e="0") pero m sigue presente: is_on False, y m interpretable
     payload = {"ctl": "X", "value": '{"t":[{"rf":"D","e":"0","m":"1"}]}'}
     zone = parse_status_payload(payload)["zones"][0]
-    assert zone["is_on"] is False
-    assert zone["mode_raw"] == "1"
-    assert zone["is_cool"] is True
+    assert zone.is_on is False
+    assert zone.mode_raw == "1"
+    assert zone.is_cool is True
 
 
 def test_parse_status_payload_missing_mode_is_none():
     payload = {"ctl": "X", "value": '{"t":[{"rf":"D","e":"1"}]}'}
     zone = parse_status_payload(payload)["zones"][0]
-    assert zone["is_on"] is True
-    assert zone["mode_raw"] is None
-    assert zone["is_heat"] is None
-    assert zone["is_cool"] is None
+    assert zone.is_on is True
+    assert zone.mode_raw is None
+    assert zone.is_heat is None
+    assert zone.is_cool is None
 
 
 def test_parse_status_payload_missing_temps_are_none():
     payload = {"ctl": "X", "value": '{"t":[{"rf":"D","e":"1","m":"0"}]}'}
     zone = parse_status_payload(payload)["zones"][0]
-    assert zone["temp_actual"] is None
-    assert zone["temp_target"] is None
-    assert zone["humidity"] is None
+    assert zone.temp_actual is None
+    assert zone.temp_target is None
+    assert zone.humidity is None
 
 
 def test_parse_status_payload_humidity_reads_hum_field():
     # Campo real confirmado en producción (2026-07-20): "hum", no "hm".
     payload = {"ctl": "X", "value": '{"t":[{"rf":"D","e":"1","m":"0","hum":"55"}]}'}
     zone = parse_status_payload(payload)["zones"][0]
-    assert zone["humidity"] == 55.0
+    assert zone.humidity == 55.0
 
 
 def test_parse_status_payload_humidity_falls_back_to_hm_field():
     # "hm" como fallback defensivo por si alguna variante del backend lo usa.
     payload = {"ctl": "X", "value": '{"t":[{"rf":"D","e":"1","m":"0","hm":"40"}]}'}
     zone = parse_status_payload(payload)["zones"][0]
-    assert zone["humidity"] == 40.0
+    assert zone.humidity == 40.0
+
+
+@pytest.mark.parametrize(
+    "zone,expected",
+    [
+        # Capacidades: solo "1" (o lo que se imprime como "1") es permitido.
+        (
+            {"c": 1, "f": True, "v": None, "s": "1"},
+            {
+                "allow_heat": True,
+                "allow_cool": False,
+                "allow_fan": False,
+                "allow_floor": True,
+            },
+        ),
+        (
+            {"c": ["1"], "f": "0", "v": "2", "s": 1.0},
+            {
+                "allow_heat": False,
+                "allow_cool": False,
+                "allow_fan": False,
+                "allow_floor": False,
+            },
+        ),
+        # e fuera de "0"/"1"/"2": power es su str, encendido si no es "0".
+        ({"e": 0}, {"power": "0", "is_on": False, "is_standby": False}),
+        ({"e": None}, {"power": None, "is_on": True, "is_standby": False}),
+        ({"e": "3"}, {"power": "3", "is_on": True, "is_standby": False}),
+        # hum presente pero null: no se cae a hm.
+        ({"hum": None, "hm": "50"}, {"humidity": None}),
+        (
+            {"tr": "", "tc": "abc", "tmm": 16, "tmx": True},
+            {
+                "temp_actual": None,
+                "temp_target": None,
+                "temp_min": 16.0,
+                "temp_max": 1.0,
+            },
+        ),
+    ],
+)
+def test_parse_status_payload_values_outside_lookup_tables(zone, expected):
+    payload = {"ctl": "X", "value": {"t": [{"rf": "D", **zone}]}}
+    parsed = parse_status_payload(payload)["zones"][0].as_dict()
+    assert {field: parsed[field] for field in expected} == expected
 
 
 def test_parse_status_payload_default_power_off_when_missing_e():
     payload = {"ctl": "X", "value": '{"t":[{"rf":"D"}]}'}
     zone = parse_status_payload(payload)["zones"][0]
-    assert zone["power"] == "0"
-    assert zone["is_on"] is False
+    assert zone.power == "0"
+    assert zone.is_on is False
 
 
 def test_parse_status_payload_invalid_value_yields_no_zones():
@@ -252,7 +382,7 @@ def test_parse_status_payload_zone_missing_rf_logs_warning(caplog):
     zones = parse_status_payload(payload)["zones"]
 
     assert len(zones) == 1
-    assert zones[0]["zone_id"] is None
+    assert zones[0].zone_id is None
     assert "zona sin 'rf'" in caplog.text
 
 
@@ -260,12 +390,40 @@ def test_parse_status_payload_skips_non_dict_thermostats():
     payload = {"ctl": "X", "value": '{"t":["bogus",{"rf":"D1","e":"1","m":"0"}]}'}
     zones = parse_status_payload(payload)["zones"]
     assert len(zones) == 1
-    assert zones[0]["zone_id"] == "D1"
+    assert zones[0].zone_id == "D1"
 
 
 # --- parse_feedback_payload (topic .../feedback, known-unknowns #23) ---
 
 
+def test_status_deduplicator_drops_only_exact_repeats_per_ctl():
+    dedup = StatusDeduplicator()
+    first = {"ctl": "A", "value": '{"t":[{"rf":"D","tr":"21.5"}]};'}
+
+    assert not dedup.is_repeat(first)
+    assert dedup.is_repeat(dict(first))  # mismo value crudo
+    assert not dedup.is_repeat({"ctl": "B", "value": first["value"]})  # otro ctl
+    assert not dedup.is_repeat({"ctl": "A", "value": first["value"] + " "})
+    assert not dedup.is_repeat(first)  # el último de A ya era otro
+    assert dedup.duplicates == 1
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        "not-a-dict",
+        {"value": "{}"},  # sin ctl
+        {"ctl": "A", "value": {"t": []}},  # value ya decodificado
+        {"ctl": "A"},
+    ],
+)
+def test_status_deduplicator_never_drops_unexpected_shapes(payload):
+    dedup = StatusDeduplicator()
+    assert not dedup.is_repeat(payload)
+    assert not dedup.is_repeat(payload)
+    assert dedup.duplicates == 0
+
+
 def test_parse_feedback_payload_flat_form():
     payload = {"orderId": "abc-123", "ctl": "INST_A"}
     assert parse_feedback_payload(payload) == {
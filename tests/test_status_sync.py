@@ -0,0 +1,223 @@
+"""Tests P2 del sync de status adaptativo (status_sync.py, harness de Home Assistant).
+
+Cubre `StatusSyncScheduler`: sync inmediato al completarse la conexión MQTT,
+syncs omitidos mientras el status es reciente o MQTT está caído, envío
+concurrente acotado con timeout por instalación, ticks sin deriva y la
+antigüedad por instalación que calcula el coordinador. Sin red real: la API
+va parcheada igual que en test_entities.py (o sustituida por dobles).
+"""
+
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+import homeassistant.util.dt as dt_util
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from custom_components.mysair import status_sync as status_sync_module
+from custom_components.mysair.api import MySairAsyncAPI
+from custom_components.mysair.const import (
+    DOMAIN,
+    STATUS_SYNC_INTERVAL_SECONDS,
+    STATUS_SYNC_MAX_AGE_SECONDS,
+)
+from custom_components.mysair.status_sync import StatusSyncScheduler
+
+from test_entities import _coro, _fire_status, _patch_happy_api, _zone
+
+
+async def _setup_entry(hass, monkeypatch):
+    _patch_happy_api(monkeypatch)
+    syncs = []
+    monkeypatch.setattr(
+        MySairAsyncAPI,
+        "async_send_installation_command",
+        _coro(lambda self, ctl, command_type: syncs.append((ctl, command_type))),
+    )
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="user@example.com",
+        data={"email": "user@example.com", "refresh_token": "OLD_REFRESH"},
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry, syncs
+
+
+async def _connect(hass, entry):
+    # Como el CONNACK: el cliente avisa a connection_callback.
+    hass.data[DOMAIN][entry.entry_id]["mqtt"]._set_connected(True)
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+
+async def _tick(hass, frozen, seconds=STATUS_SYNC_INTERVAL_SECONDS):
+    frozen.tick(timedelta(seconds=seconds))
+    async_fire_time_changed(hass, dt_util.utcnow())
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+
+async def test_status_sync_on_connect_and_skipped_while_fresh(hass, monkeypatch):
+    freezegun = pytest.importorskip("freezegun")
+
+    with freezegun.freeze_time(dt_util.utcnow()) as frozen:
+        entry, syncs = await _setup_entry(hass, monkeypatch)
+        status_sync = hass.data[DOMAIN][entry.entry_id]["status_sync"]
+        # Sin conexión MQTT todavía: nada que sincronizar.
+        assert syncs == []
+
+        await _connect(hass, entry)
+        assert syncs == [("INST_A", "status")]
+
+        # Status reciente por MQTT: el tick siguiente no pide sync.
+        _fire_status(hass, "INST_A", _zone())
+        await _tick(hass, frozen)
+        assert syncs == [("INST_A", "status")]
+
+        # Sin status durante STATUS_SYNC_MAX_AGE_SECONDS: vuelve a pedirlo.
+        await _tick(hass, frozen)
+        assert syncs == [("INST_A", "status")] * 2
+
+        stats = status_sync.stats()
+        assert stats["syncs_sent"] == 2
+        assert stats["syncs_avoided"] == 1
+        assert stats["sync_errors"] == 0
+        assert stats["syncs_per_hour"] == round(
+            2 * 3600 / (2 * STATUS_SYNC_INTERVAL_SECONDS), 1
+        )
+
+
+async def test_status_sync_skipped_while_mqtt_disconnected(hass, monkeypatch):
+    freezegun = pytest.importorskip("freezegun")
+
+    with freezegun.freeze_time(dt_util.utcnow()) as frozen:
+        entry, syncs = await _setup_entry(hass, monkeypatch)
+        status_sync = hass.data[DOMAIN][entry.entry_id]["status_sync"]
+
+        await _tick(hass, frozen)
+        assert syncs == []
+        assert status_sync.stats()["syncs_avoided"] == 1
+
+        # Al reconectar se sincroniza en el acto, sin esperar al tick.
+        await _connect(hass, entry)
+        assert syncs == [("INST_A", "status")]
+
+
+async def test_status_sync_errors_are_counted(hass, monkeypatch):
+    entry, _ = await _setup_entry(hass, monkeypatch)
+
+    async def _fail(self, ctl, command_type):
+        raise ConnectionError("sin red")
+
+    monkeypatch.setattr(MySairAsyncAPI, "async_send_installation_command", _fail)
+    await _connect(hass, entry)
+
+    stats = hass.data[DOMAIN][entry.entry_id]["status_sync"].stats()
+    assert (stats["syncs_sent"], stats["sync_errors"]) == (0, 1)
+
+
+async def test_installation_status_age_needs_every_zone_fresh(hass, monkeypatch):
+    freezegun = pytest.importorskip("freezegun")
+
+    with freezegun.freeze_time(dt_util.utcnow()) as frozen:
+        entry, _ = await _setup_entry(hass, monkeypatch)
+        coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+        assert coordinator.installation_status_age("INST_A") is None
+
+        _fire_status(hass, "INST_A", _zone(zone_id="DEV_1"))
+        frozen.tick(timedelta(seconds=30))
+        _fire_status(hass, "INST_A", _zone(zone_id="DEV_2"))
+        frozen.tick(timedelta(seconds=10))
+        # La zona que más lleva sin status manda.
+        assert coordinator.installation_status_age("INST_A") == 40
+
+        # DEV_2 sigue llegando, pero DEV_1 caduca: hace falta sync.
+        for _ in range(4):
+            frozen.tick(timedelta(seconds=STATUS_SYNC_MAX_AGE_SECONDS / 2))
+            _fire_status(hass, "INST_A", _zone(zone_id="DEV_2"))
+            async_fire_time_changed(hass, dt_util.utcnow())
+            await hass.async_block_till_done()
+        assert coordinator.installation_status_age("INST_A") is None
+
+
+class _FakeMQTT:
+    def __init__(self, connected):
+        self.connected = connected
+
+
+class _NeverFresh:
+    def installation_status_age(self, ctl):
+        return None
+
+
+class _SlowAPI:
+    """Cuenta peticiones simultáneas; ``hang`` nunca responden."""
+
+    def __init__(self, hang=()):
+        self.hang = set(hang)
+        self.release = asyncio.Event()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def async_send_installation_command(self, ctl, command_type):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if ctl in self.hang:
+                await asyncio.Event().wait()
+            await self.release.wait()
+        finally:
+            self.in_flight -= 1
+
+
+async def test_status_sync_fans_out_bounded_with_per_installation_timeout(
+    hass, monkeypatch
+):
+    monkeypatch.setattr(status_sync_module, "STATUS_SYNC_TIMEOUT_SECONDS", 0.05)
+    refs = ["INST_A", "INST_B", "INST_C", "INST_D", "INST_E"]
+    api = _SlowAPI(hang={"INST_B"})
+    scheduler = StatusSyncScheduler(
+        hass, api, _NeverFresh(), refs, _FakeMQTT(True), max_concurrency=2
+    )
+
+    scheduler.start()  # MQTT ya conectado: sync inmediato de todas
+    await asyncio.sleep(0)
+    assert api.max_in_flight == 2
+
+    api.release.set()
+    await hass.async_block_till_done(wait_background_tasks=True)
+    scheduler.stop()
+
+    stats = scheduler.stats()
+    assert api.max_in_flight == 2
+    assert (stats["syncs_sent"], stats["sync_errors"]) == (4, 1)
+    # La instalación que no responde no bloquea al resto y se cuenta aparte.
+    assert stats["installations"]["INST_B"]["sync_timeouts"] == 1
+    assert stats["installations"]["INST_B"]["last_error"] == "timeout (0.05s)"
+    assert stats["installations"]["INST_A"]["syncs_sent"] == 1
+    assert stats["installations"]["INST_A"]["sync_errors"] == 0
+
+
+async def test_status_sync_ticks_are_anchored_start_to_start(hass):
+    freezegun = pytest.importorskip("freezegun")
+
+    with freezegun.freeze_time(dt_util.utcnow()) as frozen:
+        scheduler = StatusSyncScheduler(
+            hass, _SlowAPI(), _NeverFresh(), ["INST_A"], _FakeMQTT(False)
+        )
+        scheduler.start()
+
+        # Tick atendido con 10 s de retraso: el siguiente sigue en t0 + 240.
+        await _tick(hass, frozen, STATUS_SYNC_INTERVAL_SECONDS + 10)
+        assert scheduler.syncs_avoided == 1
+        await _tick(hass, frozen, STATUS_SYNC_INTERVAL_SECONDS - 11)
+        assert scheduler.syncs_avoided == 1
+        await _tick(hass, frozen, 1)
+        assert scheduler.syncs_avoided == 2
+        scheduler.stop()